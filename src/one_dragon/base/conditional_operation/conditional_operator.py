@@ -1,7 +1,7 @@
 import time
 from concurrent.futures import ThreadPoolExecutor, Future
 
-from threading import Lock
+from threading import Lock, Condition
 from typing import Optional, Callable, List
 
 from one_dragon.base.conditional_operation.atomic_op import AtomicOp
@@ -19,6 +19,8 @@ from one_dragon.utils.log_utils import log
 
 _od_conditional_op_executor = ThreadPoolExecutor(thread_name_prefix='od_conditional_op', max_workers=32)
 
+_NORMAL_SCENE_MAX_WAIT_SECONDS: float = 1  # 主循环最长的等待时间 防止遗漏唤醒后一直等待
+
 
 class ConditionalOperator(YamlConfig):
 
@@ -43,6 +45,11 @@ class ConditionalOperator(YamlConfig):
         self.running_task: Optional[OperationTask] = None  # 正在运行的任务
         self.running_task_cnt: AtomicInt = AtomicInt()
 
+        # 主循环的唤醒 状态更新、任务结束、停止运行时通知
+        self._loop_condition: Condition = Condition()
+        self._loop_wake_cnt: int = 0  # 通知次数 用于判断等待前是否已经有新的通知
+        self._loop_id: int = 0  # 主循环的编号 重新开始运行后 旧的主循环退出
+
     def init(
             self,
             op_getter: Callable[[OperationDef], AtomicOp],
@@ -106,38 +113,48 @@ class ConditionalOperator(YamlConfig):
         self.running_task_cnt.set(0)  # 每次重置计数器 防止有bug导致无法正常运行
 
         if self.normal_scene_handler is not None:
-            future: Future = _od_conditional_op_executor.submit(self._normal_scene_loop)
+            self._loop_id += 1
+            future: Future = _od_conditional_op_executor.submit(self._normal_scene_loop, self._loop_id)
             future.add_done_callback(thread_utils.handle_future_result)
 
         return True
 
-    def _normal_scene_loop(self) -> None:
+    def _normal_scene_loop(self, loop_id: int) -> None:
         """
         主循环
+        不轮询 在以下时机重新判断
+        - 有状态更新
+        - 其它场景的任务结束
+        - 场景冷却结束
+        - 某个状态进入或离开表达式要求的时间范围
+        :param loop_id: 主循环的编号
         :return:
         """
-        normal_handler_id = id(self.normal_scene_handler)
-        while self.is_running:
-            if self.running_task_cnt.get() > 0:
-                # 有其它场景在运行 等待
-                time.sleep(0.02)
-            else:
-                # log.debug('开始等待新的主循环')
-                to_sleep: Optional[float] = None
-
-                # 上锁后确保运行状态不会被篡改
-                with self._task_lock:
-                    if not self.is_running:
-                        # 已经被stop_running中断了 不继续
-                        break
-
+        normal_handler = self.normal_scene_handler
+        normal_handler_id = id(normal_handler)
+        while self.is_running and loop_id == self._loop_id:
+            # 先记录通知次数 判断期间有新的通知时 不进行等待
+            with self._loop_condition:
+                wake_cnt = self._loop_wake_cnt
+
+            to_wait: Optional[float] = None  # None代表等待通知
+            # 上锁后确保运行状态不会被篡改
+            with self._task_lock:
+                if not self.is_running or loop_id != self._loop_id:
+                    # 已经被stop_running中断了 不继续
+                    break
+
+                if self.running_task_cnt.get() > 0:
+                    # 有其它场景在运行 等待任务结束
+                    pass
+                else:
                     trigger_time = time.time()
                     last_trigger_time = self.last_trigger_time.get(normal_handler_id, 0)
                     past_time = trigger_time - last_trigger_time
-                    if past_time < self.normal_scene_handler.interval_seconds:
-                        to_sleep = self.normal_scene_handler.interval_seconds - past_time
+                    if past_time < normal_handler.interval_seconds:
+                        to_wait = normal_handler.interval_seconds - past_time
                     else:
-                        new_task = self.normal_scene_handler.get_operations(trigger_time)
+                        new_task = normal_handler.get_operations(trigger_time)
                         if new_task is not None:
                             log.debug(f'当前场景 主循环 当前条件 {new_task.expr_display}')
                             self.running_task = new_task
@@ -145,12 +162,38 @@ class ConditionalOperator(YamlConfig):
                             self.running_task_cnt.inc()
                             future = self.running_task.run_async()
                             future.add_done_callback(self._on_task_done)
+                        else:
+                            # 没有命中的状态 等到状态更新或者时间范围变化
+                            next_change_time = normal_handler.get_next_change_time(trigger_time)
+                            if next_change_time is not None:
+                                to_wait = next_change_time - trigger_time
+
+            # 等待不能写在锁里 要尽快释放锁
+            self._wait_loop(wake_cnt, to_wait)
+
+    def _wait_loop(self, wake_cnt: int, to_wait: Optional[float]) -> None:
+        """
+        主循环等待通知或者超时
+        :param wake_cnt: 开始判断前的通知次数 已经有新的通知时不等待
+        :param to_wait: 最多等待的秒数 None代表只等待通知
+        :return:
+        """
+        if to_wait is None or to_wait > _NORMAL_SCENE_MAX_WAIT_SECONDS:
+            to_wait = _NORMAL_SCENE_MAX_WAIT_SECONDS
+        with self._loop_condition:
+            if self._loop_wake_cnt != wake_cnt or not self.is_running:
+                return
+            if to_wait > 0:
+                self._loop_condition.wait(to_wait)
 
-                if to_sleep is not None:
-                    # 等待时间不能写在锁里 要尽快释放锁
-                    time.sleep(to_sleep)
-                else:  # 没有命中的状态 或者 提交执行了 那就自旋等待
-                    time.sleep(0.02)
+    def _notify_loop(self) -> None:
+        """
+        唤醒主循环重新判断
+        :return:
+        """
+        with self._loop_condition:
+            self._loop_wake_cnt += 1
+            self._loop_condition.notify_all()
 
     def _trigger_scene(self, state_name: str) -> None:
         """
@@ -215,6 +258,7 @@ class ConditionalOperator(YamlConfig):
         with self._task_lock:
             self.is_running = False
             self._stop_running_task()
+        self._notify_loop()
 
     def _stop_running_task(self) -> None:
         """
@@ -228,6 +272,7 @@ class ConditionalOperator(YamlConfig):
                 # 如果 finish=True 则计数器已经在 _on_task_done 减少了 这里就不减了
                 # 如果 finish=False 则代表还有操作在继续。在这里要减少计数器而不是等_on_task_done 让无触发器场景尽早运行
                 self.running_task_cnt.dec()
+                self._notify_loop()
 
     def _on_task_done(self, future: Future) -> None:
         """
@@ -241,6 +286,7 @@ class ConditionalOperator(YamlConfig):
                     self.running_task.priority = None
             except Exception:  # run_async里有callback打印日志
                 pass
+        self._notify_loop()
 
     def get_usage_states(self) -> set[str]:
         """
@@ -273,6 +319,7 @@ class ConditionalOperator(YamlConfig):
         state_recorder = self._update_state_recorder(state_record)
         if state_recorder is None:
             return
+        self._notify_loop()
 
         # 再去触发具体的场景 由自己的线程处理
         if not state_record.is_clear:
@@ -292,11 +339,13 @@ class ConditionalOperator(YamlConfig):
         top_priority_handler: Optional[SceneHandler] = None
         top_priority_state: Optional[str] = None
 
+        updated: bool = False
         for state_record in state_records:
             state_name = state_record.state_name
             state_recorder = self._update_state_recorder(state_record)
             if state_recorder is None:
                 continue
+            updated = True
             if state_record.is_clear:
                 continue
 
@@ -319,6 +368,9 @@ class ConditionalOperator(YamlConfig):
                 top_priority_handler = handler
                 top_priority_state = state_name
 
+        if updated:
+            self._notify_loop()
+
         # 触发具体的场景 由自己的线程处理
         if top_priority_state is not None:
             future: Future = _od_conditional_op_executor.submit(self._trigger_scene, top_priority_state)
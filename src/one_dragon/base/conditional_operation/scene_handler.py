@@ -24,6 +24,19 @@ class SceneHandler:
                 return task
         return None
 
+    def get_next_change_time(self, now: float) -> Optional[float]:
+        """
+        不考虑状态更新的情况下 判断结果下一次可能发生变化的时间
+        :param now: 当前时间
+        :return: 下一次可能变化的时间 不会再随时间变化时返回None
+        """
+        result: Optional[float] = None
+        for sh in self.state_handlers:
+            sh_time = sh.get_next_change_time(now)
+            if sh_time is not None and (result is None or sh_time < result):
+                result = sh_time
+        return result
+
     def get_usage_states(self) -> set[str]:
         """
         获取使用的状态
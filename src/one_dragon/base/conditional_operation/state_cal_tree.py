@@ -1,9 +1,12 @@
+import threading
 from enum import Enum
-from typing import Optional, Callable
+from typing import Optional, Callable, List, Tuple
 
 from one_dragon.base.conditional_operation.state_recorder import StateRecorder
 from one_dragon.utils.log_utils import log
 
+_CACHE_MARGIN_SECONDS: float = 1e-6  # 缓存结果提前失效的时间 避免浮点误差导致在边界上使用了错误的缓存
+
 
 class StateCalNodeType(Enum):
 
@@ -96,6 +99,36 @@ class StateCalNode:
         elif self.node_type == StateCalNodeType.TRUE:
             return True
 
+    def get_next_change_time(self, now: float) -> Optional[float]:
+        """
+        不考虑状态更新的情况下 判断结果下一次可能发生变化的时间
+        结果只会在某个状态进入或离开生效时间范围时变化
+        :param now: 当前时间
+        :return: 下一次可能变化的时间 不会再随时间变化时返回None
+        """
+        if self.node_type == StateCalNodeType.OP:
+            left_time = self.left_child.get_next_change_time(now)
+            if self.right_child is None:
+                return left_time
+            right_time = self.right_child.get_next_change_time(now)
+            if left_time is None:
+                return right_time
+            elif right_time is None:
+                return left_time
+            else:
+                return min(left_time, right_time)
+        elif self.node_type == StateCalNodeType.STATE:
+            last_record_time = self.state_recorder.last_record_time
+            diff = now - last_record_time
+            if diff < self.state_time_range_min:
+                return last_record_time + self.state_time_range_min
+            elif diff <= self.state_time_range_max:
+                return last_record_time + self.state_time_range_max
+            else:
+                return None
+        else:
+            return None
+
     def get_usage_states(self) -> set[str]:
         """
         获取使用的状态
@@ -125,6 +158,170 @@ class StateCalNode:
             self.state_recorder.dispose()
 
 
+class StateCalSlot:
+
+    def __init__(self, node: StateCalNode):
+        """
+        编译后表达式中的一个状态判断 对应状态计算树的一个叶子节点
+        :param node: 状态记录器节点
+        """
+        self.state_recorder: StateRecorder = node.state_recorder
+        self.time_range_min: float = node.state_time_range_min
+        self.time_range_max: float = node.state_time_range_max
+        self.value_range_min: Optional[int] = node.state_value_range_min
+        self.value_range_max: Optional[int] = node.state_value_range_max
+        self.check_value: bool = self.value_range_min is not None and self.value_range_max is not None
+
+    def is_valid(self, now: float) -> bool:
+        """
+        与 StateCalNode.in_time_range 的状态节点判断一致
+        :param now: 当前时间
+        :return:
+        """
+        diff = now - self.state_recorder.last_record_time
+        if not (self.time_range_min <= diff <= self.time_range_max):
+            return False
+        if self.check_value:
+            last_value = self.state_recorder.last_value
+            if last_value is None:
+                return False
+            return self.value_range_min <= last_value <= self.value_range_max
+        return True
+
+    def get_next_change_time(self, now: float) -> Optional[float]:
+        """
+        与 StateCalNode.get_next_change_time 的状态节点判断一致
+        :param now: 当前时间
+        :return:
+        """
+        last_record_time = self.state_recorder.last_record_time
+        diff = now - last_record_time
+        if diff < self.time_range_min:
+            return last_record_time + self.time_range_min
+        elif diff <= self.time_range_max:
+            return last_record_time + self.time_range_max
+        else:
+            return None
+
+
+class StateCalExpr:
+
+    OP_SLOT: int = 0
+    OP_AND: int = 1
+    OP_OR: int = 2
+    OP_NOT: int = 3
+    OP_TRUE: int = 4
+
+    def __init__(self, root: StateCalNode):
+        """
+        将状态计算树编译成扁平的后缀表达式 叶子节点的状态判断放在数组中 按下标引用
+        计算结果会被缓存 只有以下情况会重新计算
+        - 依赖的状态记录发生变化 由状态记录器回调通知
+        - 到达某个状态进入或离开生效时间范围的时间
+        :param root: 状态计算树的根节点
+        """
+        self.slot_list: List[StateCalSlot] = []
+        self.program: List[Tuple[int, int]] = []  # (操作, 状态判断下标)
+        self._compile(root)
+
+        self._lock = threading.Lock()
+        self._dirty: bool = True  # 依赖的状态是否有变化
+        self._value: bool = False  # 缓存的结果
+        self._eval_time: float = 0  # 计算缓存结果时使用的时间
+        self._valid_until: float = 0  # 缓存结果在这个时间前有效
+        self._next_change_time: Optional[float] = None  # 结果下一次可能变化的时间
+
+        recorder_id_set: set[int] = set()
+        for slot in self.slot_list:
+            recorder = slot.state_recorder
+            if id(recorder) in recorder_id_set:
+                continue
+            recorder_id_set.add(id(recorder))
+            recorder.add_change_listener(self.mark_dirty)
+
+    def _compile(self, node: StateCalNode) -> None:
+        if node.node_type == StateCalNodeType.OP:
+            self._compile(node.left_child)
+            if node.op_type == StateCalOpType.NOT:
+                self.program.append((StateCalExpr.OP_NOT, -1))
+            else:
+                self._compile(node.right_child)
+                op = StateCalExpr.OP_AND if node.op_type == StateCalOpType.AND else StateCalExpr.OP_OR
+                self.program.append((op, -1))
+        elif node.node_type == StateCalNodeType.STATE:
+            self.program.append((StateCalExpr.OP_SLOT, len(self.slot_list)))
+            self.slot_list.append(StateCalSlot(node))
+        else:
+            self.program.append((StateCalExpr.OP_TRUE, -1))
+
+    def mark_dirty(self) -> None:
+        """
+        依赖的状态发生变化 下次使用时重新计算
+        """
+        self._dirty = True
+
+    def is_true(self, now: float) -> bool:
+        """
+        计算表达式的结果 与 StateCalNode.in_time_range 一致
+        :param now: 当前时间
+        :return:
+        """
+        with self._lock:
+            if not self._dirty and self._eval_time <= now < self._valid_until:
+                return self._value
+            self._evaluate(now)
+            return self._value
+
+    def get_next_change_time(self, now: float) -> Optional[float]:
+        """
+        不考虑状态更新的情况下 结果下一次可能发生变化的时间
+        :param now: 当前时间
+        :return: 下一次可能变化的时间 不会再随时间变化时返回None
+        """
+        with self._lock:
+            if self._dirty or not (self._eval_time <= now < self._valid_until):
+                self._evaluate(now)
+            return self._next_change_time
+
+    def _evaluate(self, now: float) -> None:
+        """
+        重新计算结果和有效期 调用前需要上锁
+        :param now: 当前时间
+        :return:
+        """
+        # 先清除标记再读取状态 计算期间有状态变化时 下次会重新计算
+        self._dirty = False
+
+        next_change_time: Optional[float] = None
+        for slot in self.slot_list:
+            change_time = slot.get_next_change_time(now)
+            if change_time is not None and (next_change_time is None or change_time < next_change_time):
+                next_change_time = change_time
+
+        stack: List[bool] = []
+        for op, slot_idx in self.program:
+            if op == StateCalExpr.OP_SLOT:
+                stack.append(self.slot_list[slot_idx].is_valid(now))
+            elif op == StateCalExpr.OP_AND:
+                right = stack.pop()
+                stack[-1] = stack[-1] and right
+            elif op == StateCalExpr.OP_OR:
+                right = stack.pop()
+                stack[-1] = stack[-1] or right
+            elif op == StateCalExpr.OP_NOT:
+                stack[-1] = not stack[-1]
+            else:
+                stack.append(True)
+
+        self._value = stack[-1]
+        self._eval_time = now
+        self._next_change_time = next_change_time
+        if next_change_time is None:
+            self._valid_until = float('inf')
+        else:
+            self._valid_until = next_change_time - _CACHE_MARGIN_SECONDS
+
+
 def construct_state_cal_tree(expr_str: str, state_getter: Callable[[str], StateRecorder], debugname: Optional[str] = None) -> StateCalNode:
     """
     根据表达式 构造出状态判断树
@@ -2,7 +2,7 @@ from typing import List, Optional, Set
 
 from one_dragon.base.conditional_operation.atomic_op import AtomicOp
 from one_dragon.base.conditional_operation.operation_task import OperationTask
-from one_dragon.base.conditional_operation.state_cal_tree import StateCalNode
+from one_dragon.base.conditional_operation.state_cal_tree import StateCalNode, StateCalExpr
 from one_dragon.utils.log_utils import log
 
 
@@ -25,6 +25,7 @@ class StateHandler:
         self.expr: str = expr
         self.debug_name: Optional[str] = debug_name  # 新增属性
         self.state_cal_tree: StateCalNode = state_cal_tree
+        self.state_expr: StateCalExpr = StateCalExpr(state_cal_tree)  # 编译后的表达式 状态没有变化时直接使用缓存的结果
         self.sub_handlers: List[StateHandler] = sub_handlers
         self.operations: List[AtomicOp] = operations
         self.interrupt_states: Set[str] = interrupt_states
@@ -35,7 +36,7 @@ class StateHandler:
         :param trigger_time:
         :return:
         """
-        if self.state_cal_tree.in_time_range(trigger_time):
+        if self.state_expr.is_true(trigger_time):
             if self.sub_handlers is not None and len(self.sub_handlers) > 0:
                 for sub_handler in self.sub_handlers:
                     task = sub_handler.get_operations(trigger_time)
@@ -51,6 +52,22 @@ class StateHandler:
 
         return None
 
+    def get_next_change_time(self, now: float) -> Optional[float]:
+        """
+        不考虑状态更新的情况下 判断结果下一次可能发生变化的时间
+        :param now: 当前时间
+        :return: 下一次可能变化的时间 不会再随时间变化时返回None
+        """
+        result: Optional[float] = None
+        if self.state_expr is not None:
+            result = self.state_expr.get_next_change_time(now)
+        if self.sub_handlers is not None:
+            for sub in self.sub_handlers:
+                sub_time = sub.get_next_change_time(now)
+                if sub_time is not None and (result is None or sub_time < result):
+                    result = sub_time
+        return result
+
     def get_usage_states(self) -> set[str]:
         """
         获取使用的状态
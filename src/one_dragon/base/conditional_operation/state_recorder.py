@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Optional, List, Callable
 
 
 class StateRecord:
@@ -29,6 +29,20 @@ class StateRecorder:
         self.last_record_time: float = -1  # 上次记录这个状态的时间 -1代表还没有触发过 0代表被清除
         self.last_value: Optional[int] = None  # 上一次记录的值
 
+        self._change_listener_list: List[Callable[[], None]] = []  # 状态变化时的回调 用于让依赖这个状态的表达式重新计算
+
+    def add_change_listener(self, listener: Callable[[], None]) -> None:
+        """
+        添加状态变化的回调 在状态记录修改后调用
+        :param listener: 回调
+        :return:
+        """
+        self._change_listener_list.append(listener)
+
+    def _notify_change(self) -> None:
+        for listener in self._change_listener_list:
+            listener()
+
     def update_state_record(self, record: StateRecord) -> None:
         """
         状态事件被触发时 记录触发的时间
@@ -51,6 +65,8 @@ class StateRecorder:
         if record.value_add is not None:
             self.last_value += record.value_add
 
+        self._notify_change()
+
     def clear_state_record(self) -> None:
         """
         互斥事件发生时 清空
@@ -61,6 +77,8 @@ class StateRecorder:
         self.last_record_time = 0
         self.last_value = None
 
+        self._notify_change()
+
     def dispose(self) -> None:
         """
         销毁时 解绑事件
@@ -68,5 +86,6 @@ class StateRecorder:
         """
         self.state_name = None
         self.mutex_list = None
+        self._change_listener_list = []
         self.last_value = None
         self.last_value = None
@@ -26,6 +26,78 @@ class BasicModelConfig(YamlConfig):
     def ocr_gpu(self, new_value: bool) -> None:
         self.update('ocr_gpu', new_value)
 
+    @property
+    def onnx_intra_op_num_threads(self) -> int:
+        return self.get('onnx_intra_op_num_threads', 0)
+
+    @onnx_intra_op_num_threads.setter
+    def onnx_intra_op_num_threads(self, new_value: int) -> None:
+        self.update('onnx_intra_op_num_threads', new_value)
+
+    @property
+    def onnx_inter_op_num_threads(self) -> int:
+        return self.get('onnx_inter_op_num_threads', 0)
+
+    @onnx_inter_op_num_threads.setter
+    def onnx_inter_op_num_threads(self, new_value: int) -> None:
+        self.update('onnx_inter_op_num_threads', new_value)
+
+    @property
+    def onnx_graph_optimization_level(self) -> str:
+        return self.get('onnx_graph_optimization_level', 'all')
+
+    @onnx_graph_optimization_level.setter
+    def onnx_graph_optimization_level(self, new_value: str) -> None:
+        self.update('onnx_graph_optimization_level', new_value)
+
+    @property
+    def onnx_execution_mode(self) -> str:
+        return self.get('onnx_execution_mode', 'sequential')
+
+    @onnx_execution_mode.setter
+    def onnx_execution_mode(self, new_value: str) -> None:
+        self.update('onnx_execution_mode', new_value)
+
+    @property
+    def onnx_enable_cpu_mem_arena(self) -> bool:
+        return self.get('onnx_enable_cpu_mem_arena', True)
+
+    @onnx_enable_cpu_mem_arena.setter
+    def onnx_enable_cpu_mem_arena(self, new_value: bool) -> None:
+        self.update('onnx_enable_cpu_mem_arena', new_value)
+
+    @property
+    def onnx_use_global_thread_pool(self) -> bool:
+        return self.get('onnx_use_global_thread_pool', False)
+
+    @onnx_use_global_thread_pool.setter
+    def onnx_use_global_thread_pool(self, new_value: bool) -> None:
+        self.update('onnx_use_global_thread_pool', new_value)
+
+    @property
+    def onnx_cache_optimized_model(self) -> bool:
+        return self.get('onnx_cache_optimized_model', False)
+
+    @onnx_cache_optimized_model.setter
+    def onnx_cache_optimized_model(self, new_value: bool) -> None:
+        self.update('onnx_cache_optimized_model', new_value)
+
+    def get_onnx_session_config(self) -> 'OnnxSessionConfig':
+        """
+        创建onnx会话使用的配置
+        :return:
+        """
+        from one_dragon.yolo.onnx_session_factory import OnnxSessionConfig
+        return OnnxSessionConfig(
+            intra_op_num_threads=self.onnx_intra_op_num_threads,
+            inter_op_num_threads=self.onnx_inter_op_num_threads,
+            graph_optimization_level=self.onnx_graph_optimization_level,
+            execution_mode=self.onnx_execution_mode,
+            enable_cpu_mem_arena=self.onnx_enable_cpu_mem_arena,
+            use_global_thread_pool=self.onnx_use_global_thread_pool,
+            cache_optimized_model=self.onnx_cache_optimized_model,
+        )
+
     def using_old_model(self) -> bool:
         """
         是否在使用旧模型
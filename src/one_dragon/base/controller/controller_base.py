@@ -1,3 +1,4 @@
+import threading
 import time
 
 from cv2.typing import MatLike
@@ -24,6 +25,7 @@ class ControllerBase:
         self.screenshot_history: List[ScreenshotWithTime] = []
         self.screenshot_alive_seconds: float = screenshot_alive_seconds  # 截图在内存的存活时间
         self.max_screenshot_cnt: int = max_screenshot_cnt  # 内存中最多保持的截图数量
+        self._screenshot_history_lock = threading.Lock()  # 截图可能在多个线程中进行
 
     def init_before_context_run(self) -> bool:
         """
@@ -60,16 +62,29 @@ class ControllerBase:
         fix_screen = self.fill_uid_black(screen)
 
         if self.max_screenshot_cnt > 0:
-            self.screenshot_history.append(ScreenshotWithTime(fix_screen, now))
-            while len(self.screenshot_history) > self.max_screenshot_cnt:
-                self.screenshot_history.pop(0)
+            with self._screenshot_history_lock:
+                self.screenshot_history.append(ScreenshotWithTime(fix_screen, now))
+                while len(self.screenshot_history) > self.max_screenshot_cnt:
+                    self.screenshot_history.pop(0)
 
-            while (len(self.screenshot_history) > 0
-                and now - self.screenshot_history[0].create_time > self.screenshot_alive_seconds):
-                self.screenshot_history.pop(0)
+                while (len(self.screenshot_history) > 0
+                    and now - self.screenshot_history[0].create_time > self.screenshot_alive_seconds):
+                    self.screenshot_history.pop(0)
 
         return fix_screen
 
+    def init_screenshot_thread(self) -> None:
+        """
+        在当前线程中持续截图前调用 创建当前线程使用的截图资源 由子类实现
+        """
+        pass
+
+    def release_screenshot_thread(self) -> None:
+        """
+        当前线程不再截图时调用 释放 init_screenshot_thread 创建的资源 由子类实现
+        """
+        pass
+
     def before_screenshot(self) -> None:
         """
         截图前的操作 由子类实现
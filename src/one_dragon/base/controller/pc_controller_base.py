@@ -1,3 +1,4 @@
+import threading
 import time
 
 import ctypes
@@ -43,6 +44,7 @@ class PcControllerBase(ControllerBase):
 
         self.btn_controller: PcButtonController = self.keyboard_controller
         self.sct = None
+        self._thread_sct = threading.local()  # 单独截图线程使用的mss mss的句柄只能在创建的线程中使用
 
     def init_before_context_run(self) -> bool:
         pyautogui.FAILSAFE = False  # 禁用 Fail-Safe,防止鼠标接近屏幕的边缘或角落时报错
@@ -60,6 +62,30 @@ class PcControllerBase(ControllerBase):
 
         return True
 
+    def init_screenshot_thread(self) -> None:
+        """
+        为当前线程创建单独的mss 之后在当前线程中截图都使用它
+        """
+        self.release_screenshot_thread()
+        try:
+            import mss
+            self._thread_sct.sct = mss.mss()
+        except Exception:
+            log.error('截图线程初始化失败', exc_info=True)
+
+    def release_screenshot_thread(self) -> None:
+        """
+        关闭当前线程单独使用的mss
+        """
+        sct = getattr(self._thread_sct, 'sct', None)
+        if sct is None:
+            return
+        self._thread_sct.sct = None
+        try:
+            sct.close()
+        except Exception:
+            pass
+
     def active_window(self) -> None:
         """
         前置窗口
@@ -139,7 +165,10 @@ class PcControllerBase(ControllerBase):
                 except Exception:
                     pass
             else:
-                screenshot = cv2.cvtColor(np.array(self.sct.grab(monitor)), cv2.COLOR_BGRA2RGB)
+                sct = getattr(self._thread_sct, 'sct', None)
+                if sct is None:
+                    sct = self.sct
+                screenshot = cv2.cvtColor(np.array(sct.grab(monitor)), cv2.COLOR_BGRA2RGB)
         else:
             img: Image = pyautogui.screenshot(region=(left, top, width, height))
             screenshot = np.array(img)
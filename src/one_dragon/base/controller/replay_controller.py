@@ -0,0 +1,269 @@
+import bisect
+import os
+import re
+import threading
+import time
+from typing import List, Optional, Any, Tuple
+
+from cv2.typing import MatLike
+
+from one_dragon.base.controller.controller_base import ControllerBase
+from one_dragon.base.controller.pc_button.pc_button_controller import PcButtonController
+from one_dragon.base.geometry.point import Point
+from one_dragon.utils import cv2_utils
+from one_dragon.utils.log_utils import log
+
+# 文件名结尾的毫秒时间戳 与 debug_utils.save_debug_image 保存的文件名一致 例如 _1735134333210.png
+_FRAME_TIME_PATTERN = re.compile(r'(\d{10,})$')
+_IMAGE_SUFFIX_LIST = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+class ReplayFrame:
+
+    def __init__(self, frame_time: float, file_path: Optional[str] = None, image: Optional[MatLike] = None):
+        """
+        录制的一帧画面
+        :param frame_time: 录制时的时间戳 秒
+        :param file_path: 图片路径 没有传入图片时 第一次使用时读取
+        :param image: 图片
+        """
+        self.frame_time: float = frame_time
+        self.file_path: Optional[str] = file_path
+        self._image: Optional[MatLike] = image
+
+    @property
+    def image(self) -> MatLike:
+        if self._image is None and self.file_path is not None:
+            self._image = cv2_utils.read_image(self.file_path)
+        return self._image
+
+
+class ReplayAction:
+
+    def __init__(self, action_name: str, args: Tuple, kwargs: dict[str, Any],
+                 frame_idx: int, frame_time: Optional[float]):
+        """
+        回放过程中记录的一个操作
+        :param action_name: 操作名称 即控制器的方法名
+        :param args: 参数
+        :param kwargs: 参数
+        :param frame_idx: 操作时最后一次截图的帧下标
+        :param frame_time: 操作时最后一次截图的录制时间
+        """
+        self.action_name: str = action_name
+        self.args: Tuple = args
+        self.kwargs: dict[str, Any] = kwargs
+        self.frame_idx: int = frame_idx
+        self.frame_time: Optional[float] = frame_time
+
+    def __str__(self) -> str:
+        return '%s %s %s 帧 %d' % (self.action_name, self.args, self.kwargs, self.frame_idx)
+
+
+def load_frame_list(frame_dir: str, default_interval: float = 0.1, preload: bool = False) -> List[ReplayFrame]:
+    """
+    读取一个文件夹中录制的画面
+    文件名以毫秒时间戳结尾时 使用该时间戳 否则按文件名顺序以固定间隔排列
+    :param frame_dir: 文件夹
+    :param default_interval: 没有时间戳时 每帧的间隔
+    :param preload: 是否提前读取图片 避免回放时读取图片的耗时影响测试结果
+    :return: 按时间排序的画面
+    """
+    frame_list: List[ReplayFrame] = []
+    file_name_list = sorted(i for i in os.listdir(frame_dir) if i.lower().endswith(_IMAGE_SUFFIX_LIST))
+    for idx, file_name in enumerate(file_name_list):
+        stem = os.path.splitext(file_name)[0]
+        match = _FRAME_TIME_PATTERN.search(stem)
+        frame_time = int(match.group(1)) / 1000.0 if match is not None else idx * default_interval
+        frame_list.append(ReplayFrame(frame_time, file_path=os.path.join(frame_dir, file_name)))
+    frame_list.sort(key=lambda x: x.frame_time)
+
+    if preload:
+        for frame in frame_list:
+            _ = frame.image
+
+    return frame_list
+
+
+def record_frames(controller: ControllerBase, save_dir: str, seconds: float, interval: float = 0.1) -> int:
+    """
+    使用真实的控制器录制一段画面 保存的文件可以直接用于回放
+    :param controller: 控制器
+    :param save_dir: 保存的文件夹
+    :param seconds: 录制时长
+    :param interval: 截图间隔
+    :return: 录制的帧数
+    """
+    os.makedirs(save_dir, exist_ok=True)
+    frame_cnt: int = 0
+    end_time = time.monotonic() + seconds
+    while time.monotonic() < end_time:
+        start_time = time.monotonic()
+        screenshot_time = time.time()
+        screen = controller.screenshot()
+        if screen is not None:
+            cv2_utils.save_image(screen, os.path.join(save_dir, '_%d.png' % round(screenshot_time * 1000)))
+            frame_cnt += 1
+        to_sleep = interval - (time.monotonic() - start_time)
+        if to_sleep > 0:
+            time.sleep(to_sleep)
+    return frame_cnt
+
+
+class ReplayButtonController(PcButtonController):
+
+    def __init__(self, controller: 'ReplayController'):
+        """
+        回放时使用的按键控制器 只记录按键 不实际发送
+        """
+        PcButtonController.__init__(self)
+        self.controller: ReplayController = controller
+
+    def tap(self, key: str) -> None:
+        self.controller.record_action('tap', key)
+
+    def press(self, key: str, press_time: Optional[float] = None) -> None:
+        self.controller.record_action('press', key, press_time=press_time)
+
+    def release(self, key: str) -> None:
+        self.controller.record_action('release', key)
+
+
+class ReplayController(ControllerBase):
+
+    def __init__(self, frame_list: List[ReplayFrame],
+                 realtime: bool = False,
+                 loop: bool = False,
+                 standard_width: int = 1920,
+                 standard_height: int = 1080):
+        """
+        回放录制画面的控制器 用于在没有游戏的情况下运行识别逻辑
+        截图返回录制的画面 点击和按键只做记录 不实际发送
+        :param frame_list: 按时间排序的画面
+        :param realtime: True时按录制时的时间推进画面 处理慢时会跳过中间的帧; False时每次截图返回下一帧
+        :param loop: 回放完毕后是否从头开始
+        :param standard_width: 画面宽度
+        :param standard_height: 画面高度
+        """
+        ControllerBase.__init__(self)
+        self.frame_list: List[ReplayFrame] = frame_list
+        self.realtime: bool = realtime
+        self.loop: bool = loop
+        self.standard_width: int = standard_width
+        self.standard_height: int = standard_height
+
+        self._frame_time_list: List[float] = [i.frame_time for i in frame_list]
+        self._lock = threading.Lock()
+
+        self.btn_controller: PcButtonController = ReplayButtonController(self)
+        self.action_list: List[ReplayAction] = []  # 记录的操作
+        self.reset()
+
+    @staticmethod
+    def from_dir(frame_dir: str, realtime: bool = False, loop: bool = False, preload: bool = True,
+                 standard_width: int = 1920, standard_height: int = 1080) -> 'ReplayController':
+        """
+        使用一个文件夹中录制的画面创建
+        """
+        return ReplayController(load_frame_list(frame_dir, preload=preload), realtime=realtime, loop=loop,
+                                standard_width=standard_width, standard_height=standard_height)
+
+    def reset(self) -> None:
+        """
+        回到第一帧 清空记录的操作
+        """
+        with self._lock:
+            self.frame_idx: int = -1  # 最后一次截图返回的帧下标
+            self.screenshot_cnt: int = 0  # 截图次数
+            self.finished: bool = len(self.frame_list) == 0  # 是否已经回放完毕
+            self._replay_start_time: Optional[float] = None  # 实时回放时 第一次截图的时间
+            self.action_list = []
+
+    def init_before_context_run(self) -> bool:
+        return True
+
+    @property
+    def is_game_window_ready(self) -> bool:
+        return True
+
+    @property
+    def last_frame_time(self) -> Optional[float]:
+        """
+        最后一次截图返回的帧 录制时的时间
+        """
+        if 0 <= self.frame_idx < len(self.frame_list):
+            return self.frame_list[self.frame_idx].frame_time
+        return None
+
+    def get_screenshot(self, independent: bool = False) -> Optional[MatLike]:
+        with self._lock:
+            if len(self.frame_list) == 0:
+                return None
+            self.screenshot_cnt += 1
+            if self.realtime:
+                self.frame_idx = self._get_realtime_frame_idx()
+            else:
+                self.frame_idx = self._get_next_frame_idx()
+            return self.frame_list[self.frame_idx].image
+
+    def _get_next_frame_idx(self) -> int:
+        next_idx = self.frame_idx + 1
+        if next_idx >= len(self.frame_list) - 1:
+            if self.loop:
+                next_idx = next_idx % len(self.frame_list)
+            else:
+                next_idx = len(self.frame_list) - 1
+                self.finished = True
+        return next_idx
+
+    def _get_realtime_frame_idx(self) -> int:
+        now = time.monotonic()
+        if self._replay_start_time is None:
+            self._replay_start_time = now
+        first_time = self._frame_time_list[0]
+        duration = self._frame_time_list[-1] - first_time
+        elapsed = now - self._replay_start_time
+        if elapsed >= duration:
+            if self.loop and duration > 0:
+                elapsed = elapsed % duration
+            else:
+                self.finished = True
+                return len(self.frame_list) - 1
+        # 录制时间不超过当前回放时间的最后一帧
+        return max(0, bisect.bisect_right(self._frame_time_list, first_time + elapsed) - 1)
+
+    def record_action(self, action_name: str, *args, **kwargs) -> None:
+        """
+        记录一个操作
+        :param action_name: 操作名称
+        :return:
+        """
+        action = ReplayAction(action_name, args, kwargs, self.frame_idx, self.last_frame_time)
+        self.action_list.append(action)
+        log.debug('回放操作 %s', action)
+
+    def click(self, pos: Point = None, press_time: float = 0, pc_alt: bool = False) -> bool:
+        if pos is not None and (pos.x < 0 or pos.x >= self.standard_width
+                                or pos.y < 0 or pos.y >= self.standard_height):
+            log.error('点击非游戏窗口区域 (%s)', pos)
+            return False
+        self.record_action('click', pos, press_time=press_time, pc_alt=pc_alt)
+        return True
+
+    def scroll(self, down: int, pos: Point = None):
+        self.record_action('scroll', down, pos)
+
+    def drag_to(self, end: Point, start: Point = None, duration: float = 0.5):
+        self.record_action('drag_to', end, start, duration=duration)
+
+    def close_game(self):
+        self.record_action('close_game')
+
+    def input_str(self, to_input: str, interval: float = 0.1):
+        self.record_action('input_str', to_input, interval=interval)
+
+    def delete_all_input(self):
+        self.record_action('delete_all_input')
+
+    def mouse_move(self, game_pos: Point):
+        self.record_action('mouse_move', game_pos)
@@ -0,0 +1,193 @@
+import threading
+import time
+from typing import Optional, Any
+
+from cv2.typing import MatLike
+
+from one_dragon.base.controller.controller_base import ControllerBase
+from one_dragon.utils.log_utils import log
+
+
+class CapturedFrame:
+
+    def __init__(self, frame_id: int, image: MatLike, capture_start_time: float, capture_end_time: float):
+        """
+        截图线程得到的一帧画面 时间均使用 time.time 与 StateRecord 一致
+        :param frame_id: 帧序号 从1开始递增
+        :param image: 画面
+        :param capture_start_time: 开始截图的时间
+        :param capture_end_time: 截图完成的时间
+        """
+        self.frame_id: int = frame_id
+        self.image: MatLike = image
+        self.capture_start_time: float = capture_start_time
+        self.capture_end_time: float = capture_end_time
+        self.take_time: Optional[float] = None  # 被取出进行识别的时间
+
+    @property
+    def screenshot_time(self) -> float:
+        """
+        画面对应的时间 传给识别作为状态的触发时间
+        与串行截图时一致 使用开始截图的时间
+        """
+        return self.capture_start_time
+
+    @property
+    def capture_cost(self) -> float:
+        return self.capture_end_time - self.capture_start_time
+
+    @property
+    def frame_age(self) -> float:
+        """
+        从截图完成到被取出识别 等待的时间
+        """
+        return (self.take_time if self.take_time is not None else time.time()) - self.capture_end_time
+
+
+class ScreenshotPipelineStats:
+
+    def __init__(self):
+        """
+        截图线程的统计数据
+        """
+        self.capture_cnt: int = 0  # 截图次数
+        self.error_cnt: int = 0  # 截图出错次数
+        self.take_cnt: int = 0  # 被取出识别的帧数
+        self.drop_cnt: int = 0  # 没被取出就被更新的画面覆盖的帧数
+        self.total_capture_cost: float = 0  # 截图总耗时 秒
+        self.total_frame_age: float = 0  # 被取出的帧 从截图完成到被取出的总等待时间 秒
+
+    @property
+    def avg_capture_cost(self) -> float:
+        return self.total_capture_cost / self.capture_cnt if self.capture_cnt > 0 else 0
+
+    @property
+    def avg_frame_age(self) -> float:
+        return self.total_frame_age / self.take_cnt if self.take_cnt > 0 else 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'capture': self.capture_cnt,
+            'error': self.error_cnt,
+            'take': self.take_cnt,
+            'drop': self.drop_cnt,
+            'avg_capture_cost': self.avg_capture_cost,
+            'avg_frame_age': self.avg_frame_age,
+        }
+
+
+class ScreenshotPipeline:
+
+    def __init__(self, controller: ControllerBase, interval: float = 0.02, error_wait: float = 1):
+        """
+        在单独的线程中持续截图 只保留最新的一帧
+        识别方取出最新的画面 处理期间截到的旧画面直接被覆盖 不会排队
+        这样截图和识别同时进行 状态更新的频率取决于较慢的一方 而不是两者之和
+        :param controller: 控制器
+        :param interval: 截图间隔 秒 包含截图本身的耗时
+        :param error_wait: 截图出错后 等待多久再重试 秒
+        """
+        self.controller: ControllerBase = controller
+        self.interval: float = interval
+        self.error_wait: float = error_wait
+        self.stats: ScreenshotPipelineStats = ScreenshotPipelineStats()
+
+        self._condition = threading.Condition()
+        self._latest_frame: Optional[CapturedFrame] = None  # 最新的一帧
+        self._latest_taken: bool = False  # 最新的一帧是否已被取出
+        self._next_frame_id: int = 1
+        self._running: bool = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def start(self) -> None:
+        """
+        开始截图 已经在运行时不做任何事
+        """
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._latest_frame = None  # 暂停前的画面已经过时
+            self._thread = threading.Thread(target=self._run, name='screenshot_pipeline', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        停止截图 并唤醒正在等待画面的线程
+        """
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            thread = self._thread
+            self._thread = None
+            self._condition.notify_all()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self) -> None:
+        # 截图资源可能只能在创建的线程中使用 例如mss 因此截图线程使用自己的
+        self.controller.init_screenshot_thread()
+        try:
+            self._capture_loop()
+        finally:
+            self.controller.release_screenshot_thread()
+
+    def _capture_loop(self) -> None:
+        while self._running:
+            start_time = time.time()
+            try:
+                image = self.controller.screenshot()
+            except Exception:
+                image = None
+                log.error('截图失败', exc_info=True)
+            end_time = time.time()
+
+            with self._condition:
+                if not self._running:
+                    break
+                if image is None:
+                    self.stats.error_cnt += 1
+                    self._condition.wait(self.error_wait)
+                    continue
+
+                if self._latest_frame is not None and not self._latest_taken:
+                    self.stats.drop_cnt += 1
+                self._latest_frame = CapturedFrame(self._next_frame_id, image, start_time, end_time)
+                self._latest_taken = False
+                self._next_frame_id += 1
+                self.stats.capture_cnt += 1
+                self.stats.total_capture_cost += end_time - start_time
+                self._condition.notify_all()
+
+                # 在锁中等待 停止时可以立刻被唤醒
+                to_wait = self.interval - (time.time() - start_time)
+                if to_wait > 0:
+                    self._condition.wait(to_wait)
+
+    def get_latest_frame(self, last_frame_id: int = 0, timeout: Optional[float] = None) -> Optional[CapturedFrame]:
+        """
+        取出最新的一帧 没有比上一次取出的更新的画面时 等待截图线程截到新的画面
+        :param last_frame_id: 上一次取出的帧序号
+        :param timeout: 最多等待的秒数 不传入时一直等待
+        :return: 最新的一帧 超时或已停止时返回None
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: not self._running or (self._latest_frame is not None
+                                              and self._latest_frame.frame_id > last_frame_id),
+                timeout
+            )
+            frame = self._latest_frame
+            if not self._running or frame is None or frame.frame_id <= last_frame_id:
+                return None
+            if not self._latest_taken:
+                self._latest_taken = True
+                frame.take_time = time.time()
+                self.stats.take_cnt += 1
+                self.stats.total_frame_age += frame.frame_age
+            return frame
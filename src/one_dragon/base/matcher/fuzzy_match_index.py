@@ -0,0 +1,280 @@
+import difflib
+import heapq
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple, Any
+
+
+def build_char_masks(s: str) -> dict[str, int]:
+    """
+    位并行LCS使用的字符掩码 第i位表示字符串第i个字符是否为该字符
+    :param s: 字符串
+    :return: 字符 -> 掩码
+    """
+    masks: dict[str, int] = {}
+    for i, c in enumerate(s):
+        masks[c] = masks.get(c, 0) | (1 << i)
+    return masks
+
+
+def lcs_length_by_masks(masks: dict[str, int], length: int, other: str) -> int:
+    """
+    位并行计算最长公共子序列长度 (Allison-Dix / Hyyrö)
+    每个字符只需要几次整数运算 结果与动态规划一致
+    :param masks: 第一个字符串的字符掩码
+    :param length: 第一个字符串的长度
+    :param other: 第二个字符串
+    :return: 长度
+    """
+    if length == 0:
+        return 0
+    full = (1 << length) - 1
+    v = full
+    for c in other:
+        m = masks.get(c)
+        if m is None:
+            continue
+        u = v & m
+        v = ((v + u) | (v - u)) & full
+    return length - v.bit_count()
+
+
+def _count_chars(s: str) -> dict[str, int]:
+    cnt: dict[str, int] = {}
+    for c in s:
+        cnt[c] = cnt.get(c, 0) + 1
+    return cnt
+
+
+class FuzzyMatchIndex:
+
+    def __init__(self, word_list: List[str], cache_size: int = 256):
+        """
+        一组目标词的模糊匹配索引 对同一组目标词只需要构建一次
+        - 按字符建立倒排索引 查询时只计算与查询词有相同字符的目标词 得到公共字符数
+        - 公共字符数是LCS长度和difflib匹配字符数的上限 按上限从高到低计算 上限不可能超过当前结果时提前结束
+        - LCS使用位并行计算 目标词的字符掩码提前计算
+        - 缓存每个查询词的结果
+        查询结果与逐个遍历目标词的 find_best_match_by_lcs / difflib.get_close_matches 一致
+        :param word_list: 目标词列表
+        :param cache_size: 缓存的查询结果数量
+        """
+        self.word_list: List[str] = list(word_list)
+
+        # 相同的目标词只计算一次 结果返回第一次出现的下标
+        self._unique_word_list: List[str] = []
+        self._unique_first_idx: List[int] = []
+        self._unique_cnt: List[int] = []
+        self._word_2_uid: dict[str, int] = {}
+        for idx, word in enumerate(self.word_list):
+            uid = self._word_2_uid.get(word)
+            if uid is None:
+                self._word_2_uid[word] = len(self._unique_word_list)
+                self._unique_word_list.append(word)
+                self._unique_first_idx.append(idx)
+                self._unique_cnt.append(1)
+            else:
+                self._unique_cnt[uid] += 1
+
+        self._char_masks: List[dict[str, int]] = [build_char_masks(word) for word in self._unique_word_list]
+
+        # 字符 -> [(目标词, 该字符在目标词中的数量)]
+        self._char_index: dict[str, List[Tuple[int, int]]] = {}
+        for uid, word in enumerate(self._unique_word_list):
+            for c, cnt in _count_chars(word).items():
+                if c not in self._char_index:
+                    self._char_index[c] = []
+                self._char_index[c].append((uid, cnt))
+
+        self._cache_size: int = cache_size
+        self._cache: OrderedDict[tuple, Any] = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _get_common_char_cnt(self, word: str) -> dict[int, int]:
+        """
+        与查询词有相同字符的目标词 以及公共字符的数量
+        :param word: 查询词
+        :return: 目标词 -> 公共字符数量
+        """
+        common_cnt: dict[int, int] = {}
+        for c, word_cnt in _count_chars(word).items():
+            posting_list = self._char_index.get(c)
+            if posting_list is None:
+                continue
+            for uid, cnt in posting_list:
+                common_cnt[uid] = common_cnt.get(uid, 0) + min(cnt, word_cnt)
+        return common_cnt
+
+    def _get_cache(self, key: tuple) -> Tuple[bool, Any]:
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return True, self._cache[key]
+        return False, None
+
+    def _set_cache(self, key: tuple, value: Any) -> None:
+        with self._cache_lock:
+            self._cache[key] = value
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def find_best_match_by_lcs(self, word: str, lcs_percent_threshold: Optional[float] = None) -> Optional[int]:
+        """
+        找出LCS长度占目标词长度比例最大的目标词 结果与 str_utils.find_best_match_by_lcs 一致
+        :param word: 候选词
+        :param lcs_percent_threshold: 要求的LCS阈值
+        :return: 最符合的目标词的下标
+        """
+        key = ('lcs', word, lcs_percent_threshold)
+        found, result = self._get_cache(key)
+        if found:
+            return result
+
+        # 按比例上限从高到低 同样上限时下标小的优先 与遍历时保留第一个最大值一致
+        candidate_list: List[Tuple[float, int, int]] = []
+        for uid, common_cnt in self._get_common_char_cnt(word).items():
+            percent_upper = common_cnt * 1.0 / len(self._unique_word_list[uid])
+            if lcs_percent_threshold is not None and percent_upper < lcs_percent_threshold:
+                continue
+            candidate_list.append((-percent_upper, self._unique_first_idx[uid], uid))
+        candidate_list.sort()
+
+        target_idx: Optional[int] = None
+        target_lcs_percent: Optional[float] = None
+        for neg_percent_upper, idx, uid in candidate_list:
+            if target_lcs_percent is not None:
+                if -neg_percent_upper < target_lcs_percent:
+                    break
+                if -neg_percent_upper == target_lcs_percent and idx > target_idx:
+                    continue
+
+            target_word = self._unique_word_list[uid]
+            lcs = lcs_length_by_masks(self._char_masks[uid], len(target_word), word)
+            if lcs == 0:  # 至少要有一个匹配
+                continue
+            lcs_percent = lcs * 1.0 / len(target_word)
+            if lcs_percent_threshold is not None and lcs_percent < lcs_percent_threshold:
+                continue
+            if (target_idx is None
+                    or lcs_percent > target_lcs_percent
+                    or (lcs_percent == target_lcs_percent and idx < target_idx)):
+                target_idx = idx
+                target_lcs_percent = lcs_percent
+
+        self._set_cache(key, target_idx)
+        return target_idx
+
+    def find_lcs_candidate_idx_list(self, word: str, lcs_percent_threshold: float) -> List[int]:
+        """
+        LCS比例的上限达到阈值的目标词下标 按目标词原来的顺序
+        只用公共字符数过滤 用于在逐个判断前排除不可能匹配的目标词
+        :param word: 候选词
+        :param lcs_percent_threshold: 要求的LCS阈值 LCS长度占目标词长度的比例
+        :return: 可能匹配的目标词的下标
+        """
+        key = ('lcs_candidate', word, lcs_percent_threshold)
+        found, result = self._get_cache(key)
+        if found:
+            return list(result)
+
+        common_cnt_map = self._get_common_char_cnt(word)
+        result = []
+        for idx, target_word in enumerate(self.word_list):
+            common_cnt = common_cnt_map.get(self._word_2_uid[target_word], 0)
+            if common_cnt > 0 and common_cnt >= len(target_word) * lcs_percent_threshold:
+                result.append(idx)
+
+        self._set_cache(key, result)
+        return list(result)
+
+    def get_close_matches(self, word: str, n: int = 3, cutoff: float = 0.6) -> List[str]:
+        """
+        找出最相近的几个目标词 结果与 difflib.get_close_matches(word, word_list, n, cutoff) 一致
+        :param word: 查询词
+        :param n: 最多返回的数量
+        :param cutoff: 相似度阈值
+        :return: 目标词 按相似度从高到低
+        """
+        key = ('difflib', word, n, cutoff)
+        found, result = self._get_cache(key)
+        if found:
+            return list(result)
+
+        if n <= 0 or not 0.0 < cutoff <= 1.0 or len(word) == 0:
+            # 没有公共字符的目标词也可能满足要求 或者参数不合法 使用原来的方式
+            result = difflib.get_close_matches(word, self.word_list, n=n, cutoff=cutoff)
+            self._set_cache(key, result)
+            return list(result)
+
+        # 公共字符数就是 quick_ratio 的分子 按上限从高到低计算 ratio
+        word_len = len(word)
+        candidate_list: List[Tuple[float, int]] = []
+        for uid, common_cnt in self._get_common_char_cnt(word).items():
+            total_len = word_len + len(self._unique_word_list[uid])
+            real_quick_ratio = 2.0 * min(word_len, len(self._unique_word_list[uid])) / total_len
+            quick_ratio = 2.0 * common_cnt / total_len
+            if real_quick_ratio >= cutoff and quick_ratio >= cutoff:
+                candidate_list.append((quick_ratio, uid))
+        candidate_list.sort(key=lambda x: -x[0])
+
+        s = difflib.SequenceMatcher()
+        s.set_seq2(word)
+        matched_list: List[Tuple[float, str]] = []
+        matched_cnt: int = 0
+        nth_score: Optional[float] = None  # 已有n个结果时 第n高的分数
+        for quick_ratio, uid in candidate_list:
+            if nth_score is not None and quick_ratio < nth_score:
+                break
+            target_word = self._unique_word_list[uid]
+            s.set_seq1(target_word)
+            score = s.ratio()
+            if score < cutoff:
+                continue
+            for _ in range(self._unique_cnt[uid]):  # 重复的目标词 与原来一样重复出现在结果中
+                matched_list.append((score, target_word))
+            matched_cnt += self._unique_cnt[uid]
+            if matched_cnt >= n:
+                nth_score = heapq.nlargest(n, matched_list)[-1][0]
+
+        result = [x for score, x in heapq.nlargest(n, matched_list)]
+        self._set_cache(key, result)
+        return list(result)
+
+    def find_best_match_by_difflib(self, word: str, cutoff: float = 0.6) -> Optional[int]:
+        """
+        找出最相近的一个目标词对应的下标 结果与 str_utils.find_best_match_by_difflib 一致
+        :param word: 查询词
+        :param cutoff: 相似度阈值
+        :return: 目标词的下标
+        """
+        results = self.get_close_matches(word, n=1, cutoff=cutoff)
+        if len(results) > 0:
+            return self._unique_first_idx[self._word_2_uid[results[0]]]
+        else:
+            return None
+
+
+_index_cache: OrderedDict[Tuple[str, ...], FuzzyMatchIndex] = OrderedDict()
+_index_cache_lock = threading.Lock()
+_INDEX_CACHE_SIZE: int = 64
+
+
+def get_fuzzy_match_index(word_list: List[str]) -> FuzzyMatchIndex:
+    """
+    获取一组目标词的索引 相同的目标词列表会复用之前构建的索引
+    :param word_list: 目标词列表
+    :return:
+    """
+    key = tuple(word_list)
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+
+    index = FuzzyMatchIndex(word_list)
+    with _index_cache_lock:
+        _index_cache[key] = index
+        if len(_index_cache) > _INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
@@ -1,4 +1,6 @@
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Tuple
+
+import numpy as np
 
 from one_dragon.base.geometry.point import Point
 from one_dragon.base.geometry.rectangle import Rect
@@ -41,33 +43,96 @@ class MatchResult:
         self.x += p.x
         self.y += p.y
 
+    def copy(self) -> "MatchResult":
+        return MatchResult(self.confidence, self.x, self.y, self.w, self.h,
+                           template_scale=self.template_scale, data=self.data)
+
 
 class MatchResultList:
+
+    _INIT_CAPACITY: int = 8
+
     def __init__(self, only_best: bool = True):
         """
         多个识别结果的组合 适用于一张图中有多个目标结果
+        坐标、大小和置信度以列的形式保存在numpy数组中 MatchResult对象只在需要时才创建
+        合并结果时 使用以合并距离为边长的网格做空间索引 只需要比较相邻网格中的结果
         """
         self.only_best: bool = only_best
-        self.arr: List[MatchResult] = []
-        self.max: Optional[MatchResult] = None
+
+        self._size: int = 0
+        self._x: np.ndarray = np.empty(MatchResultList._INIT_CAPACITY, dtype=np.int64)
+        self._y: np.ndarray = np.empty(MatchResultList._INIT_CAPACITY, dtype=np.int64)
+        self._w: np.ndarray = np.empty(MatchResultList._INIT_CAPACITY, dtype=np.int64)
+        self._h: np.ndarray = np.empty(MatchResultList._INIT_CAPACITY, dtype=np.int64)
+        self._confidence: np.ndarray = np.empty(MatchResultList._INIT_CAPACITY, dtype=np.float64)
+        self._items: List[Optional[MatchResult]] = []  # 已经创建的对象 未创建的为None
+        self._max_idx: int = -1
+
+        # 尚未应用到坐标列上的偏移量 在创建对象或读取坐标时再加上
+        self._offset_x: int = 0
+        self._offset_y: int = 0
+
+        # 空间网格 key=(网格x, 网格y) value=结果下标列表
+        self._grid: dict[Tuple[int, int], List[int]] = {}
+        self._grid_cell_size: float = -1
 
     def __repr__(self):
         return '[%s]' % ', '.join(str(i) for i in self.arr)
 
     def __iter__(self):
-        self.index = 0
-        return self
-
-    def __next__(self):
-        if self.index < len(self.arr):
-            value = self.arr[self.index]
-            self.index += 1
-            return value
-        else:
-            raise StopIteration
+        return iter(self.arr)
 
     def __len__(self):
-        return len(self.arr)
+        return self._size
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self.arr[item]
+        if item < 0:
+            item += self._size
+        if item < 0 or item >= self._size:
+            raise IndexError('MatchResultList index out of range')
+        return self._get_item(item)
+
+    @property
+    def arr(self) -> List[MatchResult]:
+        """
+        所有结果对象
+        """
+        for idx in range(self._size):
+            if self._items[idx] is None:
+                self._get_item(idx)
+        return self._items
+
+    @property
+    def max(self) -> Optional[MatchResult]:
+        """
+        置信度最高的结果
+        """
+        if self._max_idx < 0:
+            return None
+        return self._get_item(self._max_idx)
+
+    @property
+    def x_array(self) -> np.ndarray:
+        return self._x[:self._size] + self._offset_x
+
+    @property
+    def y_array(self) -> np.ndarray:
+        return self._y[:self._size] + self._offset_y
+
+    @property
+    def w_array(self) -> np.ndarray:
+        return self._w[:self._size]
+
+    @property
+    def h_array(self) -> np.ndarray:
+        return self._h[:self._size]
+
+    @property
+    def confidence_array(self) -> np.ndarray:
+        return self._confidence[:self._size]
 
     def append(self, a: MatchResult, auto_merge: bool = True, merge_distance: float = 10):
         """
@@ -77,26 +142,49 @@ class MatchResultList:
         :param merge_distance: 多少距离内的
         :return:
         """
-        if self.only_best:
-            if self.max is None:
-                self.max = a
-                self.arr.append(a)
-            elif a.confidence > self.max.confidence:
-                self.max = a
-                self.arr[0] = a
-        else:
-            if auto_merge:
-                for i in self.arr:
-                    if (i.x - a.x) ** 2 + (i.y - a.y) ** 2 <= merge_distance ** 2:
-                        if a.confidence > i.confidence:
-                            i.x = a.x
-                            i.y = a.y
-                            i.confidence = a.confidence
-                        return
-
-            self.arr.append(a)
-            if self.max is None or a.confidence > self.max.confidence:
-                self.max = a
+        self._add(a.x, a.y, a.w, a.h, a.confidence, a,
+                  auto_merge=auto_merge, merge_distance=merge_distance)
+
+    def append_arrays(self, x: np.ndarray, y: np.ndarray, w, h, confidence: np.ndarray,
+                      auto_merge: bool = True, merge_distance: float = 10) -> None:
+        """
+        批量添加结果 不会创建MatchResult对象
+        :param x: 横坐标
+        :param y: 纵坐标
+        :param w: 宽度 可以是数组或者一个整数
+        :param h: 高度 可以是数组或者一个整数
+        :param confidence: 置信度
+        :param auto_merge: 是否与之前结果进行合并
+        :param merge_distance: 多少距离内的
+        :return:
+        """
+        n = len(x)
+        if n == 0:
+            return
+        w = np.broadcast_to(np.asarray(w, dtype=np.int64), (n,))
+        h = np.broadcast_to(np.asarray(h, dtype=np.int64), (n,))
+
+        if self.only_best or auto_merge:
+            for idx in range(n):
+                self._add(int(x[idx]), int(y[idx]), int(w[idx]), int(h[idx]), float(confidence[idx]), None,
+                          auto_merge=auto_merge, merge_distance=merge_distance)
+            return
+
+        # 不需要合并时 直接整列复制
+        start = self._size
+        self._ensure_capacity(start + n)
+        self._x[start:start + n] = np.asarray(x, dtype=np.int64) - self._offset_x
+        self._y[start:start + n] = np.asarray(y, dtype=np.int64) - self._offset_y
+        self._w[start:start + n] = w
+        self._h[start:start + n] = h
+        self._confidence[start:start + n] = confidence
+        self._items.extend([None] * n)
+        self._size += n
+        self._invalidate_grid()
+
+        best = start + int(np.argmax(self._confidence[start:start + n]))
+        if self._max_idx < 0 or self._confidence[best] > self._confidence[self._max_idx]:
+            self._max_idx = best
 
     def extend(self, mrl: "MatchResultList", auto_merge: bool = True, merge_distance: float = 10) -> None:
         """
@@ -106,16 +194,169 @@ class MatchResultList:
         :param merge_distance: 合并距离
         :return:
         """
-        for mr in mrl.arr:
-            self.append(mr, auto_merge=auto_merge, merge_distance=merge_distance)
+        other_x = mrl.x_array
+        other_y = mrl.y_array
+        for idx in range(mrl._size):
+            item = mrl._items[idx]
+            if item is not None:
+                self._add(item.x, item.y, item.w, item.h, item.confidence, item,
+                          auto_merge=auto_merge, merge_distance=merge_distance)
+            else:
+                self._add(int(other_x[idx]), int(other_y[idx]), int(mrl._w[idx]), int(mrl._h[idx]),
+                          float(mrl._confidence[idx]), None,
+                          auto_merge=auto_merge, merge_distance=merge_distance)
 
-    def __getitem__(self, item):
-        return self.arr[item]
+    def copy(self) -> "MatchResultList":
+        """
+        复制一个新的列表 已创建的结果对象也会复制 修改新列表不会影响原列表
+        """
+        new_list = MatchResultList(only_best=self.only_best)
+        new_list._ensure_capacity(self._size)
+        for name in ('_x', '_y', '_w', '_h', '_confidence'):
+            getattr(new_list, name)[:self._size] = getattr(self, name)[:self._size]
+        new_list._items = [None if item is None else item.copy() for item in self._items]
+        new_list._size = self._size
+        new_list._max_idx = self._max_idx
+        new_list._offset_x = self._offset_x
+        new_list._offset_y = self._offset_y
+        return new_list
 
     def add_offset(self, lt: Point) -> None:
         """
         给所有结果增加一个左上角的偏移
         用于截取区域后
+        坐标列不做修改 只记录偏移量 已创建的对象会直接修改
         """
-        for mr in self.arr:
-            mr.add_offset(lt)
+        self._offset_x += lt.x
+        self._offset_y += lt.y
+        for mr in self._items:
+            if mr is not None:
+                mr.add_offset(lt)
+
+    def _add(self, x: int, y: int, w: int, h: int, c: float, item: Optional[MatchResult],
+             auto_merge: bool, merge_distance: float) -> None:
+        """
+        添加一个结果
+        :param x: 横坐标 已包含偏移量
+        :param y: 纵坐标 已包含偏移量
+        :param w: 宽度
+        :param h: 高度
+        :param c: 置信度
+        :param item: 对应的对象 没有时传入None
+        :param auto_merge: 是否与之前结果进行合并
+        :param merge_distance: 多少距离内的
+        :return:
+        """
+        raw_x = x - self._offset_x
+        raw_y = y - self._offset_y
+
+        if self.only_best:
+            if self._size == 0:
+                self._push(raw_x, raw_y, w, h, c, item)
+                self._max_idx = 0
+            elif c > self._confidence[0]:
+                self._set(0, raw_x, raw_y, w, h, c, item)
+            return
+
+        if auto_merge:
+            self._ensure_grid(merge_distance)
+            cell_x, cell_y = self._cell_of(raw_x, raw_y)
+            merge_idx = -1
+            dis2 = merge_distance ** 2
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for idx in self._grid.get((cell_x + dx, cell_y + dy), ()):
+                        if (merge_idx == -1 or idx < merge_idx) and \
+                                (self._x[idx] - raw_x) ** 2 + (self._y[idx] - raw_y) ** 2 <= dis2:
+                            merge_idx = idx
+
+            if merge_idx != -1:
+                if c > self._confidence[merge_idx]:
+                    self._move(merge_idx, raw_x, raw_y, c)
+                return
+
+        idx = self._push(raw_x, raw_y, w, h, c, item)
+        if self._grid_cell_size > 0:
+            self._grid.setdefault(self._cell_of(raw_x, raw_y), []).append(idx)
+        if self._max_idx < 0 or c > self._confidence[self._max_idx]:
+            self._max_idx = idx
+
+    def _push(self, raw_x: int, raw_y: int, w: int, h: int, c: float, item: Optional[MatchResult]) -> int:
+        idx = self._size
+        self._ensure_capacity(idx + 1)
+        self._x[idx] = raw_x
+        self._y[idx] = raw_y
+        self._w[idx] = w
+        self._h[idx] = h
+        self._confidence[idx] = c
+        self._items.append(item)
+        self._size += 1
+        return idx
+
+    def _set(self, idx: int, raw_x: int, raw_y: int, w: int, h: int, c: float, item: Optional[MatchResult]) -> None:
+        self._x[idx] = raw_x
+        self._y[idx] = raw_y
+        self._w[idx] = w
+        self._h[idx] = h
+        self._confidence[idx] = c
+        self._items[idx] = item
+
+    def _move(self, idx: int, raw_x: int, raw_y: int, c: float) -> None:
+        """
+        合并时 将已有结果移动到置信度更高的位置
+        """
+        old_cell = self._cell_of(self._x[idx], self._y[idx])
+        new_cell = self._cell_of(raw_x, raw_y)
+        if old_cell != new_cell:
+            self._grid[old_cell].remove(idx)
+            self._grid.setdefault(new_cell, []).append(idx)
+
+        self._x[idx] = raw_x
+        self._y[idx] = raw_y
+        self._confidence[idx] = c
+        item = self._items[idx]
+        if item is not None:
+            item.x = raw_x + self._offset_x
+            item.y = raw_y + self._offset_y
+            item.confidence = c
+
+        if c > self._confidence[self._max_idx]:
+            self._max_idx = idx
+
+    def _get_item(self, idx: int) -> MatchResult:
+        item = self._items[idx]
+        if item is None:
+            item = MatchResult(self._confidence[idx],
+                               self._x[idx] + self._offset_x, self._y[idx] + self._offset_y,
+                               self._w[idx], self._h[idx])
+            self._items[idx] = item
+        return item
+
+    def _ensure_capacity(self, capacity: int) -> None:
+        if capacity <= len(self._x):
+            return
+        new_capacity = max(capacity, len(self._x) * 2)
+        for name in ('_x', '_y', '_w', '_h', '_confidence'):
+            old = getattr(self, name)
+            new = np.empty(new_capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _cell_of(self, raw_x, raw_y) -> Tuple[int, int]:
+        return int(raw_x // self._grid_cell_size), int(raw_y // self._grid_cell_size)
+
+    def _ensure_grid(self, merge_distance: float) -> None:
+        """
+        保证空间网格的边长不小于合并距离 这样只需要检查相邻的网格
+        """
+        cell_size = max(float(merge_distance), 1.0)
+        if self._grid_cell_size == cell_size:
+            return
+        self._grid_cell_size = cell_size
+        self._grid = {}
+        for idx in range(self._size):
+            self._grid.setdefault(self._cell_of(self._x[idx], self._y[idx]), []).append(idx)
+
+    def _invalidate_grid(self) -> None:
+        self._grid_cell_size = -1
+        self._grid = {}
@@ -0,0 +1,195 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Tuple, Any
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from one_dragon.base.geometry.point import Point
+from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.base.matcher.match_result import MatchResultList
+from one_dragon.base.matcher.ocr.ocr_matcher import OcrMatcher
+from one_dragon.utils import cv2_utils
+
+
+class _OcrFrameEntry:
+
+    def __init__(self, frame: MatLike):
+        """
+        一张截图的OCR结果
+        保留截图的引用 保证 id(frame) 在缓存期间不会被其它对象复用
+        """
+        self.frame: MatLike = frame
+        self.result_map: dict[Tuple, dict[str, MatchResultList]] = {}
+
+
+class OcrFrameCache:
+
+    def __init__(self, ocr: OcrMatcher, max_frame_cnt: int = 4):
+        """
+        以截图为单位的OCR结果缓存
+        同一张截图中 相同区域、相同预处理的OCR只会执行一次
+        开启整图模式后 没有颜色筛选的区域会先对整张截图OCR一次 之后按区域截取结果
+        :param ocr: OCR
+        :param max_frame_cnt: 最多缓存多少张截图的结果 多线程识别时会同时处理多张截图
+        """
+        self.ocr: OcrMatcher = ocr
+        self.max_frame_cnt: int = max_frame_cnt
+        self.full_frame_mode: bool = False
+
+        self._frame_map: OrderedDict[int, _OcrFrameEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 每次识别只计入以下其中一项
+        self.hit_cnt: int = 0  # 直接命中缓存的次数
+        self.miss_cnt: int = 0  # 实际执行OCR的次数
+        self.full_frame_hit_cnt: int = 0  # 通过缓存的整图结果截取的次数
+
+    def run_ocr(self, screen: MatLike, rect: Optional[Rect] = None,
+                color_range: Optional[List] = None, dilate_size: int = 0,
+                threshold: float = 0, merge_line_distance: float = -1) -> dict[str, MatchResultList]:
+        """
+        对截图中的区域进行OCR 优先使用缓存
+        返回的结果是复制出来的 调用方可以随意修改
+        :param screen: 游戏截图
+        :param rect: 区域 不传入时为整张截图
+        :param color_range: 颜色筛选范围 [lower, upper]
+        :param dilate_size: 颜色筛选后掩码的膨胀大小 0为不膨胀
+        :param threshold: OCR匹配阈值
+        :param merge_line_distance: 多少行距内合并结果 -1为不合并
+        :return: 区域内的OCR结果 坐标相对于区域左上角
+        """
+        rect_key = None if rect is None else (rect.x1, rect.y1, rect.x2, rect.y2)
+        color_key = None if color_range is None else tuple(tuple(np.asarray(c).tolist()) for c in color_range)
+        key = (rect_key, color_key, dilate_size if color_key is not None else 0, threshold, merge_line_distance)
+
+        result = self._get(screen, key)
+        if result is not None:
+            with self._lock:
+                self.hit_cnt += 1
+            return OcrFrameCache.copy_result_map(result)
+
+        if (self.full_frame_mode and rect is not None
+                and color_range is None and merge_line_distance == -1):
+            full_key = (None, None, 0, threshold, -1)
+            full_result = self._get(screen, full_key)
+            if full_result is None:
+                full_result = self._run_and_put(screen, full_key, screen, threshold, -1)
+            else:
+                with self._lock:
+                    self.full_frame_hit_cnt += 1
+            result = OcrFrameCache.slice_result_map(full_result, rect)
+            self._put(screen, key, result)
+            return OcrFrameCache.copy_result_map(result)
+
+        to_ocr = OcrFrameCache.get_ocr_image(screen, rect, color_range, dilate_size)
+        result = self._run_and_put(screen, key, to_ocr, threshold, merge_line_distance)
+        return OcrFrameCache.copy_result_map(result)
+
+    def _get(self, screen: MatLike, key: Tuple) -> Optional[dict[str, MatchResultList]]:
+        with self._lock:
+            entry = self._frame_map.get(id(screen))
+            if entry is None or entry.frame is not screen:
+                return None
+            result = entry.result_map.get(key)
+            if result is not None:
+                self._frame_map.move_to_end(id(screen))
+            return result
+
+    def _put(self, screen: MatLike, key: Tuple, result: dict[str, MatchResultList]) -> None:
+        with self._lock:
+            frame_id = id(screen)
+            entry = self._frame_map.get(frame_id)
+            if entry is None or entry.frame is not screen:
+                entry = _OcrFrameEntry(screen)
+                self._frame_map[frame_id] = entry
+            self._frame_map.move_to_end(frame_id)
+            entry.result_map[key] = result
+            while len(self._frame_map) > self.max_frame_cnt:
+                self._frame_map.popitem(last=False)
+
+    def _run_and_put(self, screen: MatLike, key: Tuple, to_ocr: MatLike,
+                     threshold: float, merge_line_distance: float) -> dict[str, MatchResultList]:
+        result = self.ocr.run_ocr(to_ocr, threshold=threshold, merge_line_distance=merge_line_distance)
+        with self._lock:
+            self.miss_cnt += 1
+        self._put(screen, key, result)
+        return result
+
+    def clear(self) -> None:
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._frame_map.clear()
+
+    def reset_stats(self) -> None:
+        """
+        重置统计
+        """
+        with self._lock:
+            self.hit_cnt = 0
+            self.miss_cnt = 0
+            self.full_frame_hit_cnt = 0
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """
+        统计数据
+        """
+        with self._lock:
+            total = self.hit_cnt + self.full_frame_hit_cnt + self.miss_cnt
+            return {
+                'hit': self.hit_cnt,
+                'miss': self.miss_cnt,
+                'full_frame_hit': self.full_frame_hit_cnt,
+                'hit_rate': (self.hit_cnt + self.full_frame_hit_cnt) / total if total > 0 else 0,
+            }
+
+    @staticmethod
+    def get_ocr_image(screen: MatLike, rect: Optional[Rect] = None,
+                      color_range: Optional[List] = None, dilate_size: int = 0) -> MatLike:
+        """
+        截取区域并进行颜色筛选 得到用于OCR的图片
+        :param screen: 游戏截图
+        :param rect: 区域
+        :param color_range: 颜色筛选范围 [lower, upper]
+        :param dilate_size: 颜色筛选后掩码的膨胀大小 0为不膨胀
+        :return:
+        """
+        part = screen if rect is None else cv2_utils.crop_image_only(screen, rect)
+        if color_range is None:
+            return part
+        mask = cv2.inRange(part,
+                           np.array(color_range[0], dtype=np.uint8),
+                           np.array(color_range[1], dtype=np.uint8))
+        if dilate_size > 0:
+            mask = cv2_utils.dilate(mask, dilate_size)
+        return cv2.bitwise_and(part, part, mask=mask)
+
+    @staticmethod
+    def slice_result_map(result_map: dict[str, MatchResultList], rect: Rect) -> dict[str, MatchResultList]:
+        """
+        从整图的OCR结果中 截取中心点在区域内的结果 并转换为区域内的坐标
+        :param result_map: 整图的OCR结果
+        :param rect: 区域
+        :return:
+        """
+        offset = Point(-rect.x1, -rect.y1)
+        sliced: dict[str, MatchResultList] = {}
+        for text, mrl in result_map.items():
+            for mr in mrl:
+                center = mr.center
+                if not (rect.x1 <= center.x < rect.x2 and rect.y1 <= center.y < rect.y2):
+                    continue
+                if text not in sliced:
+                    sliced[text] = MatchResultList(only_best=False)
+                new_mr = mr.copy()
+                new_mr.add_offset(offset)
+                sliced[text].append(new_mr, auto_merge=False)
+        return sliced
+
+    @staticmethod
+    def copy_result_map(result_map: dict[str, MatchResultList]) -> dict[str, MatchResultList]:
+        return {text: mrl.copy() for text, mrl in result_map.items()}
@@ -1,5 +1,5 @@
 from cv2.typing import MatLike
-from typing import Optional, Callable
+from typing import Optional, Callable, List
 
 from one_dragon.base.matcher.match_result import MatchResultList
 
@@ -42,3 +42,25 @@ class OcrMatcher:
         :return: {key_word: []}
         """
         pass
+
+    def run_ocr_batch(self, image_list: List[MatLike], threshold: float = None,
+                      merge_line_distance: float = -1) -> List[dict[str, MatchResultList]]:
+        """
+        对多张图片进行OCR 结果与逐张调用 run_ocr 一致
+        子类可以合并推理以减少耗时
+        :param image_list: 图片列表
+        :param threshold: 匹配阈值
+        :param merge_line_distance: 多少行距内合并结果 -1为不合并
+        :return: 每张图片的结果 {key_word: []}
+        """
+        return [self.run_ocr(image, threshold, merge_line_distance=merge_line_distance) for image in image_list]
+
+    def run_ocr_single_line_batch(self, image_list: List[MatLike], threshold: float = None) -> List[str]:
+        """
+        对多张图片进行单行文本识别 结果与逐张调用 run_ocr_single_line 一致
+        子类可以合并推理以减少耗时
+        :param image_list: 图片列表
+        :param threshold: 阈值
+        :return: 每张图片的文本
+        """
+        return [self.run_ocr_single_line(image, threshold) for image in image_list]
@@ -7,6 +7,7 @@ from typing import Callable, List, Optional
 from one_dragon.base.matcher.match_result import MatchResult, MatchResultList
 from one_dragon.base.matcher.ocr import ocr_utils
 from one_dragon.base.matcher.ocr.ocr_matcher import OcrMatcher
+from one_dragon.base.operation import operation_round_timing
 from one_dragon.base.web.common_downloader import CommonDownloaderParam
 from one_dragon.base.web.zip_downloader import ZipDownloader
 from one_dragon.utils import os_utils
@@ -113,6 +114,7 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
         # 加载模型
         if self._model is None:
             from onnxocr.onnx_paddleocr import ONNXPaddleOcr
+            from one_dragon.yolo import onnx_session_factory
 
             try:
                 self._model = ONNXPaddleOcr(
@@ -122,6 +124,11 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
                     cls_model_dir=os.path.join(self.base_dir, 'cls.onnx'),
                     rec_char_dict_path=os.path.join(self.base_dir, 'ppocrv5_dict.txt'),
                     vis_font_path=os.path.join(self.base_dir, 'simfang.ttf'),
+                    rec_width_bucket_step=80,
+                    det_roi_mode=True,
+                    det_single_line_max_height=32,
+                    det_single_line_min_wh_ratio=2.0,
+                    onnx_session_factory=onnx_session_factory.create_session,
                 )
                 self._loading = False
                 log.info('加载OCR模型完毕')
@@ -135,6 +142,7 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
         self._loading = False
         return True
 
+    @operation_round_timing.record_recognition_time('ocr_time')
     def run_ocr_single_line(self, image: MatLike, threshold: float = 0, strict_one_line: bool = True) -> str:
         """
         单行文本识别 手动合成一行 按匹配结果从左到右 从上到下
@@ -147,27 +155,82 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
         if strict_one_line:
             return self._run_ocr_without_det(image, threshold)
         else:
-            ocr_map: dict = self.run_ocr(image, threshold)
+            # 最终会合并成一行 足够扁平的小图可以跳过检测
+            ocr_map: dict = self.run_ocr(image, threshold, single_line_bypass=True)
             tmp = ocr_utils.merge_ocr_result_to_single_line(ocr_map, join_space=False)
             return tmp
 
+    @operation_round_timing.record_recognition_time('ocr_time')
     def run_ocr(self, image: MatLike, threshold: float = 0,
-                merge_line_distance: float = -1) -> dict[str, MatchResultList]:
+                merge_line_distance: float = -1,
+                single_line_bypass: bool = False) -> dict[str, MatchResultList]:
         """
         对图片进行OCR 返回所有匹配结果
         :param image: 图片
         :param threshold: 匹配阈值
         :param merge_line_distance: 多少行距内合并结果 -1为不合并 理论中文情况不会出现过长分行的 这里只是为了兼容英语的情况
+        :param single_line_bypass: 是否允许足够扁平的小图跳过检测 整张图片作为一个结果 不会拆分文本
         :return: {key_word: []}
         """
         start_time = time.time()
-        result_map: dict = {}
-        scan_result_list: list = self._model.ocr(image, cls=False)
+        scan_result_list: list = self._model.ocr(image, cls=False, single_line_bypass=single_line_bypass)
         if len(scan_result_list) == 0:
-            log.debug('OCR结果 %s 耗时 %.2f', result_map.keys(), time.time() - start_time)
-            return result_map
+            log.debug('OCR结果 %s 耗时 %.2f', [], time.time() - start_time)
+            return {}
+
+        result_map = self._convert_scan_result(scan_result_list[0], threshold, merge_line_distance)
+        log.debug('OCR结果 %s 耗时 %.2f', result_map.keys(), time.time() - start_time)
+        return result_map
+
+    @operation_round_timing.record_recognition_time('ocr_time')
+    def run_ocr_batch(self, image_list: List[MatLike], threshold: float = 0,
+                      merge_line_distance: float = -1) -> List[dict[str, MatchResultList]]:
+        """
+        对多张图片进行OCR 结果与逐张调用 run_ocr 一致
+        检测仍逐张进行 所有图片的文本框合并成尽量少的识别推理
+        :param image_list: 图片列表
+        :param threshold: 匹配阈值
+        :param merge_line_distance: 多少行距内合并结果 -1为不合并
+        :return: 每张图片的结果 {key_word: []}
+        """
+        if len(image_list) == 0:
+            return []
+        start_time = time.time()
+        scan_result_list: list = self._model.ocr_batch(image_list, cls=False)
+        result_map_list = [
+            self._convert_scan_result(scan_result, threshold, merge_line_distance)
+            for scan_result in scan_result_list
+        ]
+        log.debug('批量OCR %d张 耗时 %.2f', len(image_list), time.time() - start_time)
+        return result_map_list
+
+    @operation_round_timing.record_recognition_time('ocr_time')
+    def run_ocr_single_line_batch(self, image_list: List[MatLike], threshold: float = 0) -> List[str]:
+        """
+        对多张图片进行单行文本识别 结果与逐张调用 run_ocr_single_line 一致
+        所有图片合并成尽量少的识别推理
+        :param image_list: 图片列表
+        :param threshold: 阈值
+        :return: 每张图片的文本
+        """
+        if len(image_list) == 0:
+            return []
+        start_time = time.time()
+        scan_result_list: list = self._model.ocr_batch(image_list, det=False, cls=False)
+        result_list = [self._convert_rec_result(img_result, threshold) for img_result in scan_result_list]
+        log.debug('批量OCR结果 %s 耗时 %.2f', result_list, time.time() - start_time)
+        return result_list
 
-        scan_result = scan_result_list[0]
+    def _convert_scan_result(self, scan_result: list, threshold: float,
+                             merge_line_distance: float) -> dict[str, MatchResultList]:
+        """
+        将模型返回的一张图片的结果 转化成 {key_word: []}
+        :param scan_result: 一张图片的结果
+        :param threshold: 匹配阈值
+        :param merge_line_distance: 多少行距内合并结果 -1为不合并
+        :return:
+        """
+        result_map: dict = {}
         for anchor in scan_result:
             anchor_position = anchor[0]
             anchor_text = anchor[1][0]
@@ -186,7 +249,6 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
         if merge_line_distance != -1:
             result_map = ocr_utils.merge_ocr_result_to_multiple_line(result_map, join_space=True,
                                                                      merge_line_distance=merge_line_distance)
-        log.debug('OCR结果 %s 耗时 %.2f', result_map.keys(), time.time() - start_time)
         return result_map
 
     def _run_ocr_without_det(self, image: MatLike, threshold: float = 0) -> str:
@@ -200,13 +262,23 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
         start_time = time.time()
         scan_result: list = self._model.ocr(image, det=False, cls=False)
         img_result = scan_result[0]  # 取第一张图片
+        result = self._convert_rec_result(img_result, threshold)
+        log.debug('OCR结果 %s 耗时 %.2f', scan_result, time.time() - start_time)
+        return result
+
+    def _convert_rec_result(self, img_result: list, threshold: float) -> str:
+        """
+        将不使用检测模型时 一张图片的识别结果 转化成文本
+        :param img_result: 一张图片的识别结果
+        :param threshold: 匹配阈值
+        :return:
+        """
         if len(img_result) > 1:
             log.debug("禁检测的OCR模型返回多个识别结果")  # 目前没有出现这种情况
 
         if img_result[0][1] < threshold:
             log.debug("OCR模型返回的识别结果置信度低于阈值")
             return ""
-        log.debug('OCR结果 %s 耗时 %.2f', scan_result, time.time() - start_time)
         return img_result[0][0]
 
     def match_words(
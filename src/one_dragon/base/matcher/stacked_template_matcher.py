@@ -0,0 +1,159 @@
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from one_dragon.base.screen.template_info import TemplateInfo
+from one_dragon.base.screen.template_loader import TemplateLoader
+from one_dragon.utils.log_utils import log
+
+
+class _StackedTemplateGroup:
+
+    def __init__(self, template_id_list: List[str], image_list: List[np.ndarray], mask_list: List[np.ndarray]):
+        """
+        尺寸相同的一组模板 堆叠成矩阵 用于一次计算所有模板的匹配度
+        :param template_id_list: 模板id
+        :param image_list: 缩放后的模板图片 (h, w, 3)
+        :param mask_list: 缩放后的掩码 (h, w) 只有0和1
+        """
+        self.template_id_list: List[str] = template_id_list
+        self.height: int = image_list[0].shape[0]
+        self.width: int = image_list[0].shape[1]
+
+        image_arr = np.stack(image_list).astype(np.float32).reshape(len(image_list), -1, 3)  # (K, hw, 3)
+        self.mask_arr: np.ndarray = np.stack(mask_list).astype(np.float32).reshape(len(mask_list), -1)  # (K, hw)
+        self.mask_sum: np.ndarray = np.maximum(self.mask_arr.sum(axis=1), 1)  # (K,)
+
+        # 掩码内去均值后的模板 与图片的相关系数只需要一次矩阵乘法
+        mean = (image_arr * self.mask_arr[:, :, None]).sum(axis=1) / self.mask_sum[:, None]  # (K, 3)
+        centered = (image_arr - mean[:, None, :]) * self.mask_arr[:, :, None]
+        self.centered_arr: np.ndarray = centered.reshape(len(image_list), -1)  # (K, hw * 3)
+        self.centered_sq_sum: np.ndarray = (self.centered_arr ** 2).sum(axis=1)  # (K,)
+
+    def score(self, source: np.ndarray, idx_arr: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        计算每个模板在原图中的最高匹配度 即 TM_CCOEFF_NORMED 带掩码的结果
+        :param source: 缩放后的原图 float32
+        :param idx_arr: 只计算这些模板 不传入时计算全部
+        :return: 每个模板的最高匹配度, 对应的位置下标
+        """
+        if source.shape[0] < self.height or source.shape[1] < self.width:
+            cnt = len(self.template_id_list) if idx_arr is None else len(idx_arr)
+            return np.full(cnt, -np.inf, dtype=np.float32), np.zeros(cnt, dtype=np.int64)
+
+        centered_arr = self.centered_arr if idx_arr is None else self.centered_arr[idx_arr]
+        centered_sq_sum = self.centered_sq_sum if idx_arr is None else self.centered_sq_sum[idx_arr]
+        mask_arr = self.mask_arr if idx_arr is None else self.mask_arr[idx_arr]
+        mask_sum = self.mask_sum if idx_arr is None else self.mask_sum[idx_arr]
+
+        # 所有位置的窗口 (n, hw, 3)
+        window = np.lib.stride_tricks.sliding_window_view(source, (self.height, self.width, 3))
+        window = window.reshape(-1, self.height * self.width, 3)
+
+        numerator = window.reshape(window.shape[0], -1) @ centered_arr.T  # (n, K)
+
+        window_t = window.transpose(0, 2, 1)  # (n, 3, hw)
+        s1 = window_t @ mask_arr.T  # (n, 3, K)
+        s2 = (window_t * window_t) @ mask_arr.T
+        variance = (s2 - s1 * s1 / mask_sum).sum(axis=1)  # (n, K)
+
+        denominator = variance * centered_sq_sum
+        valid = denominator > 1e-6
+        score = np.full(numerator.shape, -np.inf, dtype=np.float32)
+        np.sqrt(denominator, out=denominator, where=valid)
+        np.divide(numerator, denominator, out=score, where=valid)
+
+        pos_arr = np.argmax(score, axis=0)
+        return score[pos_arr, np.arange(score.shape[1])], pos_arr
+
+
+class StackedTemplateMatcher:
+
+    def __init__(self, template_loader: TemplateLoader, template_sub_dir: str,
+                 template_id_list: List[str], scale: float = 0.25):
+        """
+        将一批模板堆叠起来 一次性计算原图与所有模板的匹配度 用于在大量候选模板中快速排序
+        计算在缩小后的图片上进行 结果只用于排序和初筛 最终结果需要再用原模板匹配确认
+        :param template_loader: 模板加载器
+        :param template_sub_dir: 模板的子文件夹
+        :param template_id_list: 模板id 不存在的模板会被忽略
+        :param scale: 计算时的缩放比例
+        """
+        self.template_sub_dir: str = template_sub_dir
+        self.scale: float = scale
+        self.template_id_list: List[str] = []
+
+        self._group_list: List[_StackedTemplateGroup] = []
+        self._template_pos: dict[str, Tuple[int, int]] = {}  # 模板id -> (组下标, 组内下标)
+
+        shape_map: dict[Tuple[int, int], Tuple[List[str], List[np.ndarray], List[np.ndarray]]] = {}
+        for template_id in template_id_list:
+            template: TemplateInfo = template_loader.get_template(template_sub_dir, template_id)
+            if template is None or template.raw is None:
+                log.error('未加载模板 %s', template_id)
+                continue
+            image = self._resize(template.raw)
+            if template.mask is not None:
+                mask = template.mask if template.mask.ndim == 2 else template.mask[:, :, 0]
+                mask = cv2.resize(mask, (image.shape[1], image.shape[0]), interpolation=cv2.INTER_AREA)
+                mask = (mask > 127).astype(np.uint8)
+            else:
+                mask = np.ones(image.shape[:2], dtype=np.uint8)
+
+            key = (image.shape[0], image.shape[1])
+            if key not in shape_map:
+                shape_map[key] = ([], [], [])
+            shape_map[key][0].append(template_id)
+            shape_map[key][1].append(image)
+            shape_map[key][2].append(mask)
+            self.template_id_list.append(template_id)
+
+        for group_template_id_list, image_list, mask_list in shape_map.values():
+            group_idx = len(self._group_list)
+            for idx, template_id in enumerate(group_template_id_list):
+                self._template_pos[template_id] = (group_idx, idx)
+            self._group_list.append(_StackedTemplateGroup(group_template_id_list, image_list, mask_list))
+
+    def _resize(self, image: MatLike) -> MatLike:
+        if self.scale == 1:
+            return image
+        return cv2.resize(image, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+    def rank(self, source: MatLike, template_id_list: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        """
+        计算原图与模板的匹配度 按匹配度从高到低排序
+        :param source: 原图
+        :param template_id_list: 只计算这些模板 不传入时计算全部
+        :return: [(模板id, 匹配度)]
+        """
+        if len(self._group_list) == 0:
+            return []
+
+        source_f = self._resize(source).astype(np.float32)
+
+        if template_id_list is None:
+            idx_list_per_group: List[Optional[List[int]]] = [None] * len(self._group_list)
+        else:
+            idx_list_per_group = [[] for _ in self._group_list]
+            for template_id in template_id_list:
+                pos = self._template_pos.get(template_id)
+                if pos is not None:
+                    idx_list_per_group[pos[0]].append(pos[1])
+
+        result: List[Tuple[str, float]] = []
+        for group, idx_list in zip(self._group_list, idx_list_per_group):
+            if idx_list is None:
+                score_arr, _ = group.score(source_f)
+                id_list = group.template_id_list
+            elif len(idx_list) == 0:
+                continue
+            else:
+                score_arr, _ = group.score(source_f, np.array(idx_list, dtype=np.int64))
+                id_list = [group.template_id_list[i] for i in idx_list]
+            for template_id, score in zip(id_list, score_arr.tolist()):
+                result.append((template_id, score))
+
+        result.sort(key=lambda i: i[1], reverse=True)
+        return result
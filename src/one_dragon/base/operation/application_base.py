@@ -5,6 +5,7 @@ from typing import Optional, Callable
 from io import BytesIO
 
 from one_dragon.base.notify.push import Push
+from one_dragon.base.operation import operation_telemetry
 from one_dragon.base.operation.application_run_record import AppRunRecord
 from one_dragon.base.operation.one_dragon_context import OneDragonContext
 from one_dragon.base.operation.operation import Operation
@@ -75,6 +76,13 @@ class Application(Operation):
         self.ctx.start_running()
         self.ctx.dispatch_event(ApplicationEventId.APPLICATION_START.value, self.app_id)
 
+        # 初始化成功后才开始统计 保证结束时会调用 after_operation_done
+        if self.ctx.env_config.enable_telemetry:
+            operation_telemetry.start_telemetry(self)  # 一条龙中由最外层的应用开始和结束统计
+        telemetry = operation_telemetry.get_telemetry()
+        if telemetry is not None:
+            telemetry.enter_app(self.app_id)
+
     def handle_resume(self) -> None:
         """
         恢复运行后的处理 由子类实现
@@ -89,6 +97,10 @@ class Application(Operation):
         """
         Operation.after_operation_done(self, result)
         self._update_record_after_stop(result)
+        telemetry = operation_telemetry.get_telemetry()
+        if telemetry is not None:
+            telemetry.exit_app(self.app_id)
+            operation_telemetry.stop_telemetry(self)
         if self.stop_context_after_stop:
             self.ctx.stop_running()
         self.ctx.dispatch_event(ApplicationEventId.APPLICATION_STOP.value, self.app_id)
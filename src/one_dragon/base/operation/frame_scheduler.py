@@ -0,0 +1,331 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Optional, List, Union, Any
+
+from cv2.typing import MatLike
+
+from one_dragon.utils import cal_utils, thread_utils
+from one_dragon.utils.log_utils import log
+
+
+class FrameCheck:
+
+    def __init__(self, name: str, func: Callable[..., Any],
+                 interval: Optional[Callable[[], Union[float, List[float]]]] = None,
+                 cost: float = 0,
+                 depends_on: Optional[List[str]] = None):
+        """
+        每帧画面需要进行的一种识别
+        :param name: 名称
+        :param func: 识别方法 调用方式为 func(screen, screenshot_time, *依赖识别的Future, **本帧的参数)
+        :param interval: 获取识别间隔的方法 每次识别前调用 间隔可以在运行中改变 不传入时每帧都识别
+        :param cost: 预计耗时 毫秒 同一帧中耗时高的识别先提交
+        :param depends_on: 依赖的识别 依赖的识别会先提交 其结果以 Future 的形式传给识别方法
+        """
+        self.name: str = name
+        self.func: Callable[..., Any] = func
+        self.interval: Optional[Callable[[], Union[float, List[float]]]] = interval
+        self.cost: float = cost
+        self.depends_on: List[str] = [] if depends_on is None else depends_on
+
+
+class FrameCheckStats:
+
+    def __init__(self):
+        """
+        一种识别的统计数据
+        """
+        self.run_cnt: int = 0  # 识别次数
+        self.error_cnt: int = 0  # 出错次数
+        self.skip_interval_cnt: int = 0  # 未到识别间隔而跳过的次数
+        self.skip_busy_cnt: int = 0  # 同一种识别正在运行而跳过的次数
+        self.skip_stale_cnt: int = 0  # 等待期间有更新的画面 被丢弃的次数
+        self.total_cost: float = 0  # 识别总耗时 秒
+        self.max_cost: float = 0  # 最大识别耗时 秒
+        self.last_cost: float = 0  # 上一次识别耗时 秒
+        self.total_delay: float = 0  # 从提交到开始识别的总等待时间 秒
+
+    @property
+    def avg_cost(self) -> float:
+        return self.total_cost / self.run_cnt if self.run_cnt > 0 else 0
+
+    @property
+    def avg_delay(self) -> float:
+        return self.total_delay / self.run_cnt if self.run_cnt > 0 else 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'run': self.run_cnt,
+            'error': self.error_cnt,
+            'skip_interval': self.skip_interval_cnt,
+            'skip_busy': self.skip_busy_cnt,
+            'skip_stale': self.skip_stale_cnt,
+            'avg_cost': self.avg_cost,
+            'max_cost': self.max_cost,
+            'last_cost': self.last_cost,
+            'avg_delay': self.avg_delay,
+        }
+
+
+class _PendingFrame:
+
+    def __init__(self, screen: MatLike, screenshot_time: float, submit_time: float,
+                 dep_future_list: List[Future], kwargs: dict[str, Any], future: Future):
+        """
+        一种识别 等待处理的一帧画面
+        """
+        self.screen: MatLike = screen
+        self.screenshot_time: float = screenshot_time
+        self.submit_time: float = submit_time
+        self.dep_future_list: List[Future] = dep_future_list
+        self.kwargs: dict[str, Any] = kwargs
+        self.future: Future = future
+
+
+class _CheckSlot:
+
+    def __init__(self, check: FrameCheck):
+        """
+        一种识别的运行状态
+        每种识别同一时间只有一个任务在线程池中 任务处理完当前画面后 继续处理等待中的最新画面
+        """
+        self.check: FrameCheck = check
+        self.stats: FrameCheckStats = FrameCheckStats()
+        self.pending: Optional[_PendingFrame] = None  # 等待处理的画面 只保留最新的一帧
+        self.active: bool = False  # 是否已有任务在线程池中
+        self.last_run_time: float = 0  # 上一次识别的画面的截图时间
+        self.run_lock = threading.Lock()  # 每帧提交和直接调用 同一时间只有一个在识别
+
+
+class FrameScheduler:
+
+    def __init__(self, executor: ThreadPoolExecutor):
+        """
+        每帧画面的识别调度
+        - 每种识别同一时间只会有一个在运行 运行期间提交的画面只保留最新一帧 旧的直接丢弃 不会在线程池中排队
+        - 按各自的间隔跳过识别
+        - 不经过每帧提交 直接调用识别时 与每帧提交共用识别间隔和单实例
+        - 依赖的识别先提交 线程池按提交顺序执行 因此等待依赖的识别不会卡死
+          但线程池的线程数需要大于有依赖的识别的数量
+        - 统计每种识别的耗时和跳过次数
+        :param executor: 执行识别的线程池
+        """
+        self._executor: ThreadPoolExecutor = executor
+        self._slot_map: dict[str, _CheckSlot] = {}
+        self._order_map: dict[str, int] = {}  # 识别名称 -> 提交顺序
+        self._lock = threading.Lock()
+
+    def register(self, check: FrameCheck) -> None:
+        """
+        注册一种识别 同名的识别会被替换
+        :param check: 识别
+        :return:
+        """
+        with self._lock:
+            self._slot_map[check.name] = _CheckSlot(check)
+            self._order_map = self._cal_submit_order()
+
+    def _cal_submit_order(self) -> dict[str, int]:
+        """
+        计算提交顺序 依赖的识别在前 同一层按预计耗时从高到低
+        :return: 识别名称 -> 顺序
+        """
+        level_map: dict[str, int] = {}
+
+        def get_level(name: str, visiting: set[str]) -> int:
+            if name in level_map:
+                return level_map[name]
+            if name in visiting:
+                raise ValueError(f'识别依赖存在循环 {name}')
+            visiting.add(name)
+            slot = self._slot_map.get(name)
+            level = 0
+            if slot is not None:
+                for dep in slot.check.depends_on:
+                    level = max(level, get_level(dep, visiting) + 1)
+            visiting.remove(name)
+            level_map[name] = level
+            return level
+
+        for name in self._slot_map:
+            get_level(name, set())
+
+        name_list = sorted(self._slot_map.keys(),
+                           key=lambda n: (level_map[n], -self._slot_map[n].check.cost))
+        return {name: idx for idx, name in enumerate(name_list)}
+
+    def submit_frame(self, screen: MatLike, screenshot_time: float,
+                     check_name_list: List[str],
+                     kwargs_map: Optional[dict[str, dict[str, Any]]] = None) -> List[Future]:
+        """
+        提交一帧画面
+        :param screen: 游戏画面
+        :param screenshot_time: 截图时间
+        :param check_name_list: 这一帧需要进行的识别
+        :param kwargs_map: 识别名称 -> 这一帧传给识别方法的参数
+        :return: 每种识别的 Future 跳过或被丢弃时结果为 None
+        """
+        submit_time = time.time()
+        future_map: dict[str, Future] = {}
+        to_run_list: List[_CheckSlot] = []
+
+        with self._lock:
+            name_list = sorted([i for i in check_name_list if i in self._slot_map],
+                               key=lambda n: self._order_map[n])
+            for name in name_list:
+                slot = self._slot_map[name]
+                dep_future_list: List[Future] = []
+                for dep in slot.check.depends_on:
+                    dep_future = future_map.get(dep)
+                    if dep_future is None:  # 这一帧没有进行依赖的识别
+                        dep_future = Future()
+                        dep_future.set_result(None)
+                    dep_future_list.append(dep_future)
+
+                future = Future()
+                future_map[name] = future
+                kwargs = {} if kwargs_map is None or name not in kwargs_map else kwargs_map[name]
+
+                if slot.pending is not None:
+                    slot.pending.future.set_result(None)
+                    slot.stats.skip_stale_cnt += 1
+                slot.pending = _PendingFrame(screen, screenshot_time, submit_time, dep_future_list, kwargs, future)
+
+                if not slot.active:
+                    slot.active = True
+                    to_run_list.append(slot)
+
+        for slot in to_run_list:
+            f = self._executor.submit(self._run_slot, slot)
+            f.add_done_callback(thread_utils.handle_future_result)
+
+        return [future_map[name] for name in check_name_list if name in future_map]
+
+    def _run_slot(self, slot: _CheckSlot) -> None:
+        """
+        处理一种识别等待中的画面 直到没有新的画面
+        :param slot: 识别
+        :return:
+        """
+        while True:
+            with self._lock:
+                frame = slot.pending
+                slot.pending = None
+                if frame is None:
+                    slot.active = False
+                    return
+
+            result = self._run_check(slot, frame.screen, frame.screenshot_time, frame.submit_time,
+                                     frame.dep_future_list, frame.kwargs)
+            frame.future.set_result(result)
+
+    def _run_check(self, slot: _CheckSlot, screen: MatLike, screenshot_time: float, submit_time: float,
+                   args: List[Any], kwargs: dict[str, Any]) -> Any:
+        """
+        进行一次识别 同一种识别正在运行 或者还没有达到识别间隔时跳过
+        :param slot: 识别
+        :param screen: 游戏画面
+        :param screenshot_time: 截图时间
+        :param submit_time: 提交时间
+        :param args: 传给识别方法的参数
+        :param kwargs: 传给识别方法的参数
+        :return: 识别结果 跳过或出错时为None
+        """
+        if not slot.run_lock.acquire(blocking=False):
+            with self._lock:
+                slot.stats.skip_busy_cnt += 1
+            return None
+
+        try:
+            check = slot.check
+            if check.interval is not None:
+                interval = cal_utils.random_in_range(check.interval())
+                if screenshot_time - slot.last_run_time < interval:
+                    # 还没有达到识别间隔
+                    with self._lock:
+                        slot.stats.skip_interval_cnt += 1
+                    return None
+            slot.last_run_time = screenshot_time
+
+            start_time = time.time()
+            result = None
+            error = False
+            try:
+                result = check.func(screen, screenshot_time, *args, **kwargs)
+            except Exception:
+                error = True
+                log.error('识别出错 %s', check.name, exc_info=True)
+            cost = time.time() - start_time
+
+            with self._lock:
+                stats = slot.stats
+                stats.run_cnt += 1
+                if error:
+                    stats.error_cnt += 1
+                stats.total_cost += cost
+                stats.last_cost = cost
+                stats.max_cost = max(stats.max_cost, cost)
+                stats.total_delay += start_time - submit_time
+
+            return result
+        finally:
+            slot.run_lock.release()
+
+    def run_check(self, name: str, screen: MatLike, screenshot_time: float, *args, **kwargs) -> Any:
+        """
+        在当前线程进行一种识别 用于不经过每帧提交 直接调用识别的地方
+        与每帧提交共用识别间隔 同一种识别正在运行时跳过
+        :param name: 识别名称
+        :param screen: 游戏画面
+        :param screenshot_time: 截图时间
+        :param args: 传给识别方法的参数 例如依赖识别的 Future
+        :param kwargs: 传给识别方法的参数
+        :return: 识别结果 未注册、跳过或出错时为None
+        """
+        with self._lock:
+            slot = self._slot_map.get(name)
+        if slot is None:
+            return None
+        return self._run_check(slot, screen, screenshot_time, time.time(), list(args), kwargs)
+
+    def reset_interval(self, name: str) -> None:
+        """
+        重置一种识别的间隔 下一帧画面会立刻进行识别
+        :param name: 识别名称
+        :return:
+        """
+        with self._lock:
+            slot = self._slot_map.get(name)
+            if slot is not None:
+                slot.last_run_time = 0
+
+    def reset(self) -> None:
+        """
+        重置识别间隔和统计 在每次运行前调用
+        :return:
+        """
+        with self._lock:
+            for slot in self._slot_map.values():
+                slot.stats = FrameCheckStats()
+                slot.last_run_time = 0
+
+    def get_stats(self) -> dict[str, dict[str, Any]]:
+        """
+        获取所有识别的统计数据
+        :return: 识别名称 -> 统计数据
+        """
+        with self._lock:
+            return {name: slot.stats.to_dict() for name, slot in self._slot_map.items()}
+
+    def log_stats(self) -> None:
+        """
+        输出所有识别的统计数据
+        :return:
+        """
+        for name, stats in self.get_stats().items():
+            if stats['run'] == 0 and stats['skip_interval'] == 0 and stats['skip_busy'] == 0 and stats['skip_stale'] == 0:
+                continue
+            log.info('%s 识别 %d 次 出错 %d 次 间隔跳过 %d 次 运行中跳过 %d 次 丢弃 %d 次 平均耗时 %.2fms 最大耗时 %.2fms 平均等待 %.2fms',
+                     name, stats['run'], stats['error'], stats['skip_interval'], stats['skip_busy'], stats['skip_stale'],
+                     stats['avg_cost'] * 1000, stats['max_cost'] * 1000, stats['avg_delay'] * 1000)
@@ -1,4 +1,5 @@
 import logging
+import threading
 from enum import Enum
 from pynput import keyboard, mouse
 from typing import Optional
@@ -11,6 +12,7 @@ from one_dragon.base.config.push_config import PushConfig
 from one_dragon.base.operation.context_lazy_signal import ContextLazySignal
 from one_dragon.base.controller.controller_base import ControllerBase
 from one_dragon.base.controller.pc_button.pc_button_listener import PcButtonListener
+from one_dragon.base.matcher.ocr.ocr_frame_cache import OcrFrameCache
 from one_dragon.base.matcher.ocr.ocr_matcher import OcrMatcher
 from one_dragon.base.matcher.ocr.onnx_ocr_matcher import OnnxOcrMatcher
 from one_dragon.base.matcher.template_matcher import TemplateMatcher
@@ -66,12 +68,14 @@ class OneDragonContext(ContextEventBus, OneDragonEnvContext):
             self.one_dragon_config.create_new_instance(True)
         self.current_instance_idx = self.one_dragon_config.current_active_instance.idx
 
-        self.context_running_state: ContextRunStateEnum = ContextRunStateEnum.STOP
+        self._running_state_condition = threading.Condition()  # 运行状态变化时唤醒等待中的指令
+        self._context_running_state: ContextRunStateEnum = ContextRunStateEnum.STOP
 
         self.screen_loader: ScreenContext = ScreenContext()
         self.template_loader: TemplateLoader = TemplateLoader()
         self.tm: TemplateMatcher = TemplateMatcher(self.template_loader)
         self.ocr: OcrMatcher = OnnxOcrMatcher()
+        self.ocr_cache: OcrFrameCache = OcrFrameCache(self.ocr)
         self.controller: ControllerBase = controller
 
         self.keyboard_controller = keyboard.Controller()
@@ -112,6 +116,30 @@ class OneDragonContext(ContextEventBus, OneDragonEnvContext):
         log.info('停止运行')
         self.dispatch_event(ContextRunningStateEventEnum.STOP_RUNNING.value, self.context_running_state)
 
+    @property
+    def context_running_state(self) -> ContextRunStateEnum:
+        return self._context_running_state
+
+    @context_running_state.setter
+    def context_running_state(self, new_state: ContextRunStateEnum) -> None:
+        with self._running_state_condition:
+            self._context_running_state = new_state
+            self._running_state_condition.notify_all()
+
+    def wait_running_state_change(self, state: ContextRunStateEnum, timeout: Optional[float] = None) -> bool:
+        """
+        运行状态为 state 时 等待直到状态变化或超时
+        状态变化时立刻返回 不需要轮询
+        :param state: 当前的运行状态
+        :param timeout: 最长等待秒数 不传入时一直等待
+        :return: 运行状态是否已经不是 state
+        """
+        with self._running_state_condition:
+            return self._running_state_condition.wait_for(
+                lambda: self._context_running_state != state,
+                timeout=timeout
+            )
+
     @property
     def is_context_stop(self) -> bool:
         return self.context_running_state == ContextRunStateEnum.STOP
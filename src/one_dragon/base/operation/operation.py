@@ -1,24 +1,29 @@
+import threading
 import time
 
 import cv2
 import difflib
-import inspect
 from cv2.typing import MatLike
-from typing import Optional, ClassVar, Callable, List, Any, Tuple
+from collections import deque
+from typing import Optional, ClassVar, Callable, List, Any, Tuple, Deque
 from io import BytesIO
 
 from one_dragon.base.geometry.point import Point
 from one_dragon.base.matcher.match_result import MatchResultList
 from one_dragon.base.matcher.ocr import ocr_utils
-from one_dragon.base.operation.one_dragon_context import OneDragonContext, ContextRunningStateEventEnum
+from one_dragon.base.operation.one_dragon_context import OneDragonContext, ContextRunningStateEventEnum, \
+    ContextRunStateEnum
 from one_dragon.base.operation.operation_base import OperationBase, OperationResult
-from one_dragon.base.operation.operation_edge import OperationEdge, OperationEdgeDesc
+from one_dragon.base.operation import operation_graph, operation_round_timing, operation_telemetry
+from one_dragon.base.operation.operation_edge import OperationEdge
+from one_dragon.base.operation.operation_graph import OperationGraph
 from one_dragon.base.operation.operation_node import OperationNode
 from one_dragon.base.operation.operation_round_result import OperationRoundResultEnum, OperationRoundResult
+from one_dragon.base.operation.operation_round_timing import OperationRoundTiming
 from one_dragon.base.screen import screen_utils
 from one_dragon.base.screen.screen_area import ScreenArea
 from one_dragon.base.screen.screen_utils import OcrClickResultEnum, FindAreaResultEnum
-from one_dragon.utils import debug_utils, cv2_utils, str_utils
+from one_dragon.utils import debug_utils, str_utils
 from one_dragon.utils.i18_utils import coalesce_gt, gt
 from one_dragon.utils.log_utils import log
 
@@ -64,12 +69,18 @@ class Operation(OperationBase):
         self.node_clicked: bool = False
         """本节点是否已经完成了点击"""
 
+        self.round_timing: Optional[OperationRoundTiming] = None
+        """当前轮的耗时记录"""
+
+        self.round_timing_list: Deque[OperationRoundTiming] = deque(maxlen=100)
+        """最近几轮的耗时记录"""
+
     def _init_before_execute(self):
         """
         执行前的初始化
         :return:
         """
-        now = time.time()
+        now = time.monotonic()
 
         self.node_retry_times: int = 0
         """当前节点的重试次数"""
@@ -86,6 +97,15 @@ class Operation(OperationBase):
         self.pause_total_time: float = 0
         """暂停的总时间"""
 
+        self._pause_handled: bool = False
+        """当前的暂停是否已经处理 暂停恢复的事件在事件线程中异步回调 主循环也会同步处理 只处理一次"""
+
+        self._pause_lock = threading.Lock()
+        """处理暂停和恢复时使用的锁"""
+
+        self._remaining_wait: float = 0
+        """轮后等待被暂停打断时 剩余的等待时间 恢复后继续等待"""
+
         self.round_start_time: float = 0
         """本轮指令的开始时间"""
 
@@ -103,8 +123,8 @@ class Operation(OperationBase):
         """当前节点开始时间"""
 
         self.ctx.unlisten_all_event(self)
-        self.ctx.listen_event(ContextRunningStateEventEnum.PAUSE_RUNNING.value, self._on_pause)
-        self.ctx.listen_event(ContextRunningStateEventEnum.RESUME_RUNNING.value, self._on_resume)
+        self.ctx.listen_event(ContextRunningStateEventEnum.PAUSE_RUNNING.value, self._handle_pause_event)
+        self.ctx.listen_event(ContextRunningStateEventEnum.RESUME_RUNNING.value, self._handle_resume_event)
 
         self.handle_init()
 
@@ -118,43 +138,21 @@ class Operation(OperationBase):
     def _add_edges_and_nodes_by_annotation(self) -> None:
         """
         初始化前 读取类方法的标注 自动添加边和节点
+        标注构成的节点网络每个类只构建一次 这里只绑定到当前实例
         :return:
         """
-        node_name_map: dict[str, OperationNode] = {}
-        edge_desc_list: List[OperationEdgeDesc] = []
+        self._annotation_graph: OperationGraph = operation_graph.get_annotation_graph(type(self))
+        """类方法标注构成的节点网络"""
 
-        for name, method in inspect.getmembers(self, predicate=inspect.ismethod):
-            node: OperationNode = method.__annotations__.get('operation_node_annotation')
-            if node is not None:
-                node_name_map[node.cn] = node
-            else:  # 不是节点的话 一定没有边
-                continue
-            if node.is_start_node:
-                self.param_start_node = node
-            edges: List[OperationEdgeDesc] = method.__annotations__.get('operation_edge_annotation')
-            if edges is not None:
-                for edge in edges:
-                    edge.node_to_name = node.cn
-                    edge_desc_list.append(edge)
-
-        for edge_desc in edge_desc_list:
-            node_from = node_name_map.get(edge_desc.node_from_name, None)
-            if node_from is None:
-                raise ValueError('找不到节点 %s' % edge_desc.node_from_name)
-            node_to = node_name_map.get(edge_desc.node_to_name, None)
-            if node_to is None:
-                raise ValueError('找不到节点 %s' % edge_desc.node_to_name)
-            self.add_edge(node_from, node_to,
-                          success=edge_desc.success,
-                          status=edge_desc.status,
-                          ignore_status=edge_desc.ignore_status)
+        if self._annotation_graph.start_node is not None:
+            self.param_start_node = self._annotation_graph.start_node
 
     def _init_edge_list(self) -> None:
         """
         初始化边列表
         :return:
         """
-        self.edge_list: List[OperationEdge] = []
+        self.edge_list: List[OperationEdge] = list(self._annotation_graph.edge_list)
         """合并的边列表"""
 
         if len(self._add_edge_list) > 0:
@@ -184,27 +182,25 @@ class Operation(OperationBase):
         self.add_edges_and_nodes()
         self._init_edge_list()
 
-        self._node_edges_map: dict[str, List[OperationEdge]] = {}
+        # 标注的部分直接复用 只需要加入调用方法添加的边
+        graph = self._annotation_graph
+        self._node_edges_map: dict[str, Tuple[OperationEdge, ...]] = dict(graph.node_edges_map)
         """下一个节点的集合"""
 
-        self._node_map: dict[str, OperationNode] = {}
+        self._node_map: dict[str, OperationNode] = dict(graph.node_map)
         """节点"""
 
         self._current_node_start_time: Optional[float] = None
         """当前节点的开始运行时间"""
 
-        op_in_map: dict[str, int] = {}  # 入度
+        op_in_map: dict[str, int] = dict(graph.in_degree_map)  # 入度
 
-        for edge in self.edge_list:
+        for edge in self._add_edge_list:
             from_id = edge.node_from.cn
-            if from_id not in self._node_edges_map:
-                self._node_edges_map[from_id] = []
-            self._node_edges_map[from_id].append(edge)
+            self._node_edges_map[from_id] = self._node_edges_map.get(from_id, ()) + (edge,)
 
             to_id = edge.node_to.cn
-            if to_id not in op_in_map:
-                op_in_map[to_id] = 0
-            op_in_map[to_id] = op_in_map[to_id] + 1
+            op_in_map[to_id] = op_in_map.get(to_id, 0) + 1
 
             self._node_map[from_id] = edge.node_from
             self._node_map[to_id] = edge.node_to
@@ -236,8 +232,8 @@ class Operation(OperationBase):
             with_game_edge = OperationEdge(check_game_window, start_node)
             enter_game_edge = OperationEdge(open_and_enter_game, start_node)
 
-            self._node_edges_map[check_game_window.cn] = [no_game_edge, with_game_edge]
-            self._node_edges_map[open_and_enter_game.cn] = [enter_game_edge]
+            self._node_edges_map[check_game_window.cn] = (no_game_edge, with_game_edge)
+            self._node_edges_map[open_and_enter_game.cn] = (enter_game_edge,)
 
             start_node = check_game_window
 
@@ -286,17 +282,34 @@ class Operation(OperationBase):
 
         op_result: Optional[OperationResult] = None
         while True:
-            self.round_start_time = time.time()
-            if self.timeout_seconds != -1 and self.operation_usage_time >= self.timeout_seconds:
-                op_result = self.op_fail(Operation.STATUS_TIMEOUT)
-                break
+            self.round_start_time = time.monotonic()
             if self.ctx.is_context_stop:
                 op_result = self.op_fail('人工结束')
                 break
             elif self.ctx.is_context_pause:
-                time.sleep(1)
+                self._handle_pause_event()
+                # 恢复或停止时会立刻唤醒
+                self.ctx.wait_running_state_change(ContextRunStateEnum.PAUSE, timeout=1)
+                if self.ctx.is_context_running:
+                    # 恢复的事件回调是异步的 先在这里计算暂停时间 避免下一轮把暂停的时间算作超时
+                    self._handle_resume_event()
                 continue
+            elif self._remaining_wait > 0:
+                # 上一轮的轮后等待被暂停打断 恢复后继续等待剩余的时间
+                remaining_wait = self._remaining_wait
+                self._remaining_wait = 0
+                self._wait(remaining_wait)
+                continue
+            elif self.timeout_seconds != -1 and self.operation_usage_time >= self.timeout_seconds:
+                # 暂停中的时间在恢复时才计入暂停总时间 所以在处理暂停之后再判断超时
+                op_result = self.op_fail(Operation.STATUS_TIMEOUT)
+                break
 
+            self.round_timing = OperationRoundTiming(
+                None if self._current_node is None else self._current_node.cn,
+                self.round_start_time
+            )
+            operation_round_timing.push_round_timing(self.round_timing)
             try:
                 round_result: OperationRoundResult = self._execute_one_round()
                 if (self._current_node is None
@@ -311,7 +324,7 @@ class Operation(OperationBase):
                     else:
                         log.info('%s 节点 %s 返回状态 %s', self.display_name, node_name, round_result_status)
                 if self.ctx.is_context_pause:  # 有可能触发暂停的时候仍在执行指令 执行完成后 再次触发暂停回调 保证操作的暂停回调真正生效
-                    self._on_pause()
+                    self._handle_pause_event(repeat=True)
             except Exception as e:
                 round_result: OperationRoundResult = self.round_retry('异常')
                 if self.last_screenshot is not None:
@@ -320,6 +333,14 @@ class Operation(OperationBase):
                 else:
                     log.error('%s 执行出错', self.display_name, exc_info=True)
 
+            self.round_timing.finish(round_result.result)
+            operation_round_timing.pop_round_timing(self.round_timing)
+            self.round_timing_list.append(self.round_timing)
+            telemetry = operation_telemetry.get_telemetry()
+            if telemetry is not None:
+                telemetry.record_round(type(self).__name__, self.round_timing)
+            self.round_timing = None
+
             # 重试或者等待的
             if round_result.result == OperationRoundResultEnum.RETRY:
                 self.node_retry_times += 1
@@ -360,7 +381,7 @@ class Operation(OperationBase):
 
         if self._current_node.timeout_seconds is not None \
                 and self._current_node_start_time is not None \
-                and time.time() - self._current_node_start_time > self._current_node.timeout_seconds:
+                and time.monotonic() - self._current_node_start_time > self._current_node.timeout_seconds:
             return self.round_fail(Operation.STATUS_TIMEOUT)
 
         self.node_max_retry_times = self._current_node.node_max_retry_times
@@ -423,9 +444,43 @@ class Operation(OperationBase):
         @return:
         """
         self.node_retry_times = 0  # 每个节点都可以重试
-        self._current_node_start_time = time.time()  # 每个节点单独计算耗时
+        self._current_node_start_time = time.monotonic()  # 每个节点单独计算耗时
         self.node_clicked = False  # 重置节点点击
 
+    def _handle_pause_event(self, e=None, repeat: bool = False) -> None:
+        """
+        处理暂停 由暂停事件回调和主循环调用 同一次暂停只触发一次 _on_pause
+        :param e: 事件
+        :param repeat: 已经处理过时 是否再次触发 _on_pause
+        :return:
+        """
+        with self._pause_lock:
+            if not self.ctx.is_context_pause:
+                return
+            if self._pause_handled and not repeat:
+                return
+            first_handle = not self._pause_handled
+            self._pause_handled = True
+        if first_handle:
+            self._on_pause(e)
+        else:
+            # 再次触发时 暂停的开始时间保持不变
+            pause_start_time = self.pause_start_time
+            self._on_pause(e)
+            self.pause_start_time = pause_start_time
+
+    def _handle_resume_event(self, e=None) -> None:
+        """
+        处理恢复 由恢复事件回调和主循环调用 同一次恢复只触发一次 _on_resume
+        :param e: 事件
+        :return:
+        """
+        with self._pause_lock:
+            if not self.ctx.is_context_running or not self._pause_handled:
+                return
+            self._pause_handled = False
+        self._on_resume(e)
+
     def _on_pause(self, e=None):
         """
         暂停运行时触发的回调
@@ -436,7 +491,7 @@ class Operation(OperationBase):
         if not self.ctx.is_context_pause:
             return
         self.current_pause_time = 0
-        self.pause_start_time = time.time()
+        self.pause_start_time = time.monotonic()
         self.handle_pause()
 
     def handle_pause(self) -> None:
@@ -454,7 +509,7 @@ class Operation(OperationBase):
         """
         if not self.ctx.is_context_running:
             return
-        self.current_pause_time = time.time() - self.pause_start_time
+        self.current_pause_time = time.monotonic() - self.pause_start_time
         self.pause_total_time += self.current_pause_time
         self._current_node_start_time += self.current_pause_time
         self.handle_resume()
@@ -472,15 +527,18 @@ class Operation(OperationBase):
         获取指令的耗时
         :return:
         """
-        return time.time() - self.operation_start_time - self.pause_total_time
+        return time.monotonic() - self.operation_start_time - self.pause_total_time
 
     def screenshot(self):
         """
         包装一层截图 会在内存中保存上一张截图 方便出错时候保存
         :return:
         """
+        start_time = time.monotonic()
         screen = self.ctx.controller.screenshot()
         self.last_screenshot = screen
+        if self.round_timing is not None:
+            self.round_timing.capture_time += time.monotonic() - start_time
         return self.last_screenshot
 
     def save_screenshot(self, prefix: Optional[str] = None) -> str:
@@ -589,11 +647,40 @@ class Operation(OperationBase):
         :return:
         """
         if wait is not None and wait > 0:
-            time.sleep(wait)
+            self._sleep(wait)
         elif wait_round_time is not None and wait_round_time > 0:
-            to_wait = wait_round_time - (time.time() - self.round_start_time)
+            to_wait = wait_round_time - (time.monotonic() - self.round_start_time)
             if to_wait > 0:
-                time.sleep(to_wait)
+                self._sleep(to_wait)
+
+    def _sleep(self, seconds: float) -> None:
+        """
+        轮后等待 耗时计入本轮的等待耗时
+        :param seconds: 等待秒数
+        :return:
+        """
+        start_time = time.monotonic()
+        self._wait(seconds)
+        if self.round_timing is not None:
+            self.round_timing.sleep_time += time.monotonic() - start_time
+
+    def _wait(self, seconds: float) -> None:
+        """
+        可以被暂停和停止打断的等待
+        运行中时 暂停或停止会立刻结束等待 由主循环处理 被暂停打断时 剩余的时间在恢复后由主循环继续等待
+        已经暂停时 全部时间在恢复后等待 不在运行中时(例如单独调试) 与原来一样完整等待
+        :param seconds: 等待秒数
+        :return:
+        """
+        start_time = time.monotonic()
+        if self.ctx.is_context_running:
+            self.ctx.wait_running_state_change(ContextRunStateEnum.RUN, timeout=seconds)
+            if self.ctx.is_context_pause:
+                self._remaining_wait = max(0.0, seconds - (time.monotonic() - start_time))
+        elif self.ctx.is_context_pause:
+            self._remaining_wait = seconds
+        else:
+            time.sleep(seconds)
 
     def round_by_op_result(self, op_result: OperationResult, retry_on_fail: bool = False,
                            wait: Optional[float] = None, wait_round_time: Optional[float] = None) -> OperationRoundResult:
@@ -754,14 +841,8 @@ class Operation(OperationBase):
         :param color_range: 文本匹配的颜色范围
         :return: 点击结果
         """
-        to_ocr_part = screen if area is None else cv2_utils.crop_image_only(screen, area.rect)
-        if color_range is not None:
-            mask = cv2.inRange(to_ocr_part, color_range[0], color_range[1])
-            mask = cv2_utils.dilate(mask, 5)
-            to_ocr_part = cv2.bitwise_and(to_ocr_part, to_ocr_part, mask=mask)
-            # cv2_utils.show_image(to_ocr_part, win_name='round_by_ocr_and_click', wait=0)
-
-        ocr_result_map = self.ctx.ocr.run_ocr(to_ocr_part)
+        ocr_result_map = self.ctx.ocr_cache.run_ocr(screen, None if area is None else area.rect,
+                                                    color_range=color_range, dilate_size=5)
 
         to_click: Optional[Point] = None
         ocr_result_list: List[str] = []
@@ -820,14 +901,8 @@ class Operation(OperationBase):
         :param color_range: 文本匹配的颜色范围
         :return: 点击结果
         """
-        to_ocr_part = screen if area is None else cv2_utils.crop_image_only(screen, area.rect)
-        if color_range is not None:
-            mask = cv2.inRange(to_ocr_part, color_range[0], color_range[1])
-            mask = cv2_utils.dilate(mask, 5)
-            to_ocr_part = cv2.bitwise_and(to_ocr_part, to_ocr_part, mask=mask)
-            # cv2_utils.show_image(to_ocr_part, win_name='round_by_ocr_and_click', wait=0)
-
-        ocr_result_map = self.ctx.ocr.run_ocr(to_ocr_part)
+        ocr_result_map = self.ctx.ocr_cache.run_ocr(screen, None if area is None else area.rect,
+                                                    color_range=color_range, dilate_size=5)
 
         match_word, match_word_mrl = ocr_utils.match_word_list_by_priority(
             ocr_result_map,
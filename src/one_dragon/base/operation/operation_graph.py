@@ -0,0 +1,112 @@
+import inspect
+from typing import Optional, List, Tuple
+
+from one_dragon.base.operation.operation_edge import OperationEdge, OperationEdgeDesc
+from one_dragon.base.operation.operation_node import OperationNode
+
+
+class OperationGraph:
+
+    def __init__(self, edge_list: List[OperationEdge], start_node: Optional[OperationNode] = None):
+        """
+        指令的节点网络 构建后不再修改 可以在同一个指令类的多个实例中共用
+        :param edge_list: 边列表
+        :param start_node: 指定的开始节点
+        """
+        self.edge_list: Tuple[OperationEdge, ...] = tuple(edge_list)
+        """边列表"""
+
+        self.start_node: Optional[OperationNode] = start_node
+        """指定的开始节点"""
+
+        node_edges_map: dict[str, List[OperationEdge]] = {}
+        self.node_map: dict[str, OperationNode] = {}
+        """节点"""
+
+        self.in_degree_map: dict[str, int] = {}
+        """入度"""
+
+        for edge in self.edge_list:
+            from_id = edge.node_from.cn
+            if from_id not in node_edges_map:
+                node_edges_map[from_id] = []
+            node_edges_map[from_id].append(edge)
+
+            to_id = edge.node_to.cn
+            self.in_degree_map[to_id] = self.in_degree_map.get(to_id, 0) + 1
+
+            self.node_map[from_id] = edge.node_from
+            self.node_map[to_id] = edge.node_to
+
+        self.node_edges_map: dict[str, Tuple[OperationEdge, ...]] = {
+            k: tuple(v) for k, v in node_edges_map.items()
+        }
+        """下一个节点的集合"""
+
+
+_class_graph_cache: dict[type, OperationGraph] = {}
+
+
+def get_annotation_graph(op_class: type) -> OperationGraph:
+    """
+    获取指令类中 由方法标注构成的节点网络
+    每个类只在第一次使用时读取标注 之后复用同一个结果
+    :param op_class: 指令类
+    :return:
+    """
+    graph = _class_graph_cache.get(op_class)
+    if graph is None:
+        # 并发时可能重复构建 结果一致 不需要加锁
+        graph = _build_annotation_graph(op_class)
+        _class_graph_cache[op_class] = graph
+    return graph
+
+
+def _build_annotation_graph(op_class: type) -> OperationGraph:
+    """
+    读取类方法的标注 构建节点网络
+    直接读取类属性 不需要实例 也不会触发property的计算
+    与在实例上使用 inspect.getmembers 一样 按方法名称顺序处理 子类覆盖的方法以子类为准
+    :param op_class: 指令类
+    :return:
+    """
+    node_name_map: dict[str, OperationNode] = {}
+    edge_desc_list: List[Tuple[OperationEdgeDesc, str]] = []
+    start_node: Optional[OperationNode] = None
+
+    for name in sorted(dir(op_class)):
+        method = inspect.getattr_static(op_class, name, None)
+        if isinstance(method, classmethod):
+            method = method.__func__
+        elif not inspect.isfunction(method):  # 实例上不是绑定方法的 不读取
+            continue
+
+        annotations = getattr(method, '__annotations__', None)
+        if not annotations:
+            continue
+        node: OperationNode = annotations.get('operation_node_annotation')
+        if node is not None:
+            node_name_map[node.cn] = node
+        else:  # 不是节点的话 一定没有边
+            continue
+        if node.is_start_node:
+            start_node = node
+        edges: List[OperationEdgeDesc] = annotations.get('operation_edge_annotation')
+        if edges is not None:
+            for edge in edges:
+                edge_desc_list.append((edge, node.cn))
+
+    edge_list: List[OperationEdge] = []
+    for edge_desc, node_to_name in edge_desc_list:
+        node_from = node_name_map.get(edge_desc.node_from_name, None)
+        if node_from is None:
+            raise ValueError('找不到节点 %s' % edge_desc.node_from_name)
+        node_to = node_name_map.get(node_to_name, None)
+        if node_to is None:
+            raise ValueError('找不到节点 %s' % node_to_name)
+        edge_list.append(OperationEdge(node_from, node_to,
+                                       success=edge_desc.success,
+                                       status=edge_desc.status,
+                                       ignore_status=edge_desc.ignore_status))
+
+    return OperationGraph(edge_list, start_node=start_node)
@@ -0,0 +1,151 @@
+import threading
+import time
+from functools import wraps
+from typing import Optional, List
+
+from one_dragon.base.operation.operation_round_result import OperationRoundResultEnum
+
+
+class OperationRoundTiming:
+
+    def __init__(self, node_name: Optional[str], start_time: float):
+        """
+        一轮指令的耗时记录 时间均使用 time.monotonic
+        :param node_name: 节点名称
+        :param start_time: 本轮开始时间
+        """
+        self.node_name: Optional[str] = node_name
+        """节点名称"""
+
+        self.start_time: float = start_time
+        """本轮开始时间"""
+
+        self.end_time: float = start_time
+        """本轮结束时间"""
+
+        self.capture_time: float = 0
+        """截图耗时"""
+
+        self.ocr_time: float = 0
+        """OCR耗时"""
+
+        self.template_time: float = 0
+        """模板匹配耗时"""
+
+        self.child_time: float = 0
+        """本轮中执行的子指令的耗时 子指令的截图和识别耗时记录在子指令中"""
+
+        self.sleep_time: float = 0
+        """轮后等待耗时"""
+
+        self.result: Optional[OperationRoundResultEnum] = None
+        """本轮结果"""
+
+    def finish(self, result: Optional[OperationRoundResultEnum]) -> None:
+        """
+        本轮结束
+        :param result: 本轮结果
+        :return:
+        """
+        self.end_time = time.monotonic()
+        self.result = result
+
+    @property
+    def total_time(self) -> float:
+        """
+        本轮总耗时
+        """
+        return self.end_time - self.start_time
+
+    @property
+    def self_time(self) -> float:
+        """
+        不包含子指令的耗时
+        """
+        return max(0.0, self.total_time - self.child_time)
+
+    @property
+    def recognition_time(self) -> float:
+        """
+        识别耗时 即OCR和模板匹配的耗时
+        """
+        return self.ocr_time + self.template_time
+
+    @property
+    def action_time(self) -> float:
+        """
+        除截图、识别、子指令和等待外的耗时 即操作和其它逻辑的耗时
+        """
+        return max(0.0, self.self_time - self.capture_time - self.recognition_time - self.sleep_time)
+
+    def __str__(self) -> str:
+        return '%s 总耗时 %.3fs 截图 %.3fs 识别 %.3fs 操作 %.3fs 子指令 %.3fs 等待 %.3fs' % (
+            self.node_name, self.total_time, self.capture_time, self.recognition_time,
+            self.action_time, self.child_time, self.sleep_time
+        )
+
+
+_local = threading.local()
+
+
+def _get_timing_stack() -> List[OperationRoundTiming]:
+    stack = getattr(_local, 'timing_stack', None)
+    if stack is None:
+        stack = []
+        _local.timing_stack = stack
+    return stack
+
+
+def push_round_timing(timing: OperationRoundTiming) -> None:
+    """
+    当前线程开始执行一轮指令 子指令的轮次会叠在上面
+    :param timing: 本轮的耗时记录
+    :return:
+    """
+    _get_timing_stack().append(timing)
+
+
+def pop_round_timing(timing: OperationRoundTiming) -> None:
+    """
+    当前线程的一轮指令执行完毕 耗时计入上一层指令的子指令耗时
+    :param timing: 本轮的耗时记录 需要已经调用 finish
+    :return:
+    """
+    stack = _get_timing_stack()
+    if len(stack) == 0 or stack[-1] is not timing:
+        return
+    stack.pop()
+    if len(stack) > 0:
+        stack[-1].child_time += timing.total_time
+
+
+def get_current_round_timing() -> Optional[OperationRoundTiming]:
+    """
+    当前线程正在执行的一轮指令
+    :return:
+    """
+    stack = _get_timing_stack()
+    return stack[-1] if len(stack) > 0 else None
+
+
+def record_recognition_time(field_name: str):
+    """
+    装饰器 将方法的耗时计入当前线程正在执行的一轮指令
+    嵌套调用时只计算最外层 不在指令中调用时不做任何记录
+    :param field_name: 耗时记录的字段 ocr_time / template_time
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            timing = get_current_round_timing()
+            if timing is None or getattr(_local, 'in_recognition', False):
+                return func(*args, **kwargs)
+            _local.in_recognition = True
+            start_time = time.monotonic()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _local.in_recognition = False
+                setattr(timing, field_name, getattr(timing, field_name) + time.monotonic() - start_time)
+        return wrapper
+    return decorator
@@ -0,0 +1,268 @@
+import json
+import os
+import threading
+import time
+from typing import Optional, List, Tuple, Any
+
+from one_dragon.base.operation.operation_round_result import OperationRoundResultEnum
+from one_dragon.base.operation.operation_round_timing import OperationRoundTiming
+from one_dragon.utils import os_utils
+from one_dragon.utils.log_utils import log
+
+# 每轮耗时直方图的分桶上限 毫秒 最后一个桶记录超过所有上限的
+HISTOGRAM_BUCKET_MS: Tuple[int, ...] = (10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+_FILE_VERSION: int = 1
+
+
+class NodeTelemetry:
+
+    def __init__(self, app_id: str, op_name: str, node_name: str):
+        """
+        一个节点的耗时统计 时间单位为秒
+        :param app_id: 所属应用
+        :param op_name: 所属指令
+        :param node_name: 节点名称
+        """
+        self.app_id: str = app_id
+        self.op_name: str = op_name
+        self.node_name: str = node_name
+
+        self.round_cnt: int = 0  # 轮次
+        self.retry_cnt: int = 0  # 返回重试的轮次
+        self.fail_cnt: int = 0  # 返回失败的轮次
+        self.total_time: float = 0  # 总耗时 包含子指令
+        self.self_time: float = 0  # 不包含子指令的耗时
+        self.capture_time: float = 0  # 截图耗时
+        self.ocr_time: float = 0  # OCR耗时
+        self.template_time: float = 0  # 模板匹配耗时
+        self.sleep_time: float = 0  # 轮后等待耗时
+        self.max_time: float = 0  # 单轮最大耗时
+        self.histogram: List[int] = [0] * (len(HISTOGRAM_BUCKET_MS) + 1)  # 每轮总耗时的分布
+
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        return self.app_id, self.op_name, self.node_name
+
+    @property
+    def avg_time(self) -> float:
+        return self.total_time / self.round_cnt if self.round_cnt > 0 else 0
+
+    def add(self, timing: OperationRoundTiming) -> None:
+        """
+        加入一轮的耗时
+        :param timing: 本轮耗时
+        :return:
+        """
+        self.round_cnt += 1
+        if timing.result == OperationRoundResultEnum.RETRY:
+            self.retry_cnt += 1
+        elif timing.result == OperationRoundResultEnum.FAIL:
+            self.fail_cnt += 1
+        total_time = timing.total_time
+        self.total_time += total_time
+        self.self_time += timing.self_time
+        self.capture_time += timing.capture_time
+        self.ocr_time += timing.ocr_time
+        self.template_time += timing.template_time
+        self.sleep_time += timing.sleep_time
+        self.max_time = max(self.max_time, total_time)
+
+        total_ms = total_time * 1000
+        bucket_idx = 0
+        while bucket_idx < len(HISTOGRAM_BUCKET_MS) and total_ms > HISTOGRAM_BUCKET_MS[bucket_idx]:
+            bucket_idx += 1
+        self.histogram[bucket_idx] += 1
+
+    def merge(self, other: 'NodeTelemetry') -> None:
+        """
+        合并另一份同一节点的统计
+        :param other: 另一份统计
+        :return:
+        """
+        self.round_cnt += other.round_cnt
+        self.retry_cnt += other.retry_cnt
+        self.fail_cnt += other.fail_cnt
+        self.total_time += other.total_time
+        self.self_time += other.self_time
+        self.capture_time += other.capture_time
+        self.ocr_time += other.ocr_time
+        self.template_time += other.template_time
+        self.sleep_time += other.sleep_time
+        self.max_time = max(self.max_time, other.max_time)
+        for i in range(len(self.histogram)):
+            self.histogram[i] += other.histogram[i]
+
+    def get_percentile_ms(self, percent: float) -> float:
+        """
+        根据直方图估算分位数 返回所在分桶的上限
+        :param percent: 分位 0~1
+        :return: 毫秒 落在最后一个分桶时返回最大耗时
+        """
+        if self.round_cnt == 0:
+            return 0
+        target = percent * self.round_cnt
+        cnt = 0
+        for i, bucket_cnt in enumerate(self.histogram):
+            cnt += bucket_cnt
+            if cnt >= target and bucket_cnt > 0:
+                if i < len(HISTOGRAM_BUCKET_MS):
+                    return min(HISTOGRAM_BUCKET_MS[i], self.max_time * 1000)
+                break
+        return self.max_time * 1000
+
+    def to_list(self) -> list:
+        """
+        保存到文件时使用的紧凑格式
+        """
+        return [self.app_id, self.op_name, self.node_name,
+                self.round_cnt, self.retry_cnt, self.fail_cnt,
+                round(self.total_time, 4), round(self.self_time, 4),
+                round(self.capture_time, 4), round(self.ocr_time, 4),
+                round(self.template_time, 4), round(self.sleep_time, 4),
+                round(self.max_time, 4), self.histogram]
+
+    @staticmethod
+    def from_list(data: list) -> 'NodeTelemetry':
+        node = NodeTelemetry(data[0], data[1], data[2])
+        (node.round_cnt, node.retry_cnt, node.fail_cnt,
+         node.total_time, node.self_time,
+         node.capture_time, node.ocr_time,
+         node.template_time, node.sleep_time,
+         node.max_time) = data[3:13]
+        node.histogram = list(data[13])
+        return node
+
+
+class OperationTelemetry:
+
+    def __init__(self):
+        """
+        一次运行中 每个应用/指令/节点的耗时统计
+        """
+        self.start_time: float = time.time()
+        self.end_time: float = self.start_time
+        self.node_map: dict[Tuple[str, str, str], NodeTelemetry] = {}
+        self._app_id_stack: List[str] = []  # 当前运行的应用 一条龙中会嵌套运行
+        self._lock = threading.Lock()
+
+    @property
+    def current_app_id(self) -> str:
+        return self._app_id_stack[-1] if len(self._app_id_stack) > 0 else ''
+
+    def enter_app(self, app_id: str) -> None:
+        with self._lock:
+            self._app_id_stack.append(app_id)
+
+    def exit_app(self, app_id: str) -> None:
+        with self._lock:
+            if app_id in self._app_id_stack:
+                # 只移除最后一次进入的
+                idx = len(self._app_id_stack) - 1 - self._app_id_stack[::-1].index(app_id)
+                self._app_id_stack.pop(idx)
+
+    def record_round(self, op_name: str, timing: OperationRoundTiming) -> None:
+        """
+        记录一轮指令
+        :param op_name: 指令名称
+        :param timing: 本轮耗时
+        :return:
+        """
+        with self._lock:
+            key = (self.current_app_id, op_name, timing.node_name or '')
+            node = self.node_map.get(key)
+            if node is None:
+                node = NodeTelemetry(*key)
+                self.node_map[key] = node
+            node.add(timing)
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                'version': _FILE_VERSION,
+                'start_time': self.start_time,
+                'end_time': self.end_time,
+                'bucket_ms': list(HISTOGRAM_BUCKET_MS),
+                'nodes': [node.to_list() for node in self.node_map.values()],
+            }
+
+    def save(self, file_path: Optional[str] = None) -> str:
+        """
+        保存到文件
+        :param file_path: 文件路径 不传入时保存到默认目录 按开始时间命名
+        :return: 文件路径
+        """
+        self.end_time = time.time()
+        if file_path is None:
+            file_name = time.strftime('%Y%m%d_%H%M%S', time.localtime(self.start_time)) + '.json'
+            file_path = os.path.join(get_telemetry_dir(), file_name)
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False, separators=(',', ':'))
+        return file_path
+
+
+def get_telemetry_dir() -> str:
+    """
+    耗时统计文件的保存目录
+    """
+    return os_utils.get_path_under_work_dir('.log', 'telemetry')
+
+
+def load_telemetry_file(file_path: str) -> List[NodeTelemetry]:
+    """
+    读取一个耗时统计文件
+    :param file_path: 文件路径
+    :return: 各节点的统计
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    if data.get('version') != _FILE_VERSION or data.get('bucket_ms') != list(HISTOGRAM_BUCKET_MS):
+        log.error('耗时统计文件格式不一致 %s', file_path)
+        return []
+    return [NodeTelemetry.from_list(i) for i in data.get('nodes', [])]
+
+
+_telemetry: Optional[OperationTelemetry] = None
+_telemetry_owner: Any = None
+
+
+def get_telemetry() -> Optional[OperationTelemetry]:
+    """
+    当前正在进行的耗时统计 没有开启时为None
+    """
+    return _telemetry
+
+
+def start_telemetry(owner: Any) -> bool:
+    """
+    开始耗时统计 已经在统计时不做任何事
+    :param owner: 开始统计的对象 只有它能结束统计
+    :return: 是否开始了新的统计
+    """
+    global _telemetry, _telemetry_owner
+    if _telemetry is not None:
+        return False
+    _telemetry = OperationTelemetry()
+    _telemetry_owner = owner
+    return True
+
+
+def stop_telemetry(owner: Any) -> Optional[str]:
+    """
+    结束耗时统计 并保存到文件
+    :param owner: 开始统计的对象
+    :return: 保存的文件路径 不是开始统计的对象时为None
+    """
+    global _telemetry, _telemetry_owner
+    if _telemetry is None or _telemetry_owner is not owner:
+        return None
+    telemetry = _telemetry
+    _telemetry = None
+    _telemetry_owner = None
+    try:
+        file_path = telemetry.save()
+        log.info('耗时统计已保存 %s', file_path)
+        return file_path
+    except Exception:
+        log.error('耗时统计保存失败', exc_info=True)
+        return None
@@ -4,6 +4,7 @@ from typing import Optional
 
 from one_dragon.base.screen.screen_area import ScreenArea
 from one_dragon.base.screen.screen_info import ScreenInfo
+from one_dragon.base.screen.screen_match_index import ScreenMatchIndex
 from one_dragon.utils.log_utils import log
 
 
@@ -41,13 +42,50 @@ class ScreenRoute:
         return self.node_list is not None and len(self.node_list) > 0
 
 
+class _LazyScreenRoute(ScreenRoute):
+
+    def __init__(self, from_screen: str, to_screen: str, prev_map: dict[str, tuple[str, str]]):
+        """
+        按需生成节点列表的路径
+        :param from_screen: 出发的画面
+        :param to_screen: 目标画面
+        :param prev_map: BFS 得到的 目标画面 -> (上一个画面, 点击的区域)
+        """
+        ScreenRoute.__init__(self, from_screen, to_screen)
+        self._prev_map: Optional[dict[str, tuple[str, str]]] = prev_map
+        self._node_list: Optional[list[ScreenRouteNode]] = None
+
+    @property
+    def node_list(self) -> list[ScreenRouteNode]:
+        if self._node_list is None:
+            node_list: list[ScreenRouteNode] = []
+            if self.to_screen in self._prev_map:
+                current = self.to_screen
+                while True:
+                    prev_screen, area_name = self._prev_map[current]
+                    node_list.append(ScreenRouteNode(from_screen=prev_screen, from_area=area_name, to_screen=current))
+                    if prev_screen == self.from_screen:
+                        break
+                    current = prev_screen
+                node_list.reverse()
+            self._node_list = node_list
+            self._prev_map = None
+        return self._node_list
+
+    @node_list.setter
+    def node_list(self, new_value: list[ScreenRouteNode]) -> None:
+        self._node_list = new_value
+
+
 class ScreenContext:
 
     def __init__(self):
         self.screen_info_list: list[ScreenInfo] = []
         self.screen_info_map: dict[str, ScreenInfo] = {}
         self._screen_area_map: dict[str, ScreenArea] = {}
-        self.screen_route_map: dict[str, dict[str, ScreenRoute]] = {}
+        self._screen_goto_map: dict[str, list[tuple[str, str]]] = {}  # 画面 -> [(可前往的画面, 点击的区域)]
+        self._screen_route_cache: dict[str, dict[str, ScreenRoute]] = {}  # 出发画面 -> 目标画面 -> 路径
+        self.screen_match_index: ScreenMatchIndex = ScreenMatchIndex([])
 
         self.load_all()
         self.last_screen_name: Optional[str] = None  # 上一个画面名字
@@ -74,6 +112,7 @@ class ScreenContext:
                     self._screen_area_map[f'{screen_info.screen_name}.{screen_area.area_name}'] = screen_area
 
         self.init_screen_route()
+        self.screen_match_index = ScreenMatchIndex(self.screen_info_list)
 
     def get_screen(self, screen_name: str) -> ScreenInfo:
         """
@@ -94,71 +133,54 @@ class ScreenContext:
 
     def init_screen_route(self) -> None:
         """
-        初始化画面间的跳转路径
+        初始化画面间的跳转关系
+        只记录每个画面可以直接前往的画面 具体路径在 get_screen_route 时按需计算并缓存
+        跳转关系没有变化时 保留之前的缓存
         :return:
         """
-        # 先对任意两个画面之间做初始化
-        for screen_1 in self.screen_info_list:
-            self.screen_route_map[screen_1.screen_name] = {}
-            for screen_2 in self.screen_info_list:
-                self.screen_route_map[screen_1.screen_name][screen_2.screen_name] = ScreenRoute(
-                    from_screen=screen_1.screen_name,
-                    to_screen=screen_2.screen_name
-                )
-
-        # 根据画面的goto_list来初始化边
+        screen_goto_map: dict[str, list[tuple[str, str]]] = {}
         for screen_info in self.screen_info_list:
+            goto_list: list[tuple[str, str]] = []
+            screen_goto_map[screen_info.screen_name] = goto_list
             for area in screen_info.area_list:
                 if area.goto_list is None or len(area.goto_list) == 0:
                     continue
-                from_screen_route = self.screen_route_map[screen_info.screen_name]
-                if from_screen_route is None:
-                    log.error('画面路径没有初始化 %s', screen_info.screen_name)
-                    continue
                 for goto_screen_name in area.goto_list:
-                    if goto_screen_name not in from_screen_route:
+                    if goto_screen_name not in self.screen_info_map:
                         log.error('画面路径 %s -> %s 无法找到目标画面', screen_info.screen_name, goto_screen_name)
                         continue
-                    from_screen_route[goto_screen_name].node_list.append(
-                        ScreenRouteNode(
-                            from_screen=screen_info.screen_name,
-                            from_area=area.area_name,
-                            to_screen=goto_screen_name
-                        )
-                    )
-
-        # Floyd算出任意两个画面之间的路径
-        screen_len = len(self.screen_info_list)
-        for k in range(screen_len):
-            screen_k = self.screen_info_list[k]
-            for i in range(screen_len):
-                if i == k:
+                    goto_list.append((goto_screen_name, area.area_name))
+
+        if screen_goto_map != self._screen_goto_map:
+            self._screen_goto_map = screen_goto_map
+            self._screen_route_cache.clear()
+
+    def _init_screen_route_from(self, from_screen: str) -> dict[str, ScreenRoute]:
+        """
+        从一个画面出发 BFS 得到前往其它画面的最短路径
+        每条路径只记录上一跳 ScreenRoute 的节点列表在首次访问时才生成
+        :param from_screen: 出发的画面
+        :return: 目标画面 -> 路径
+        """
+        prev_map: dict[str, tuple[str, str]] = {}  # 目标画面 -> (上一个画面, 点击的区域)
+        queue: list[str] = [from_screen]
+        queue_idx: int = 0
+        while queue_idx < len(queue):
+            current = queue[queue_idx]
+            queue_idx += 1
+            for goto_screen_name, area_name in self._screen_goto_map.get(current, []):
+                if goto_screen_name in prev_map:
                     continue
-                screen_i = self.screen_info_list[i]
-
-                route_ik: ScreenRoute = self.screen_route_map[screen_i.screen_name][screen_k.screen_name]
-                if not route_ik.can_go:  # 无法从 i 到 k
+                if goto_screen_name == from_screen and current != from_screen:  # 回到出发画面的路径没有意义
                     continue
+                prev_map[goto_screen_name] = (current, area_name)
+                if goto_screen_name != from_screen:
+                    queue.append(goto_screen_name)
 
-                for j in range(screen_len):
-                    if k == j or i == j:
-                        continue
-                    screen_j = self.screen_info_list[j]
-
-                    route_kj: ScreenRoute = self.screen_route_map[screen_k.screen_name][screen_j.screen_name]
-                    if not route_kj.can_go:  # 无法从 k 到 j
-                        continue
-
-                    route_ij: ScreenRoute = self.screen_route_map[screen_i.screen_name][screen_j.screen_name]
-
-                    if (not route_ij.can_go  # 当前无法从 i 到 j
-                        or len(route_ik.node_list) + len(route_kj.node_list) < len(route_ij.node_list)  # 新的更短
-                    ):
-                        route_ij.node_list = []
-                        for node_ik in route_ik.node_list:
-                            route_ij.node_list.append(node_ik)
-                        for node_kj in route_kj.node_list:
-                            route_ij.node_list.append(node_kj)
+        route_map: dict[str, ScreenRoute] = {}
+        for to_screen in self.screen_info_map:
+            route_map[to_screen] = _LazyScreenRoute(from_screen, to_screen, prev_map)
+        return route_map
 
     def get_screen_route(self, from_screen: str, to_screen: str) -> Optional[ScreenRoute]:
         """
@@ -167,9 +189,12 @@ class ScreenContext:
         :param to_screen:
         :return:
         """
-        from_route = self.screen_route_map.get(from_screen, None)
+        from_route = self._screen_route_cache.get(from_screen, None)
         if from_route is None:
-            return None
+            if from_screen not in self.screen_info_map:
+                return None
+            from_route = self._init_screen_route_from(from_screen)
+            self._screen_route_cache[from_screen] = from_route
         return from_route.get(to_screen, None)
 
     def update_current_screen_name(self, screen_name: str) -> None:
@@ -0,0 +1,134 @@
+from typing import Optional, List, Tuple
+
+from one_dragon.base.screen.screen_area import ScreenArea
+from one_dragon.base.screen.screen_info import ScreenInfo
+
+
+class ScreenMatchProbe:
+
+    OCR_COST: int = 10  # OCR的耗时大约是模板匹配的十倍
+    TEMPLATE_COST: int = 1
+
+    def __init__(self, probe_idx: int, area: ScreenArea):
+        """
+        一次识别操作 即对某个区域进行OCR或模板匹配
+        多个画面中 矩形和预处理相同的文本区域 可以共用一次OCR结果
+        :param probe_idx: 下标
+        :param area: 用于识别的区域 取第一个出现的
+        """
+        self.probe_idx: int = probe_idx
+        self.area: ScreenArea = area
+        self.is_ocr: bool = area.is_text_area
+        self.cost: int = ScreenMatchProbe.OCR_COST if self.is_ocr else ScreenMatchProbe.TEMPLATE_COST
+
+
+class ScreenMatchCheck:
+
+    def __init__(self, check_idx: int, area: ScreenArea, probe: Optional[ScreenMatchProbe]):
+        """
+        对识别结果的一次判断 对应画面中的一个 id_mark 区域
+        不同画面中完全相同的区域 会共用同一个判断
+        :param check_idx: 下标
+        :param area: 对应的区域 取第一个出现的
+        :param probe: 需要的识别操作 区域既不是文本也不是模板时为None 此时判断结果恒为False
+        """
+        self.check_idx: int = check_idx
+        self.area: ScreenArea = area
+        self.probe: Optional[ScreenMatchProbe] = probe
+        self.screen_idx_list: List[int] = []  # 需要这个判断的画面
+
+
+class ScreenMatchIndex:
+
+    def __init__(self, screen_info_list: List[ScreenInfo]):
+        """
+        画面识别的索引 在加载画面时构建
+        将所有画面的 id_mark 区域去重成判断 并将相同区域的OCR合并成一次识别
+        识别时 按决策树的方式 优先执行代价低、能排除最多画面的判断
+        """
+        self.screen_name_list: List[str] = []
+        self.screen_check_list: List[List[int]] = []  # 每个画面需要通过的判断下标
+        self.check_list: List[ScreenMatchCheck] = []
+        self.probe_list: List[ScreenMatchProbe] = []
+
+        probe_map: dict[Tuple, ScreenMatchProbe] = {}
+        check_map: dict[Tuple, ScreenMatchCheck] = {}
+        for screen_info in screen_info_list:
+            screen_idx = len(self.screen_name_list)
+            self.screen_name_list.append(screen_info.screen_name)
+
+            check_idx_list: List[int] = []
+            for area in screen_info.area_list:
+                if not area.id_mark:
+                    continue
+
+                check_key = ScreenMatchIndex.get_check_key(area)
+                check = check_map.get(check_key)
+                if check is None:
+                    probe_key = ScreenMatchIndex.get_probe_key(area)
+                    probe = None
+                    if probe_key is not None:
+                        probe = probe_map.get(probe_key)
+                        if probe is None:
+                            probe = ScreenMatchProbe(len(self.probe_list), area)
+                            self.probe_list.append(probe)
+                            probe_map[probe_key] = probe
+                    check = ScreenMatchCheck(len(self.check_list), area, probe)
+                    self.check_list.append(check)
+                    check_map[check_key] = check
+
+                if check.check_idx not in check_idx_list:
+                    check_idx_list.append(check.check_idx)
+                    check.screen_idx_list.append(screen_idx)
+
+            self.screen_check_list.append(check_idx_list)
+
+    @staticmethod
+    def get_probe_key(area: ScreenArea) -> Optional[Tuple]:
+        """
+        识别操作的唯一键 相同键的区域 识别结果相同
+        :param area: 区域
+        :return:
+        """
+        rect_key = (area.x1, area.y1, area.x2, area.y2)
+        if area.is_text_area:
+            color_key = None if area.color_range is None else tuple(tuple(i) for i in area.color_range)
+            return 'ocr', rect_key, color_key
+        elif area.is_template_area:
+            return 'template', rect_key, area.template_sub_dir, area.template_id, area.template_match_threshold
+        else:
+            return None
+
+    @staticmethod
+    def get_check_key(area: ScreenArea) -> Tuple:
+        """
+        判断的唯一键 相同键的区域 判断结果相同
+        :param area: 区域
+        :return:
+        """
+        probe_key = ScreenMatchIndex.get_probe_key(area)
+        if probe_key is None:
+            return 'none', area.x1, area.y1, area.x2, area.y2
+        elif area.is_text_area:
+            return probe_key + (area.text, area.lcs_percent)
+        else:
+            return probe_key
+
+    def get_screen_idx_list(self, screen_name_list: Optional[List[str]] = None,
+                            exclude_screen_name_list: Optional[List[str]] = None) -> List[int]:
+        """
+        获取候选画面的下标 保持加载时的顺序
+        :param screen_name_list: 只包含这些画面
+        :param exclude_screen_name_list: 排除这些画面
+        :return:
+        """
+        result = []
+        for screen_idx, screen_name in enumerate(self.screen_name_list):
+            if screen_name_list is not None and screen_name not in screen_name_list:
+                continue
+            if exclude_screen_name_list is not None and screen_name in exclude_screen_name_list:
+                continue
+            if len(self.screen_check_list[screen_idx]) == 0:  # 没有 id_mark 的画面无法被识别
+                continue
+            result.append(screen_idx)
+        return result
@@ -1,13 +1,13 @@
-import cv2
-import numpy as np
 from cv2.typing import MatLike
 from enum import Enum
-from typing import Optional, List
+from typing import Optional, List, Any
 
 from one_dragon.base.geometry.point import Point
+from one_dragon.base.matcher.match_result import MatchResultList
 from one_dragon.base.operation.one_dragon_context import OneDragonContext
 from one_dragon.base.screen.screen_area import ScreenArea
 from one_dragon.base.screen.screen_info import ScreenInfo
+from one_dragon.base.screen.screen_match_index import ScreenMatchCheck
 from one_dragon.utils import cv2_utils, str_utils
 from one_dragon.utils.i18_utils import gt
 
@@ -53,32 +53,50 @@ def find_area_in_screen(ctx: OneDragonContext, screen: MatLike, area: ScreenArea
 
     find: bool = False
     if area.is_text_area:
-        rect = area.rect
-        part = cv2_utils.crop_image_only(screen, rect)
+        find = is_ocr_result_match_area(area, ocr_area(ctx, screen, area))
+    elif area.is_template_area:
+        find = match_template_area(ctx, screen, area)
 
-        if area.color_range is None:
-            to_ocr = part
-        else:
-            mask = cv2.inRange(part,
-                               np.array(area.color_range[0], dtype=np.uint8),
-                               np.array(area.color_range[1], dtype=np.uint8))
-            mask = cv2_utils.dilate(mask, 2)
-            to_ocr = cv2.bitwise_and(part, part, mask=mask)
+    return FindAreaResultEnum.TRUE if find else FindAreaResultEnum.FALSE
 
-        ocr_result_map = ctx.ocr.run_ocr(to_ocr)
-        for ocr_result, mrl in ocr_result_map.items():
-            if str_utils.find_by_lcs(gt(area.text, 'game'), ocr_result, percent=area.lcs_percent):
-                find = True
-                break
-    elif area.is_template_area:
-        rect = area.rect
-        part = cv2_utils.crop_image_only(screen, rect)
 
-        mrl = ctx.tm.match_template(part, area.template_sub_dir, area.template_id,
-                                    threshold=area.template_match_threshold)
-        find = mrl.max is not None
+def ocr_area(ctx: OneDragonContext, screen: MatLike, area: ScreenArea) -> dict[str, MatchResultList]:
+    """
+    对文本区域进行OCR 有颜色范围时先进行筛选
+    :param ctx: 上下文
+    :param screen: 游戏截图
+    :param area: 区域
+    :return: OCR结果
+    """
+    return ctx.ocr_cache.run_ocr(screen, area.rect, color_range=area.color_range, dilate_size=2)
 
-    return FindAreaResultEnum.TRUE if find else FindAreaResultEnum.FALSE
+
+def is_ocr_result_match_area(area: ScreenArea, ocr_result_map: dict[str, MatchResultList]) -> bool:
+    """
+    OCR结果中 是否包含区域的文本
+    :param area: 区域
+    :param ocr_result_map: OCR结果
+    :return:
+    """
+    target_text = gt(area.text, 'game')
+    for ocr_result in ocr_result_map.keys():
+        if str_utils.find_by_lcs(target_text, ocr_result, percent=area.lcs_percent):
+            return True
+    return False
+
+
+def match_template_area(ctx: OneDragonContext, screen: MatLike, area: ScreenArea) -> bool:
+    """
+    在模板区域中 是否能匹配到模板
+    :param ctx: 上下文
+    :param screen: 游戏截图
+    :param area: 区域
+    :return:
+    """
+    part = cv2_utils.crop_image_only(screen, area.rect)
+    mrl = ctx.tm.match_template(part, area.template_sub_dir, area.template_id,
+                                threshold=area.template_match_threshold)
+    return mrl.max is not None
 
 
 def find_and_click_area(ctx: OneDragonContext, screen: MatLike, screen_name: str, area_name: str) -> OcrClickResultEnum:
@@ -94,15 +112,8 @@ def find_and_click_area(ctx: OneDragonContext, screen: MatLike, screen_name: str
     if area is None:
         return OcrClickResultEnum.AREA_NO_CONFIG
     if area.is_text_area:
-        rect = area.rect
-        to_ocr_part = cv2_utils.crop_image_only(screen, rect)
-        if area.color_range is not None:
-            mask = cv2.inRange(to_ocr_part, area.color_range_lower, area.color_range_upper)
-            mask = cv2_utils.dilate(mask, 5)
-            to_ocr_part = cv2.bitwise_and(to_ocr_part, to_ocr_part, mask=mask)
-        # cv2_utils.show_image(to_ocr_part, win_name='debug', wait=1)
-
-        ocr_result_map = ctx.ocr.run_ocr(to_ocr_part)
+        color_range = None if area.color_range is None else [area.color_range_lower, area.color_range_upper]
+        ocr_result_map = ctx.ocr_cache.run_ocr(screen, area.rect, color_range=color_range, dilate_size=5)
         for ocr_result, mrl in ocr_result_map.items():
             if str_utils.find_by_lcs(gt(area.text, 'game'), ocr_result, percent=area.lcs_percent):
                 to_click = mrl.max.center + area.left_top
@@ -138,21 +149,92 @@ def get_match_screen_name(ctx: OneDragonContext, screen: MatLike, screen_name_li
     :return: 画面名字
     """
     if screen_name_list is not None:
-        for screen_info in ctx.screen_loader.screen_info_list:
-            if screen_info.screen_name not in screen_name_list:
-                continue
-            if is_target_screen(ctx, screen, screen_info=screen_info):
-                return screen_info.screen_name
+        return get_match_screen_name_by_index(ctx, screen, screen_name_list=screen_name_list)
     elif ctx.screen_loader.current_screen_name is not None or ctx.screen_loader.last_screen_name is not None:
         return get_match_screen_name_from_last(ctx, screen)
     else:
-        for screen_info in ctx.screen_loader.screen_info_list:
-            if is_target_screen(ctx, screen, screen_info=screen_info):
-                return screen_info.screen_name
+        return get_match_screen_name_by_index(ctx, screen)
+
+
+def get_match_screen_name_by_index(ctx: OneDragonContext, screen: MatLike,
+                                   screen_name_list: Optional[List[str]] = None,
+                                   exclude_screen_name_list: Optional[List[str]] = None) -> Optional[str]:
+    """
+    使用画面识别索引 匹配一个最合适的画面
+    结果与按加载顺序逐个调用 is_target_screen 一致 即返回第一个所有 id_mark 区域都满足的画面
+    但相同区域的识别只进行一次 并优先执行代价低、涉及画面多的判断 尽早排除大量画面
+    :param ctx: 上下文
+    :param screen: 游戏截图
+    :param screen_name_list: 传入时 只判断这里的画面
+    :param exclude_screen_name_list: 传入时 不判断这里的画面
+    :return: 画面名字
+    """
+    index = ctx.screen_loader.screen_match_index
+    candidate_list: List[int] = index.get_screen_idx_list(screen_name_list=screen_name_list,
+                                                          exclude_screen_name_list=exclude_screen_name_list)
+    check_result_map: dict[int, bool] = {}
+    probe_result_map: dict[int, Any] = {}
+
+    while len(candidate_list) > 0:
+        first_screen_idx = candidate_list[0]
+        if all(check_result_map.get(check_idx, False) for check_idx in index.screen_check_list[first_screen_idx]):
+            return index.screen_name_list[first_screen_idx]
+
+        # 统计剩余画面中 每个未执行的判断涉及多少个画面
+        check_cnt_map: dict[int, int] = {}
+        for screen_idx in candidate_list:
+            for check_idx in index.screen_check_list[screen_idx]:
+                if check_idx not in check_result_map:
+                    check_cnt_map[check_idx] = check_cnt_map.get(check_idx, 0) + 1
+
+        # 已有识别结果的判断不需要代价 其次是模板匹配 最后是OCR 相同代价时 优先涉及画面多的
+        def check_order(idx: int) -> tuple[int, int, int]:
+            probe = index.check_list[idx].probe
+            cost = 0 if probe is None or probe.probe_idx in probe_result_map else probe.cost
+            return cost, -check_cnt_map[idx], idx
+
+        next_check_idx = min(check_cnt_map.keys(), key=check_order)
+        check = index.check_list[next_check_idx]
+        check_result = _run_screen_match_check(ctx, screen, check, probe_result_map)
+        check_result_map[next_check_idx] = check_result
+
+        if not check_result:
+            candidate_list = [
+                screen_idx
+                for screen_idx in candidate_list
+                if next_check_idx not in index.screen_check_list[screen_idx]
+            ]
 
     return None
 
 
+def _run_screen_match_check(ctx: OneDragonContext, screen: MatLike,
+                            check: ScreenMatchCheck, probe_result_map: dict[int, Any]) -> bool:
+    """
+    执行画面识别索引中的一个判断 识别结果会保存下来供相同区域的其它判断使用
+    :param ctx: 上下文
+    :param screen: 游戏截图
+    :param check: 判断
+    :param probe_result_map: 已有的识别结果
+    :return: 是否满足
+    """
+    probe = check.probe
+    if probe is None:
+        return False
+
+    if probe.probe_idx not in probe_result_map:
+        if probe.is_ocr:
+            probe_result_map[probe.probe_idx] = ocr_area(ctx, screen, probe.area)
+        else:
+            probe_result_map[probe.probe_idx] = match_template_area(ctx, screen, probe.area)
+
+    probe_result = probe_result_map[probe.probe_idx]
+    if probe.is_ocr:
+        return is_ocr_result_match_area(check.area, probe_result)
+    else:
+        return probe_result
+
+
 def get_match_screen_name_from_last(ctx: OneDragonContext, screen: MatLike) -> str:
     """
     根据游戏截图 从上次记录的画面开始 匹配一个最合适的画面
@@ -185,11 +267,7 @@ def get_match_screen_name_from_last(ctx: OneDragonContext, screen: MatLike) -> s
                         bfs_list.append(goto_screen)
 
         # 最后 尝试搜索中没有出现的画面
-        for screen_info in ctx.screen_loader.screen_info_list:
-            if screen_info.screen_name in bfs_list:
-                continue
-            if is_target_screen(ctx, screen, screen_info=screen_info):
-                return screen_info.screen_name
+        return get_match_screen_name_by_index(ctx, screen, exclude_screen_name_list=bfs_list)
 
 def is_target_screen(ctx: OneDragonContext, screen: MatLike,
                      screen_name: Optional[str] = None,
@@ -238,11 +316,7 @@ def find_by_ocr(ctx: OneDragonContext, screen: MatLike, target_cn: str,
     """
     if lcs_percent is None:
         lcs_percent = area.lcs_percent
-    to_ocr_part = screen if area is None else cv2_utils.crop_image_only(screen, area.rect)
-    if color_range is not None:
-        mask = cv2.inRange(to_ocr_part, color_range[0], color_range[1])
-        to_ocr_part = cv2.bitwise_and(to_ocr_part, to_ocr_part, mask=mask)
-    ocr_result_map = ctx.ocr.run_ocr(to_ocr_part)
+    ocr_result_map = ctx.ocr_cache.run_ocr(screen, None if area is None else area.rect, color_range=color_range)
 
     to_click: Optional[Point] = None
     for ocr_result, mrl in ocr_result_map.items():
@@ -0,0 +1,130 @@
+import random
+import threading
+import time
+from typing import List, Optional
+
+from one_dragon.base.conditional_operation.atomic_op import AtomicOp
+from one_dragon.base.conditional_operation.conditional_operator import ConditionalOperator
+from one_dragon.base.conditional_operation.scene_handler import SceneHandler
+from one_dragon.base.conditional_operation.state_cal_tree import construct_state_cal_tree
+from one_dragon.base.conditional_operation.state_handler import StateHandler
+from one_dragon.base.conditional_operation.state_recorder import StateRecorder, StateRecord
+
+
+class _BenchmarkOperator(ConditionalOperator):
+
+    def __init__(self, state_name_list: List[str]):
+        ConditionalOperator.__init__(self, '', '', is_mock=True)
+        self._recorder_map: dict[str, StateRecorder] = {i: StateRecorder(i) for i in state_name_list}
+
+    def get_state_recorder(self, state_name: str) -> Optional[StateRecorder]:
+        return self._recorder_map.get(state_name)
+
+
+class _DispatchRecordOp(AtomicOp):
+
+    def __init__(self, op: ConditionalOperator):
+        """
+        记录主循环分发指令的时间 并清除触发状态 避免重复分发
+        """
+        AtomicOp.__init__(self, 'benchmark')
+        self.op: ConditionalOperator = op
+        self.dispatch_time_list: List[float] = []
+        self.dispatched = threading.Event()
+
+    def execute(self):
+        self.dispatch_time_list.append(time.time())
+        self.op.update_state(StateRecord('触发', is_clear=True))
+        self.dispatched.set()
+
+
+def _create_operator(expr: str, interval_seconds: float) -> tuple[_BenchmarkOperator, _DispatchRecordOp]:
+    op = _BenchmarkOperator(['触发'])
+    record_op = _DispatchRecordOp(op)
+    tree = construct_state_cal_tree(expr, op.get_state_recorder)
+    op.normal_scene_handler = SceneHandler(interval_seconds, [StateHandler(expr, tree, operations=[record_op])])
+    op._inited = True
+    return op, record_op
+
+
+def _print_latency(title: str, latency_list: List[float]) -> None:
+    latency_list = sorted(latency_list)
+    cnt = len(latency_list)
+    print('%s 次数 %d 平均 %.2fms 中位 %.2fms P95 %.2fms 最大 %.2fms' % (
+        title, cnt,
+        sum(latency_list) / cnt * 1000,
+        latency_list[cnt // 2] * 1000,
+        latency_list[min(cnt - 1, int(cnt * 0.95))] * 1000,
+        latency_list[-1] * 1000,
+    ))
+
+
+def benchmark_trigger_latency(times: int = 200) -> List[float]:
+    """
+    状态更新到主循环分发指令的延迟
+    主循环空闲时更新一个状态 使表达式成立 记录指令开始执行的时间
+    :param times: 次数
+    :return: 每次的延迟 秒
+    """
+    op, record_op = _create_operator('[触发, 0, 0.5]', 0)
+    op.start_running_async()
+
+    latency_list: List[float] = []
+    for _ in range(times):
+        time.sleep(random.uniform(0.01, 0.03))  # 随机时机 避免与轮询周期对齐
+        record_op.dispatched.clear()
+        start_time = time.time()
+        op.update_state(StateRecord('触发', start_time))
+        if record_op.dispatched.wait(1):
+            latency_list.append(record_op.dispatch_time_list[-1] - start_time)
+
+    op.stop_running()
+    _print_latency('状态触发', latency_list)
+    return latency_list
+
+
+def benchmark_cooldown_latency(times: int = 100, interval_seconds: float = 0.05) -> List[float]:
+    """
+    冷却结束到主循环再次分发指令的延迟
+    表达式一直成立 每次分发的间隔减去冷却时间即为延迟
+    :param times: 次数
+    :param interval_seconds: 场景冷却时间
+    :return: 每次的延迟 秒
+    """
+    op, record_op = _create_operator('', interval_seconds)
+    op.start_running_async()
+
+    while len(record_op.dispatch_time_list) < times + 1:
+        time.sleep(0.05)
+    op.stop_running()
+
+    time_list = record_op.dispatch_time_list[:times + 1]
+    latency_list = [time_list[i + 1] - time_list[i] - interval_seconds for i in range(times)]
+    _print_latency('冷却结束', latency_list)
+    return latency_list
+
+
+def benchmark_idle_cpu(seconds: float = 3) -> float:
+    """
+    主循环空闲时占用的CPU时间 表达式不成立 也没有状态更新
+    :param seconds: 测试时长
+    :return: 每秒占用的CPU时间 秒
+    """
+    op, _ = _create_operator('[触发, 0, 0.5]', 0)
+    start_cpu = time.process_time()
+    op.start_running_async()
+    time.sleep(seconds)
+    op.stop_running()
+    cpu_per_second = (time.process_time() - start_cpu) / seconds
+    print('空闲CPU占用 %.2fms/s' % (cpu_per_second * 1000))
+    return cpu_per_second
+
+
+def __debug():
+    benchmark_trigger_latency()
+    benchmark_cooldown_latency()
+    benchmark_idle_cpu()
+
+
+if __name__ == '__main__':
+    __debug()
@@ -0,0 +1,137 @@
+import time
+from typing import List
+
+from one_dragon.base.operation import operation_graph
+from one_dragon.base.operation.context_event_bus import ContextEventBus
+from one_dragon.base.operation.operation import Operation
+from one_dragon.base.operation.operation_edge import node_from
+from one_dragon.base.operation.operation_node import operation_node
+from one_dragon.base.operation.operation_round_result import OperationRoundResult
+
+
+class _BenchmarkOperation(Operation):
+
+    def __init__(self, ctx: ContextEventBus):
+        """
+        与常见的子指令规模相近 10个节点 带状态的边和失败的边 以及几个属性
+        """
+        Operation.__init__(self, ctx, op_name='benchmark', need_check_game_win=True)
+
+    @property
+    def property_1(self) -> str:
+        return self.op_name
+
+    @property
+    def property_2(self) -> float:
+        return self.timeout_seconds
+
+    @operation_node(name='节点1', is_start_node=True)
+    def node_1(self) -> OperationRoundResult:
+        return self.round_success()
+
+    @node_from(from_name='节点1')
+    @operation_node(name='节点2')
+    def node_2(self) -> OperationRoundResult:
+        return self.round_success()
+
+    @node_from(from_name='节点2', status='状态1')
+    @operation_node(name='节点3')
+    def node_3(self) -> OperationRoundResult:
+        return self.round_success()
+
+    @node_from(from_name='节点2', status='状态2')
+    @operation_node(name='节点4')
+    def node_4(self) -> OperationRoundResult:
+        return self.round_success()
+
+    @node_from(from_name='节点3')
+    @node_from(from_name='节点4')
+    @operation_node(name='节点5')
+    def node_5(self) -> OperationRoundResult:
+        return self.round_success()
+
+    @node_from(from_name='节点5')
+    @operation_node(name='节点6')
+    def node_6(self) -> OperationRoundResult:
+        return self.round_success()
+
+    @node_from(from_name='节点6', success=False)
+    @operation_node(name='节点7')
+    def node_7(self) -> OperationRoundResult:
+        return self.round_success()
+
+    @node_from(from_name='节点6')
+    @operation_node(name='节点8')
+    def node_8(self) -> OperationRoundResult:
+        return self.round_success()
+
+    @node_from(from_name='节点7')
+    @node_from(from_name='节点8')
+    @operation_node(name='节点9')
+    def node_9(self) -> OperationRoundResult:
+        return self.round_success()
+
+    @node_from(from_name='节点9')
+    @operation_node(name='节点10')
+    def node_10(self) -> OperationRoundResult:
+        return self.round_success()
+
+
+def _create_and_init(ctx: ContextEventBus) -> Operation:
+    """
+    创建指令 并进行执行前的初始化 结束后解除监听 避免事件监听不断增加
+    """
+    op = _BenchmarkOperation(ctx)
+    op._init_before_execute()
+    ctx.unlisten_all_event(op)
+    return op
+
+
+def benchmark_operation_init(times: int = 2000) -> tuple[float, float]:
+    """
+    指令创建加上执行前初始化的耗时
+    分别测试每次都重新读取方法标注 和复用类级别缓存的节点网络
+    :param times: 次数
+    :return: 不使用缓存、使用缓存时每次的平均耗时 秒
+    """
+    ctx = ContextEventBus()
+
+    start_time = time.perf_counter()
+    for _ in range(times):
+        operation_graph._class_graph_cache.pop(_BenchmarkOperation, None)
+        _create_and_init(ctx)
+    no_cache_cost = (time.perf_counter() - start_time) / times
+
+    _create_and_init(ctx)  # 预先构建
+    start_time = time.perf_counter()
+    for _ in range(times):
+        _create_and_init(ctx)
+    cache_cost = (time.perf_counter() - start_time) / times
+
+    print('指令初始化 不使用缓存 %.1fus 使用缓存 %.1fus' % (no_cache_cost * 1e6, cache_cost * 1e6))
+    return no_cache_cost, cache_cost
+
+
+def benchmark_graph_build(times: int = 2000) -> float:
+    """
+    读取一个类的方法标注并构建节点网络的耗时 即每个类第一次使用时的额外耗时
+    :param times: 次数
+    :return: 每次的平均耗时 秒
+    """
+    cost_list: List[float] = []
+    for _ in range(times):
+        start_time = time.perf_counter()
+        operation_graph._build_annotation_graph(_BenchmarkOperation)
+        cost_list.append(time.perf_counter() - start_time)
+    cost = sum(cost_list) / times
+    print('构建节点网络 %.1fus' % (cost * 1e6))
+    return cost
+
+
+def __debug():
+    benchmark_operation_init()
+    benchmark_graph_build()
+
+
+if __name__ == '__main__':
+    __debug()
@@ -0,0 +1,127 @@
+import argparse
+import os
+from typing import List, Tuple
+
+from one_dragon.base.operation import operation_telemetry
+from one_dragon.base.operation.operation_telemetry import NodeTelemetry
+
+# 排序字段 -> 取值方法
+_SORT_KEY_MAP = {
+    'self': lambda node: node.self_time,
+    'total': lambda node: node.total_time,
+    'avg': lambda node: node.avg_time,
+    'p95': lambda node: node.get_percentile_ms(0.95),
+    'max': lambda node: node.max_time,
+    'retry': lambda node: node.retry_cnt,
+    'ocr': lambda node: node.ocr_time,
+    'capture': lambda node: node.capture_time,
+}
+
+
+def list_telemetry_files(path_list: List[str]) -> List[str]:
+    """
+    找出所有耗时统计文件 传入文件夹时读取其中所有的文件
+    :param path_list: 文件或文件夹路径
+    :return: 文件路径
+    """
+    file_list: List[str] = []
+    for path in path_list:
+        if os.path.isdir(path):
+            for file_name in sorted(os.listdir(path)):
+                if file_name.endswith('.json'):
+                    file_list.append(os.path.join(path, file_name))
+        elif os.path.isfile(path):
+            file_list.append(path)
+    return file_list
+
+
+def merge_telemetry_files(file_list: List[str]) -> List[NodeTelemetry]:
+    """
+    读取多个耗时统计文件 合并相同节点的统计
+    :param file_list: 文件路径
+    :return: 各节点的统计
+    """
+    node_map: dict[Tuple[str, str, str], NodeTelemetry] = {}
+    for file_path in file_list:
+        for node in operation_telemetry.load_telemetry_file(file_path):
+            existed = node_map.get(node.key)
+            if existed is None:
+                node_map[node.key] = node
+            else:
+                existed.merge(node)
+    return list(node_map.values())
+
+
+def format_report(node_list: List[NodeTelemetry], sort_by: str = 'self', top: int = 30) -> str:
+    """
+    按耗时排序 输出最慢的节点
+    :param node_list: 各节点的统计
+    :param sort_by: 排序字段
+    :param top: 输出的节点数量
+    :return: 报告文本
+    """
+    all_self_time = sum(node.self_time for node in node_list)  # 占比按全部节点计算
+    node_list = sorted(node_list, key=_SORT_KEY_MAP[sort_by], reverse=True)[:top]
+
+    header = ('排名', '应用', '指令', '节点', '轮次', '重试', '失败',
+              '自身耗时s', '占比', '总耗时s', '平均ms', 'P50ms', 'P95ms', '最大ms',
+              '截图s', 'OCR s', '模板s', '等待s')
+    row_list: List[Tuple] = [header]
+    for idx, node in enumerate(node_list):
+        row_list.append((
+            idx + 1, node.app_id, node.op_name, node.node_name,
+            node.round_cnt, node.retry_cnt, node.fail_cnt,
+            '%.1f' % node.self_time,
+            '%.1f%%' % (node.self_time * 100.0 / all_self_time if all_self_time > 0 else 0),
+            '%.1f' % node.total_time,
+            '%.0f' % (node.avg_time * 1000),
+            '%.0f' % node.get_percentile_ms(0.5),
+            '%.0f' % node.get_percentile_ms(0.95),
+            '%.0f' % (node.max_time * 1000),
+            '%.1f' % node.capture_time,
+            '%.1f' % node.ocr_time,
+            '%.1f' % node.template_time,
+            '%.1f' % node.sleep_time,
+        ))
+
+    col_width = [max(_display_width(str(row[i])) for row in row_list) for i in range(len(header))]
+    line_list: List[str] = []
+    for row in row_list:
+        line_list.append('  '.join(
+            str(value) + ' ' * (col_width[i] - _display_width(str(value)))
+            for i, value in enumerate(row)
+        ))
+    return '\n'.join(line_list)
+
+
+def _display_width(s: str) -> int:
+    """
+    终端中的显示宽度 中文字符占两格
+    """
+    return sum(2 if ord(c) > 0x2E80 else 1 for c in s)
+
+
+def main(args_list: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description='节点耗时统计报告 合并多次运行的统计 按耗时排序')
+    parser.add_argument('path', nargs='*', help='统计文件或文件夹 默认为 .log/telemetry')
+    parser.add_argument('--sort', default='self', choices=list(_SORT_KEY_MAP.keys()),
+                        help='排序字段 默认为不包含子指令的自身耗时')
+    parser.add_argument('--top', type=int, default=30, help='输出的节点数量')
+    parser.add_argument('--app', default=None, help='只统计这个应用')
+    args = parser.parse_args(args_list)
+
+    path_list = args.path if len(args.path) > 0 else [operation_telemetry.get_telemetry_dir()]
+    file_list = list_telemetry_files(path_list)
+    if len(file_list) == 0:
+        print('没有找到耗时统计文件')
+        return
+
+    node_list = merge_telemetry_files(file_list)
+    if args.app is not None:
+        node_list = [node for node in node_list if node.app_id == args.app]
+    print('统计文件 %d 个 节点 %d 个' % (len(file_list), len(node_list)))
+    print(format_report(node_list, sort_by=args.sort, top=args.top))
+
+
+if __name__ == '__main__':
+    main()
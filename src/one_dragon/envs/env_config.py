@@ -382,6 +382,22 @@ class EnvConfig(YamlConfig):
         """
         self.update('is_debug', new_value)
 
+    @property
+    def enable_telemetry(self) -> bool:
+        """
+        是否记录各节点的耗时统计 运行结束后保存在 .log/telemetry
+        :return:
+        """
+        return self.get('enable_telemetry', False)
+
+    @enable_telemetry.setter
+    def enable_telemetry(self, new_value: bool) -> None:
+        """
+        更新是否记录各节点的耗时统计
+        :return:
+        """
+        self.update('enable_telemetry', new_value)
+
     @property
     def copy_screenshot(self) -> bool:
         """
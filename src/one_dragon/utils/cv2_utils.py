@@ -117,7 +117,8 @@ def mark_area_as_color(image: MatLike, pos: List, color, new_image: bool = False
 
 def match_template(source: MatLike, template: MatLike, threshold,
                    mask: np.ndarray = None, only_best: bool = True,
-                   ignore_inf: bool = False) -> MatchResultList:
+                   ignore_inf: bool = False,
+                   merge_distance: float = 10) -> MatchResultList:
     """
     在原图中匹配模板 注意无法从负偏移量开始匹配 即需要保证目标模板不会在原图边缘位置导致匹配不到
     :param source: 原图
@@ -126,6 +127,7 @@ def match_template(source: MatLike, template: MatLike, threshold,
     :param mask: 掩码
     :param only_best: 只返回最好的结果
     :param ignore_inf: 是否忽略无限大的结果
+    :param merge_distance: 返回多个结果时 多少距离内的结果只保留置信度最高的一个
     :return: 所有匹配结果
     """
     tx, ty = template.shape[1], template.shape[0]
@@ -136,19 +138,49 @@ def match_template(source: MatLike, template: MatLike, threshold,
     result = cv2.matchTemplate(source, template, cv2.TM_CCOEFF_NORMED, mask=mask)
 
     match_result_list = MatchResultList(only_best=only_best)
-    filtered_locations = np.where(np.logical_and(
-        result >= threshold,
-        np.isfinite(result) if ignore_inf else np.ones_like(result))
-    )  # 过滤低置信度的匹配结果
 
-    # 遍历所有匹配结果，并输出位置和置信度
-    for pt in zip(*filtered_locations[::-1]):
-        confidence = result[pt[1], pt[0]]  # 获取置信度
-        match_result_list.append(MatchResult(confidence, pt[0], pt[1], tx, ty))
+    # 使用掩码时可能出现 nan 和 inf 统一改成 -inf 使其不会通过阈值
+    invalid = ~np.isfinite(result) if ignore_inf else np.isnan(result)
+    if invalid.any():
+        result[invalid] = -np.inf
+
+    if only_best:
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val >= threshold:
+            match_result_list.append(MatchResult(max_val, max_loc[0], max_loc[1], tx, ty))
+        return match_result_list
+
+    xs, ys, confidences = find_local_peaks(result, threshold, merge_distance)
+    # 按置信度从高到低加入 合并时保留的就是置信度最高的结果
+    order = np.argsort(-confidences, kind='stable')
+    match_result_list.append_arrays(xs[order], ys[order], tx, ty, confidences[order],
+                                    merge_distance=merge_distance)
 
     return match_result_list
 
 
+def find_local_peaks(response: np.ndarray, threshold: float,
+                     merge_distance: float = 10) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    在匹配结果的响应图中 找出高于阈值的局部最大值 即非极大值抑制
+    使用膨胀后与原图比较 相等的位置就是 merge_distance 范围内的最大值
+    :param response: 响应图 如 cv2.matchTemplate 的结果
+    :param threshold: 阈值
+    :param merge_distance: 抑制半径
+    :return: 峰值的 x坐标、y坐标、置信度
+    """
+    radius = max(int(merge_distance), 0)
+    if radius > 0:
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * radius + 1, 2 * radius + 1))
+        dilated = cv2.dilate(response, kernel)
+        peak = np.logical_and(response >= threshold, response >= dilated)
+    else:
+        peak = response >= threshold
+
+    ys, xs = np.nonzero(peak)
+    return xs, ys, response[ys, xs]
+
+
 def concat_vertically(img: MatLike, next_img: MatLike, decision_height: int = 150):
     """
     垂直拼接图片。
@@ -2,6 +2,8 @@ import difflib
 import re
 from typing import Optional, List, Tuple
 
+from one_dragon.base.matcher import fuzzy_match_index
+
 
 _WITH_CHINESE_PATTERN = re.compile(r'[\u4e00-\u9fff]+')
 
@@ -45,26 +47,12 @@ def find_by_lcs(source: str, target: str, percent: float = 0.3,
 
 def longest_common_subsequence_length(str1: str, str2: str) -> int:
     """
-    找两个字符串的最长公共子序列长度
+    找两个字符串的最长公共子序列长度 使用位并行计算
     :param str1:
     :param str2:
     :return: 长度
     """
-    m = len(str1)
-    n = len(str2)
-
-    # 创建一个二维数组用于存储中间结果
-    dp = [[0] * (n + 1) for _ in range(m + 1)]
-
-    # 动态规划求解
-    for i in range(1, m + 1):
-        for j in range(1, n + 1):
-            if str1[i - 1] == str2[j - 1]:
-                dp[i][j] = dp[i - 1][j - 1] + 1
-            else:
-                dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
-
-    return dp[m][n]
+    return fuzzy_match_index.lcs_length_by_masks(fuzzy_match_index.build_char_masks(str1), len(str1), str2)
 
 
 def get_positive_digits(v: str, err: Optional[int] = None) -> Optional[int]:
@@ -107,40 +95,25 @@ def find_best_match_by_lcs(word: str, target_word_list: List[str],
                            lcs_percent_threshold: Optional[float] = None) -> Optional[int]:
     """
     在目标词中，找出LCS比例最大的
+    同一组目标词会复用索引 不需要逐个计算
     :param word: 候选词
     :param target_word_list: 目标词列表
     :param lcs_percent_threshold: 要求的LCS阈值
     :return: 最符合的目标词的下标
     """
-    target_idx: Optional[int] = None
-    target_lcs_percent: Optional[float] = None
-
-    for idx, target_word in enumerate(target_word_list):
-        lcs = longest_common_subsequence_length(word, target_word)
-        if lcs == 0:  # 至少要有一个匹配
-            continue
-        lcs_percent = lcs * 1.0 / len(target_word)
-        if lcs_percent_threshold is not None and lcs_percent < lcs_percent_threshold:
-            continue
-        if target_idx is None or lcs_percent > target_lcs_percent:
-            target_idx = idx
-            target_lcs_percent = lcs_percent
-
-    return target_idx
+    return fuzzy_match_index.get_fuzzy_match_index(target_word_list).find_best_match_by_lcs(
+        word, lcs_percent_threshold=lcs_percent_threshold)
 
 
 def find_best_match_by_difflib(word: str, target_word_list: List[str], cutoff=0.6) -> Optional[int]:
     """
     在目标列表中，找出最相近的一个词语对应的下标
+    同一组目标词会复用索引 不需要逐个计算
     :param word:
     :param target_word_list:
     :return:
     """
-    results = difflib.get_close_matches(word, target_word_list, n=1, cutoff=cutoff)
-    if results is not None and len(results) > 0:
-        return target_word_list.index(results[0])
-    else:
-        return None
+    return fuzzy_match_index.get_fuzzy_match_index(target_word_list).find_best_match_by_difflib(word, cutoff=cutoff)
 
 
 def find_most_similar(str_list1: List[str], str_list2: List[str]) -> Tuple[Optional[int], Optional[int]]:
@@ -122,6 +122,134 @@ class DetectFrameResult:
         """识别的结果"""
 
 
+class DetectResultHistory:
+
+    def __init__(self, keep_seconds: float = 2, max_frame_cnt: int = 64, keep_image: bool = False):
+        """
+        固定容量的历史识别结果 按识别时间顺序保存在环形缓冲区中
+        追加和过期都是 O(1) 的
+        :param keep_seconds: 保留多长时间的识别结果
+        :param max_frame_cnt: 最多保留多少帧 超过时丢弃最旧的
+        :param keep_image: 是否在历史中保留原始图片 不保留时只有最新一帧带有图片
+        """
+        self.keep_seconds: float = keep_seconds
+        self.max_frame_cnt: int = max(1, max_frame_cnt)
+        self.keep_image: bool = keep_image
+
+        self._frames: List[Optional[DetectFrameResult]] = [None] * self.max_frame_cnt
+        self._head: int = 0  # 最旧一帧的下标
+        self._size: int = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        """
+        从旧到新遍历
+        """
+        for i in range(self._size):
+            yield self._frames[(self._head + i) % self.max_frame_cnt]
+
+    def _get(self, i: int) -> DetectFrameResult:
+        """
+        :param i: 从旧到新的第几帧
+        """
+        return self._frames[(self._head + i) % self.max_frame_cnt]
+
+    def append(self, frame: DetectFrameResult) -> None:
+        """
+        追加一帧识别结果 并丢弃过期的结果
+        :param frame: 识别结果
+        :return:
+        """
+        if self._size > 0 and not self.keep_image:
+            # 新的一帧进来后 上一帧换成不带图片的副本 调用方持有的对象不受影响
+            last_idx = (self._head + self._size - 1) % self.max_frame_cnt
+            last = self._frames[last_idx]
+            if last.raw_image is not None:
+                self._frames[last_idx] = DetectFrameResult(raw_image=None, results=last.results, run_time=last.run_time)
+
+        if self._size == self.max_frame_cnt:
+            self._frames[self._head] = None
+            self._head = (self._head + 1) % self.max_frame_cnt
+            self._size -= 1
+
+        self._frames[(self._head + self._size) % self.max_frame_cnt] = frame
+        self._size += 1
+
+        self.expire(frame.run_time)
+
+    def expire(self, now: float) -> None:
+        """
+        丢弃过期的结果
+        :param now: 当前时间
+        :return:
+        """
+        while self._size > 0 and now - self._frames[self._head].run_time > self.keep_seconds:
+            self._frames[self._head] = None
+            self._head = (self._head + 1) % self.max_frame_cnt
+            self._size -= 1
+
+    def clear(self) -> None:
+        self._frames = [None] * self.max_frame_cnt
+        self._head = 0
+        self._size = 0
+
+    @property
+    def last(self) -> Optional[DetectFrameResult]:
+        """
+        最新一帧
+        """
+        if self._size == 0:
+            return None
+        return self._get(self._size - 1)
+
+    def get_frames(self, seconds: Optional[float] = None, now: Optional[float] = None) -> List[DetectFrameResult]:
+        """
+        获取一段时间内的识别结果 从旧到新
+        :param seconds: 最近多少秒 不传入时返回全部
+        :param now: 当前时间 不传入时使用最新一帧的时间
+        :return:
+        """
+        if self._size == 0:
+            return []
+        if seconds is None:
+            return list(self)
+        if now is None:
+            now = self.last.run_time
+
+        # 时间是递增的 二分找到第一帧在范围内的
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if now - self._get(mid).run_time <= seconds:
+                hi = mid
+            else:
+                lo = mid + 1
+        return [self._get(i) for i in range(lo, self._size)]
+
+    def get_results(self, seconds: Optional[float] = None, now: Optional[float] = None,
+                    class_name_list: Optional[List[str]] = None,
+                    category_list: Optional[List[str]] = None) -> List[DetectObjectResult]:
+        """
+        获取一段时间内 特定类别的识别结果 从旧到新
+        :param seconds: 最近多少秒 不传入时返回全部
+        :param now: 当前时间 不传入时使用最新一帧的时间
+        :param class_name_list: 只返回这些标签 不传入时不过滤
+        :param category_list: 只返回这些分类 不传入时不过滤
+        :return:
+        """
+        result_list: List[DetectObjectResult] = []
+        for frame in self.get_frames(seconds, now):
+            for result in frame.results:
+                if class_name_list is not None and result.detect_class.class_name not in class_name_list:
+                    continue
+                if category_list is not None and result.detect_class.class_category not in category_list:
+                    continue
+                result_list.append(result)
+        return result_list
+
+
 def nms(boxes, scores, iou_threshold):
     # Sort by score
     sorted_indices = np.argsort(scores)[::-1]
@@ -1,11 +1,14 @@
+import threading
 import time
 
+import numpy as np
 import onnxruntime as ort
 import os
 import urllib.request
 import zipfile
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
+from one_dragon.yolo import onnx_session_factory, onnx_utils
 from one_dragon.yolo.log_utils import log
 
 _GH_PROXY_URL = 'https://ghfast.top'
@@ -40,6 +43,10 @@ class OnnxModelLoader:
         self.onnx_input_height: int = 0
         self.output_names: List[str] = []
 
+        # 每个线程复用自己的预处理缓冲区和 IO Binding
+        self._thread_local = threading.local()
+        self.use_io_binding: bool = True  # 不支持时会自动关闭
+
         if not self.check_and_download_model():  # 新模型不ok
             log.error(f'模型 {self.model_name} 未下载成功 请尝试更换代理下载')
             log.info(f'尝试使用备用模型 {self.backup_model_name}')
@@ -134,10 +141,7 @@ class OnnxModelLoader:
 
         onnx_path = os.path.join(self.model_dir_path, 'model.onnx')
         log.info('加载模型 %s', onnx_path)
-        self.session = ort.InferenceSession(
-            onnx_path,
-            providers=providers
-        )
+        self.session = onnx_session_factory.create_session(onnx_path, providers)
         self.get_input_details()
         self.get_output_details()
 
@@ -152,3 +156,42 @@ class OnnxModelLoader:
     def get_output_details(self):
         model_outputs = self.session.get_outputs()
         self.output_names = [model_outputs[i].name for i in range(len(model_outputs))]
+
+    def prepare_input_tensor(self, image: np.ndarray) -> Tuple[np.ndarray, int, int]:
+        """
+        将图片缩放到模型需要的大小 写入当前线程复用的缓冲区
+        返回的张量在当前线程下一次调用时会被覆盖
+        :param image: 输入的图片 RGB通道
+        :return: 输入张量, 缩放后的高度, 缩放后的宽度
+        """
+        buffer: Optional[onnx_utils.ScaleInputBuffer] = getattr(self._thread_local, 'input_buffer', None)
+        if (buffer is None
+                or buffer.onnx_input_width != self.onnx_input_width
+                or buffer.onnx_input_height != self.onnx_input_height):
+            buffer = onnx_utils.ScaleInputBuffer(self.onnx_input_width, self.onnx_input_height)
+            self._thread_local.input_buffer = buffer
+        return onnx_utils.scale_input_image_into(image, buffer)
+
+    def run_session(self, input_tensor: np.ndarray) -> List[np.ndarray]:
+        """
+        进行推理 支持时使用 IO Binding 直接绑定输入缓冲区 避免 run 时对输入的检查和复制
+        :param input_tensor: 输入张量
+        :return: 各个输出
+        """
+        if self.use_io_binding:
+            try:
+                binding = getattr(self._thread_local, 'io_binding', None)
+                if binding is None or getattr(self._thread_local, 'io_binding_session', None) is not self.session:
+                    binding = self.session.io_binding()
+                    for name in self.output_names:
+                        binding.bind_output(name)
+                    self._thread_local.io_binding = binding
+                    self._thread_local.io_binding_session = self.session
+                binding.bind_cpu_input(self.input_names[0], input_tensor)
+                self.session.run_with_iobinding(binding)
+                return binding.copy_outputs_to_cpu()
+            except Exception:
+                log.error('IO Binding 推理失败 后续使用普通方式推理', exc_info=True)
+                self.use_io_binding = False
+
+        return self.session.run(self.output_names, {self.input_names[0]: input_tensor})
@@ -0,0 +1,207 @@
+import os
+import threading
+from typing import Optional, List, Tuple, Any
+
+import onnxruntime as ort
+
+from one_dragon.yolo.log_utils import log
+
+_GRAPH_OPTIMIZATION_LEVEL_MAP = {
+    'disable': ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+_EXECUTION_MODE_MAP = {
+    'sequential': ort.ExecutionMode.ORT_SEQUENTIAL,
+    'parallel': ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+class OnnxSessionConfig:
+
+    def __init__(self,
+                 intra_op_num_threads: int = 0,
+                 inter_op_num_threads: int = 0,
+                 graph_optimization_level: str = 'all',
+                 execution_mode: str = 'sequential',
+                 enable_cpu_mem_arena: bool = True,
+                 use_global_thread_pool: bool = False,
+                 cache_optimized_model: bool = False,
+                 ):
+        """
+        创建 onnxruntime 会话时使用的配置 默认值与 onnxruntime 的默认值一致
+        :param intra_op_num_threads: 单个算子内并行的线程数 0为由onnxruntime决定(物理核数)
+        :param inter_op_num_threads: 算子间并行的线程数 只在 parallel 模式下生效 0为由onnxruntime决定
+        :param graph_optimization_level: 图优化等级 disable / basic / extended / all
+        :param execution_mode: 执行模式 sequential / parallel
+        :param enable_cpu_mem_arena: 是否启用CPU内存池
+        :param use_global_thread_pool: 是否所有会话共用一个进程级的线程池 避免每个模型各自开一个线程池抢占CPU
+        :param cache_optimized_model: 是否将优化后的模型保存在模型旁边 下次加载时跳过图优化 只对CPU生效
+        """
+        self.intra_op_num_threads: int = intra_op_num_threads
+        self.inter_op_num_threads: int = inter_op_num_threads
+        self.graph_optimization_level: str = graph_optimization_level
+        self.execution_mode: str = execution_mode
+        self.enable_cpu_mem_arena: bool = enable_cpu_mem_arena
+        self.use_global_thread_pool: bool = use_global_thread_pool
+        self.cache_optimized_model: bool = cache_optimized_model
+
+    @property
+    def key(self) -> Tuple:
+        """
+        配置的唯一键 用于共享会话
+        """
+        return (self.intra_op_num_threads, self.inter_op_num_threads,
+                self.graph_optimization_level, self.execution_mode,
+                self.enable_cpu_mem_arena, self.use_global_thread_pool,
+                self.cache_optimized_model)
+
+
+_session_config: OnnxSessionConfig = OnnxSessionConfig()
+_session_map: dict[Tuple, ort.InferenceSession] = {}
+_session_lock = threading.Lock()
+_global_thread_pool_key: Optional[Tuple[int, int]] = None  # 已创建的进程级线程池大小 只能创建一次
+
+
+def get_session_config() -> OnnxSessionConfig:
+    return _session_config
+
+
+def set_session_config(config: OnnxSessionConfig) -> None:
+    """
+    更新之后创建的会话所使用的配置 已经创建的会话不受影响
+    :param config: 配置
+    :return:
+    """
+    global _session_config
+    _session_config = config
+
+
+def get_optimized_model_path(model_path: str, config: OnnxSessionConfig, provider: str) -> str:
+    """
+    优化后模型的保存路径 与原模型放在同一个目录下
+    图优化的结果与执行器相关 因此路径中包含执行器和优化等级
+    :param model_path: 原模型路径
+    :param config: 配置
+    :param provider: 执行器
+    :return:
+    """
+    base, ext = os.path.splitext(model_path)
+    provider_name = provider.replace('ExecutionProvider', '').lower()
+    return f'{base}.opt_{provider_name}_{config.graph_optimization_level}{ext}'
+
+
+def _init_global_thread_pool(config: OnnxSessionConfig) -> bool:
+    """
+    创建进程级的线程池 onnxruntime 只允许在创建第一个会话前设置一次
+    :param config: 配置
+    :return: 是否可以使用进程级线程池
+    """
+    global _global_thread_pool_key
+    pool_key = (config.intra_op_num_threads, config.inter_op_num_threads)
+    if _global_thread_pool_key is not None:
+        if _global_thread_pool_key != pool_key:
+            log.warning('进程级线程池已创建 线程数 %s 无法修改为 %s', _global_thread_pool_key, pool_key)
+        return True
+
+    set_sizes = getattr(ort.capi._pybind_state, 'set_global_thread_pool_sizes', None)
+    if set_sizes is None or not hasattr(ort.SessionOptions, 'use_per_session_threads'):
+        log.warning('当前onnxruntime不支持进程级线程池 使用会话独立的线程池')
+        return False
+
+    if len(_session_map) > 0:
+        log.warning('已有会话创建 进程级线程池可能不生效')
+
+    try:
+        set_sizes(config.intra_op_num_threads, config.inter_op_num_threads)
+    except Exception:
+        log.error('创建进程级线程池失败 使用会话独立的线程池', exc_info=True)
+        return False
+    _global_thread_pool_key = pool_key
+    return True
+
+
+def create_session_options(config: OnnxSessionConfig) -> ort.SessionOptions:
+    """
+    根据配置创建会话选项
+    :param config: 配置
+    :return:
+    """
+    options = ort.SessionOptions()
+    options.graph_optimization_level = _GRAPH_OPTIMIZATION_LEVEL_MAP.get(
+        config.graph_optimization_level, ort.GraphOptimizationLevel.ORT_ENABLE_ALL)
+    options.execution_mode = _EXECUTION_MODE_MAP.get(
+        config.execution_mode, ort.ExecutionMode.ORT_SEQUENTIAL)
+    options.enable_cpu_mem_arena = config.enable_cpu_mem_arena
+
+    if config.use_global_thread_pool and _init_global_thread_pool(config):
+        options.use_per_session_threads = False
+    else:
+        if config.intra_op_num_threads > 0:
+            options.intra_op_num_threads = config.intra_op_num_threads
+        if config.inter_op_num_threads > 0:
+            options.inter_op_num_threads = config.inter_op_num_threads
+
+    return options
+
+
+def create_session(model_path: str, providers: List[Any],
+                   config: Optional[OnnxSessionConfig] = None,
+                   shared: bool = True) -> ort.InferenceSession:
+    """
+    创建 onnxruntime 会话
+    :param model_path: 模型路径
+    :param providers: 执行器列表 与 InferenceSession 的 providers 参数一致
+    :param config: 配置 不传入时使用全局配置
+    :param shared: 是否共享会话 同一模型、执行器、配置只创建一个会话 InferenceSession.run 是线程安全的
+    :return:
+    """
+    if config is None:
+        config = _session_config
+
+    provider_key = tuple(p if isinstance(p, str) else (p[0], tuple(sorted(p[1].items()))) for p in providers)
+    session_key = (os.path.abspath(model_path), provider_key, config.key)
+
+    with _session_lock:
+        if shared:
+            session = _session_map.get(session_key)
+            if session is not None:
+                return session
+
+        options = create_session_options(config)
+        load_path = model_path
+
+        first_provider = providers[0] if isinstance(providers[0], str) else providers[0][0]
+        if config.cache_optimized_model and first_provider == 'CPUExecutionProvider':
+            opt_path = get_optimized_model_path(model_path, config, first_provider)
+            if os.path.exists(opt_path) and os.path.getmtime(opt_path) >= os.path.getmtime(model_path):
+                load_path = opt_path
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            else:
+                options.optimized_model_filepath = opt_path
+
+        try:
+            session = ort.InferenceSession(load_path, options, providers=providers)
+        except Exception:
+            if load_path == model_path:
+                raise
+            # 缓存的优化模型损坏或不兼容时 重新从原模型创建
+            log.error('加载优化后的模型失败 使用原模型 %s', load_path, exc_info=True)
+            options = create_session_options(config)
+            options.optimized_model_filepath = load_path
+            session = ort.InferenceSession(model_path, options, providers=providers)
+
+        if shared:
+            _session_map[session_key] = session
+        return session
+
+
+def clear_shared_sessions() -> None:
+    """
+    清空共享的会话 已经持有会话的对象不受影响
+    :return:
+    """
+    with _session_lock:
+        _session_map.clear()
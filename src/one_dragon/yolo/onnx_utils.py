@@ -38,3 +38,70 @@ def scale_input_image_u(image: MatLike, onnx_input_width: int, onnx_input_height
     input_tensor = input_img[np.newaxis, :, :, :].astype(np.float32)
 
     return input_tensor, scale_height, scale_width
+
+
+# 与 uint8 / 255.0 后再转换为 float32 的结果完全一致
+_NORM_LUT: np.ndarray = (np.arange(256, dtype=np.float64) / 255.0).astype(np.float32)
+
+
+class ScaleInputBuffer:
+
+    def __init__(self, onnx_input_width: int, onnx_input_height: int):
+        """
+        预处理时复用的缓冲区 避免每一帧都重新申请内存
+        同一个缓冲区不能在多个线程中同时使用
+        :param onnx_input_width: 模型需要的图片宽度
+        :param onnx_input_height: 模型需要的图片高度
+        """
+        self.onnx_input_width: int = onnx_input_width
+        self.onnx_input_height: int = onnx_input_height
+
+        self.pad_img: np.ndarray = np.full(shape=(onnx_input_height, onnx_input_width, 3),
+                                           fill_value=114, dtype=np.uint8)
+        """缩放并填充后的图片"""
+
+        self.input_tensor: np.ndarray = np.empty(shape=(1, 3, onnx_input_height, onnx_input_width),
+                                                 dtype=np.float32)
+        """输入模型的张量"""
+
+        self.scale_height: int = onnx_input_height
+        """上一次缩放后的高度 尺寸不变时填充区域无需重置"""
+
+        self.scale_width: int = onnx_input_width
+        """上一次缩放后的宽度"""
+
+
+def scale_input_image_into(image: MatLike, buffer: ScaleInputBuffer) -> Tuple[np.ndarray, int, int]:
+    """
+    与 scale_input_image_u 的结果一致 但写入到复用的缓冲区中
+    返回的张量在下一次使用同一个缓冲区时会被覆盖
+    :param image: 输入的图片 RBG通道
+    :param buffer: 缓冲区
+    :return: 缩放后的图片 RGB通道
+    """
+    if image.dtype != np.uint8:
+        return scale_input_image_u(image, buffer.onnx_input_width, buffer.onnx_input_height)
+
+    img_height, img_width = image.shape[:2]
+    onnx_input_width = buffer.onnx_input_width
+    onnx_input_height = buffer.onnx_input_height
+
+    min_scale = min(onnx_input_height / img_height, onnx_input_width / img_width)
+    scale_height = int(round(img_height * min_scale))
+    scale_width = int(round(img_width * min_scale))
+
+    if onnx_input_height != img_height or onnx_input_width != img_width:  # 需要缩放
+        if scale_height != buffer.scale_height or scale_width != buffer.scale_width:
+            buffer.pad_img.fill(114)
+            buffer.scale_height = scale_height
+            buffer.scale_width = scale_width
+        buffer.pad_img[0:scale_height, 0:scale_width, :] = cv2.resize(
+            image, (scale_width, scale_height), interpolation=cv2.INTER_LINEAR)
+        input_img = buffer.pad_img
+    else:
+        input_img = image
+
+    # 归一化和 HWC -> CHW 一次完成
+    np.take(_NORM_LUT, input_img.transpose(2, 0, 1), out=buffer.input_tensor[0], mode='clip')
+
+    return buffer.input_tensor, scale_height, scale_width
@@ -6,9 +6,8 @@ import os
 from cv2.typing import MatLike
 from typing import Optional, List
 
-from one_dragon.yolo import onnx_utils
 from one_dragon.yolo.detect_utils import DetectFrameResult, DetectClass, DetectContext, DetectObjectResult, xywh2xyxy, \
-    multiclass_nms
+    multiclass_nms, DetectResultHistory
 from one_dragon.yolo.onnx_model_loader import OnnxModelLoader
 
 
@@ -23,7 +22,9 @@ class Yolov8Detector(OnnxModelLoader):
                  personal_proxy: Optional[str] = None,
                  gpu: bool = False,
                  backup_model_name: Optional[str] = None,
-                 keep_result_seconds: float = 2
+                 keep_result_seconds: float = 2,
+                 keep_result_max_frame_cnt: int = 64,
+                 keep_result_image: bool = False,
                  ):
         """
         yolov8 detect 导出 onnx 后使用
@@ -33,6 +34,8 @@ class Yolov8Detector(OnnxModelLoader):
         :param model_parent_dir_path: 放置所有模型的根目录
         :param gpu: 是否启用GPU运算
         :param keep_result_seconds: 保留多长时间的识别结果
+        :param keep_result_max_frame_cnt: 最多保留多少帧识别结果
+        :param keep_result_image: 历史结果中是否保留原始图片 不保留时只有最新一帧带有图片
         """
         OnnxModelLoader.__init__(
             self,
@@ -47,11 +50,16 @@ class Yolov8Detector(OnnxModelLoader):
         )
 
         self.keep_result_seconds: float = keep_result_seconds  # 保留识别结果的秒数
-        self.run_result_history: List[DetectFrameResult] = []  # 历史识别结果
+        self.result_history: DetectResultHistory = DetectResultHistory(
+            keep_seconds=keep_result_seconds,
+            max_frame_cnt=keep_result_max_frame_cnt,
+            keep_image=keep_result_image,
+        )  # 历史识别结果
 
         self.idx_2_class: dict[int, DetectClass] = {}  # 分类
         self.class_2_idx: dict[str, int] = {}
         self.category_2_idx: dict[str, List[int]] = {}
+        self._class_idx_arr_cache: dict[tuple, np.ndarray] = {}  # 标签、分类筛选 对应的类别下标
         self._load_detect_classes(self.model_dir_path)
 
     def run(self, image: MatLike, conf: float = 0.6, iou: float = 0.5, run_time: Optional[float] = None,
@@ -88,7 +96,7 @@ class Yolov8Detector(OnnxModelLoader):
         """
         推理前的预处理
         """
-        input_tensor, scale_height, scale_width = onnx_utils.scale_input_image_u(context.img, self.onnx_input_width, self.onnx_input_height)
+        input_tensor, scale_height, scale_width = self.prepare_input_tensor(context.img)
         context.scale_height = scale_height
         context.scale_width = scale_width
         return input_tensor
@@ -99,7 +107,7 @@ class Yolov8Detector(OnnxModelLoader):
         :param input_tensor: 输入模型的图片 RGB通道
         :return: onnx模型推理得到的结果
         """
-        outputs = self.session.run(self.output_names, {self.input_names[0]: input_tensor})
+        outputs = self.run_session(input_tensor)
         return outputs
 
     def process_output(self, output, context: DetectContext) -> List[DetectObjectResult]:
@@ -108,39 +116,32 @@ class Yolov8Detector(OnnxModelLoader):
         :param context: 上下文
         :return: 最终得到的识别结果
         """
-        predictions = np.squeeze(output[0]).T
+        output_0 = output[0][0]  # (4 + 类别数, 候选框数)
+        class_scores = output_0[4:, :]  # 只是视图 不复制
 
-        keep = np.ones(shape=(predictions.shape[1]), dtype=bool)
+        # 只检测部分类别时 只取这部分类别的行 下标保持升序 argmax 的结果与原来置零的方式一致
+        class_idx_arr = self.get_class_idx_arr(context.label_list, context.category_list)
+        if class_idx_arr is not None:
+            if len(class_idx_arr) == 0:
+                return []
+            class_scores = class_scores[class_idx_arr, :]
 
-        if context.label_list is not None or context.category_list is not None:
-            keep[4:] = False  # 前4位是坐标 先把所有标签都设置为False
-            if context.label_list is not None:
-                for label in context.label_list:
-                    idx = self.class_2_idx.get(label)
-                    if idx is not None:
-                        keep[idx + 4] = True
-
-            if context.category_list is not None:
-                for category in context.category_list:
-                    for idx in self.category_2_idx.get(category, []):
-                        keep[idx + 4] = True
-
-        predictions[:, keep == False] = 0
-
-        # 按置信度阈值进行基本的过滤
-        scores = np.max(predictions[:, 4:], axis=1)
-        predictions = predictions[scores > context.conf, :]
-        scores = scores[scores > context.conf]
+        # 先按置信度阈值进行基本的过滤 之后只处理剩下的少量候选框
+        scores = np.max(class_scores, axis=0)
+        conf_mask = scores > context.conf
+        scores = scores[conf_mask]
 
         results: List[DetectObjectResult] = []
         if len(scores) == 0:
             return results
 
         # 选择置信度最高的类别
-        class_ids = np.argmax(predictions[:, 4:], axis=1)
+        class_ids = np.argmax(class_scores[:, conf_mask], axis=0)
+        if class_idx_arr is not None:
+            class_ids = class_idx_arr[class_ids]
 
         # 提取Bounding box
-        boxes = predictions[:, :4]  # 原始推理结果 xywh
+        boxes = output_0[:4, conf_mask].T  # 原始推理结果 xywh
         scale_shape = np.array([context.scale_width, context.scale_height, context.scale_width, context.scale_height])  # 缩放后图片的大小
         boxes = np.divide(boxes, scale_shape, dtype=np.float32)  # 转化到 0~1
         boxes *= np.array([context.img_width, context.img_height, context.img_width, context.img_height])  # 恢复到原图的坐标
@@ -158,6 +159,39 @@ class Yolov8Detector(OnnxModelLoader):
 
         return results
 
+    def get_class_idx_arr(self, label_list: Optional[List[str]],
+                          category_list: Optional[List[str]]) -> Optional[np.ndarray]:
+        """
+        获取需要检测的类别下标
+        :param label_list: 只检测特定的标签
+        :param category_list: 只检测特定分类的标签
+        :return: 升序的类别下标 None 代表检测全部类别
+        """
+        if label_list is None and category_list is None:
+            return None
+
+        key = (None if label_list is None else tuple(label_list),
+               None if category_list is None else tuple(category_list))
+        class_idx_arr = self._class_idx_arr_cache.get(key)
+        if class_idx_arr is not None:
+            return class_idx_arr
+
+        idx_set = set()
+        if label_list is not None:
+            for label in label_list:
+                idx = self.class_2_idx.get(label)
+                if idx is not None:
+                    idx_set.add(idx)
+
+        if category_list is not None:
+            for category in category_list:
+                for idx in self.category_2_idx.get(category, []):
+                    idx_set.add(idx)
+
+        class_idx_arr = np.array(sorted(idx_set), dtype=np.int64)
+        self._class_idx_arr_cache[key] = class_idx_arr
+        return class_idx_arr
+
     def record_result(self, context: DetectContext, results: List[DetectObjectResult]) -> DetectFrameResult:
         """
         记录本帧识别结果
@@ -170,18 +204,20 @@ class Yolov8Detector(OnnxModelLoader):
             results=results,
             run_time=context.run_time
         )
-        self.run_result_history.append(new_frame)
-        self.run_result_history = [i for i in self.run_result_history
-                                   if context.run_time - i.run_time <= self.keep_result_seconds]
+        self.result_history.append(new_frame)
 
         return new_frame
 
+    @property
+    def run_result_history(self) -> List[DetectFrameResult]:
+        """
+        历史识别结果 从旧到新
+        """
+        return self.result_history.get_frames()
+
     @property
     def last_run_result(self) -> Optional[DetectFrameResult]:
-        if len(self.run_result_history) > 0:
-            return self.run_result_history[len(self.run_result_history) - 1]
-        else:
-            return None
+        return self.result_history.last
 
     def _load_detect_classes(self, model_dir_path: str):
         """
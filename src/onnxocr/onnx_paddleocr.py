@@ -25,7 +25,7 @@ class ONNXPaddleOcr(TextSystem):
         # 初始化模型
         super().__init__(params)
 
-    def ocr(self, img, det=True, rec=True, cls=True):
+    def ocr(self, img, det=True, rec=True, cls=True, single_line_bypass=False):
         if cls == True and self.use_angle_cls == False:
             print(
                 "Since the angle classifier is not initialized, the angle classifier will not be uesd during the forward process"
@@ -33,7 +33,7 @@ class ONNXPaddleOcr(TextSystem):
 
         if det and rec:
             ocr_res = []
-            dt_boxes, rec_res = self.__call__(img, cls)
+            dt_boxes, rec_res = self.__call__(img, cls, single_line_bypass)
             tmp_res = [[box.tolist(), res] for box, res in zip(dt_boxes, rec_res)]
             ocr_res.append(tmp_res)
             return ocr_res
@@ -61,6 +61,27 @@ class ONNXPaddleOcr(TextSystem):
             return ocr_res
 
 
+    def ocr_batch(self, img_list, det=True, cls=True, single_line_bypass=False):
+        """
+        对多张图片进行OCR 所有图片的文本识别合并成尽量少的推理
+        :param img_list: 图片列表
+        :param det: 是否使用检测模型 不使用时每张图片当作一行文本
+        :param cls: 是否进行方向分类
+        :param single_line_bypass: 是否允许足够扁平的小图跳过检测
+        :return: 每张图片的结果 格式与 ocr()[0] 一致
+        """
+        if det:
+            batch_res = self.batch_call(img_list, cls, single_line_bypass)
+            return [
+                [[box.tolist(), res] for box, res in zip(dt_boxes, rec_res)]
+                for dt_boxes, rec_res in batch_res
+            ]
+        else:
+            if self.use_angle_cls and cls:
+                img_list, _ = self.text_classifier(img_list)
+            return self.text_recognizer.batch_call([[img] for img in img_list])
+
+
 def sav2Img(org_img, result, name="draw_ocr.jpg"):
     # 显示结果
     from PIL import Image
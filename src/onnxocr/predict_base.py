@@ -4,14 +4,23 @@ class PredictBase(object):
     def __init__(self):
         pass
 
-    def get_onnx_session(self, model_dir, use_gpu):
+    def get_onnx_session(self, model_dir, use_gpu, session_factory=None):
+        """
+        :param model_dir: 模型路径
+        :param use_gpu: 是否使用gpu
+        :param session_factory: 创建会话的方法 factory(model_path, providers) 不传入时使用默认配置创建
+        :return:
+        """
         # 使用gpu
         if use_gpu:
             providers =[('CUDAExecutionProvider',{"cudnn_conv_algo_search": "DEFAULT"}),'CPUExecutionProvider']
         else:
             providers =['CPUExecutionProvider']
 
-        onnx_session = onnxruntime.InferenceSession(model_dir, None,providers=providers)
+        if session_factory is not None:
+            onnx_session = session_factory(model_dir, providers)
+        else:
+            onnx_session = onnxruntime.InferenceSession(model_dir, None,providers=providers)
 
         # print("providers:", onnxruntime.get_device())
         return onnx_session
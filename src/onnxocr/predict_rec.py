@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
 import math
+import threading
 from PIL import Image
 
 
@@ -17,8 +18,17 @@ class TextRecognizer(PredictBase):
             use_space_char=args.use_space_char,
         )
 
+        self.rec_width_bucket_step = getattr(args, "rec_width_bucket_step", 0)
+
+        # 归一化查表 (x / 255 - 0.5) / 0.5 与 resize_norm_img 的计算结果完全一致
+        self.norm_lut = np.arange(256, dtype=np.float32) / 255
+        self.norm_lut -= 0.5
+        self.norm_lut /= 0.5
+        # 每个线程、每种输入宽度 复用同一块输入内存
+        self._input_buffer = threading.local()
+
         # 初始化模型
-        self.rec_onnx_session = self.get_onnx_session(args.rec_model_dir, args.use_gpu)
+        self.rec_onnx_session = self.get_onnx_session(args.rec_model_dir, args.use_gpu, args.onnx_session_factory)
         self.rec_input_name = self.get_input_name(self.rec_onnx_session)
         self.rec_output_name = self.get_output_name(self.rec_onnx_session)
 
@@ -276,7 +286,126 @@ class TextRecognizer(PredictBase):
 
         return img
 
+    def can_use_fast_norm(self, img):
+        """
+        是否可以使用 resize_norm_img_into 进行预处理
+        """
+        return (
+            self.rec_algorithm not in ("NRTR", "ViTSTR", "RFL", "RARE")
+            and img.dtype == np.uint8
+            and img.ndim == 3
+            and img.shape[2] == self.rec_image_shape[0]
+        )
+
+    def resize_norm_img_into(self, img, out):
+        """
+        结果与 resize_norm_img 一致 但直接写入预分配的输入中
+        归一化通过查表一次完成 不产生中间的浮点数组
+        :param img: uint8 图片
+        :param out: 输入中这张图片的部分 (C, H, W) W为填充后的宽度
+        """
+        imgH = self.rec_image_shape[1]
+        padding_w = out.shape[2]
+        h, w = img.shape[:2]
+        ratio = w / float(h)
+        resized_w = min(padding_w, int(math.ceil(imgH * ratio)))
+        resized_image = cv2.resize(img, (resized_w, imgH))
+        np.take(self.norm_lut, resized_image.transpose((2, 0, 1)), out=out[:, :, 0:resized_w], mode="clip")
+        out[:, :, resized_w:] = 0
+
+    def get_input_buffer(self, batch_size, padding_w):
+        """
+        获取当前线程中 对应宽度的输入内存 容量不足时扩大
+        :param batch_size: 图片数量
+        :param padding_w: 填充后的宽度
+        :return: (batch_size, C, H, padding_w)
+        """
+        buffer_map = getattr(self._input_buffer, "buffer_map", None)
+        if buffer_map is None:
+            buffer_map = {}
+            self._input_buffer.buffer_map = buffer_map
+        buffer = buffer_map.get(padding_w)
+        if buffer is None or buffer.shape[0] < batch_size:
+            imgC, imgH = self.rec_image_shape[:2]
+            buffer = np.empty((batch_size, imgC, imgH, padding_w), dtype=np.float32)
+            buffer_map[padding_w] = buffer
+        return buffer[:batch_size]
+
+    def get_padding_w(self, max_wh_ratio):
+        """
+        按 resize_norm_img 的方式 计算填充后的宽度
+        """
+        imgH = self.rec_image_shape[1]
+        return int(imgH * max_wh_ratio)
+
+    def get_bucket_w(self, wh_ratio):
+        """
+        宽度分桶时 图片所在桶的宽度 不小于单独识别时的填充宽度
+        """
+        imgC, imgH, imgW = self.rec_image_shape[:3]
+        padding_w = self.get_padding_w(max(imgW / imgH, wh_ratio))
+        step = self.rec_width_bucket_step
+        return int(math.ceil(padding_w / step)) * step
+
+    def run_by_padding_w(self, job_list, result_list, max_batch_num=None):
+        """
+        将填充宽度相同的图片合并推理
+        :param job_list: [(结果列表下标, 结果下标, 图片, 填充宽度)]
+        :param result_list: 识别结果写入的位置
+        :param max_batch_num: 每次推理最多多少张图片 None为不限制
+        """
+        job_group = {}
+        for job in job_list:
+            padding_w = job[3]
+            if padding_w not in job_group:
+                job_group[padding_w] = []
+            job_group[padding_w].append(job)
+
+        for padding_w, group in job_group.items():
+            batch_num = len(group) if max_batch_num is None else max_batch_num
+            for beg in range(0, len(group), batch_num):
+                batch = group[beg: beg + batch_num]
+                if all(self.can_use_fast_norm(job[2]) for job in batch):
+                    norm_img_batch = self.get_input_buffer(len(batch), padding_w)
+                    for bno, job in enumerate(batch):
+                        self.resize_norm_img_into(job[2], norm_img_batch[bno])
+                else:
+                    # 加0.5 保证 resize_norm_img 中 int(imgH * max_wh_ratio) 得到的正好是 padding_w
+                    imgH = self.rec_image_shape[1]
+                    norm_img_batch = np.stack([
+                        self.resize_norm_img(job[2], (padding_w + 0.5) / imgH)
+                        for job in batch
+                    ])
+
+                input_feed = self.get_input_feed(self.rec_input_name, norm_img_batch)
+                outputs = self.rec_onnx_session.run(
+                    self.rec_output_name, input_feed=input_feed
+                )
+                rec_result = self.postprocess_op(outputs[0])
+                for rno in range(len(rec_result)):
+                    list_idx, img_idx = batch[rno][0], batch[rno][1]
+                    result_list[list_idx][img_idx] = rec_result[rno]
+
+    def call_by_width_bucket(self, img_list):
+        """
+        按宽度分桶识别
+        每张图片只填充到所在桶的宽度 避免一张很长的图片让整批都填充到很宽
+        :param img_list: 图片列表
+        :return: 识别结果
+        """
+        job_list = []
+        for ino, img in enumerate(img_list):
+            h, w = img.shape[0:2]
+            job_list.append((0, ino, img, self.get_bucket_w(w * 1.0 / h)))
+
+        rec_res = [["", 0.0]] * len(img_list)
+        self.run_by_padding_w(job_list, [rec_res], max_batch_num=self.rec_batch_num)
+        return rec_res
+
     def __call__(self, img_list):
+        if self.rec_width_bucket_step > 0:
+            return self.call_by_width_bucket(img_list)
+
         img_num = len(img_list)
         # Calculate the aspect ratio of all text bars
         width_list = []
@@ -323,3 +452,38 @@ class TextRecognizer(PredictBase):
                 rec_res[indices[beg_img_no + rno]] = rec_result[rno]
 
         return rec_res
+
+    def batch_call(self, img_list_list):
+        """
+        一次识别多组图片 例如多个区域的截图 或多张图片中检测出来的文本框
+        每组图片按 __call__ 的方式计算各自的填充宽度 所以每张图片的输入与单独调用 __call__ 时完全一致
+        之后把所有组中 输入大小相同的图片合并成一次推理
+        :param img_list_list: 多组图片
+        :return: 每组图片的识别结果
+        """
+        imgC, imgH, imgW = self.rec_image_shape[:3]
+        batch_num = self.rec_batch_num
+
+        # 按 __call__ 的分批方式 得到每张图片填充后的宽度
+        job_list = []
+        for list_idx, img_list in enumerate(img_list_list):
+            img_num = len(img_list)
+            width_list = [img.shape[1] / float(img.shape[0]) for img in img_list]
+            if self.rec_width_bucket_step > 0:
+                for ino in range(img_num):
+                    job_list.append((list_idx, ino, img_list[ino], self.get_bucket_w(width_list[ino])))
+                continue
+
+            indices = np.argsort(np.array(width_list))
+            for beg_img_no in range(0, img_num, batch_num):
+                end_img_no = min(img_num, beg_img_no + batch_num)
+                max_wh_ratio = imgW / imgH
+                for ino in range(beg_img_no, end_img_no):
+                    max_wh_ratio = max(max_wh_ratio, width_list[indices[ino]])
+                padding_w = self.get_padding_w(max_wh_ratio)
+                for ino in range(beg_img_no, end_img_no):
+                    job_list.append((list_idx, indices[ino], img_list[indices[ino]], padding_w))
+
+        rec_res_list = [[["", 0.0]] * len(img_list) for img_list in img_list_list]
+        self.run_by_padding_w(job_list, rec_res_list)
+        return rec_res_list
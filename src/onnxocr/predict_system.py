@@ -1,6 +1,7 @@
 import os
 import cv2
 import copy
+import numpy as np
 import onnxocr.predict_det as predict_det
 import onnxocr.predict_cls as predict_cls
 import onnxocr.predict_rec as predict_rec
@@ -19,6 +20,10 @@ class TextSystem(object):
         self.args = args
         self.crop_image_res_index = 0
 
+        self.roi_mode = getattr(args, "det_roi_mode", False)
+        self.single_line_max_height = getattr(args, "det_single_line_max_height", 0)
+        self.single_line_min_wh_ratio = getattr(args, "det_single_line_min_wh_ratio", 2.0)
+
     def draw_crop_rec_res(self, output_dir, img_crop_list, rec_res):
         os.makedirs(output_dir, exist_ok=True)
         bbox_num = len(img_crop_list)
@@ -32,26 +37,49 @@ class TextSystem(object):
 
         self.crop_image_res_index += bbox_num
 
-    def __call__(self, img, cls=True):
-        ori_im = img.copy()
+    def is_single_line(self, img, single_line_bypass=False):
+        """
+        区域模式下 调用方允许时 根据图片大小判断是否只有一行文本
+        """
+        if not single_line_bypass or not self.roi_mode or self.single_line_max_height <= 0:
+            return False
+        h, w = img.shape[0:2]
+        return 0 < h <= self.single_line_max_height and w >= h * self.single_line_min_wh_ratio
+
+    def rec_single_line(self, img, cls=True):
+        """
+        跳过检测 将整张图片当作一个文本框识别
+        :return: 与 __call__ 相同格式的 (文本框, 识别结果)
+        """
+        h, w = img.shape[0:2]
+        box = np.array([[0, 0], [w, 0], [w, h], [0, h]], dtype=np.float32)
+        img_crop_list = [img]
+        if self.use_angle_cls and cls:
+            img_crop_list, angle_list = self.text_classifier(img_crop_list)
+        rec_res = self.text_recognizer(img_crop_list)
+        if len(rec_res[0][0]) == 0:  # 与检测找不到文本框时一致
+            return [], []
+        return self.filter_by_score([box], rec_res)
+
+    def __call__(self, img, cls=True, single_line_bypass=False):
+        """
+        :param single_line_bypass: 是否允许足够扁平的小图跳过检测 整张图片当作一行文本 默认总是进行检测
+        """
+        if self.is_single_line(img, single_line_bypass):
+            return self.rec_single_line(img, cls)
+
+        # 区域模式下 裁剪不会修改原图 不需要复制
+        ori_im = img if self.roi_mode else img.copy()
         # 文字检测
         dt_boxes = self.text_detector(img)
 
         if dt_boxes is None:
             return None, None
 
-        img_crop_list = []
-
         dt_boxes = sorted_boxes(dt_boxes)
 
         # 图片裁剪
-        for bno in range(len(dt_boxes)):
-            tmp_box = copy.deepcopy(dt_boxes[bno])
-            if self.args.det_box_type == "quad":
-                img_crop = get_rotate_crop_image(ori_im, tmp_box)
-            else:
-                img_crop = get_minarea_rect_crop(ori_im, tmp_box)
-            img_crop_list.append(img_crop)
+        img_crop_list = self.crop_by_boxes(ori_im, dt_boxes)
 
         # 方向分类
         if self.use_angle_cls and cls:
@@ -62,6 +90,72 @@ class TextSystem(object):
 
         if self.args.save_crop_res:
             self.draw_crop_rec_res(self.args.crop_res_save_dir, img_crop_list, rec_res)
+
+        return self.filter_by_score(dt_boxes, rec_res)
+
+    def batch_call(self, img_list, cls=True, single_line_bypass=False):
+        """
+        对多张图片进行OCR 检测仍逐张进行 但所有图片的文本框合并在一起识别
+        每张图片的结果与单独调用 __call__ 一致
+        :param img_list: 图片列表
+        :param cls: 是否进行方向分类
+        :param single_line_bypass: 是否允许足够扁平的小图跳过检测
+        :return: 每张图片的 (文本框, 识别结果)
+        """
+        dt_boxes_list = []
+        img_crop_list_list = []
+        for img in img_list:
+            if self.is_single_line(img, single_line_bypass):
+                h, w = img.shape[0:2]
+                dt_boxes = [np.array([[0, 0], [w, 0], [w, h], [0, h]], dtype=np.float32)]
+                img_crop_list = [img]
+            else:
+                ori_im = img if self.roi_mode else img.copy()
+                dt_boxes = self.text_detector(img)
+                if dt_boxes is None:
+                    dt_boxes = []
+                dt_boxes = sorted_boxes(dt_boxes) if len(dt_boxes) > 0 else []
+                img_crop_list = self.crop_by_boxes(ori_im, dt_boxes)
+            if self.use_angle_cls and cls and len(img_crop_list) > 0:
+                img_crop_list, angle_list = self.text_classifier(img_crop_list)
+            dt_boxes_list.append(dt_boxes)
+            img_crop_list_list.append(img_crop_list)
+
+        rec_res_list = self.text_recognizer.batch_call(img_crop_list_list)
+
+        result_list = []
+        for img, dt_boxes, rec_res in zip(img_list, dt_boxes_list, rec_res_list):
+            if self.is_single_line(img, single_line_bypass) and len(rec_res[0][0]) == 0:
+                result_list.append(([], []))
+            else:
+                result_list.append(self.filter_by_score(dt_boxes, rec_res))
+        return result_list
+
+    def crop_by_boxes(self, ori_im, dt_boxes):
+        """
+        按文本框裁剪图片
+        :param ori_im: 原图
+        :param dt_boxes: 排序后的文本框
+        :return: 裁剪后的图片
+        """
+        img_crop_list = []
+        for bno in range(len(dt_boxes)):
+            # 裁剪不会修改文本框 区域模式下不需要复制
+            tmp_box = dt_boxes[bno] if self.roi_mode else copy.deepcopy(dt_boxes[bno])
+            if self.args.det_box_type == "quad":
+                img_crop = get_rotate_crop_image(ori_im, tmp_box)
+            else:
+                img_crop = get_minarea_rect_crop(ori_im, tmp_box)
+            img_crop_list.append(img_crop)
+        return img_crop_list
+
+    def filter_by_score(self, dt_boxes, rec_res):
+        """
+        过滤识别分数过低的结果
+        :param dt_boxes: 文本框
+        :param rec_res: 识别结果
+        :return: 过滤后的 (文本框, 识别结果)
+        """
         filter_boxes, filter_rec_res = [], []
         for box, rec_result in zip(dt_boxes, rec_res):
             text, score = rec_result
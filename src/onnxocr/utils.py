@@ -273,6 +273,11 @@ def infer_args():
     parser.add_argument("--det_limit_side_len", type=float, default=960)
     parser.add_argument("--det_limit_type", type=str, default="max")
     parser.add_argument("--det_box_type", type=str, default="quad")
+    # 区域模式 传入的通常是截取好的小图 不再复制原图和文本框
+    parser.add_argument("--det_roi_mode", type=str2bool, default=False)
+    # 区域模式下 调用时允许跳过检测的话 高度不超过这个值且宽高比足够大的图片 认为只有一行文本 直接识别 0为不跳过
+    parser.add_argument("--det_single_line_max_height", type=int, default=0)
+    parser.add_argument("--det_single_line_min_wh_ratio", type=float, default=2.0)
 
     # DB parmas
     parser.add_argument("--det_db_thresh", type=float, default=0.3)
@@ -313,6 +318,8 @@ def infer_args():
     parser.add_argument("--rec_image_inverse", type=str2bool, default=True)
     parser.add_argument("--rec_image_shape", type=str, default="3, 48, 320")
     parser.add_argument("--rec_batch_num", type=int, default=6)
+    # 大于0时 按宽度分桶识别 每批只填充到所在桶的宽度 而不是整批最宽的图片
+    parser.add_argument("--rec_width_bucket_step", type=int, default=0)
     parser.add_argument("--max_text_length", type=int, default=25)
     parser.add_argument(
         "--rec_char_dict_path",
@@ -384,4 +391,6 @@ def infer_args():
 
     parser.add_argument("--show_log", type=str2bool, default=True)
     parser.add_argument("--use_onnx", type=str2bool, default=False)
+    # 创建onnx会话的方法 factory(model_path, providers) 为None时使用默认配置
+    parser.add_argument("--onnx_session_factory", default=None)
     return parser
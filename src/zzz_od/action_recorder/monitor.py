@@ -11,7 +11,7 @@ from pynput import keyboard, mouse
 
 from one_dragon.base.screen.screen_area import ScreenArea
 from one_dragon.base.conditional_operation.state_recorder import StateRecord
-from one_dragon.utils import cv2_utils, thread_utils, cal_utils, os_utils, yolo_config_utils
+from one_dragon.utils import cv2_utils, thread_utils, os_utils, yolo_config_utils
 from one_dragon.utils.log_utils import log
 from zzz_od.context.zzz_context import ZContext
 from zzz_od.auto_battle.auto_battle_context import AutoBattleContext
@@ -48,9 +48,6 @@ class BattleAgentContext4Recording(AutoBattleAgentContext):
         # 识别间隔
         self._check_agent_interval = check_agent_interval
 
-        # 上一次识别的时间
-        self._last_check_agent_time: float = 0
-
         # 初始化需要检测的状态
         for agent_enum in AgentEnum:
             agent = agent_enum.value
@@ -74,63 +71,58 @@ class BattleAgentContext4Recording(AutoBattleAgentContext):
         判断角色相关内容 并发送事件
         :return:
         """
-        if not self._check_agent_lock.acquire(blocking=False):
-            return None, None
-
-        try:
-            if screenshot_time - self._last_check_agent_time < cal_utils.random_in_range(self._check_agent_interval):
-                # 还没有达到识别间隔
-                return None, None
-            self._last_check_agent_time = screenshot_time
+        result = AutoBattleAgentContext.check_agent_related(self, screen, screenshot_time)
+        return (None, None) if result is None else result
 
-            screen_agent_list = self._check_agent_in_parallel(screen)
-            all_agent_state_list = self._check_all_agent_state(screen, screenshot_time, screen_agent_list)
+    def _check_agent_related(self, screen: MatLike, screenshot_time: float) -> tuple[Any, Any]:
+        """
+        判断角色相关内容 并发送事件 不控制识别间隔
+        :return:
+        """
+        screen_agent_list = self._check_agent_avatar(screen)
+        all_agent_state_list = self._check_all_agent_state(screen, screenshot_time, screen_agent_list)
 
-            if screen_agent_list is None or len(screen_agent_list) == 0:
-                energy_state_list = []
-                other_state_list = []
-            else:
-                energy_state_list = all_agent_state_list[:len(screen_agent_list)]
-                other_state_list = all_agent_state_list[len(screen_agent_list):]
+        if screen_agent_list is None or len(screen_agent_list) == 0:
+            energy_state_list = []
+            other_state_list = []
+        else:
+            energy_state_list = all_agent_state_list[:len(screen_agent_list)]
+            other_state_list = all_agent_state_list[len(screen_agent_list):]
 
-            update_state_record_list = []
-            # 尝试更新代理人列表 成功的话 更新状态记录
-            if self.team_info.update_agent_list(
-                    screen_agent_list,
-                    [(i.value if i is not None else 0) for i in energy_state_list],
-                    screenshot_time):
+        update_state_record_list = []
+        # 尝试更新代理人列表 成功的话 更新状态记录
+        if self.team_info.update_agent_list(
+                screen_agent_list,
+                [(i.value if i is not None else 0) for i in energy_state_list],
+                screenshot_time):
 
-                for i in self._get_agent_state_records(screenshot_time):
-                    update_state_record_list.append(i)
+            for i in self._get_agent_state_records(screenshot_time):
+                update_state_record_list.append(i)
 
-                # 只有代理人列表更新成功 本次识别的状态才可用
-                for i in other_state_list:
-                    update_state_record_list.append(i)
+            # 只有代理人列表更新成功 本次识别的状态才可用
+            for i in other_state_list:
+                update_state_record_list.append(i)
 
-            self.auto_op.batch_update_states(update_state_record_list)
+        self.auto_op.batch_update_states(update_state_record_list)
 
-            # # # # 重写部分 # # # #
-            output_agent_names = []  # 导出用
-            output_agent_types = []
-            output_energy = []
-            output_other_state = []
-
-            for i in range(len(self.team_info.agent_list)):
-                prefix = '前台-' if i == 0 else ('后台-%d-' % i)
-                agent_info = self.team_info.agent_list[i]
-                if agent_info.agent is not None:
-                    # 除了display, 还要内部导出
-                    output_agent_names.append(prefix + agent_info.agent.agent_name)
-                    output_agent_types.append(prefix + agent_info.agent.agent_type.value)
-                    output_energy.append(agent_info.energy)
-                    output_other_state.append(agent_info.agent.state_list)
-
-            return output_agent_names, output_agent_types
-            # # # # 重写部分 # # # #
-        except Exception:
-            log.error('识别画面角色失败', exc_info=True)
-        finally:
-            self._check_agent_lock.release()
+        # # # # 重写部分 # # # #
+        output_agent_names = []  # 导出用
+        output_agent_types = []
+        output_energy = []
+        output_other_state = []
+
+        for i in range(len(self.team_info.agent_list)):
+            prefix = '前台-' if i == 0 else ('后台-%d-' % i)
+            agent_info = self.team_info.agent_list[i]
+            if agent_info.agent is not None:
+                # 除了display, 还要内部导出
+                output_agent_names.append(prefix + agent_info.agent.agent_name)
+                output_agent_types.append(prefix + agent_info.agent.agent_type.value)
+                output_energy.append(agent_info.energy)
+                output_other_state.append(agent_info.agent.state_list)
+
+        return output_agent_names, output_agent_types
+        # # # # 重写部分 # # # #
 
 
 class BattleDodgeContext4Recording(AutoBattleDodgeContext):
@@ -163,10 +155,6 @@ class BattleDodgeContext4Recording(AutoBattleDodgeContext):
         self._check_dodge_interval = check_dodge_interval
         self._check_audio_interval = check_audio_interval
 
-        # 上一次识别的时间
-        self._last_check_dodge_time = 0
-        self._last_check_audio_time = 0
-
         # # # # 重写部分 # # # #
         # 异步加载音频模板
         _record_executor.submit(self.init_audio_template)
@@ -181,38 +169,35 @@ class BattleDodgeContext4Recording(AutoBattleDodgeContext):
         :return: 是否应该闪避 （识别到闪光或者声音）
         """
         # # # # 重写部分 # # # #
-        state_name = '无闪避'
+        result = AutoBattleDodgeContext.check_dodge_flash(self, screen, screenshot_time, audio_future)
+        return (False, '无闪避') if result is None else result
 
-        if not self._check_dodge_flash_lock.acquire(blocking=False):
-            return False, state_name
+    def _check_dodge_flash(self, screen: MatLike, screenshot_time: float, audio_future: Optional[Future[bool]] = None) -> tuple[bool, str]:
+        """
+        识别画面是否有闪光 不控制识别间隔
+        :param screen: 屏幕截图
+        :param screenshot_time: 截图时间
+        :param audio_future: 音频识别结果的Future对象
+        :return: 是否应该闪避 （识别到闪光或者声音）
+        """
+        state_name = '无闪避'
 
-        try:
-            if screenshot_time - self._last_check_dodge_time < cal_utils.random_in_range(self._check_dodge_interval):
-                # 还没有达到识别间隔
-                return False, state_name
-
-            self._last_check_dodge_time = screenshot_time
-
-            result = self._flash_model.run(screen)
-            if result.class_idx == 1:
-                state_name = YoloStateEventEnum.DODGE_RED.value
-            elif result.class_idx == 2:
-                state_name = YoloStateEventEnum.DODGE_YELLOW.value
-            elif audio_future is not None:
-                audio_result = audio_future.result()
-                if audio_result:
-                    state_name = YoloStateEventEnum.DODGE_AUDIO.value
-
-            with_flash = state_name != '无闪避'
-            if with_flash:
-                self.auto_op.update_state(StateRecord(state_name, screenshot_time))
-
-            return with_flash, state_name
+        result = self._flash_model.run(screen)
+        if result.class_idx == 1:
+            state_name = YoloStateEventEnum.DODGE_RED.value
+        elif result.class_idx == 2:
+            state_name = YoloStateEventEnum.DODGE_YELLOW.value
+        elif audio_future is not None:
+            audio_result = audio_future.result()
+            if audio_result:
+                state_name = YoloStateEventEnum.DODGE_AUDIO.value
+
+        with_flash = state_name != '无闪避'
+        if with_flash:
+            self.auto_op.update_state(StateRecord(state_name, screenshot_time))
+
+        return with_flash, state_name
         # # # # 重写部分 # # # #
-        except Exception:
-            log.error('识别画面闪光失败', exc_info=True)
-        finally:
-            self._check_dodge_flash_lock.release()
 
 
 class BattleContext4Recording(AutoBattleContext):
@@ -268,18 +253,14 @@ class BattleContext4Recording(AutoBattleContext):
         self._check_end_interval = check_end_interval
         self._check_distance_interval = 5
 
-        # 上一次识别的时间
-        self._last_check_chain_time: float = 0
-        self._last_check_quick_time: float = 0
-        self._last_check_end_time: float = 0
-        self._last_check_distance_time: float = 0
-
         # 识别结果
         self.last_check_end_result: Optional[str] = None  # 识别战斗结束的结果
         self.without_distance_times: int = 0  # 没有显示距离的次数
         self.with_distance_times: int = 0  # 有显示距离的次数
         self.last_check_distance = -1
 
+        self._register_frame_checks()
+
     def check_battle_state(self, screen: MatLike, screenshot_time: float,
                            check_battle_end_normal_result: bool = False,
                            check_battle_end_hollow_result: bool = False,
@@ -309,13 +290,14 @@ class BattleContext4Recording(AutoBattleContext):
                 _record_executor.submit(self.dodge_context.check_dodge_flash, screen, screenshot_time, audio_future))
 
             if check_distance:
-                future_list.append(_record_executor.submit(self._check_distance_with_lock, screen, screenshot_time))
+                future_list.append(_record_executor.submit(self.frame_scheduler.run_check, AutoBattleContext.CHECK_DISTANCE,
+                                                           screen, screenshot_time))
         else:
             future_list.append(_record_executor.submit(self.check_chain_attack, screen, screenshot_time))
             check_battle_end = check_battle_end_normal_result or check_battle_end_hollow_result
             if check_battle_end:
                 future_list.append(_record_executor.submit(
-                    self._check_battle_end, screen, screenshot_time,
+                    self.frame_scheduler.run_check, AutoBattleContext.CHECK_END, screen, screenshot_time,
                     check_battle_end_normal_result, check_battle_end_hollow_result
                 ))
         for future in future_list:
@@ -360,66 +342,37 @@ class BattleContext4Recording(AutoBattleContext):
         return output_status_record
 
         # # # # 重写部分 # # # #
-    def check_quick_assist(self, screen: MatLike, screenshot_time: float) -> tuple[str, str, str] | None:
+    def _check_quick_assist(self, screen: MatLike, screenshot_time: float) -> tuple[str, str, str] | None:
         """
-        识别快速支援
+        识别快速支援 不控制识别间隔
         """
-        if not self._check_quick_lock.acquire(blocking=False):
-            return None
-
-        try:
-            if screenshot_time - self._last_check_quick_time < cal_utils.random_in_range(self._check_quick_interval):
-                # 还没有达到识别间隔
-                return None
-            self._last_check_quick_time = screenshot_time
-
-            part = cv2_utils.crop_image_only(screen, self.area_btn_switch.rect)
+        part = cv2_utils.crop_image_only(screen, self.area_btn_switch.rect)
 
-            possible_agents = self.agent_context.get_possible_agent_list()
-
-            agent = self._match_quick_assist_agent_in(part, possible_agents)
-
-            if agent is not None:
-                state_records: List[StateRecord] = [
-                    StateRecord(f'快速支援-{agent.agent_name}', screenshot_time),
-                    StateRecord(f'快速支援-{agent.agent_type.value}', screenshot_time),
-                    StateRecord(BattleStateEnum.STATUS_QUICK_ASSIST_READY.value, screenshot_time),
-                ]
-                self.auto_op.batch_update_states(state_records)
-
-                # # # # 重写部分 # # # #
-                # 返回快速支援状态
-                return (f'快速支援-{agent.agent_name}', f'快速支援-{agent.agent_type.value}',
-                        BattleStateEnum.STATUS_QUICK_ASSIST_READY.value)
-                # # # # 重写部分 # # # #
+        possible_agents = self.agent_context.get_possible_agent_list()
 
-        except Exception:
-            log.error('识别快速支援失败', exc_info=True)
-        finally:
-            self._check_quick_lock.release()
+        agent = self._match_quick_assist_agent_in(part, possible_agents)
 
-    def check_chain_attack(self, screen: MatLike, screenshot_time: float) -> None:
-        """
-        识别连携技
-        """
-        if not self._check_chain_lock.acquire(blocking=False):
-            return None
-
-        try:
-            if screenshot_time - self._last_check_chain_time < cal_utils.random_in_range(self._check_chain_interval):
-                # 还没有达到识别间隔
-                return None
-            self._last_check_chain_time = screenshot_time
+        if agent is not None:
+            state_records: List[StateRecord] = [
+                StateRecord(f'快速支援-{agent.agent_name}', screenshot_time),
+                StateRecord(f'快速支援-{agent.agent_type.value}', screenshot_time),
+                StateRecord(BattleStateEnum.STATUS_QUICK_ASSIST_READY.value, screenshot_time),
+            ]
+            self.auto_op.batch_update_states(state_records)
 
             # # # # 重写部分 # # # #
-            agent_chains = self._check_chain_attack_in_parallel(screen, screenshot_time)
-            return agent_chains
+            # 返回快速支援状态
+            return (f'快速支援-{agent.agent_name}', f'快速支援-{agent.agent_type.value}',
+                    BattleStateEnum.STATUS_QUICK_ASSIST_READY.value)
             # # # # 重写部分 # # # #
 
-        except Exception:
-            log.error('识别连携技出错', exc_info=True)
-        finally:
-            self._check_chain_lock.release()
+    def _check_chain_attack(self, screen: MatLike, screenshot_time: float):
+        """
+        识别连携技 不控制识别间隔
+        """
+        # # # # 重写部分 # # # #
+        return self._check_chain_attack_in_parallel(screen, screenshot_time)
+        # # # # 重写部分 # # # #
 
     def _check_chain_attack_in_parallel(self, screen: MatLike, screenshot_time: float):
         """
@@ -3,11 +3,13 @@ import time
 from typing import Optional, ClassVar
 
 from one_dragon.base.controller.pc_button import pc_button_utils
+from one_dragon.base.controller.screenshot_pipeline import ScreenshotPipeline
 from one_dragon.base.operation.operation_base import OperationResult
 from one_dragon.base.operation.operation_edge import node_from
 from one_dragon.base.operation.operation_node import operation_node
 from one_dragon.base.operation.operation_round_result import OperationRoundResult
 from one_dragon.utils.i18_utils import gt
+from one_dragon.utils.log_utils import log
 from zzz_od.application.zzz_application import ZApplication
 from zzz_od.auto_battle import auto_battle_utils
 from zzz_od.auto_battle.auto_battle_operator import AutoBattleOperator
@@ -31,6 +33,8 @@ class AutoBattleApp(ZApplication):
         )
 
         self.auto_op: Optional[AutoBattleOperator] = None
+        self.screenshot_pipeline: Optional[ScreenshotPipeline] = None  # 并行截图 不开启时为None
+        self.last_frame_id: int = 0  # 上一次识别的画面的帧序号
 
     def handle_init(self) -> None:
         """
@@ -75,6 +79,13 @@ class AutoBattleApp(ZApplication):
                 self.auto_op,
             )
             self.auto_op.start_running_async()
+            if self.ctx.battle_assistant_config.pipeline_screenshot:
+                self.screenshot_pipeline = ScreenshotPipeline(
+                    self.ctx.controller,
+                    interval=self.ctx.battle_assistant_config.screenshot_interval
+                )
+                self.last_frame_id = 0
+                self.screenshot_pipeline.start()
 
         return result
 
@@ -85,6 +96,9 @@ class AutoBattleApp(ZApplication):
         识别当前画面 并进行点击
         :return:
         """
+        if self.screenshot_pipeline is not None:
+            return self._check_latest_frame()
+
         now = time.time()
 
         screen = self.screenshot()
@@ -92,16 +106,48 @@ class AutoBattleApp(ZApplication):
 
         return self.round_wait(wait_round_time=self.ctx.battle_assistant_config.screenshot_interval)
 
+    def _check_latest_frame(self) -> OperationRoundResult:
+        """
+        并行截图时 识别截图线程最新的画面
+        识别期间截到的画面只保留最新一帧 识别完马上处理下一帧 不需要额外等待
+        状态的触发时间使用画面的截图时间 而不是识别的时间
+        截图与识别同时进行 本轮等待新画面的时间即为截图阻塞识别的时间 计入截图耗时
+        :return:
+        """
+        start_time = time.monotonic()
+        frame = self.screenshot_pipeline.get_latest_frame(self.last_frame_id, timeout=1)
+        if self.round_timing is not None:
+            self.round_timing.capture_time += time.monotonic() - start_time
+        if frame is None:
+            return self.round_wait(status='等待截图')
+
+        self.last_frame_id = frame.frame_id
+        self.last_screenshot = frame.image
+        self.auto_op.auto_battle_context.check_battle_state(frame.image, frame.screenshot_time)
+
+        return self.round_wait()
+
+    def _stop_screenshot_pipeline(self) -> None:
+        if self.screenshot_pipeline is None:
+            return
+        self.screenshot_pipeline.stop()
+        log.debug('并行截图统计 %s', self.screenshot_pipeline.stats.to_dict())
+
     def _on_pause(self, e=None):
         ZApplication._on_pause(self, e)
         auto_battle_utils.stop_running(self.auto_op)
+        self._stop_screenshot_pipeline()
 
     def _on_resume(self, e=None):
         ZApplication._on_resume(self, e)
         auto_battle_utils.resume_running(self.auto_op)
+        if self.screenshot_pipeline is not None:
+            self.screenshot_pipeline.start()
 
     def after_operation_done(self, result: OperationResult):
         ZApplication.after_operation_done(self, result)
+        self._stop_screenshot_pipeline()
+        self.screenshot_pipeline = None
         if self.auto_op is not None:
             self.auto_op.dispose()
             self.auto_op = None
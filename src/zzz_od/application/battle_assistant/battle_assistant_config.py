@@ -31,6 +31,14 @@ class BattleAssistantConfig(YamlConfig):
     def screenshot_interval(self, new_value: float) -> None:
         self.update('screenshot_interval', new_value)
 
+    @property
+    def pipeline_screenshot(self) -> bool:
+        return self.get('pipeline_screenshot', False)
+
+    @pipeline_screenshot.setter
+    def pipeline_screenshot(self, new_value: bool) -> None:
+        self.update('pipeline_screenshot', new_value)
+
     @property
     def gamepad_type(self) -> str:
         return self.get('gamepad_type', GamepadTypeEnum.NONE.value.value)
@@ -5,6 +5,7 @@ from cv2.typing import MatLike
 from typing import Optional, List, Tuple
 
 from one_dragon.base.config.yaml_operator import YamlOperator
+from one_dragon.base.matcher import fuzzy_match_index
 from one_dragon.base.matcher.match_result import MatchResult
 from one_dragon.base.screen import screen_utils
 from one_dragon.base.screen.screen_utils import FindAreaResultEnum
@@ -249,14 +250,18 @@ class LostVoidContext:
         sorted_cate_list = [x[0] for x in to_sort_list] + ['卡牌', '无详情']
 
         # 按排序后的cate去匹配对应的藏品
+        name_full_str_lower = name_full_str.lower()
         for cate in sorted_cate_list:
             art_list = self.cate_2_artifact[cate]
+            art_name_list = [gt(art.name, 'game') for art in art_list]
+            # 与整段文本的公共字符数都不够的藏品 后缀也不可能匹配 用索引先排除
+            art_index = fuzzy_match_index.get_fuzzy_match_index([i.lower() for i in art_name_list])
             # 符合分类的情况下 判断后缀和藏品名字是否一致
-            for art in art_list:
-                art_name = gt(art.name, 'game')
+            for idx in art_index.find_lcs_candidate_idx_list(name_full_str_lower, 0.5):
+                art_name = art_name_list[idx]
                 suffix = name_full_str[-len(art_name):]
                 if str_utils.find_by_lcs(art_name, suffix, percent=0.5):
-                    return art
+                    return art_list[idx]
 
     def check_artifact_priority_input(self, input_str: str) -> Tuple[List[str], str]:
         """
@@ -209,10 +209,10 @@ class RandomPlayApp(ZApplication):
         ]
 
         target_list = [gt(i, 'game') for i in self._all_video_themes]
-        for area in areas:
-            part = cv2_utils.crop_image_only(screen, area.rect)
-            ocr_result = self.ctx.ocr.run_ocr_single_line(part)
-
+        ocr_result_list = self.ctx.ocr.run_ocr_single_line_batch(
+            [cv2_utils.crop_image_only(screen, area.rect) for area in areas]
+        )
+        for ocr_result in ocr_result_list:
             results = difflib.get_close_matches(ocr_result, target_list, n=1)
 
             if results is not None and len(results) > 0:
@@ -0,0 +1,128 @@
+import threading
+import time
+from typing import Optional, List, Tuple
+
+from cv2.typing import MatLike
+
+from one_dragon.base.matcher.stacked_template_matcher import StackedTemplateMatcher
+from zzz_od.context.zzz_context import ZContext
+from zzz_od.game_data.agent import Agent, AgentEnum
+
+
+class AgentAvatarMatcher:
+
+    PREFIX_FRONT: str = 'avatar_1_'  # 前台角色头像
+    PREFIX_BACK: str = 'avatar_2_'  # 后台角色头像
+    PREFIX_CHAIN: str = 'avatar_chain_'  # 连携技头像
+    PREFIX_QUICK: str = 'avatar_quick_'  # 快速支援头像
+
+    def __init__(self, ctx: ZContext, threshold: float = 0.8):
+        """
+        角色头像识别
+        每种头像的所有模板堆叠在一起 一次计算出所有候选模板的匹配度 只用原模板匹配确认匹配度最高的一个
+        确认不通过时 按候选的顺序逐个用原模板匹配
+        :param ctx: 上下文
+        :param threshold: 原模板匹配的阈值
+        """
+        self.ctx: ZContext = ctx
+        self.threshold: float = threshold
+
+        self._matcher_map: dict[str, StackedTemplateMatcher] = {}
+        self._matcher_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self.match_cnt: int = 0  # 识别次数
+        self.verify_cnt: int = 0  # 原模板匹配的次数
+        self.fallback_cnt: int = 0  # 匹配度最高的模板确认不通过 逐个匹配的次数
+        self.total_cost: float = 0  # 识别总耗时 秒
+        self.last_cost: float = 0  # 上一次识别的耗时 秒
+
+    def get_matcher(self, prefix: str) -> StackedTemplateMatcher:
+        """
+        获取某种头像的堆叠模板 第一次使用时创建
+        :param prefix: 头像模板的前缀
+        :return:
+        """
+        matcher = self._matcher_map.get(prefix)
+        if matcher is not None:
+            return matcher
+        with self._matcher_lock:
+            matcher = self._matcher_map.get(prefix)
+            if matcher is None:
+                template_id_list: List[str] = []
+                for agent_enum in AgentEnum:
+                    for template_id in agent_enum.value.template_id_list:
+                        template_id_list.append(prefix + template_id)
+                matcher = StackedTemplateMatcher(self.ctx.template_loader, 'battle', template_id_list)
+                self._matcher_map[prefix] = matcher
+            return matcher
+
+    def init_matchers(self) -> None:
+        """
+        创建所有种类头像的堆叠模板
+        """
+        for prefix in [AgentAvatarMatcher.PREFIX_FRONT, AgentAvatarMatcher.PREFIX_BACK,
+                       AgentAvatarMatcher.PREFIX_CHAIN, AgentAvatarMatcher.PREFIX_QUICK]:
+            self.get_matcher(prefix)
+
+    def match(self, img: MatLike, prefix: str,
+              possible_agents: List[Tuple[Agent, Optional[str]]]) -> Tuple[Optional[Agent], Optional[str]]:
+        """
+        在候选列表中匹配角色
+        :param img: 头像区域的图片
+        :param prefix: 头像模板的前缀
+        :param possible_agents: 候选角色 以及上次识别到的模板id 没有时匹配角色所有的模板
+        :return: 匹配到的角色 和对应的模板id
+        """
+        start_time = time.time()
+
+        candidate_map: dict[str, Tuple[Agent, str]] = {}
+        for agent, specific_template_id in possible_agents:
+            template_id_list = [specific_template_id] if specific_template_id else agent.template_id_list
+            for template_id in template_id_list:
+                key = prefix + template_id
+                if key not in candidate_map:
+                    candidate_map[key] = (agent, template_id)
+
+        result_agent: Optional[Agent] = None
+        result_template_id: Optional[str] = None
+        verify_cnt: int = 0
+        fallback: bool = False
+        if len(candidate_map) > 0:
+            rank_list = self.get_matcher(prefix).rank(img, list(candidate_map.keys()))
+            best_template: Optional[str] = rank_list[0][0] if len(rank_list) > 0 else None
+            if best_template is not None:
+                verify_cnt += 1
+                mrl = self.ctx.tm.match_template(img, 'battle', best_template, threshold=self.threshold)
+                if mrl.max is not None:
+                    result_agent, result_template_id = candidate_map[best_template]
+
+            if result_agent is None:
+                # 匹配度最高的不通过 按原来的方式逐个匹配 已经确认过的不再重复
+                fallback = True
+                for template_to_check in candidate_map:
+                    if template_to_check == best_template:
+                        continue
+                    verify_cnt += 1
+                    mrl = self.ctx.tm.match_template(img, 'battle', template_to_check, threshold=self.threshold)
+                    if mrl.max is not None:
+                        result_agent, result_template_id = candidate_map[template_to_check]
+                        break
+
+        cost = time.time() - start_time
+        with self._stats_lock:
+            self.match_cnt += 1
+            self.verify_cnt += verify_cnt
+            if fallback:
+                self.fallback_cnt += 1
+            self.total_cost += cost
+            self.last_cost = cost
+
+        return result_agent, result_template_id
+
+    @property
+    def avg_cost(self) -> float:
+        """
+        平均每次识别的耗时 秒
+        """
+        return self.total_cost / self.match_cnt if self.match_cnt > 0 else 0
@@ -0,0 +1,194 @@
+from typing import Optional, List, Tuple
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from one_dragon.base.conditional_operation.state_recorder import StateRecord
+from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.base.screen.template_info import TemplateInfo
+from one_dragon.utils import cv2_utils
+from one_dragon.utils.log_utils import log
+from zzz_od.auto_battle.agent_state import agent_state_checker
+from zzz_od.context.zzz_context import ZContext
+from zzz_od.game_data.agent import AgentStateDef, AgentStateCheckWay
+
+
+class CheckAgentState:
+
+    def __init__(self, state: AgentStateDef, total: Optional[int] = None, pos: Optional[int] = None):
+        self.state: AgentStateDef = state
+        self.total: int = total
+        self.pos: int = pos
+
+
+class _FrameCrop:
+
+    def __init__(self, screen: MatLike, rect: Optional[Rect]):
+        """
+        一帧画面中 一个区域的截图 以及由它转换得到的图片
+        多个状态使用同一个区域时 只截取和转换一次
+        """
+        self.screen: MatLike = screen
+        self.rect: Optional[Rect] = rect
+        self._part: Optional[MatLike] = None
+        self._gray_mean: Optional[np.ndarray] = None
+        self._hsv: Optional[MatLike] = None
+        self._masked_map: dict[int, Tuple[MatLike, Optional[MatLike]]] = {}  # id(掩码) -> (使用掩码后的图片, HSV)
+
+    @property
+    def part(self) -> MatLike:
+        if self._part is None:
+            self._part = cv2_utils.crop_image_only(self.screen, self.rect)
+        return self._part
+
+    @property
+    def gray_mean(self) -> np.ndarray:
+        """
+        灰度图按列求的平均值
+        """
+        if self._gray_mean is None:
+            self._gray_mean = cv2.cvtColor(self.part, cv2.COLOR_RGB2GRAY).mean(axis=0)
+        return self._gray_mean
+
+    @property
+    def hsv(self) -> MatLike:
+        if self._hsv is None:
+            self._hsv = cv2.cvtColor(self.part, cv2.COLOR_RGB2HSV)
+        return self._hsv
+
+    def get_masked(self, mask: MatLike) -> MatLike:
+        """
+        使用模板掩码后的图片
+        """
+        key = id(mask)
+        if key not in self._masked_map:
+            part = self.part
+            self._masked_map[key] = (cv2.bitwise_and(part, part, mask=mask), None)
+        return self._masked_map[key][0]
+
+    def get_masked_hsv(self, mask: MatLike) -> MatLike:
+        """
+        使用模板掩码后的图片 转换成的HSV
+        """
+        masked = self.get_masked(mask)
+        key = id(mask)
+        hsv = self._masked_map[key][1]
+        if hsv is None:
+            hsv = cv2.cvtColor(masked, cv2.COLOR_RGB2HSV)
+            self._masked_map[key] = (masked, hsv)
+        return hsv
+
+
+class _CompiledCheck:
+
+    def __init__(self, to_check: CheckAgentState, template: Optional[TemplateInfo], crop_idx: int):
+        """
+        编译后的一个状态检测
+        :param to_check: 需要检测的状态
+        :param template: 状态对应的模板 提前获取
+        :param crop_idx: 使用的截图区域下标
+        """
+        self.state: AgentStateDef = to_check.state
+        self.template: Optional[TemplateInfo] = template
+        self.crop_idx: int = crop_idx
+
+        # 使用HSV过滤时 才需要共用转换后的HSV图片
+        self.use_hsv: bool = self.state.hsv_color is not None and self.state.hsv_color_diff is not None
+
+
+class AgentStateCheckPlan:
+
+    def __init__(self, ctx: ZContext, to_check_list: List[CheckAgentState]):
+        """
+        角色状态的检测计划
+        构建时提前获取模板和区域 并将相同区域的状态合并
+        检测时每个区域只截取一次 灰度、HSV等转换也只做一次 然后在当前线程依次计算所有状态
+        每个状态的结果与 agent_state_checker 中单独检测的结果一致
+        :param ctx: 上下文
+        :param to_check_list: 需要检测的状态 结果按这个顺序返回
+        """
+        self.check_list: List[_CompiledCheck] = []
+        self.rect_list: List[Optional[Rect]] = []
+
+        rect_idx_map: dict[Optional[Tuple[int, int, int, int]], int] = {}
+        for to_check in to_check_list:
+            template = agent_state_checker.get_template(ctx, to_check.state, to_check.total, to_check.pos)
+            if template is None:
+                self.check_list.append(_CompiledCheck(to_check, None, -1))
+                continue
+
+            rect = template.get_template_rect_by_point()
+            rect_key = None if rect is None else (rect.x1, rect.y1, rect.x2, rect.y2)
+            crop_idx = rect_idx_map.get(rect_key)
+            if crop_idx is None:
+                crop_idx = len(self.rect_list)
+                rect_idx_map[rect_key] = crop_idx
+                self.rect_list.append(rect)
+            self.check_list.append(_CompiledCheck(to_check, template, crop_idx))
+
+    def evaluate(self, screen: MatLike, screenshot_time: float) -> List[StateRecord]:
+        """
+        检测所有状态
+        :param screen: 游戏画面
+        :param screenshot_time: 截图时间
+        :return: 满足触发条件的状态记录 按构建时的顺序
+        """
+        crop_list: List[_FrameCrop] = [_FrameCrop(screen, rect) for rect in self.rect_list]
+
+        result_list: List[StateRecord] = []
+        for check in self.check_list:
+            state = check.state
+            if not state.should_check_in_battle:
+                continue
+            try:
+                if check.template is None:
+                    value = 0
+                else:
+                    value = AgentStateCheckPlan._check(check, crop_list[check.crop_idx])
+            except Exception:
+                log.error('识别角色状态失败', exc_info=True)
+                continue
+
+            if value > -1 and value >= state.min_value_trigger_state:
+                result_list.append(StateRecord(state.state_name, screenshot_time, value))
+
+        return result_list
+
+    @staticmethod
+    def _check(check: _CompiledCheck, crop: _FrameCrop) -> int:
+        """
+        使用共用的截图计算一个状态的值
+        :param check: 状态检测
+        :param crop: 区域截图
+        :return: 状态值
+        """
+        state = check.state
+        template = check.template
+        check_way = state.check_way
+
+        if check_way == AgentStateCheckWay.COLOR_RANGE_CONNECT or check_way == AgentStateCheckWay.COLOR_RANGE_EXIST:
+            to_check = crop.get_masked(template.mask)
+            hsv = crop.get_masked_hsv(template.mask) if check.use_hsv else None
+            cnt = agent_state_checker.cnt_by_color_range(to_check, state, hsv_image=hsv)
+            if check_way == AgentStateCheckWay.COLOR_RANGE_EXIST:
+                return 1 if cnt > 0 else 0
+            return cnt
+        elif check_way == AgentStateCheckWay.BACKGROUND_GRAY_RANGE_LENGTH:
+            return agent_state_checker.length_by_background_gray(crop.gray_mean, state)
+        elif check_way == AgentStateCheckWay.FOREGROUND_GRAY_RANGE_LENGTH:
+            return agent_state_checker.length_by_foreground_gray(crop.gray_mean, state)
+        elif check_way == AgentStateCheckWay.FOREGROUND_COLOR_RANGE_LENGTH:
+            hsv = crop.hsv if check.use_hsv else None
+            return agent_state_checker.length_by_foreground_color(crop.part, state, hsv_image=hsv)
+        elif check_way == AgentStateCheckWay.TEMPLATE_NOT_FOUND:
+            return 0 if agent_state_checker.is_template_found(crop.part, template, state) else 1
+        elif check_way == AgentStateCheckWay.TEMPLATE_FOUND:
+            return 1 if agent_state_checker.is_template_found(crop.part, template, state) else 0
+        elif check_way == AgentStateCheckWay.COLOR_CHANNEL_MAX_RANGE_EXIST:
+            cnt = agent_state_checker.cnt_by_color_channel_max_range(crop.get_masked(template.mask), state)
+            return 1 if cnt > 0 else 0
+        elif check_way == AgentStateCheckWay.COLOR_CHANNEL_EQUAL_RANGE_CONNECT:
+            return agent_state_checker.cnt_by_color_channel_equal_range(crop.get_masked(template.mask), state)
+        else:
+            return -1
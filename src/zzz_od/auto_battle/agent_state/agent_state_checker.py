@@ -3,6 +3,7 @@ import numpy as np
 from cv2.typing import MatLike
 from typing import Optional
 
+from one_dragon.base.screen.template_info import TemplateInfo
 from one_dragon.utils import cv2_utils
 from zzz_od.context.zzz_context import ZContext
 from zzz_od.game_data.agent import AgentStateDef
@@ -50,8 +51,19 @@ def check_cnt_by_color_range(
         return 0
     part = cv2_utils.crop_image_only(screen, template.get_template_rect_by_point())
     to_check = cv2.bitwise_and(part, part, mask=template.mask)
+    return cnt_by_color_range(to_check, state_def)
 
-    mask = filter_by_color(to_check, state_def)
+
+def cnt_by_color_range(to_check: MatLike, state_def: AgentStateDef,
+                       hsv_image: Optional[MatLike] = None) -> int:
+    """
+    按颜色判断连通块有多少个
+    :param to_check: 已经截取并使用模板掩码的图片
+    :param state_def: 角色状态定义
+    :param hsv_image: to_check 转换后的HSV图片 已经转换过时传入 避免重复转换
+    :return:
+    """
+    mask = filter_by_color(to_check, state_def, hsv_image=hsv_image)
     mask = cv2_utils.dilate(mask, 2)
     # cv2_utils.show_image(mask, wait=0)
 
@@ -111,6 +123,16 @@ def check_length_by_background_gray(
     to_check = part
 
     gray = cv2.cvtColor(to_check, cv2.COLOR_RGB2GRAY).mean(axis=0)
+    return length_by_background_gray(gray, state_def)
+
+
+def length_by_background_gray(gray: np.ndarray, state_def: AgentStateDef) -> int:
+    """
+    按背景的灰度色来反推横条的长度
+    :param gray: 区域灰度图按列求的平均值
+    :param state_def: 角色状态定义
+    :return: 0~100
+    """
     mask = (gray >= state_def.lower_color) & (gray <= state_def.upper_color)
     bg_mask_idx = np.where(mask)
     fg_mask_idx = np.where(~mask)
@@ -166,6 +188,16 @@ def check_length_by_foreground_gray(
     part = cv2_utils.crop_image_only(screen, template.get_template_rect_by_point())
     # 模版需要保证高度是1
     gray = cv2.cvtColor(part, cv2.COLOR_RGB2GRAY).mean(axis=0)
+    return length_by_foreground_gray(gray, state_def)
+
+
+def length_by_foreground_gray(gray: np.ndarray, state_def: AgentStateDef) -> int:
+    """
+    按前景的灰度色来计算横条的长度
+    :param gray: 区域灰度图按列求的平均值
+    :param state_def: 角色状态定义
+    :return: 0~max_length
+    """
     if state_def.split_color_range is not None:
         split_mask = (gray >= state_def.split_color_range[0]) & (gray <= state_def.split_color_range[1])
         gray = gray[np.where(split_mask == False)]
@@ -206,9 +238,21 @@ def check_length_by_foreground_color(
     if template is None:
         return 0
     part = cv2_utils.crop_image_only(screen, template.get_template_rect_by_point())
+    return length_by_foreground_color(part, state_def)
+
+
+def length_by_foreground_color(part: MatLike, state_def: AgentStateDef,
+                               hsv_image: Optional[MatLike] = None) -> int:
+    """
+    按前景色(彩色)来计算横条的长度
+    :param part: 截取的区域
+    :param state_def: 角色状态定义
+    :param hsv_image: part 转换后的HSV图片 已经转换过时传入 避免重复转换
+    :return: 0~max_length
+    """
     to_check = part
 
-    mask = filter_by_color(to_check, state_def)
+    mask = filter_by_color(to_check, state_def, hsv_image=hsv_image)
     # 查找所有非零（白色）像素的坐标
     white_pixels_coords = cv2.findNonZero(mask)
 
@@ -252,10 +296,7 @@ def check_template_not_found(
     if template is None:
         return False
     to_check = cv2_utils.crop_image_only(screen, template.get_template_rect_by_point())
-    mrl = cv2_utils.match_template(source=to_check, template=template.raw, mask=template.mask,
-                                   threshold=state_def.template_threshold)
-
-    return 1 if mrl.max is None else 0
+    return 0 if is_template_found(to_check, template, state_def) else 1
 
 
 def check_template_found(
@@ -278,10 +319,20 @@ def check_template_found(
     if template is None:
         return False
     to_check = cv2_utils.crop_image_only(screen, template.get_template_rect_by_point())
+    return 1 if is_template_found(to_check, template, state_def) else 0
+
+
+def is_template_found(to_check: MatLike, template: TemplateInfo, state_def: AgentStateDef) -> bool:
+    """
+    在截取的区域内 是否能找到模板
+    :param to_check: 截取的区域
+    :param template: 模板
+    :param state_def: 角色状态定义
+    :return:
+    """
     mrl = cv2_utils.match_template(source=to_check, template=template.raw, mask=template.mask,
                                    threshold=state_def.template_threshold)
-
-    return 1 if mrl.max is not None else 0
+    return mrl.max is not None
 
 
 def check_cnt_by_color_channel_max_range(
@@ -305,7 +356,16 @@ def check_cnt_by_color_channel_max_range(
         return 0
     part = cv2_utils.crop_image_only(screen, template.get_template_rect_by_point())
     to_check = cv2.bitwise_and(part, part, mask=template.mask)
+    return cnt_by_color_channel_max_range(to_check, state_def)
 
+
+def cnt_by_color_channel_max_range(to_check: MatLike, state_def: AgentStateDef) -> int:
+    """
+    按颜色通道的最大值判断连通块有多少个
+    :param to_check: 已经截取并使用模板掩码的图片
+    :param state_def: 角色状态定义
+    :return:
+    """
     r, g, b = cv2.split(to_check)
     max_channel = np.max(np.array([r, g, b]), axis=0)
     mask = cv2.inRange(max_channel, state_def.lower_color, state_def.upper_color)
@@ -355,7 +415,16 @@ def check_cnt_by_color_channel_equal_range(
         return 0
     part = cv2_utils.crop_image_only(screen, template.get_template_rect_by_point())
     to_check = cv2.bitwise_and(part, part, mask=template.mask)
+    return cnt_by_color_channel_equal_range(to_check, state_def)
 
+
+def cnt_by_color_channel_equal_range(to_check: MatLike, state_def: AgentStateDef) -> int:
+    """
+    按颜色通道相等的点数判断是否出现
+    :param to_check: 已经截取并使用模板掩码的图片
+    :param state_def: 角色状态定义
+    :return: 存在返回1 不存在返回0
+    """
     # 2. 分离并检查RGB三通道
     r, g, b = cv2.split(to_check)
     # 检查每个像素点的三个通道是否完全相等
@@ -392,7 +461,8 @@ def check_exist_by_color_channel_equal_range(
 def filter_by_color(
     image: MatLike,
     state_def: AgentStateDef,
-    color_mode: str = 'auto'
+    color_mode: str = 'auto',
+    hsv_image: Optional[MatLike] = None
 ) -> MatLike:
     """
     根据 state_def 中的颜色定义，对图像进行统一的颜色过滤。
@@ -400,6 +470,7 @@ def filter_by_color(
     :param image:       待过滤的图像 (RGB格式)
     :param state_def:   状态定义
     :param color_mode:  颜色模式 auto/rgb/hsv
+    :param hsv_image:   image 转换后的HSV图片 已经转换过时传入 避免重复转换
     :return:            二值化的 mask 图像。白色为符合条件，黑色为不符合。
     """
     use_hsv = False
@@ -416,7 +487,8 @@ def filter_by_color(
         use_rgb = True
 
     if use_hsv:
-        hsv_image = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
+        if hsv_image is None:
+            hsv_image = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
 
         hsv_color = np.array(state_def.hsv_color)
         hsv_color_diff = np.array(state_def.hsv_color_diff)
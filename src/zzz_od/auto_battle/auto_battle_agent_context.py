@@ -1,31 +1,18 @@
-from concurrent.futures import ThreadPoolExecutor, Future
-
 import threading
 from cv2.typing import MatLike
-from typing import Optional, List, Union, Tuple, Callable
+from typing import Optional, List, Union, Tuple, Any
 
 from one_dragon.base.conditional_operation.conditional_operator import ConditionalOperator
 from one_dragon.base.conditional_operation.state_recorder import StateRecord, StateRecorder
+from one_dragon.base.operation.frame_scheduler import FrameScheduler, FrameCheck
 from one_dragon.base.screen.screen_area import ScreenArea
-from one_dragon.utils import cv2_utils, cal_utils
+from one_dragon.utils import cv2_utils
 from one_dragon.utils.log_utils import log
-from zzz_od.auto_battle.agent_state import agent_state_checker
+from zzz_od.auto_battle.agent_avatar_matcher import AgentAvatarMatcher
+from zzz_od.auto_battle.agent_state.agent_state_check_plan import AgentStateCheckPlan, CheckAgentState
 from zzz_od.auto_battle.auto_battle_state import BattleStateEnum
 from zzz_od.context.zzz_context import ZContext
-from zzz_od.game_data.agent import Agent, AgentEnum, AgentStateCheckWay, CommonAgentStateEnum, AgentStateDef
-
-_battle_agent_context_executor = ThreadPoolExecutor(thread_name_prefix='od_battle_agent_context', max_workers=16)
-_agent_state_check_method: dict[AgentStateCheckWay, Callable] = {
-    AgentStateCheckWay.COLOR_RANGE_CONNECT: agent_state_checker.check_cnt_by_color_range,
-    AgentStateCheckWay.COLOR_RANGE_EXIST: agent_state_checker.check_exist_by_color_range,
-    AgentStateCheckWay.BACKGROUND_GRAY_RANGE_LENGTH: agent_state_checker.check_length_by_background_gray,
-    AgentStateCheckWay.FOREGROUND_GRAY_RANGE_LENGTH: agent_state_checker.check_length_by_foreground_gray,
-    AgentStateCheckWay.FOREGROUND_COLOR_RANGE_LENGTH: agent_state_checker.check_length_by_foreground_color,
-    AgentStateCheckWay.TEMPLATE_NOT_FOUND: agent_state_checker.check_template_not_found,
-    AgentStateCheckWay.TEMPLATE_FOUND: agent_state_checker.check_template_found,
-    AgentStateCheckWay.COLOR_CHANNEL_MAX_RANGE_EXIST: agent_state_checker.check_exist_by_color_channel_max_range,
-    AgentStateCheckWay.COLOR_CHANNEL_EQUAL_RANGE_CONNECT: agent_state_checker.check_cnt_by_color_channel_equal_range,
-}
+from zzz_od.game_data.agent import Agent, AgentEnum, CommonAgentStateEnum
 
 
 class AgentInfo:
@@ -262,23 +249,19 @@ class TeamInfo:
         return self.get_agent_pos(switch_agent)
 
 
-class CheckAgentState:
-
-    def __init__(self, state: AgentStateDef, total: Optional[int] = None, pos: Optional[int] = None):
-        self.state: AgentStateDef = state
-        self.total: int = total
-        self.pos: int = pos
-
-
 class AutoBattleAgentContext:
 
+    CHECK_AGENT: str = '角色识别'  # 帧识别调度中的名称
+
     def __init__(self, ctx: ZContext):
         self.ctx: ZContext = ctx
         self.auto_op: ConditionalOperator = ConditionalOperator('', '', is_mock=True)
         self.team_info: TeamInfo = TeamInfo()
+        self.avatar_matcher: AgentAvatarMatcher = AgentAvatarMatcher(ctx)  # 头像识别 连携技和快速支援也共用
+        self._state_check_plan_map: dict[tuple, Tuple[AgentStateCheckPlan, int, int, int]] = {}  # 不同角色组合的状态检测计划
 
-        # 识别锁 保证每种类型只有1实例在进行识别
-        self._check_agent_lock = threading.Lock()
+        # 帧识别调度 识别间隔和单实例由调度控制 注册后才有
+        self._frame_scheduler: Optional[FrameScheduler] = None
 
     def init_battle_agent_context(
             self,
@@ -299,11 +282,13 @@ class AutoBattleAgentContext:
         self.area_agent_3_3: ScreenArea = self.ctx.screen_loader.get_area('战斗画面', '头像-3-3')
         self.area_agent_2_2: ScreenArea = self.ctx.screen_loader.get_area('战斗画面', '头像-2-2')
 
+        # 提前堆叠头像模板 避免第一次识别时卡顿
+        self.avatar_matcher.init_matchers()
+
         # 识别间隔
         self._check_agent_interval = check_agent_interval
 
-        # 上一次识别的时间
-        self._last_check_agent_time: float = 0
+        # 上一次切换角色的时间
         self._last_switch_agent_time: float = 0
 
         # 初始化需要检测的状态
@@ -324,6 +309,11 @@ class AutoBattleAgentContext:
             else:
                 state.should_check_in_battle = True
 
+        # 已知配队时 提前构建状态检测计划
+        self._state_check_plan_map.clear()
+        if not self.team_info.should_check_all_agents and len(self.team_info.agent_list) > 0:
+            self._get_state_check_plan([(i.agent, None) for i in self.team_info.agent_list])
+
     def get_possible_agent_list(self) -> Optional[List[Tuple[Agent, Optional[str]]]]:
         """
         获取用于匹配的候选角色列表
@@ -343,48 +333,66 @@ class AutoBattleAgentContext:
         else:
             return [(i.agent, i.matched_template_id) for i in self.team_info.agent_list if i.agent is not None]
 
-    def check_agent_related(self, screen: MatLike, screenshot_time: float) -> None:
+    def register_frame_checks(self, scheduler: FrameScheduler) -> None:
         """
-        判断角色相关内容 并发送事件
-        :return:
+        注册到帧识别调度 识别间隔和单实例由调度控制
+        :param scheduler: 帧识别调度
         """
-        if not self._check_agent_lock.acquire(blocking=False):
-            return
+        self._frame_scheduler = scheduler
+        scheduler.register(FrameCheck(
+            AutoBattleAgentContext.CHECK_AGENT,
+            self._check_agent_related,
+            interval=lambda: self._check_agent_interval,
+            cost=15,
+        ))
 
-        try:
-            if screenshot_time - self._last_check_agent_time < cal_utils.random_in_range(self._check_agent_interval):
-                # 还没有达到识别间隔
-                return
-            self._last_check_agent_time = screenshot_time
+    def check_agent_related(self, screen: MatLike, screenshot_time: float) -> Any:
+        """
+        判断角色相关内容 并发送事件 与每帧提交的识别共用识别间隔
+        没有注册到帧识别调度时 例如单独调试 直接识别
+        :return: 识别结果 跳过时为None
+        """
+        if self._frame_scheduler is None:
+            return self._check_agent_related(screen, screenshot_time)
+        return self._frame_scheduler.run_check(AutoBattleAgentContext.CHECK_AGENT, screen, screenshot_time)
+
+    def _reset_check_agent_interval(self) -> None:
+        """
+        下一帧画面立刻识别角色
+        """
+        if self._frame_scheduler is not None:
+            self._frame_scheduler.reset_interval(AutoBattleAgentContext.CHECK_AGENT)
 
-            screen_agent_list = self._check_agent_in_parallel(screen)
-            energy_state_list, special_state_list, ultimate_state_list, other_state_list = self._check_all_agent_state(screen, screenshot_time, screen_agent_list)
+    def _check_agent_related(self, screen: MatLike, screenshot_time: float) -> None:
+        """
+        判断角色相关内容 并发送事件 不控制识别间隔
+        :return:
+        """
+        screen_agent_list = self._check_agent_avatar(screen)
+        energy_state_list, special_state_list, ultimate_state_list, other_state_list = self._check_all_agent_state(screen, screenshot_time, screen_agent_list)
 
-            update_state_record_list = []
-            # 尝试更新代理人列表 成功的话 更新状态记录
-            if self.team_info.update_agent_list(
-                    screen_agent_list,
-                    [(i.value if i is not None else 0) for i in energy_state_list],
-                    [(i.value if i is not None else 0) for i in special_state_list],
-                    [(i.value if i is not None else 0) for i in ultimate_state_list],
-                    screenshot_time):
+        update_state_record_list = []
+        # 尝试更新代理人列表 成功的话 更新状态记录
+        if self.team_info.update_agent_list(
+                screen_agent_list,
+                [(i.value if i is not None else 0) for i in energy_state_list],
+                [(i.value if i is not None else 0) for i in special_state_list],
+                [(i.value if i is not None else 0) for i in ultimate_state_list],
+                screenshot_time):
 
-                for i in self._get_agent_state_records(screenshot_time):
-                    update_state_record_list.append(i)
+            for i in self._get_agent_state_records(screenshot_time):
+                update_state_record_list.append(i)
 
-                # 只有代理人列表更新成功 本次识别的状态才可用
-                for i in other_state_list:
-                    update_state_record_list.append(i)
+            # 只有代理人列表更新成功 本次识别的状态才可用
+            for i in other_state_list:
+                update_state_record_list.append(i)
 
-            self.auto_op.batch_update_states(update_state_record_list)
-        except Exception:
-            log.error('识别画面角色失败', exc_info=True)
-        finally:
-            self._check_agent_lock.release()
+        self.auto_op.batch_update_states(update_state_record_list)
 
-    def _check_agent_in_parallel(self, screen: MatLike) -> List[Tuple[Agent, Optional[str]]]:
+    def _check_agent_avatar(self, screen: MatLike) -> List[Tuple[Agent, Optional[str]]]:
         """
-        并发识别角色
+        识别各个位置的角色头像
+        头像使用堆叠模板匹配 耗时很短 直接在当前线程依次识别 避免占用其它线程
         :return:
         """
         area_img = [
@@ -397,7 +405,6 @@ class AutoBattleAgentContext:
         possible_agents = self.get_possible_agent_list()
 
         result_agent_list: List[Tuple[Optional[Agent], Optional[str]]] = []
-        future_list: List[Optional[Future]] = []
         should_check: List[bool] = [True, False, False, False]
 
         if not self.team_info.should_check_all_agents:
@@ -411,18 +418,11 @@ class AutoBattleAgentContext:
                 should_check[i] = True
 
         for i in range(4):
-            if should_check[i]:
-                future_list.append(_battle_agent_context_executor.submit(self._match_agent_in, area_img[i], i == 0, possible_agents))
-            else:
-                future_list.append(None)
-
-        for future in future_list:
-            if future is None:
+            if not should_check[i]:
                 result_agent_list.append((None, None))
                 continue
             try:
-                result_agent, result_template_id = future.result()
-                result_agent_list.append((result_agent, result_template_id))
+                result_agent_list.append(self._match_agent_in(area_img[i], i == 0, possible_agents))
             except Exception:
                 log.error('识别角色头像失败', exc_info=True)
                 result_agent_list.append((None, None))
@@ -442,81 +442,20 @@ class AutoBattleAgentContext:
         在候选列表重匹配角色
         :return:
         """
-        prefix = 'avatar_1_' if is_front else 'avatar_2_'
-        for agent, specific_template_id in possible_agents:
-            # 上次识别过的模板 ID，接着用
-            if specific_template_id:
-                template_to_check = prefix + specific_template_id
-                mrl = self.ctx.tm.match_template(img, 'battle', template_to_check, threshold=0.8)
-                if mrl.max is not None:
-                    return agent, specific_template_id
-            # 没有上次识别过的模板 ID，匹配所有可能的模板 ID
-            else:
-                for template_id in agent.template_id_list:
-                    template_to_check = prefix + template_id
-                    mrl = self.ctx.tm.match_template(img, 'battle', template_to_check, threshold=0.8)
-                    if mrl.max is not None:
-                        return agent, template_id
-
-        return None, None
+        prefix = AgentAvatarMatcher.PREFIX_FRONT if is_front else AgentAvatarMatcher.PREFIX_BACK
+        return self.avatar_matcher.match(img, prefix, possible_agents)
 
-    def _check_agent_state_in_parallel(self, screen: MatLike, screenshot_time: float, agent_state_list: List[CheckAgentState]) -> List[StateRecord]:
+    def _get_state_check_plan(self, screen_agent_list: List[Tuple[Agent, Optional[str]]]
+                              ) -> Tuple[AgentStateCheckPlan, int, int, int]:
         """
-        并行识别多个角色状态
-        :param screen: 游戏画面
-        :param screenshot_time: 截图时间
-        :param agent_state_list: 需要识别的状态列表
-        :return:
-        """
-        future_list: List[Future] = []
-        for state in agent_state_list:
-            if not state.state.should_check_in_battle:
-                continue
-            future_list.append(_battle_agent_context_executor.submit(self._check_agent_state, screen, screenshot_time, state))
-
-        result_list: List[Optional[StateRecord]] = []
-        for future in future_list:
-            try:
-                record = future.result()
-                if record is not None:
-                    result_list.append(record)
-            except Exception:
-                log.error('识别角色状态失败', exc_info=True)
-
-        return result_list
-
-    def _check_agent_state(self, screen: MatLike, screenshot_time: float, to_check: CheckAgentState) -> Optional[StateRecord]:
-        """
-        识别一个角色状态
-        :param screen:
-        :param screenshot_time:
-        :param to_check: 需要识别的状态
-        :return:
-        """
-        value: int = -1
-        state = to_check.state
-        check_method = _agent_state_check_method[state.check_way]
-        value = check_method(ctx=self.ctx, screen=screen, state_def=state, total=to_check.total, pos=to_check.pos)
-
-        if value > -1 and value >= state.min_value_trigger_state:
-            return StateRecord(state.state_name, screenshot_time, value)
-
-    def _check_all_agent_state(self, screen: MatLike, screenshot_time: float,
-                               screen_agent_list: List[Tuple[Agent, Optional[str]]]
-                               ) -> Tuple[List[StateRecord], List[StateRecord], List[StateRecord], List[StateRecord]]:
-        """
-        识别所有需要的角色状态
-        - 能量条
-        - 角色独有状态
-        - 血量扣减
-        :param screen: 游戏画面
-        :param screenshot_time: 截图时间
+        获取当前角色组合需要的状态检测计划 同一个组合只构建一次
         :param screen_agent_list: 当前截图的角色列表
-        :return: 三个状态记录 能量、终结技、角色状态
+        :return: 检测计划, 能量状态数量, 特殊技状态数量, 终结技状态数量
         """
-
-        if screen_agent_list is None or len(screen_agent_list) == 0:
-            return [], [], [], []
+        key = tuple(None if agent is None else agent.agent_id for agent, _ in screen_agent_list)
+        plan_with_len = self._state_check_plan_map.get(key)
+        if plan_with_len is not None:
+            return plan_with_len
 
         total = len(screen_agent_list)
         to_check_list: List[CheckAgentState] = []
@@ -585,10 +524,30 @@ class AutoBattleAgentContext:
             state = CommonAgentStateEnum.LIFE_DEDUCTION_21.value
         to_check_list.append(CheckAgentState(state))
 
-        all_state_result_list = self._check_agent_state_in_parallel(screen, screenshot_time, to_check_list)
-        energy_len = len(energy_state_list)
-        special_len = len(special_state_list)
-        ultimate_len = len(ultimate_state_list)
+        plan_with_len = (AgentStateCheckPlan(self.ctx, to_check_list),
+                         len(energy_state_list), len(special_state_list), len(ultimate_state_list))
+        self._state_check_plan_map[key] = plan_with_len
+        return plan_with_len
+
+    def _check_all_agent_state(self, screen: MatLike, screenshot_time: float,
+                               screen_agent_list: List[Tuple[Agent, Optional[str]]]
+                               ) -> Tuple[List[StateRecord], List[StateRecord], List[StateRecord], List[StateRecord]]:
+        """
+        识别所有需要的角色状态
+        - 能量条
+        - 角色独有状态
+        - 血量扣减
+        :param screen: 游戏画面
+        :param screenshot_time: 截图时间
+        :param screen_agent_list: 当前截图的角色列表
+        :return: 三个状态记录 能量、终结技、角色状态
+        """
+
+        if screen_agent_list is None or len(screen_agent_list) == 0:
+            return [], [], [], []
+
+        plan, energy_len, special_len, ultimate_len = self._get_state_check_plan(screen_agent_list)
+        all_state_result_list = plan.evaluate(screen, screenshot_time)
 
         energy_result_list = all_state_result_list[:energy_len]
         special_result_list = all_state_result_list[energy_len:energy_len + special_len]
@@ -606,7 +565,7 @@ class AutoBattleAgentContext:
         """
         if self.team_info.switch_next_agent(update_time):
             if check_agent:
-                self._last_check_agent_time = 0
+                self._reset_check_agent_interval()
             records = self._get_agent_state_records(update_time, switch=True)
             if update_state:
                 self.auto_op.batch_update_states(records)
@@ -622,7 +581,7 @@ class AutoBattleAgentContext:
         """
         if self.team_info.switch_prev_agent(update_time):
             if check_agent:
-                self._last_check_agent_time = 0
+                self._reset_check_agent_interval()
             records = self._get_agent_state_records(update_time, switch=True)
             if update_state:
                 self.auto_op.batch_update_states(records)
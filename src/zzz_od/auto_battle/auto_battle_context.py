@@ -1,18 +1,19 @@
 import time
-from concurrent.futures import ThreadPoolExecutor, Future
+from concurrent.futures import ThreadPoolExecutor
 
-import threading
 from cv2.typing import MatLike
-from typing import Optional, List, Union, Tuple
+from typing import Optional, List, Union, Tuple, Any
 
 from one_dragon.base.conditional_operation.conditional_operator import ConditionalOperator
 from one_dragon.base.conditional_operation.state_recorder import StateRecord
 from one_dragon.base.matcher.match_result import MatchResult
+from one_dragon.base.operation.frame_scheduler import FrameScheduler, FrameCheck
 from one_dragon.base.screen import screen_utils
 from one_dragon.base.screen.screen_area import ScreenArea
 from one_dragon.base.screen.screen_utils import FindAreaResultEnum
-from one_dragon.utils import cv2_utils, thread_utils, cal_utils, str_utils
+from one_dragon.utils import cv2_utils, str_utils
 from one_dragon.utils.log_utils import log
+from zzz_od.auto_battle.agent_avatar_matcher import AgentAvatarMatcher
 from zzz_od.auto_battle.auto_battle_agent_context import AutoBattleAgentContext
 from zzz_od.auto_battle.auto_battle_custom_context import AutoBattleCustomContext
 from zzz_od.auto_battle.auto_battle_dodge_context import AutoBattleDodgeContext
@@ -20,11 +21,16 @@ from zzz_od.auto_battle.auto_battle_state import BattleStateEnum
 from zzz_od.context.zzz_context import ZContext
 from zzz_od.game_data.agent import Agent
 
-_battle_state_check_executor = ThreadPoolExecutor(thread_name_prefix='od_battle_state_check', max_workers=16)
+_battle_frame_executor = ThreadPoolExecutor(thread_name_prefix='od_battle_frame', max_workers=8)
 
 
 class AutoBattleContext:
 
+    CHECK_CHAIN: str = '连携技'  # 帧识别调度中的名称
+    CHECK_QUICK: str = '快速支援'
+    CHECK_DISTANCE: str = '距离'
+    CHECK_END: str = '战斗结束'
+
     def __init__(self, ctx: ZContext):
         self.ctx: ZContext = ctx
         self.agent_context: AutoBattleAgentContext = AutoBattleAgentContext(self.ctx)
@@ -32,27 +38,18 @@ class AutoBattleContext:
         self.custom_context: AutoBattleCustomContext = AutoBattleCustomContext(self.ctx)
         self.auto_op: ConditionalOperator = ConditionalOperator('', '', is_mock=True)
 
+        # 每帧画面的识别调度 所有识别共用一个线程池
+        self.frame_scheduler: FrameScheduler = FrameScheduler(_battle_frame_executor)
+
         # 识别区域
         self._check_distance_area: Optional[ScreenArea] = None
 
-        # 识别锁 保证每种类型只有1实例在进行识别
-        self._check_chain_lock = threading.Lock()
-        self._check_quick_lock = threading.Lock()
-        self._check_end_lock = threading.Lock()
-        self._check_distance_lock = threading.Lock()
-
-        # 识别间隔
+        # 识别间隔 单实例和上一次识别的时间由帧识别调度控制
         self._check_chain_interval: Union[float, List[float]] = 0
         self._check_quick_interval: Union[float, List[float]] = 0
         self._check_end_interval: Union[float, List[float]] = 5
         self._check_distance_interval: Union[float, List[float]] = 5
 
-        # 上一次识别的时间
-        self._last_check_chain_time: float = 0
-        self._last_check_quick_time: float = 0
-        self._last_check_end_time: float = 0
-        self._last_check_distance_time: float = 0
-
         # 识别结果
         self.last_check_in_battle: bool = False  # 是否在战斗画面
         self.last_check_end_result: Optional[str] = None
@@ -362,18 +359,46 @@ class AutoBattleContext:
         self._check_end_interval = check_end_interval
         self._check_distance_interval = 5
 
-        # 上一次识别的时间
-        self._last_check_chain_time: float = 0
-        self._last_check_quick_time: float = 0
-        self._last_check_end_time: float = 0
-        self._last_check_distance_time: float = 0
-
         # 识别结果
         self.last_check_end_result: Optional[str] = None  # 识别战斗结束的结果
         self.without_distance_times: int = 0  # 没有显示距离的次数
         self.with_distance_times: int = 0  # 有显示距离的次数
         self.last_check_distance = -1
 
+        self._register_frame_checks()
+
+    def _register_frame_checks(self) -> None:
+        """
+        注册每帧画面的识别 识别间隔和单实例由调度控制
+        """
+        self.frame_scheduler.register(FrameCheck(
+            AutoBattleContext.CHECK_CHAIN,
+            self._check_chain_attack,
+            interval=lambda: self._check_chain_interval,
+            cost=5,
+        ))
+        self.frame_scheduler.register(FrameCheck(
+            AutoBattleContext.CHECK_QUICK,
+            self._check_quick_assist,
+            interval=lambda: self._check_quick_interval,
+            cost=3,
+        ))
+        self.frame_scheduler.register(FrameCheck(
+            AutoBattleContext.CHECK_DISTANCE,
+            lambda screen, screenshot_time: self.check_battle_distance(screen),
+            interval=lambda: self._check_distance_interval,
+            cost=20,
+        ))
+        self.frame_scheduler.register(FrameCheck(
+            AutoBattleContext.CHECK_END,
+            self._check_battle_end_result,
+            interval=lambda: self._check_end_interval,
+            cost=20,
+        ))
+        self.agent_context.register_frame_checks(self.frame_scheduler)
+        self.dodge_context.register_frame_checks(self.frame_scheduler)
+        self.frame_scheduler.reset()
+
     def check_battle_state(
             self, screen: MatLike, screenshot_time: float,
             check_battle_end_normal_result: bool = False,
@@ -384,33 +409,33 @@ class AutoBattleContext:
     ) -> bool:
         """
         识别战斗状态的总入口
+        各项识别提交到帧识别调度 识别仍在进行时只保留最新的画面
         :return: 当前是否在战斗画面
         """
         in_battle = self.is_normal_attack_btn_available(screen)
         self.last_check_in_battle = in_battle
 
-        future_list: List[Future] = []
-
+        check_name_list: List[str] = []
+        kwargs_map: dict[str, dict] = {}
         if in_battle:
-            audio_future = _battle_state_check_executor.submit(self.dodge_context.check_dodge_audio, screenshot_time)
-            future_list.append(audio_future)
-            future_list.append(_battle_state_check_executor.submit(self.dodge_context.check_dodge_flash, screen, screenshot_time, audio_future))
-
-            agent_future = _battle_state_check_executor.submit(self.agent_context.check_agent_related, screen, screenshot_time)
-            future_list.append(agent_future)
-            future_list.append(_battle_state_check_executor.submit(self.check_quick_assist, screen, screenshot_time))
+            check_name_list.append(AutoBattleDodgeContext.CHECK_DODGE_AUDIO)
+            check_name_list.append(AutoBattleDodgeContext.CHECK_DODGE_FLASH)
+            check_name_list.append(AutoBattleAgentContext.CHECK_AGENT)
+            check_name_list.append(AutoBattleContext.CHECK_QUICK)
             if check_distance:
-                future_list.append(_battle_state_check_executor.submit(self._check_distance_with_lock, screen, screenshot_time))
+                check_name_list.append(AutoBattleContext.CHECK_DISTANCE)
         else:
-            future_list.append(_battle_state_check_executor.submit(self.check_chain_attack, screen, screenshot_time))
+            check_name_list.append(AutoBattleContext.CHECK_CHAIN)
             check_battle_end = check_battle_end_normal_result or check_battle_end_hollow_result or check_battle_end_defense_result
             if check_battle_end:
-                future_list.append(_battle_state_check_executor.submit(
-                    self._check_battle_end, screen, screenshot_time,
-                    check_battle_end_normal_result, check_battle_end_hollow_result, check_battle_end_defense_result
-                ))
-        for future in future_list:
-            future.add_done_callback(thread_utils.handle_future_result)
+                check_name_list.append(AutoBattleContext.CHECK_END)
+                kwargs_map[AutoBattleContext.CHECK_END] = {
+                    'check_battle_end_normal_result': check_battle_end_normal_result,
+                    'check_battle_end_hollow_result': check_battle_end_hollow_result,
+                    'check_battle_end_defense_result': check_battle_end_defense_result,
+                }
+
+        future_list = self.frame_scheduler.submit_frame(screen, screenshot_time, check_name_list, kwargs_map)
 
         if sync:
             for future in future_list:
@@ -418,28 +443,17 @@ class AutoBattleContext:
 
         return in_battle
 
-    def check_chain_attack(self, screen: MatLike, screenshot_time: float) -> None:
+    def check_chain_attack(self, screen: MatLike, screenshot_time: float) -> Any:
         """
-        识别连携技
+        识别连携技 与每帧提交的识别共用识别间隔
+        :return: 识别结果 跳过时为None
         """
-        if not self._check_chain_lock.acquire(blocking=False):
-            return
-
-        try:
-            if screenshot_time - self._last_check_chain_time < cal_utils.random_in_range(self._check_chain_interval):
-                # 还没有达到识别间隔
-                return
-            self._last_check_chain_time = screenshot_time
-
-            self._check_chain_attack_in_parallel(screen, screenshot_time)
-        except Exception:
-            log.error('识别连携技出错', exc_info=True)
-        finally:
-            self._check_chain_lock.release()
+        return self.frame_scheduler.run_check(AutoBattleContext.CHECK_CHAIN, screen, screenshot_time)
 
-    def _check_chain_attack_in_parallel(self, screen: MatLike, screenshot_time: float):
+    def _check_chain_attack(self, screen: MatLike, screenshot_time: float) -> None:
         """
-        并行识别连携技角色
+        识别连携技角色 不控制识别间隔
+        头像使用堆叠模板匹配 耗时很短 直接在当前线程依次识别
         """
         c1 = cv2_utils.crop_image_only(screen, self.area_chain_1.rect)
         c2 = cv2_utils.crop_image_only(screen, self.area_chain_2.rect)
@@ -447,15 +461,9 @@ class AutoBattleContext:
         possible_agents = self.agent_context.get_possible_agent_list()
 
         result_agent_list: List[Optional[Agent]] = []
-        future_list: List[Future] = []
-        future_list.append(_battle_state_check_executor.submit(self._match_chain_agent_in, c1, possible_agents))
-        future_list.append(_battle_state_check_executor.submit(self._match_chain_agent_in, c2, possible_agents))
-
-        for future in future_list:
+        for img in [c1, c2]:
             try:
-                future.add_done_callback(thread_utils.handle_future_result)
-                result = future.result()
-                result_agent_list.append(result)
+                result_agent_list.append(self._match_chain_agent_in(img, possible_agents))
             except Exception:
                 log.error('识别连携技角色头像失败', exc_info=True)
                 result_agent_list.append(None)
@@ -482,163 +490,100 @@ class AutoBattleContext:
         在候选列表重匹配角色
         :return:
         """
-        prefix = 'avatar_chain_'
-        for agent, specific_template_id in possible_agents:
-            # 上次识别过的模板 ID，接着用
-            if specific_template_id:
-                template_to_check = prefix + specific_template_id
-                mrl = self.ctx.tm.match_template(img, 'battle', template_to_check, threshold=0.8)
-                if mrl.max is not None:
-                    return agent
-            # 没有上次识别过的模板 ID，匹配所有可能的模板 ID
-            else:
-                for template_id in agent.template_id_list:
-                    template_to_check = prefix + template_id
-                    mrl = self.ctx.tm.match_template(img, 'battle', template_to_check, threshold=0.8)
-                    if mrl.max is not None:
-                        return agent
-
-        return None
-
-    def check_quick_assist(self, screen: MatLike, screenshot_time: float) -> None:
+        agent, _ = self.agent_context.avatar_matcher.match(img, AgentAvatarMatcher.PREFIX_CHAIN, possible_agents)
+        return agent
+
+    def check_quick_assist(self, screen: MatLike, screenshot_time: float) -> Any:
         """
-        识别快速支援
+        识别快速支援 与每帧提交的识别共用识别间隔
+        :return: 识别结果 跳过时为None
         """
-        if not self._check_quick_lock.acquire(blocking=False):
-            return
+        return self.frame_scheduler.run_check(AutoBattleContext.CHECK_QUICK, screen, screenshot_time)
 
-        try:
-            if screenshot_time - self._last_check_quick_time < cal_utils.random_in_range(self._check_quick_interval):
-                # 还没有达到识别间隔
-                return
-            self._last_check_quick_time = screenshot_time
-
-            part = cv2_utils.crop_image_only(screen, self.area_btn_switch.rect)
+    def _check_quick_assist(self, screen: MatLike, screenshot_time: float) -> None:
+        """
+        识别快速支援 不控制识别间隔
+        """
+        part = cv2_utils.crop_image_only(screen, self.area_btn_switch.rect)
 
-            possible_agents = self.agent_context.get_possible_agent_list()
+        possible_agents = self.agent_context.get_possible_agent_list()
 
-            agent = self._match_quick_assist_agent_in(part, possible_agents)
+        agent = self._match_quick_assist_agent_in(part, possible_agents)
 
-            if agent is not None:
-                state_records: List[StateRecord] = [
-                    StateRecord(f'快速支援-{agent.agent_name}', screenshot_time),
-                    StateRecord(f'快速支援-{agent.agent_type.value}', screenshot_time),
-                    StateRecord(BattleStateEnum.STATUS_QUICK_ASSIST_READY.value, screenshot_time),
-                ]
-                self.auto_op.batch_update_states(state_records)
-        except Exception:
-            log.error('识别快速支援失败', exc_info=True)
-        finally:
-            self._check_quick_lock.release()
+        if agent is not None:
+            state_records: List[StateRecord] = [
+                StateRecord(f'快速支援-{agent.agent_name}', screenshot_time),
+                StateRecord(f'快速支援-{agent.agent_type.value}', screenshot_time),
+                StateRecord(BattleStateEnum.STATUS_QUICK_ASSIST_READY.value, screenshot_time),
+            ]
+            self.auto_op.batch_update_states(state_records)
 
     def _match_quick_assist_agent_in(self, img: MatLike, possible_agents: Optional[List[Tuple[Agent, Optional[str]]]]) -> Optional[Agent]:
         """
         在候选列表重匹配角色
         :return:
         """
-        prefix = 'avatar_quick_'
-        for agent, specific_template_id in possible_agents:
-            # 上次识别过的模板 ID，接着用
-            if specific_template_id:
-                template_to_check = prefix + specific_template_id
-                mrl = self.ctx.tm.match_template(img, 'battle', template_to_check, threshold=0.8)
-                if mrl.max is not None:
-                    return agent
-            # 没有上次识别过的模板 ID，匹配所有可能的模板 ID
-            else:
-                for template_id in agent.template_id_list:
-                    template_to_check = prefix + template_id
-                    mrl = self.ctx.tm.match_template(img, 'battle', template_to_check, threshold=0.8)
-                    if mrl.max is not None:
-                        return agent
-
-        return None
-
-    def _check_battle_end(self, screen: MatLike, screenshot_time: float,
-                          check_battle_end_normal_result: bool,
-                          check_battle_end_hollow_result: bool,
-                          check_battle_end_defense_result: bool = False,) -> None:
-        if not self._check_end_lock.acquire(blocking=False):
-            return
+        agent, _ = self.agent_context.avatar_matcher.match(img, AgentAvatarMatcher.PREFIX_QUICK, possible_agents)
+        return agent
 
-        try:
-            if screenshot_time - self._last_check_end_time < cal_utils.random_in_range(self._check_end_interval):
-                # 还没有达到识别间隔
+    def _check_battle_end_result(self, screen: MatLike, screenshot_time: float,
+                                 check_battle_end_normal_result: bool,
+                                 check_battle_end_hollow_result: bool,
+                                 check_battle_end_defense_result: bool = False) -> None:
+        """
+        识别战斗结束 不控制识别间隔
+        """
+        if check_battle_end_hollow_result:
+            result = screen_utils.find_area(ctx=self.ctx, screen=screen,
+                                            screen_name='零号空洞-战斗', area_name='挑战结果')
+            if result == FindAreaResultEnum.TRUE:
+                self.last_check_end_result = '零号空洞-挑战结果'
                 return
-            self._last_check_end_time = screenshot_time
-
-            if check_battle_end_hollow_result:
-                result = screen_utils.find_area(ctx=self.ctx, screen=screen,
-                                                screen_name='零号空洞-战斗', area_name='挑战结果')
-                if result == FindAreaResultEnum.TRUE:
-                    self.last_check_end_result = '零号空洞-挑战结果'
-                    return
-
-                result = screen_utils.find_area(ctx=self.ctx, screen=screen,
-                                                screen_name='零号空洞-事件', area_name='背包')
-                if result == FindAreaResultEnum.TRUE:
-                    self.last_check_end_result = '零号空洞-背包'
-                    return
-
-                result = screen_utils.find_area(ctx=self.ctx, screen=screen,
-                                                screen_name='零号空洞-战斗', area_name='鸣徽-确定')
-                if result == FindAreaResultEnum.TRUE:
-                    self.last_check_end_result = '鸣徽-确定'
-                    return
-
-                result = screen_utils.find_area(ctx=self.ctx, screen=screen,
-                                                screen_name='零号空洞-战斗', area_name='结算周期上限-确认')
-                if result == FindAreaResultEnum.TRUE:
-                    self.last_check_end_result = '零号空洞-结算周期上限'
-                    return
-
-            if check_battle_end_defense_result:
-                result = screen_utils.find_area(ctx=self.ctx, screen=screen,
-                                                screen_name='式舆防卫战', area_name='战斗结束-退出')
-                if result == FindAreaResultEnum.TRUE:
-                    self.last_check_end_result = '战斗结束-退出'
-                    return
-
-                result = screen_utils.find_area(ctx=self.ctx, screen=screen,
-                                                screen_name='式舆防卫战', area_name='战斗结束-撤退')
-                if result == FindAreaResultEnum.TRUE:
-                    self.last_check_end_result = '战斗结束-撤退'
-                    return
-
-            if check_battle_end_normal_result:
-                result = screen_utils.find_area(ctx=self.ctx, screen=screen,
-                                                screen_name='战斗画面', area_name='战斗结果-完成')
-                if result == FindAreaResultEnum.TRUE:
-                    self.last_check_end_result = '普通战斗-完成'
-                    return
-                result = screen_utils.find_area(ctx=self.ctx, screen=screen,
-                                                screen_name='战斗画面', area_name='战斗结果-撤退')
-                if result == FindAreaResultEnum.TRUE:
-                    self.last_check_end_result = '普通战斗-撤退'
-                    return
-
-            self.last_check_end_result = None
-        except Exception:
-            log.error('识别战斗结束失败', exc_info=True)
-        finally:
-            self._check_end_lock.release()
-
-    def _check_distance_with_lock(self, screen: MatLike, screenshot_time: float) -> None:
-        if not self._check_distance_lock.acquire(blocking=False):
-            return
 
-        try:
-            if screenshot_time - self._last_check_distance_time < cal_utils.random_in_range(self._check_distance_interval):
-                # 还没有达到识别间隔
+            result = screen_utils.find_area(ctx=self.ctx, screen=screen,
+                                            screen_name='零号空洞-事件', area_name='背包')
+            if result == FindAreaResultEnum.TRUE:
+                self.last_check_end_result = '零号空洞-背包'
                 return
 
-            self._last_check_distance_time = screenshot_time
+            result = screen_utils.find_area(ctx=self.ctx, screen=screen,
+                                            screen_name='零号空洞-战斗', area_name='鸣徽-确定')
+            if result == FindAreaResultEnum.TRUE:
+                self.last_check_end_result = '鸣徽-确定'
+                return
+
+            result = screen_utils.find_area(ctx=self.ctx, screen=screen,
+                                            screen_name='零号空洞-战斗', area_name='结算周期上限-确认')
+            if result == FindAreaResultEnum.TRUE:
+                self.last_check_end_result = '零号空洞-结算周期上限'
+                return
+
+        if check_battle_end_defense_result:
+            result = screen_utils.find_area(ctx=self.ctx, screen=screen,
+                                            screen_name='式舆防卫战', area_name='战斗结束-退出')
+            if result == FindAreaResultEnum.TRUE:
+                self.last_check_end_result = '战斗结束-退出'
+                return
+
+            result = screen_utils.find_area(ctx=self.ctx, screen=screen,
+                                            screen_name='式舆防卫战', area_name='战斗结束-撤退')
+            if result == FindAreaResultEnum.TRUE:
+                self.last_check_end_result = '战斗结束-撤退'
+                return
+
+        if check_battle_end_normal_result:
+            result = screen_utils.find_area(ctx=self.ctx, screen=screen,
+                                            screen_name='战斗画面', area_name='战斗结果-完成')
+            if result == FindAreaResultEnum.TRUE:
+                self.last_check_end_result = '普通战斗-完成'
+                return
+            result = screen_utils.find_area(ctx=self.ctx, screen=screen,
+                                            screen_name='战斗画面', area_name='战斗结果-撤退')
+            if result == FindAreaResultEnum.TRUE:
+                self.last_check_end_result = '普通战斗-撤退'
+                return
 
-            self.check_battle_distance(screen)
-        except Exception:
-            log.error('识别距离失败', exc_info=True)
-        finally:
-            self._check_distance_lock.release()
+        self.last_check_end_result = None
 
     def check_battle_distance(self, screen: MatLike, last_distance: Optional[float] = None) -> MatchResult:
         """
@@ -714,6 +659,7 @@ class AutoBattleContext:
         :return:
         """
         self.dodge_context.stop_context()
+        self.frame_scheduler.log_stats()
 
         log.info('松开所有按键')
         self.dodge(release=True)
@@ -6,15 +6,16 @@ import os
 import threading
 from cv2.typing import MatLike
 from enum import Enum
-from scipy.signal import correlate, butter, filtfilt
-from sklearn.preprocessing import scale
-from typing import Optional, List, Union
+from scipy.signal import butter
+from typing import Optional, List, Union, Any
 
 from one_dragon.base.conditional_operation.conditional_operator import ConditionalOperator
 from one_dragon.base.conditional_operation.state_recorder import StateRecord
-from one_dragon.utils import cal_utils, yolo_config_utils
+from one_dragon.base.operation.frame_scheduler import FrameScheduler, FrameCheck
+from one_dragon.utils import yolo_config_utils
 from one_dragon.utils import thread_utils, os_utils
 from one_dragon.utils.log_utils import log
+from zzz_od.auto_battle.dodge_audio_detector import StreamingAudioDetector
 from zzz_od.context.zzz_context import ZContext
 from zzz_od.yolo.flash_classifier import FlashClassifier
 
@@ -35,6 +36,7 @@ class AudioRecorder:
         self._used_channel = 2  # 使用的音频通道数
         self._sample_len = 0.01  # 每次采样的长度（秒）
         self._chunk_size = int(self._sample_rate * self._sample_len)  # 每个音频块的大小
+        self._window_size = int(self._sample_rate // 2)  # 参与识别的音频长度，0.5秒
 
         self.trigger_threshold = 0.1  # 触发阈值
 
@@ -44,8 +46,31 @@ class AudioRecorder:
         self.filter_b, self.filter_a = butter(self._filter_degree, self._cut_off, btype='highpass', output='ba',
                                               fs=self._sample_rate)  # Butterworth高通滤波
 
-        self.latest_audio = np.empty(shape=(0,), dtype=np.float64)  # 存储最新的音频数据
-        self._update_audio_lock = threading.Lock()
+        self.detector: Optional[StreamingAudioDetector] = None  # 流式声音检测 录制时逐块输入
+
+    @property
+    def sample_rate(self) -> int:
+        """
+        录制的采样率 模板和回放的音频需要使用相同的采样率
+        """
+        return self._sample_rate
+
+    @property
+    def chunk_size(self) -> int:
+        """
+        每次录制的音频块长度
+        """
+        return self._chunk_size
+
+    def create_detector(self, template: np.ndarray) -> StreamingAudioDetector:
+        """
+        使用录制的参数创建声音检测
+        :param template: 模板音频 未滤波 采样率需要与录制的一致
+        :return:
+        """
+        self.detector = StreamingAudioDetector(template, self.filter_b, self.filter_a,
+                                               self._window_size, self._chunk_size)
+        return self.detector
 
     def start_running_async(self) -> None:
         """
@@ -57,7 +82,7 @@ class AudioRecorder:
 
             self.running = True
 
-        self.latest_audio = np.zeros(int(self._sample_rate // 2))  # 初始化音频数据缓冲区，长度为0.5秒
+        self.clear_audio()
         future = _dodge_check_executor.submit(self._record_loop)
         future.add_done_callback(thread_utils.handle_future_result)
 
@@ -82,10 +107,9 @@ class AudioRecorder:
                 else:
                     stream_data = stream_data.T
 
-                with self._update_audio_lock:
-                    # 更新 latest_audio
-                    self.latest_audio[:-len(stream_data)] = self.latest_audio[len(stream_data):]
-                    self.latest_audio[-len(stream_data):] = stream_data
+                detector = self.detector
+                if detector is not None:
+                    detector.feed(stream_data)
 
     def stop_running(self) -> None:
         """
@@ -97,8 +121,9 @@ class AudioRecorder:
         """
         清楚当前录音
         """
-        with self._update_audio_lock:
-            self.latest_audio = np.zeros(int(self._sample_rate // 2))
+        detector = self.detector
+        if detector is not None:
+            detector.reset()
 
 
 class YoloStateEventEnum(Enum):
@@ -115,26 +140,24 @@ class AutoBattleDodgeContext:
     战斗闪避上下文类，用于管理和处理闪避识别相关的逻辑。
     """
 
+    CHECK_DODGE_AUDIO: str = '闪避识别-声音'  # 帧识别调度中的名称
+    CHECK_DODGE_FLASH: str = '闪避识别-闪光'
+
     def __init__(self, ctx: ZContext):
         self.ctx: ZContext = ctx  # 上下文对象
         self.auto_op: ConditionalOperator = ConditionalOperator('', '', is_mock=True)
 
         self._flash_model: Optional[FlashClassifier] = None  # 闪避分类器
         self._audio_recorder: AudioRecorder = AudioRecorder()  # 音频录制器
-        self._audio_template: Optional[np.ndarray] = None  # 音频模板
+        self._audio_template: Optional[np.ndarray] = None  # 音频模板 加载后同时创建声音检测
 
-        # 识别锁，保证每种类型只有一个实例在进行识别
-        self._check_dodge_flash_lock = threading.Lock()
-        self._check_audio_lock = threading.Lock()
+        # 帧识别调度 识别间隔和单实例由调度控制 注册后才有
+        self._frame_scheduler: Optional[FrameScheduler] = None
 
         # 识别间隔
         self._check_dodge_interval: Union[float, List[float]] = 0
         self._check_audio_interval: float = 0.02
 
-        # 上一次识别的时间
-        self._last_check_dodge_time: float = 0
-        self._last_check_audio_time: float = 0
-
         # 音频事件去重时间间隔
         self._audio_event_interval: float = 0.1
         self._last_audio_event_time: float = 0
@@ -169,13 +192,30 @@ class AutoBattleDodgeContext:
         self._check_dodge_interval = check_dodge_interval
         self._check_audio_interval = check_audio_interval
 
-        # 上一次识别的时间
-        self._last_check_dodge_time = 0
-        self._last_check_audio_time = 0
-
         # 异步加载音频模板
         _dodge_check_executor.submit(self.init_audio_template)
 
+    def register_frame_checks(self, scheduler: FrameScheduler) -> None:
+        """
+        注册到帧识别调度 识别间隔和单实例由调度控制
+        闪光识别依赖声音识别的结果
+        :param scheduler: 帧识别调度
+        """
+        self._frame_scheduler = scheduler
+        scheduler.register(FrameCheck(
+            AutoBattleDodgeContext.CHECK_DODGE_AUDIO,
+            lambda screen, screenshot_time: self._check_dodge_audio(screenshot_time),
+            interval=lambda: self._check_audio_interval,
+            cost=2,
+        ))
+        scheduler.register(FrameCheck(
+            AutoBattleDodgeContext.CHECK_DODGE_FLASH,
+            self._check_dodge_flash,
+            interval=lambda: self._check_dodge_interval,
+            cost=10,
+            depends_on=[AutoBattleDodgeContext.CHECK_DODGE_AUDIO],
+        ))
+
     def init_audio_template(self) -> None:
         """
         加载音频模板。
@@ -183,122 +223,87 @@ class AutoBattleDodgeContext:
         if self._audio_template is not None:
             return
         log.info('加载声音模板中')
-        self._audio_template, _ = librosa.load(os.path.join(
+        template, _ = librosa.load(os.path.join(
             os_utils.get_path_under_work_dir('assets', 'template', 'dodge_audio'),
             'template_1.wav'
-        ), sr=32000)
+        ), sr=self._audio_recorder.sample_rate)
 
-        self._audio_template = self._get_filter_wave(self._audio_template)  # 滤波
+        self._audio_recorder.create_detector(template)  # 滤波在检测中进行
+        self._audio_template = template
 
         log.info('加载声音模板完成')
 
-    def check_dodge_flash(self, screen: MatLike, screenshot_time: float, audio_future: Optional[Future[bool]] = None) -> bool:
+    def check_dodge_flash(self, screen: MatLike, screenshot_time: float, audio_future: Optional[Future[bool]] = None) -> Any:
         """
-        识别画面是否有闪光。
+        识别画面是否有闪光 与每帧提交的识别共用识别间隔
+        没有注册到帧识别调度时 直接识别
         :param screen: 屏幕截图
         :param screenshot_time: 截图时间
         :param audio_future: 音频识别结果的Future对象
-        :return: 是否应该闪避 （识别到闪光或者声音）
+        :return: 是否应该闪避 （识别到闪光或者声音） 跳过时为None
         """
-        if not self._check_dodge_flash_lock.acquire(blocking=False):
-            return False
+        if self._frame_scheduler is None:
+            return self._check_dodge_flash(screen, screenshot_time, audio_future)
+        return self._frame_scheduler.run_check(AutoBattleDodgeContext.CHECK_DODGE_FLASH,
+                                               screen, screenshot_time, audio_future)
 
-        try:
-            if screenshot_time - self._last_check_dodge_time < cal_utils.random_in_range(self._check_dodge_interval):
-                # 还没有达到识别间隔
-                return False
-
-            self._last_check_dodge_time = screenshot_time
-
-            result = self._flash_model.run(screen)
-            state_name: Optional[str] = None
-            if result.class_idx == 1:
-                state_name = YoloStateEventEnum.DODGE_RED.value
-            elif result.class_idx == 2:
-                state_name = YoloStateEventEnum.DODGE_YELLOW.value
-            elif audio_future is not None:
-                audio_result = audio_future.result()
-                if audio_result:
-                    state_name = YoloStateEventEnum.DODGE_AUDIO.value
-
-            should_dodge = state_name is not None
-            if should_dodge:
-                self.auto_op.update_state(StateRecord(state_name, screenshot_time))
-
-            return should_dodge
-        except Exception:
-            log.error('识别画面闪光失败', exc_info=True)
-        finally:
-            self._check_dodge_flash_lock.release()
-
-    def check_dodge_audio(self, screenshot_time: float) -> bool:
-        """
-        识别音频是否有闪避提示。
+    def _check_dodge_flash(self, screen: MatLike, screenshot_time: float, audio_future: Optional[Future[bool]] = None) -> bool:
+        """
+        识别画面是否有闪光 不控制识别间隔
+        :param screen: 屏幕截图
         :param screenshot_time: 截图时间
-        :return: 是否识别到音频提示
+        :param audio_future: 音频识别结果的Future对象
+        :return: 是否应该闪避 （识别到闪光或者声音）
         """
-        if not self._check_audio_lock.acquire(blocking=False):
-            return False
-
-        try:
-            if screenshot_time - self._last_check_audio_time < cal_utils.random_in_range(self._check_audio_interval):
-                # 还没有达到识别间隔
-                return False
-            if self._audio_template is None:
-                return False
-            self._last_check_audio_time = screenshot_time
-
-            if self._audio_recorder.latest_audio.size == 0:
-                return False
-
-            corr = self.get_max_corr(self._audio_template, self._audio_recorder.latest_audio)
-            # log.debug('声音相似度 %.2f' % corr)
-
-            # 事件去重逻辑
-            if corr > self._audio_recorder.trigger_threshold:
-                self._last_audio_event_time = screenshot_time
-                self._audio_recorder.clear_audio()
-                return True
-
-            return False
-        except Exception:
-            log.error('识别画面闪光失败', exc_info=True)
-        finally:
-            self._check_audio_lock.release()
-
-    def get_max_corr(self, x: np.ndarray, y: np.ndarray):
+        result = self._flash_model.run(screen)
+        state_name: Optional[str] = None
+        if result.class_idx == 1:
+            state_name = YoloStateEventEnum.DODGE_RED.value
+        elif result.class_idx == 2:
+            state_name = YoloStateEventEnum.DODGE_YELLOW.value
+        elif audio_future is not None:
+            audio_result = audio_future.result()
+            if audio_result:
+                state_name = YoloStateEventEnum.DODGE_AUDIO.value
+
+        should_dodge = state_name is not None
+        if should_dodge:
+            self.auto_op.update_state(StateRecord(state_name, screenshot_time))
+
+        return should_dodge
+
+    def check_dodge_audio(self, screenshot_time: float) -> Any:
         """
-        计算两个音频信号的最大相关性。
-        :param x: 音频信号x
-        :param y: 音频信号y
-        :return: 最大相关性系数
+        识别音频是否有闪避提示 与每帧提交的识别共用识别间隔
+        没有注册到帧识别调度时 直接识别
+        :param screenshot_time: 截图时间
+        :return: 是否识别到音频提示 跳过时为None
         """
-        y = self._get_filter_wave(y)  # 滤波
-
-        # 标准化
-        wx = scale(x, with_mean=False)
-        wy = scale(y, with_mean=False)
+        if self._frame_scheduler is None:
+            return self._check_dodge_audio(screenshot_time)
+        return self._frame_scheduler.run_check(AutoBattleDodgeContext.CHECK_DODGE_AUDIO, None, screenshot_time)
 
-        # 计算NCC
-        if wx.shape[0] > wy.shape[0]:
-            correlation = correlate(wx, wy, mode='same', method='fft') / wx.shape[0]
-        else:
-            correlation = correlate(wy, wx, mode='same', method='fft') / wy.shape[0]
+    def _check_dodge_audio(self, screenshot_time: float) -> bool:
+        """
+        识别音频是否有闪避提示 不控制识别间隔
+        :param screenshot_time: 截图时间
+        :return: 是否识别到音频提示
+        """
+        detector = self._audio_recorder.detector
+        if self._audio_template is None or detector is None:
+            return False
 
-        max_corr = np.max(correlation)
+        # 录制时已经逐块计算 这里只取上次识别后的最高得分
+        corr = detector.pop_peak_score()
+        # log.debug('声音相似度 %.2f' % corr)
 
-        return max_corr
+        # 事件去重逻辑
+        if corr > self._audio_recorder.trigger_threshold:
+            self._last_audio_event_time = screenshot_time
+            self._audio_recorder.clear_audio()
+            return True
 
-    def _get_filter_wave(self, x: np.ndarray):
-        """
-        音频滤波。
-        :param x: 音频信号x
-        :return: 滤波后波形
-        """
-        wx = filtfilt(self._audio_recorder.filter_b,
-                      self._audio_recorder.filter_a,
-                      x)
-        return wx
+        return False
 
     def start_context(self) -> None:
         """
@@ -0,0 +1,272 @@
+import threading
+from collections import deque
+from typing import List, Tuple, Optional, Deque
+
+import numpy as np
+from scipy.fft import rfft, irfft, next_fast_len
+from scipy.signal import lfilter
+
+
+class StreamingAudioDetector:
+
+    def __init__(self, template: np.ndarray,
+                 filter_b: np.ndarray, filter_a: np.ndarray,
+                 window_size: int, block_size: int):
+        """
+        流式的声音模板检测
+        与对整段窗口滤波后做相关计算的结果基本一致 但每个音频块只需要处理这一块的数据
+        - 每个音频块使用 lfilter 连续滤波 保留滤波器状态
+        - 滤波后的音频放在环形缓冲区中 同时维护窗口内的和与平方和 用于标准化
+        - 模板提前反转并做FFT 每个音频块与模板的相关结果 累加到按模板起始位置索引的环形数组上
+          音频块离开窗口时 减去它的贡献 因此数组中始终是当前窗口与模板在每个位置的相关结果
+        - 得分只取与 correlate(mode='same') 相同的位置范围 使原来的阈值仍然适用
+        :param template: 模板音频 未滤波
+        :param filter_b: 滤波器系数b
+        :param filter_a: 滤波器系数a
+        :param window_size: 参与计算的窗口长度 会向上取整为音频块长度的整数倍
+        :param block_size: 每个音频块的长度
+        """
+        self.filter_b: np.ndarray = filter_b
+        self.filter_a: np.ndarray = filter_a
+        self.block_size: int = block_size
+        self.block_cnt: int = (window_size + block_size - 1) // block_size  # 窗口内的音频块数量
+        self.window_size: int = self.block_cnt * block_size
+
+        # 模板与音频使用相同的滤波器 再标准化
+        template = lfilter(filter_b, filter_a, np.asarray(template, dtype=np.float64))
+        template_std = template.std()
+        if template_std > 0:
+            template = template / template_std
+        self.template_len: int = len(template)
+        self._norm_len: int = max(self.template_len, self.window_size)  # 与整段计算时一样 除以较长的长度
+
+        # correlate(mode='same') 保留的模板起始位置范围 用距离窗口最后一个采样点的偏移表示
+        # 较长的一方作为输出长度 居中截取全部重叠位置
+        if self.template_len > self.window_size:
+            self._lag_len: int = self.template_len
+            self._lag_offset: int = (self.window_size - 1) // 2 + self.template_len - 1
+        else:
+            self._lag_len: int = self.window_size
+            self._lag_offset: int = self.window_size + self.template_len - 2 - (self.template_len - 1) // 2
+
+        # 音频块与反转后的模板卷积 即为音频块对每个模板起始位置的相关结果
+        self._contrib_len: int = self.template_len + block_size - 1
+        self._fft_size: int = next_fast_len(self._contrib_len, real=True)
+        self._template_fft: np.ndarray = rfft(template[::-1], self._fft_size)
+
+        self._lock = threading.Lock()
+        self._pending: np.ndarray = np.empty(0, dtype=np.float64)  # 未满一个音频块的数据
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        清空窗口内的音频 滤波器状态也重置
+        """
+        with self._lock:
+            self._filter_state: np.ndarray = np.zeros(max(len(self.filter_a), len(self.filter_b)) - 1)
+            self._pending = np.empty(0, dtype=np.float64)
+
+            self._audio_ring: np.ndarray = np.zeros(self.window_size, dtype=np.float64)  # 滤波后的音频
+            self._audio_sum: float = 0
+            self._audio_sq_sum: float = 0
+            self._block_idx: int = 0  # 已处理的音频块数量
+
+            # 每个模板起始位置的相关结果 按位置对长度取模存放 长度正好覆盖窗口内所有有重叠的位置
+            self._corr_ring: np.ndarray = np.zeros(self.window_size + self.template_len - 1, dtype=np.float64)
+            self._contrib_queue: Deque[np.ndarray] = deque()  # 窗口内每个音频块的相关结果 用于离开窗口时减去
+
+            self.last_score: float = 0
+            self._peak_score: float = 0
+            self._peak_block_idx: int = 0  # 最高得分出现时 已处理的音频块数量
+
+    def feed(self, audio: np.ndarray) -> float:
+        """
+        输入一段新的音频 长度不需要与音频块一致
+        :param audio: 单声道音频
+        :return: 处理后的当前得分
+        """
+        with self._lock:
+            data = np.asarray(audio, dtype=np.float64).ravel()
+            if len(self._pending) > 0:
+                data = np.concatenate([self._pending, data])
+            block_size = self.block_size
+            full_len = len(data) - len(data) % block_size
+            for start in range(0, full_len, block_size):
+                self._process_block(data[start:start + block_size])
+            self._pending = data[full_len:].copy()
+            return self.last_score
+
+    def _process_block(self, block: np.ndarray) -> None:
+        """
+        处理一个音频块 调用前需要上锁
+        :param block: 未滤波的音频块
+        :return:
+        """
+        block_size = self.block_size
+        filtered, self._filter_state = lfilter(self.filter_b, self.filter_a, block, zi=self._filter_state)
+
+        # 环形缓冲区 更新窗口内的和与平方和
+        ring_start = (self._block_idx % self.block_cnt) * block_size
+        old = self._audio_ring[ring_start:ring_start + block_size]
+        self._audio_sum += filtered.sum() - old.sum()
+        self._audio_sq_sum += np.dot(filtered, filtered) - np.dot(old, old)
+        self._audio_ring[ring_start:ring_start + block_size] = filtered
+        if ring_start + block_size == self.window_size:
+            # 每转一圈重新计算一次 避免累计误差
+            self._audio_sum = float(self._audio_ring.sum())
+            self._audio_sq_sum = float(np.dot(self._audio_ring, self._audio_ring))
+
+        # 当前块的起始位置为 a 时 模板起始位置 d 的范围是 [a - M + 1, a + B - 1]
+        # 下标 j = d - (a - M + 1) 时 相关结果是音频块与反转模板卷积的第 j 个值
+        contrib = irfft(rfft(filtered, self._fft_size) * self._template_fft, self._fft_size)[:self._contrib_len]
+
+        a = self._block_idx * block_size
+        if len(self._contrib_queue) == self.block_cnt:
+            # 离开窗口的音频块 前 B 个位置已经不再与窗口重叠 只减去仍在范围内的部分
+            old_contrib = self._contrib_queue.popleft()
+            self._ring_add(a - self.window_size - self.template_len + 1 + block_size, old_contrib, -1)
+        # 新进入范围的位置 [a, a + B) 复用的是已经离开范围的位置 先清零
+        self._ring_fill_zero(a, block_size)
+        self._ring_add(a - self.template_len + 1, contrib, 1)
+        self._contrib_queue.append(contrib[block_size:])
+
+        self._block_idx += 1
+
+        mean = self._audio_sum / self.window_size
+        variance = self._audio_sq_sum / self.window_size - mean * mean
+        if variance > 1e-12:
+            corr_max = self._ring_max(a + block_size - 1 - self._lag_offset, self._lag_len)
+            self.last_score = corr_max / (self._norm_len * np.sqrt(variance))
+        else:
+            self.last_score = 0
+        if self.last_score > self._peak_score:
+            self._peak_score = self.last_score
+            self._peak_block_idx = self._block_idx
+
+    def _ring_add(self, pos: int, values: np.ndarray, sign: int) -> None:
+        """
+        在相关结果的环形数组上 从位置 pos 开始加上或减去 values
+        """
+        ring = self._corr_ring
+        ring_len = len(ring)
+        start = pos % ring_len
+        first = min(len(values), ring_len - start)
+        if sign > 0:
+            ring[start:start + first] += values[:first]
+            ring[:len(values) - first] += values[first:]
+        else:
+            ring[start:start + first] -= values[:first]
+            ring[:len(values) - first] -= values[first:]
+
+    def _ring_fill_zero(self, pos: int, length: int) -> None:
+        ring = self._corr_ring
+        ring_len = len(ring)
+        start = pos % ring_len
+        first = min(length, ring_len - start)
+        ring[start:start + first] = 0
+        ring[:length - first] = 0
+
+    def _ring_max(self, pos: int, length: int) -> float:
+        ring = self._corr_ring
+        ring_len = len(ring)
+        start = pos % ring_len
+        first = min(length, ring_len - start)
+        corr_max = float(ring[start:start + first].max())
+        if length > first:
+            corr_max = max(corr_max, float(ring[:length - first].max()))
+        return corr_max
+
+    def pop_peak_score(self) -> float:
+        """
+        获取上次获取后出现过的最高得分 并重新开始记录
+        两次识别之间处理了多个音频块时 不会漏掉中间的得分
+        最高得分已经超过一个窗口的时长时 不再使用 与只看当前窗口时一致
+        :return:
+        """
+        with self._lock:
+            if self._block_idx - self._peak_block_idx < self.block_cnt:
+                score = self._peak_score
+            else:
+                score = self.last_score
+            self._peak_score = self.last_score
+            self._peak_block_idx = self._block_idx
+            return score
+
+
+def load_wav(file_path: str, sample_rate: int) -> np.ndarray:
+    """
+    读取音频文件 转换成单声道和指定的采样率
+    :param file_path: 文件路径
+    :param sample_rate: 采样率
+    :return:
+    """
+    import librosa
+    audio, _ = librosa.load(file_path, sr=sample_rate, mono=True)
+    return audio
+
+
+def replay_audio(detector: StreamingAudioDetector, audio: np.ndarray, sample_rate: int,
+                 threshold: float, chunk_size: Optional[int] = None) -> Tuple[List[float], List[Tuple[float, float]]]:
+    """
+    离线回放一段音频 按录音时的方式分块输入检测器 用于调整阈值和验证识别效果
+    与实际识别一样 触发后清空窗口
+    :param detector: 检测器
+    :param audio: 单声道音频
+    :param sample_rate: 采样率
+    :param threshold: 触发阈值
+    :param chunk_size: 每次输入的长度 默认为检测器的音频块长度
+    :return: 每次输入后的得分, 触发的时间(秒)和得分
+    """
+    if chunk_size is None:
+        chunk_size = detector.block_size
+    detector.reset()
+    score_list: List[float] = []
+    trigger_list: List[Tuple[float, float]] = []
+    for start in range(0, len(audio) - chunk_size + 1, chunk_size):
+        score = detector.feed(audio[start:start + chunk_size])
+        score_list.append(score)
+        if score > threshold:
+            trigger_list.append(((start + chunk_size) / sample_rate, score))
+            detector.reset()
+    return score_list, trigger_list
+
+
+def replay_wav(detector: StreamingAudioDetector, file_path: str, sample_rate: int,
+               threshold: float, chunk_size: Optional[int] = None) -> Tuple[List[float], List[Tuple[float, float]]]:
+    """
+    离线回放录制好的音频文件
+    :param detector: 检测器
+    :param file_path: 音频文件路径
+    :param sample_rate: 检测器使用的采样率
+    :param threshold: 触发阈值
+    :param chunk_size: 每次输入的长度 默认为检测器的音频块长度
+    :return: 每次输入后的得分, 触发的时间(秒)和得分
+    """
+    return replay_audio(detector, load_wav(file_path, sample_rate), sample_rate, threshold, chunk_size)
+
+
+def __debug(file_path: str):
+    """
+    使用闪避识别的录制参数 回放一个录制好的音频文件 输出触发时间
+    """
+    import os
+    from one_dragon.utils import os_utils
+    from zzz_od.auto_battle.auto_battle_dodge_context import AudioRecorder
+
+    # 滤波器、窗口和音频块长度都与实际录制时一致
+    recorder = AudioRecorder()
+    template = load_wav(os.path.join(
+        os_utils.get_path_under_work_dir('assets', 'template', 'dodge_audio'),
+        'template_1.wav'
+    ), recorder.sample_rate)
+    detector = recorder.create_detector(template)
+    score_list, trigger_list = replay_wav(detector, file_path, recorder.sample_rate,
+                                          threshold=recorder.trigger_threshold, chunk_size=recorder.chunk_size)
+    print('最高得分 %.3f' % (max(score_list) if len(score_list) > 0 else 0))
+    for trigger_time, score in trigger_list:
+        print('%.2fs 触发 得分 %.3f' % (trigger_time, score))
+
+
+if __name__ == '__main__':
+    import sys
+    __debug(sys.argv[1])
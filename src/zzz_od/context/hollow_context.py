@@ -34,7 +34,9 @@ class HollowContext:
 
         self.map_results: List[HollowZeroMap] = []  # 识别的地图结果
         self._visited_nodes: List[HollowZeroMapNode] = []  # 已经去过的点
+        # 地图节点会被持续跟踪并原地更新 以下只保存当时的位置和类型
         self.last_target_node: Optional[HollowZeroMapNode] = None  # 上一次想前往的节点
+        self._last_node_to_move: Optional[HollowZeroMapNode] = None  # 上一次想前往时 第一步需要点击的节点
         self._last_current_node: Optional[HollowZeroMapNode] = None  # 上一次当前所在的点
         self.speed_up_clicked: bool = False  # 是否已经点击加速
         self.invalid_map_times: int = 0  # 识别不到正确地图的次数
@@ -161,7 +163,7 @@ class HollowContext:
                 arr = ['w', 's', 'a', 'd']
                 arr.remove(direction)
                 direction = arr[random.randint(0, len(arr) - 1)]
-            self._last_current_node = current_node
+            self._last_current_node = HollowContext._copy_node_value(current_node)
 
             # 伪造一个节点前往
             if direction == 'w':
@@ -198,7 +200,7 @@ class HollowContext:
         if (self.last_target_node is not None
                 and hollow_map_utils.is_same_node(self.last_target_node, target)):
             # 第一步需要点击的节点都一样 可能是被卡着过不去了
-            last_node_to_move = self.last_target_node.next_node_to_move
+            last_node_to_move = self._last_node_to_move
             curr_node_to_move = target.next_node_to_move
             if hollow_map_utils.is_same_node(last_node_to_move, curr_node_to_move):
                 # 可能识别错了 导致点击的第一个位置不对 这里改为强行点击相邻节点
@@ -211,9 +213,22 @@ class HollowContext:
                     self.update_context_after_move(current_map, target, update_current=False)
                     return None
 
-        self.last_target_node = target
+        self.last_target_node = HollowContext._copy_node_value(target)
+        self._last_node_to_move = HollowContext._copy_node_value(target.next_node_to_move)
         return target
 
+    @staticmethod
+    def _copy_node_value(node: Optional[HollowZeroMapNode]) -> Optional[HollowZeroMapNode]:
+        """
+        复制节点当时的位置和类型
+        地图上的节点每帧都是同一个对象 寻路信息和类型会被原地修改 直接保存的话 下一帧比较时就是和自己比较
+        :param node: 地图上的节点
+        :return:
+        """
+        if node is None:
+            return None
+        return HollowZeroMapNode(node.pos, node.entry, check_time=node.check_time, confidence=node.confidence)
+
     def update_context_after_move(self, current_map: HollowZeroMap, node: HollowZeroMapNode,
                                   update_current: bool = True) -> None:
         """
@@ -297,6 +312,7 @@ class HollowContext:
         if self.level_info is not None:
             self.level_info.to_next_level()
         self.last_target_node = None
+        self._last_node_to_move = None
         self.map_service.clear_map_result()
 
     def init_level_info(self, mission_type_name: str, mission_name: str,
@@ -489,3 +505,47 @@ class HollowContext:
         @return:
         """
         _hollow_context_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def __debug_try_target_node():
+    """
+    连续两帧前往同一个目标 向目标前进了的话 不应该被认为是卡住
+    """
+    from zzz_od.hollow_zero.hollow_map.hollow_map_tracker import HollowMapTracker
+
+    ctx = ZContext()
+    ctx.init_by_config()
+    hollow = HollowContext(ctx)
+    name_2_entry = hollow.data_service.name_2_entry
+
+    def get_nodes(entry_name_list: List[str], check_time: float) -> List[HollowZeroMapNode]:
+        return [
+            HollowZeroMapNode(Rect(500 + i * 100, 500, 600 + i * 100, 600), name_2_entry[entry_name],
+                              check_time=check_time, confidence=0.9)
+            for i, entry_name in enumerate(entry_name_list)
+        ]
+
+    def try_twice(second_frame: List[str]) -> HollowZeroMapNode:
+        hollow.last_target_node = None
+        hollow._visited_nodes.clear()
+        tracker = HollowMapTracker(ctx, get_nodes(['当前', '安全区', '休息区', '零号银行'], 1), 1)
+        target = None
+        for check_time, entry_name_list in [(1, None), (2, second_frame)]:
+            if entry_name_list is not None:
+                tracker.update(get_nodes(entry_name_list, check_time), check_time)
+            hollow_pathfinding.search_map(tracker.map, set(), hollow._visited_nodes)
+            target = [i for i in tracker.map.nodes if i.entry.entry_name == '零号银行'][0]
+            assert hollow.try_target_node(tracker.map, target) is not None
+        return target
+
+    # 向右走了一格 继续前往同一个目标
+    moved = try_twice(['空白已通行', '当前', '休息区', '零号银行'])
+    assert moved.path_go_way == 1
+
+    # 画面没有变化 才是卡住
+    stuck = try_twice(['当前', '安全区', '休息区', '零号银行'])
+    assert stuck.path_go_way == 0
+
+
+if __name__ == '__main__':
+    __debug_try_target_node()
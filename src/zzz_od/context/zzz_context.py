@@ -151,6 +151,9 @@ class ZContext(OneDragonContext):
         """
         OneDragonContext.init_by_config(self)
 
+        from one_dragon.yolo import onnx_session_factory
+        onnx_session_factory.set_session_config(self.model_config.get_onnx_session_config())
+
         from zzz_od.controller.zzz_pc_controller import ZPcController
         from one_dragon.base.config.game_account_config import GamePlatformEnum
         if self.game_account_config.platform == GamePlatformEnum.PC.value.value:
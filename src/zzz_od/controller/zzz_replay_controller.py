@@ -0,0 +1,77 @@
+from typing import Optional, List
+
+from one_dragon.base.controller.replay_controller import ReplayController, ReplayFrame, load_frame_list
+
+
+def _game_key_action(action_name: str):
+    """
+    生成一个游戏按键方法 参数与 ZPcController 中的一致 只记录按键 不实际发送
+    :param action_name: 方法名称
+    """
+    def action(self: 'ZReplayController', press: bool = False, press_time: Optional[float] = None,
+               release: bool = False) -> None:
+        self.record_action(action_name, press=press, press_time=press_time, release=release)
+    action.__name__ = action_name
+    return action
+
+
+class ZReplayController(ReplayController):
+
+    def __init__(self, frame_list: List[ReplayFrame],
+                 realtime: bool = False,
+                 loop: bool = False,
+                 standard_width: int = 1920,
+                 standard_height: int = 1080):
+        """
+        回放录制画面的控制器 提供和 ZPcController 一样的游戏按键方法
+        """
+        ReplayController.__init__(self, frame_list, realtime=realtime, loop=loop,
+                                  standard_width=standard_width, standard_height=standard_height)
+        self.is_moving: bool = False  # 是否正在移动
+
+    @staticmethod
+    def from_dir(frame_dir: str, realtime: bool = False, loop: bool = False, preload: bool = True,
+                 standard_width: int = 1920, standard_height: int = 1080) -> 'ZReplayController':
+        """
+        使用一个文件夹中录制的画面创建
+        """
+        return ZReplayController(load_frame_list(frame_dir, preload=preload), realtime=realtime, loop=loop,
+                                 standard_width=standard_width, standard_height=standard_height)
+
+    def enable_keyboard(self):
+        pass
+
+    def enable_xbox(self):
+        pass
+
+    def enable_ds4(self):
+        pass
+
+    dodge = _game_key_action('dodge')
+    switch_next = _game_key_action('switch_next')
+    switch_prev = _game_key_action('switch_prev')
+    normal_attack = _game_key_action('normal_attack')
+    special_attack = _game_key_action('special_attack')
+    ultimate = _game_key_action('ultimate')
+    chain_left = _game_key_action('chain_left')
+    chain_right = _game_key_action('chain_right')
+    move_w = _game_key_action('move_w')
+    move_s = _game_key_action('move_s')
+    move_a = _game_key_action('move_a')
+    move_d = _game_key_action('move_d')
+    interact = _game_key_action('interact')
+    lock = _game_key_action('lock')
+    chain_cancel = _game_key_action('chain_cancel')
+
+    def turn_by_distance(self, d: float):
+        self.record_action('turn_by_distance', d)
+
+    def start_moving_forward(self) -> None:
+        if self.is_moving:
+            return
+        self.is_moving = True
+        self.move_w(press=True)
+
+    def stop_moving_forward(self) -> None:
+        self.is_moving = False
+        self.move_w(release=True)
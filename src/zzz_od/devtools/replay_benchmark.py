@@ -0,0 +1,170 @@
+import argparse
+import time
+from typing import List, Callable, Optional
+
+from cv2.typing import MatLike
+
+from zzz_od.context.zzz_context import ZContext
+from zzz_od.controller.zzz_replay_controller import ZReplayController
+
+# 识别方法 传入画面和截图时间
+RecognizeFunc = Callable[[MatLike, float], None]
+
+
+class ReplayBenchmarkResult:
+
+    def __init__(self, target: str, latency_list: List[float], total_seconds: float, action_cnt: int):
+        """
+        一次回放测试的结果
+        :param target: 测试的识别
+        :param latency_list: 每帧识别的耗时 秒
+        :param total_seconds: 总耗时 包含截图
+        :param action_cnt: 记录到的操作数量
+        """
+        self.target: str = target
+        self.latency_list: List[float] = sorted(latency_list)
+        self.total_seconds: float = total_seconds
+        self.action_cnt: int = action_cnt
+
+    @property
+    def frame_cnt(self) -> int:
+        return len(self.latency_list)
+
+    @property
+    def fps(self) -> float:
+        return self.frame_cnt / self.total_seconds if self.total_seconds > 0 else 0
+
+    def get_percentile_ms(self, percent: float) -> float:
+        """
+        识别耗时的分位数
+        :param percent: 分位 0~1
+        :return: 毫秒
+        """
+        if self.frame_cnt == 0:
+            return 0
+        return self.latency_list[min(self.frame_cnt - 1, int(self.frame_cnt * percent))] * 1000
+
+    def __str__(self) -> str:
+        if self.frame_cnt == 0:
+            return '%s 没有画面' % self.target
+        return '%s 帧数 %d 帧率 %.1f 平均 %.2fms P50 %.2fms P99 %.2fms 最大 %.2fms 操作 %d' % (
+            self.target, self.frame_cnt, self.fps,
+            sum(self.latency_list) / self.frame_cnt * 1000,
+            self.get_percentile_ms(0.5),
+            self.get_percentile_ms(0.99),
+            self.latency_list[-1] * 1000,
+            self.action_cnt,
+        )
+
+
+def _init_battle(ctx: ZContext, auto_op_name: str) -> tuple[RecognizeFunc, Callable[[], None]]:
+    from zzz_od.auto_battle.auto_battle_operator import AutoBattleOperator
+    auto_op = AutoBattleOperator(ctx, 'auto_battle', auto_op_name)
+    success, msg = auto_op.init_before_running()
+    if not success:
+        raise Exception(msg)
+
+    def recognize(screen: MatLike, screenshot_time: float) -> None:
+        # 同步等待各项识别完成 才能算出每帧的耗时
+        auto_op.auto_battle_context.check_battle_state(screen, screenshot_time,
+                                                       check_battle_end_normal_result=True,
+                                                       sync=True)
+
+    return recognize, auto_op.dispose
+
+
+def _init_screen(ctx: ZContext) -> tuple[RecognizeFunc, Callable[[], None]]:
+    from one_dragon.base.screen import screen_utils
+
+    def recognize(screen: MatLike, screenshot_time: float) -> None:
+        screen_utils.get_match_screen_name(ctx, screen)
+
+    return recognize, lambda: None
+
+
+def _init_hollow(ctx: ZContext) -> tuple[RecognizeFunc, Callable[[], None]]:
+    ctx.hollow.map_service.init_event_yolo()
+    ctx.hollow.map_service.clear_map_result()
+
+    def recognize(screen: MatLike, screenshot_time: float) -> None:
+        ctx.hollow.map_service.cal_map_by_screen(screen, screenshot_time)
+
+    return recognize, ctx.hollow.map_service.clear_map_result
+
+
+def _init_lost_void(ctx: ZContext) -> tuple[RecognizeFunc, Callable[[], None]]:
+    ctx.lost_void.init_lost_void_det_model()
+
+    def recognize(screen: MatLike, screenshot_time: float) -> None:
+        ctx.lost_void.detect_to_go(screen, screenshot_time)
+
+    return recognize, lambda: None
+
+
+TARGET_LIST: List[str] = ['battle', 'screen', 'hollow', 'lost_void']
+
+
+def run_benchmark(ctx: ZContext, controller: ZReplayController, target: str,
+                  auto_op_name: str = '全配队通用') -> ReplayBenchmarkResult:
+    """
+    回放一遍录制的画面 每帧运行一次识别
+    :param ctx: 上下文 需要已经使用回放控制器
+    :param controller: 回放控制器
+    :param target: 测试的识别 battle / screen / hollow / lost_void
+    :param auto_op_name: 测试自动战斗时使用的配置
+    :return: 测试结果
+    """
+    if target == 'battle':
+        recognize, dispose = _init_battle(ctx, auto_op_name)
+    elif target == 'screen':
+        recognize, dispose = _init_screen(ctx)
+    elif target == 'hollow':
+        recognize, dispose = _init_hollow(ctx)
+    elif target == 'lost_void':
+        recognize, dispose = _init_lost_void(ctx)
+    else:
+        raise ValueError('未知的测试目标 %s' % target)
+
+    controller.reset()
+    latency_list: List[float] = []
+    start_time = time.perf_counter()
+    try:
+        while not controller.finished:
+            screen = controller.screenshot()
+            # 实时回放时与实际运行一致 使用当前时间; 全速回放时使用录制时间 使各项识别的间隔与录制时一致
+            screenshot_time = time.time() if controller.realtime else controller.last_frame_time
+            recognize_start_time = time.perf_counter()
+            recognize(screen, screenshot_time)
+            latency_list.append(time.perf_counter() - recognize_start_time)
+    finally:
+        dispose()
+    total_seconds = time.perf_counter() - start_time
+
+    return ReplayBenchmarkResult(target, latency_list, total_seconds, len(controller.action_list))
+
+
+def main(args_list: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='回放录制的画面 测试各项识别的帧率和耗时')
+    parser.add_argument('frame_dir', help='录制画面的文件夹 文件名以毫秒时间戳结尾 例如 _1735134333210.png')
+    parser.add_argument('--target', default='all', choices=['all'] + TARGET_LIST, help='测试的识别')
+    parser.add_argument('--realtime', action='store_true', help='按录制时的时间回放 处理慢时跳过中间的帧')
+    parser.add_argument('--auto-op', default='全配队通用', help='测试自动战斗时使用的配置')
+    args = parser.parse_args(args_list)
+
+    controller = ZReplayController.from_dir(args.frame_dir, realtime=args.realtime)
+    if len(controller.frame_list) == 0:
+        print('没有找到录制的画面')
+        return
+
+    ctx = ZContext()
+    ctx.init_ocr()
+    ctx.controller = controller
+
+    target_list = TARGET_LIST if args.target == 'all' else [args.target]
+    print('录制画面 %d 帧 %s' % (len(controller.frame_list), '实时回放' if args.realtime else '全速回放'))
+    for target in target_list:
+        print(run_benchmark(ctx, controller, target, auto_op_name=args.auto_op))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,9 @@
-import difflib
 
 import os
 import yaml
 from typing import List, Optional
 
+from one_dragon.base.matcher import fuzzy_match_index
 from one_dragon.utils import os_utils
 from one_dragon.utils.i18_utils import gt
 from one_dragon.utils.log_utils import log
@@ -59,7 +59,7 @@ class MapAreaService:
         :return:
         """
         target_list = [gt(area.area_name, 'game') for area in self.area_list]
-        results = difflib.get_close_matches(ocr_result, target_list, n=1)
+        results = fuzzy_match_index.get_fuzzy_match_index(target_list).get_close_matches(ocr_result, n=1)
 
         if results is not None and len(results) > 0:
             idx = target_list.index(results[0])
@@ -95,7 +95,7 @@ class MapAreaService:
         """
         area = self.area_name_map[area_name]
         target_list = [gt(tp, 'game') for tp in area.tp_list]
-        results = difflib.get_close_matches(ocr_result, target_list, n=1)
+        results = fuzzy_match_index.get_fuzzy_match_index(target_list).get_close_matches(ocr_result, n=1)
 
         if results is not None and len(results) > 0:
             idx = target_list.index(results[0])
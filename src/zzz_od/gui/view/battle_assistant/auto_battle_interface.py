@@ -71,6 +71,12 @@ class AutoBattleInterface(AppRunInterface):
         self.screenshot_interval_opt.value_changed.connect(self._on_screenshot_interval_changed)
         top_widget.add_widget(self.screenshot_interval_opt)
 
+        self.pipeline_screenshot_opt = SwitchSettingCard(
+            icon=FluentIcon.GAME, title='并行截图',
+            content='截图和识别同时进行 识别总是使用最新的画面 可以提高识别频率'
+        )
+        top_widget.add_widget(self.pipeline_screenshot_opt)
+
         self.gamepad_type_opt = ComboBoxSettingCard(
             icon=FluentIcon.GAME, title='手柄类型',
             content='需先安装虚拟手柄依赖，参考文档或使用安装器。仅在战斗助手生效。',
@@ -118,6 +124,7 @@ class AutoBattleInterface(AppRunInterface):
         self.config_opt.setValue(self.ctx.battle_assistant_config.auto_battle_config)
         self.gpu_opt.init_with_adapter(self.ctx.model_config.get_prop_adapter('flash_classifier_gpu'))
         self.screenshot_interval_opt.setValue(str(self.ctx.battle_assistant_config.screenshot_interval))
+        self.pipeline_screenshot_opt.init_with_adapter(self.ctx.battle_assistant_config.get_prop_adapter('pipeline_screenshot'))
         self.gamepad_type_opt.setValue(self.ctx.battle_assistant_config.gamepad_type)
         self.debug_btn.setText(f"{self.ctx.key_debug.upper()} {gt('调试')}")
         self.ctx.listen_event(AutoBattleApp.EVENT_OP_LOADED, self._on_auto_op_loaded_event)
@@ -239,4 +246,5 @@ class AutoBattleInterface(AppRunInterface):
         self.config_opt.setValue(self.ctx.battle_assistant_config.auto_battle_config)
         self.gpu_opt.init_with_adapter(self.ctx.model_config.get_prop_adapter('flash_classifier_gpu'))
         self.screenshot_interval_opt.setValue(str(self.ctx.battle_assistant_config.screenshot_interval))
+        self.pipeline_screenshot_opt.init_with_adapter(self.ctx.battle_assistant_config.get_prop_adapter('pipeline_screenshot'))
         self.gamepad_type_opt.setValue(self.ctx.battle_assistant_config.gamepad_type)
\ No newline at end of file
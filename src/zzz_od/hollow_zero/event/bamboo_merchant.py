@@ -161,28 +161,33 @@ class BambooMerchant(ZOperation):
 
         if len(result_result_map) == 0:
             # 没有识别的情况 可能是价格为0识别不到 额外再每个价格格子识别一次
+            price_area_list = []
+            to_ocr_list = []
             for i in range(2, 4):
                 for j in range(1, i+1):
                     area = self.ctx.screen_loader.get_area('零号空洞-商店', f'商品价格-{i}-{j}')
                     part = cv2_utils.crop_image_only(screen, area.rect)
                     mask = cv2.inRange(part, (240, 140, 0), (255, 255, 50))
                     mask = cv2_utils.dilate(mask, 5)
-                    to_ocr = cv2.bitwise_and(part, part, mask=mask)
-                    # 底层onnx的ocr 使用 run_ocr 会对只有一个0的情况识别不到 只能用这个方法
-                    ocr_result = self.ctx.ocr.run_ocr_single_line(to_ocr)
-                    for special_char in ['.', '。', 'o', 'O']:  # 0 有可能被识别成其它字符 特殊处理
-                        ocr_result = ocr_result.replace(special_char, '0')
-                    digit = str_utils.get_positive_digits(ocr_result, None)
-                    if digit is None:
-                        continue
-                    # 构造返回结果
-                    digit_str = str(digit)
-                    if digit_str not in result_result_map:
-                        result_result_map[digit_str] = MatchResultList(only_best=False)
-                    result_result_map[digit_str].append(
-                        MatchResult(1, area.left_top.x, area.left_top.y, area.width, area.height,
-                                    data=digit_str)
-                    )
+                    price_area_list.append(area)
+                    to_ocr_list.append(cv2.bitwise_and(part, part, mask=mask))
+
+            # 底层onnx的ocr 使用 run_ocr 会对只有一个0的情况识别不到 只能用这个方法
+            ocr_result_list = self.ctx.ocr.run_ocr_single_line_batch(to_ocr_list)
+            for area, ocr_result in zip(price_area_list, ocr_result_list):
+                for special_char in ['.', '。', 'o', 'O']:  # 0 有可能被识别成其它字符 特殊处理
+                    ocr_result = ocr_result.replace(special_char, '0')
+                digit = str_utils.get_positive_digits(ocr_result, None)
+                if digit is None:
+                    continue
+                # 构造返回结果
+                digit_str = str(digit)
+                if digit_str not in result_result_map:
+                    result_result_map[digit_str] = MatchResultList(only_best=False)
+                result_result_map[digit_str].append(
+                    MatchResult(1, area.left_top.x, area.left_top.y, area.width, area.height,
+                                data=digit_str)
+                )
 
         return ocr_result_map
 
@@ -1,9 +1,9 @@
 import cv2
-import difflib
 from cv2.typing import MatLike
 from typing import Optional, List, ClassVar
 
 from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.base.matcher import fuzzy_match_index
 from one_dragon.base.operation.operation_edge import node_from
 from one_dragon.base.operation.operation_node import operation_node
 from one_dragon.base.operation.operation_round_result import OperationRoundResult
@@ -103,7 +103,7 @@ class CallForSupport(ZOperation):
         agent_list: List[Agent] = [agent.value for agent in AgentEnum]
         target_list: List[str] = [gt(agent.value.agent_name, 'game') for agent in AgentEnum]
 
-        results = difflib.get_close_matches(to_match, target_list, n=1, cutoff=0.1)
+        results = fuzzy_match_index.get_fuzzy_match_index(target_list).get_close_matches(to_match, n=1, cutoff=0.1)
 
         if results is not None and len(results) > 0:
             idx = target_list.index(results[0])
@@ -252,7 +252,7 @@ class CallForSupport(ZOperation):
         target_list = [gt(i.word, 'game') for i in opts]
         ocr_result_map = self.ctx.ocr.run_ocr(to_ocr)
         for ocr_result, mrl in ocr_result_map.items():
-            results = difflib.get_close_matches(ocr_result, target_list, n=1)
+            results = fuzzy_match_index.get_fuzzy_match_index(target_list).get_close_matches(ocr_result, n=1)
             if results is None or len(results) == 0:
                 continue
             opt = opts[target_list.index(results[0])]
@@ -7,6 +7,7 @@ from typing import Optional, List
 
 from one_dragon.base.geometry.point import Point
 from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.base.matcher import fuzzy_match_index
 from one_dragon.base.matcher.match_result import MatchResult, MatchResultList
 from one_dragon.base.operation.operation_round_result import OperationRoundResult
 from one_dragon.base.screen import screen_utils
@@ -157,6 +158,8 @@ def check_event_text_and_run(op: ZOperation, screen: MatLike, handlers: List[Eve
             bottom_opt_pos = mrl.max
 
     handler_str_list = [gt(handler.target_cn, 'game') for handler in handlers]
+    # 选项是固定的 反向匹配复用索引; 识别结果每帧都不一样 正向匹配直接遍历
+    handler_index = fuzzy_match_index.get_fuzzy_match_index(handler_str_list)
 
     # 由于选项和识别的文本都是多个，多对多的情况下需要双向匹配才算成功匹配
     for handler in handlers:
@@ -168,7 +171,7 @@ def check_event_text_and_run(op: ZOperation, screen: MatLike, handlers: List[Eve
 
         ocr_result = results[0]
         # 同时需要反向匹配到一样的
-        results2 = difflib.get_close_matches(ocr_result, handler_str_list, n=1)
+        results2 = handler_index.get_close_matches(ocr_result, n=1)
         if results2 is None or len(results2) == 0 or results2[0] != handler_event_str:
             continue
 
@@ -17,14 +17,18 @@ def get_to_choose_list(ctx: ZContext, screen: MatLike, target_cn: str, target_lc
     """
     result_list: List[MatchResult] = []
 
-    for i in range(1, 4):
-        name_area = ctx.screen_loader.get_area('零号空洞-事件', '鸣徽名称-%d' % i)
-        confirm_area = ctx.screen_loader.get_area('零号空洞-事件', '鸣徽选择-%d' % i)
-
-        name_full_str = ctx.ocr.run_ocr_single_line(cv2_utils.crop_image_only(screen, name_area.rect))
-
-        confirm_str = ctx.ocr.run_ocr_single_line(cv2_utils.crop_image_only(screen, confirm_area.rect))
-        confirm_str = confirm_str.strip()
+    name_area_list = [ctx.screen_loader.get_area('零号空洞-事件', '鸣徽名称-%d' % i) for i in range(1, 4)]
+    confirm_area_list = [ctx.screen_loader.get_area('零号空洞-事件', '鸣徽选择-%d' % i) for i in range(1, 4)]
+
+    # 6个区域一起识别
+    ocr_result_list = ctx.ocr.run_ocr_single_line_batch(
+        [cv2_utils.crop_image_only(screen, area.rect) for area in name_area_list + confirm_area_list]
+    )
+
+    for i in range(3):
+        confirm_area = confirm_area_list[i]
+        name_full_str = ocr_result_list[i]
+        confirm_str = ocr_result_list[i + 3].strip()
 
         if not str_utils.find_by_lcs(gt(target_cn, 'game'), confirm_str, percent=target_lcs_percent):
             continue
@@ -0,0 +1,234 @@
+import copy
+from collections import deque
+from typing import List, Optional, Tuple, Deque
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from zzz_od.context.zzz_context import ZContext
+from zzz_od.hollow_zero.hollow_map import hollow_map_utils
+from zzz_od.hollow_zero.hollow_map.hollow_zero_map import HollowZeroMap, HollowZeroMapNode
+
+
+class HollowMapNodeHistory:
+
+    def __init__(self, max_size: int):
+        """
+        一个节点的识别历史
+        :param max_size: 最多保留的记录数量
+        """
+        self.record_list: Deque[Tuple[float, str, float]] = deque(maxlen=max_size)  # 识别时间, 格子类型, 置信度
+        self.seen_times: int = 0  # 被识别到的总次数
+
+    def add(self, check_time: float, entry_name: str, confidence: float) -> None:
+        self.record_list.append((check_time, entry_name, confidence))
+        self.seen_times += 1
+
+    @property
+    def last_entry_name(self) -> Optional[str]:
+        return self.record_list[-1][1] if len(self.record_list) > 0 else None
+
+    def get_avg_confidence(self, entry_name: Optional[str] = None) -> float:
+        """
+        历史记录中的平均置信度
+        :param entry_name: 传入时 只计算这个类型的记录
+        :return:
+        """
+        conf_list = [i[2] for i in self.record_list if entry_name is None or i[1] == entry_name]
+        return sum(conf_list) / len(conf_list) if len(conf_list) > 0 else 0
+
+
+class HollowMapTracker:
+
+    def __init__(self, ctx: ZContext, nodes: List[HollowZeroMapNode], check_time: float,
+                 history_size: int = 10):
+        """
+        持续跟踪一个空洞地图
+        每帧识别到的节点与地图上已有的节点按中心点距离进行一对一匹配(匈牙利算法)
+        匹配上的节点按 merge_node 的规则更新 没匹配上的新节点加入地图
+        地图对象和节点对象保持不变 只重新计算位置或类型发生变化的节点相关的边
+        :param ctx: 上下文
+        :param nodes: 第一帧识别到的节点
+        :param check_time: 识别时间
+        :param history_size: 每个节点保留的识别记录数量
+        """
+        self.ctx: ZContext = ctx
+        self.history_size: int = history_size
+
+        self.map: HollowZeroMap = hollow_map_utils.construct_map_from_nodes(ctx, nodes, check_time)
+        self.history_list: List[HollowMapNodeHistory] = []  # 与地图节点一一对应
+        for node in nodes:
+            self.history_list.append(self._new_history(node))
+
+        # 边的邻接矩阵 以及计算时使用的节点属性 用于判断哪些节点的边需要重新计算
+        node_cnt = len(nodes)
+        self._edge_matrix: np.ndarray = np.zeros((node_cnt, node_cnt), dtype=bool)
+        for i, j_list in self.map.edges.items():
+            self._edge_matrix[i, j_list] = True
+        self._edge_key_list: List[tuple] = [HollowMapTracker._get_edge_key(node) for node in nodes]
+
+    def _new_history(self, node: HollowZeroMapNode) -> HollowMapNodeHistory:
+        history = HollowMapNodeHistory(self.history_size)
+        history.add(node.check_time, node.entry.entry_name, node.confidence)
+        return history
+
+    @staticmethod
+    def _get_edge_key(node: HollowZeroMapNode) -> tuple:
+        """
+        影响边的节点属性
+        """
+        return node.pos.x1, node.pos.y1, node.pos.x2, node.pos.y2, node.entry.entry_name, node.entry.can_go
+
+    def update(self, nodes: List[HollowZeroMapNode], check_time: float) -> bool:
+        """
+        使用新一帧识别到的节点更新地图
+        :param nodes: 识别到的节点 更新后可能会成为地图的节点 不应再在其它地方使用
+        :param check_time: 识别时间
+        :return: 是否同一个地图 不是时地图不会有任何改变
+        """
+        map_nodes = self.map.nodes
+        match_list = self._match(nodes, map_nodes)
+
+        # 一般是一步移动后的变化 大部分节点都应该一致 两边都要有一半以上的节点一致
+        # 只有一边满足时 可能是进入了盲盒区域 区域里的少量格子刚好跟外层地图重合
+        same_node_cnt = 0
+        for node_idx, map_idx in match_list:
+            if nodes[node_idx].entry.entry_name == map_nodes[map_idx].entry.entry_name:
+                same_node_cnt += 1
+        if same_node_cnt < len(nodes) * 0.5 or same_node_cnt < len(map_nodes) * 0.5:
+            return False
+
+        # 先计算合并结果 新识别的节点作为合并到的节点
+        # 使用副本计算 不是同一个地图时 不影响识别到的节点
+        merged_map: dict[int, HollowZeroMapNode] = {}  # 新节点下标 -> 合并结果
+        matched_map_idx: set[int] = set()
+        for node_idx, map_idx in match_list:
+            merged = copy.copy(nodes[node_idx])
+            hollow_map_utils.merge_node(merged, map_nodes[map_idx])
+            merged_map[node_idx] = merged
+            matched_map_idx.add(map_idx)
+
+        # 合并后没有[当前]节点的 不认为是同一个地图
+        has_current = any(merged_map.get(i, nodes[i]).entry.entry_name == '当前' for i in range(len(nodes)))
+        if not has_current:
+            has_current = any(map_nodes[i].entry.entry_name == '当前'
+                              for i in range(len(map_nodes)) if i not in matched_map_idx)
+        if not has_current:
+            return False
+
+        # 匹配上的节点 将合并结果写回地图上的节点
+        for node_idx, map_idx in match_list:
+            node = nodes[node_idx]
+            merged = merged_map[node_idx]
+            map_node = map_nodes[map_idx]
+            map_node.pos = merged.pos
+            map_node.entry = merged.entry
+            map_node.confidence = merged.confidence
+            map_node.check_time = merged.check_time
+            self.history_list[map_idx].add(node.check_time, node.entry.entry_name, node.confidence)
+
+        # 没匹配上的节点 加入地图
+        for node_idx in range(len(nodes)):
+            if node_idx in merged_map:
+                continue
+            map_nodes.append(nodes[node_idx])
+            self.history_list.append(self._new_history(nodes[node_idx]))
+
+        self.map.current_idx = hollow_map_utils.cal_current_idx(self.ctx, map_nodes)
+        self.map.check_time = max(self.map.check_time, check_time)
+        self._update_edges()
+
+        return True
+
+    @staticmethod
+    def _match(nodes: List[HollowZeroMapNode], map_nodes: List[HollowZeroMapNode]) -> List[Tuple[int, int]]:
+        """
+        新识别的节点与地图上的节点一对一匹配
+        只有中心距离小于最短边一半的节点可以匹配 在此基础上使匹配数量最多、总距离最小
+        :param nodes: 新识别的节点
+        :param map_nodes: 地图上的节点
+        :return: 匹配结果 (新节点下标, 地图节点下标)
+        """
+        if len(nodes) == 0 or len(map_nodes) == 0:
+            return []
+
+        pos_1 = hollow_map_utils.get_pos_array(nodes)
+        pos_2 = hollow_map_utils.get_pos_array(map_nodes)
+        center_1 = (pos_1[:, :2] + pos_1[:, 2:]) // 2
+        center_2 = (pos_2[:, :2] + pos_2[:, 2:]) // 2
+        side_1 = np.min(pos_1[:, 2:] - pos_1[:, :2], axis=1)
+        side_2 = np.min(pos_2[:, 2:] - pos_2[:, :2], axis=1)
+
+        diff = center_1[:, None, :] - center_2[None, :, :]
+        dis = np.sqrt(np.sum(diff * diff, axis=2))
+        can_match = dis < np.minimum(side_1[:, None], side_2[None, :]) // 2
+
+        # 只使用有候选的行和列 不能匹配的位置使用一个足够大的代价
+        row_idx = np.nonzero(can_match.any(axis=1))[0]
+        col_idx = np.nonzero(can_match.any(axis=0))[0]
+        if len(row_idx) == 0:
+            return []
+        sub_match = can_match[np.ix_(row_idx, col_idx)]
+        sub_dis = dis[np.ix_(row_idx, col_idx)]
+        cost = np.where(sub_match, sub_dis, sub_dis.max() * len(row_idx) + 1e6)
+        assign_row, assign_col = linear_sum_assignment(cost)
+
+        return [(int(row_idx[r]), int(col_idx[c]))
+                for r, c in zip(assign_row, assign_col)
+                if sub_match[r, c]]
+
+    def _update_edges(self) -> None:
+        """
+        重新计算位置或类型有变化的节点相关的边
+        地图节点在外部被修改时(例如移动后更新[当前]节点) 也会在这里更新
+        """
+        map_nodes = self.map.nodes
+        node_cnt = len(map_nodes)
+        old_cnt = self._edge_matrix.shape[0]
+        if node_cnt > old_cnt:
+            edge_matrix = np.zeros((node_cnt, node_cnt), dtype=bool)
+            edge_matrix[:old_cnt, :old_cnt] = self._edge_matrix
+            self._edge_matrix = edge_matrix
+            self._edge_key_list.extend([None] * (node_cnt - old_cnt))
+
+        changed_idx: List[int] = []
+        for idx in range(node_cnt):
+            edge_key = HollowMapTracker._get_edge_key(map_nodes[idx])
+            if edge_key != self._edge_key_list[idx]:
+                self._edge_key_list[idx] = edge_key
+                changed_idx.append(idx)
+        if len(changed_idx) == 0:
+            return
+
+        screen_width = self.ctx.project_config.screen_standard_width
+        screen_height = self.ctx.project_config.screen_standard_height
+        changed_nodes = [map_nodes[i] for i in changed_idx]
+        row_matrix = hollow_map_utils.cal_edge_matrix(changed_nodes, map_nodes, screen_width, screen_height)
+        col_matrix = hollow_map_utils.cal_edge_matrix(map_nodes, changed_nodes, screen_width, screen_height)
+
+        # 变化节点对应的列有改变的行 也需要更新边
+        refresh_rows = set(changed_idx)
+        col_changed = np.nonzero((self._edge_matrix[:, changed_idx] != col_matrix).any(axis=1))[0]
+        refresh_rows.update(int(i) for i in col_changed)
+
+        self._edge_matrix[:, changed_idx] = col_matrix
+        self._edge_matrix[changed_idx, :] = row_matrix
+
+        edges = self.map.edges
+        for i in refresh_rows:
+            j_list = [int(j) for j in np.nonzero(self._edge_matrix[i])[0]]
+            if len(j_list) > 0:
+                edges[i] = j_list
+            elif i in edges:
+                del edges[i]
+
+    def get_node_history(self, node: HollowZeroMapNode) -> Optional[HollowMapNodeHistory]:
+        """
+        获取地图上一个节点的识别历史
+        :param node: 地图上的节点
+        :return:
+        """
+        for idx, map_node in enumerate(self.map.nodes):
+            if map_node is node:
+                return self.history_list[idx]
+        return None
@@ -1,5 +1,8 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
+import numpy as np
+
+from one_dragon.base.geometry.point import Point
 from one_dragon.base.geometry.rectangle import Rect
 from one_dragon.utils import cal_utils
 from one_dragon.yolo.detect_utils import DetectFrameResult
@@ -8,16 +11,18 @@ from zzz_od.hollow_zero.game_data.hollow_zero_event import HollowZeroEntry
 from zzz_od.hollow_zero.hollow_map.hollow_zero_map import HollowZeroMap, HollowZeroMapNode
 
 
-def construct_map_from_yolo_result(
-        ctx: ZContext,
+def construct_nodes_from_yolo_result(
         detect_result: DetectFrameResult,
         name_2_entry: dict[str, HollowZeroEntry]
-) -> Optional[HollowZeroMap]:
+) -> List[HollowZeroMapNode]:
     """
-    根据识别结果构造地图
+    根据识别结果构造节点 同一位置的格子和底座会合并成一个节点
     """
     nodes: List[HollowZeroMapNode] = []
     unknown = name_2_entry['未知']
+    node_index = NodeGridIndex(_cal_grid_cell_size(
+        [min(result.x2 - result.x1, result.y2 - result.y1) for result in detect_result.results]
+    ))
 
     for result in detect_result.results:
         entry_name = result.detect_class.class_name[5:]
@@ -34,14 +39,11 @@ def construct_map_from_yolo_result(
             pos = Rect(result.x1, result.y1, result.x2, result.y2 + height // 3)
 
         # 判断与已有的节点是否重复
-        to_merge: Optional[HollowZeroMapNode] = None
-        for existed in nodes:
-            min_dis = min(pos.height, pos.width, existed.pos.height, existed.pos.width) // 2
-            if cal_utils.distance_between(pos.center, existed.pos.center) < min_dis:
-                to_merge = existed
-                break
-
-        if to_merge is not None:
+        to_merge_idx = node_index.find_same_pos(nodes, pos)
+
+        if to_merge_idx is not None:
+            to_merge = nodes[to_merge_idx]
+            old_center = to_merge.pos.center
             if to_merge.entry.is_base and not entry.is_base:  # 旧的是底座 那么将新的类型赋值上去
                 to_merge.entry = entry
                 to_merge.pos.y1 = pos.y1  # 使用具体类型的坐标
@@ -51,20 +53,19 @@ def construct_map_from_yolo_result(
                 to_merge.pos.y2 = pos.y2
             else:
                 pass
+            node_index.move(to_merge_idx, old_center, to_merge.pos.center)
         else:
             node = HollowZeroMapNode(pos, entry,
                                      check_time=detect_result.run_time,
                                      confidence=result.score)
+            node_index.add(len(nodes), pos.center)
             nodes.append(node)
 
     for node in nodes:
         if node.entry.is_base:  # 只识别到底座的 赋值为未知
             node.entry = unknown
 
-    if len(nodes) > 0:  # 有识别到节点才认为是有地图
-        return construct_map_from_nodes(ctx, nodes, detect_result.run_time)
-    else:
-        return None
+    return nodes
 
 
 def construct_map_from_nodes(
@@ -72,6 +73,22 @@ def construct_map_from_nodes(
         nodes: List[HollowZeroMapNode],
         check_time: float
 ) -> HollowZeroMap:
+    current_idx = cal_current_idx(ctx, nodes)
+    edges = _cal_edges(nodes,
+                       ctx.project_config.screen_standard_width,
+                       ctx.project_config.screen_standard_height)
+
+    return HollowZeroMap(nodes, current_idx, edges, check_time=check_time)
+
+
+def cal_current_idx(ctx: ZContext, nodes: List[HollowZeroMapNode]) -> Optional[int]:
+    """
+    找到[当前]节点的下标
+    出现多个[当前]节点时 较早识别的会被设置为未知
+    :param ctx: 上下文
+    :param nodes: 节点列表
+    :return: 下标 没有[当前]节点时返回None
+    """
     current_idx: Optional[int] = None
     for i in range(len(nodes)):
         if nodes[i].entry.entry_name == '当前':
@@ -86,117 +103,96 @@ def construct_map_from_nodes(
             else:
                 current_idx = i
 
-    edges: dict[int, List[int]] = {}
-
-    for i in range(len(nodes)):
-        node_1 = nodes[i]
-        if (node_1.pos.x1 < 0
-                or node_1.pos.y1 < 0
-                or node_1.pos.x2 >= ctx.project_config.screen_standard_width
-                or node_1.pos.y2 >= ctx.project_config.screen_standard_height
-        ):
-            continue
-
-        for j in range(len(nodes)):
-            node_2 = nodes[j]
-            if (node_2.pos.x1 < 0
-                    or node_2.pos.y1 < 0
-                    or node_2.pos.x2 >= ctx.project_config.screen_standard_width
-                    or node_2.pos.y2 >= ctx.project_config.screen_standard_height
-            ):
-                continue
-
-            if not node_1.entry.can_go or not node_2.entry.can_go:
-                continue
-
-            if _at_left(node_1, node_2):  # 1在2左边
-                if node_2.entry.entry_name in ['轨道-左']:
-                    pass
-                elif node_1.entry.entry_name in ['轨道-上', '轨道-下', '轨道-左']:
-                    pass
-                else:
-                    _add_directed_edge(edges, i, j)
-            elif _at_right(node_1, node_2):  # 1在2右边
-                if node_2.entry.entry_name in ['轨道-右']:
-                    pass
-                elif node_1.entry.entry_name in ['轨道-上', '轨道-下', '轨道-右']:
-                    pass
-                else:
-                    _add_directed_edge(edges, i, j)
-            elif _above(node_1, node_2):  # 1在2上边
-                if node_2.entry.entry_name in ['轨道-上']:
-                    pass
-                elif node_1.entry.entry_name in ['轨道-左', '轨道-右', '轨道-上']:
-                    pass
-                else:
-                    _add_directed_edge(edges, i, j)
-            elif _under(node_1, node_2):  # 1在2下边
-                if node_2.entry.entry_name in ['轨道-下']:
-                    pass
-                elif node_1.entry.entry_name in ['轨道-左', '轨道-右', '轨道-下']:
-                    pass
-                else:
-                    _add_directed_edge(edges, i, j)
-
-    return HollowZeroMap(nodes, current_idx, edges, check_time=check_time)
+    return current_idx
 
 
-def _at_left(node_1: HollowZeroMapNode, node_2: HollowZeroMapNode) -> bool:
+def get_pos_array(nodes: List[HollowZeroMapNode]) -> np.ndarray:
     """
-    1在2左边
-    :param node_1:
-    :param node_2:
-    :return:
+    节点的坐标数组
+    :param nodes: 节点列表
+    :return: 形状为 (n, 4) 的数组 每行为 x1, y1, x2, y2
     """
-    min_width = min(node_1.pos.width,  node_2.pos.width) // 4
-    return abs(node_1.pos.x2 - node_2.pos.x1) <= min_width and _is_same_row(node_1, node_2)
+    pos_arr = np.empty((len(nodes), 4), dtype=np.int64)
+    for i, node in enumerate(nodes):
+        pos_arr[i] = (node.pos.x1, node.pos.y1, node.pos.x2, node.pos.y2)
+    return pos_arr
 
 
-def _at_right(node_1: HollowZeroMapNode, node_2: HollowZeroMapNode) -> bool:
+def _cal_edges(nodes: List[HollowZeroMapNode], screen_width: int, screen_height: int) -> dict[int, List[int]]:
     """
-    1在2右边
-    :param node_1:
-    :param node_2:
-    :return:
+    计算节点之间的边 使用数组一次计算所有节点对
+    结果与逐对判断 左边、右边、上边、下边 一致 每个节点的边按下标从小到大
+    :param nodes: 节点列表
+    :param screen_width: 画面宽度 超出画面的节点不连边
+    :param screen_height: 画面高度
+    :return: 节点下标 -> 可以移动到的节点下标
     """
-    min_width = min(node_1.pos.width,  node_2.pos.width) // 4
-    return abs(node_1.pos.x1 - node_2.pos.x2) <= min_width and _is_same_row(node_1, node_2)
+    edges: dict[int, List[int]] = {}
+    if len(nodes) == 0:
+        return edges
 
+    connected = cal_edge_matrix(nodes, nodes, screen_width, screen_height)
+    for i, j in zip(*np.nonzero(connected)):
+        _add_directed_edge(edges, int(i), int(j))
 
-def _above(node_1: HollowZeroMapNode, node_2: HollowZeroMapNode) -> bool:
-    """
-    1在2上边
-    :param node_1:
-    :param node_2:
-    :return:
-    """
-    min_height = min(node_1.pos.height,  node_2.pos.height) // 4
-    return abs(node_1.pos.y2 - node_2.pos.y1) <= min_height and _is_same_col(node_1, node_2)
+    return edges
 
 
-def _under(node_1: HollowZeroMapNode, node_2: HollowZeroMapNode) -> bool:
+def cal_edge_matrix(from_nodes: List[HollowZeroMapNode], to_nodes: List[HollowZeroMapNode],
+                    screen_width: int, screen_height: int) -> np.ndarray:
     """
-    1在2上边
-    :param node_1:
-    :param node_2:
-    :return:
+    计算两组节点之间的边
+    :param from_nodes: 起点
+    :param to_nodes: 终点
+    :param screen_width: 画面宽度 超出画面的节点不连边
+    :param screen_height: 画面高度
+    :return: 形状为 (起点数量, 终点数量) 的数组 表示能否从起点移动到终点
     """
-    min_height = min(node_1.pos.height,  node_2.pos.height) // 4
-    return abs(node_1.pos.y1 - node_2.pos.y2) <= min_height and _is_same_col(node_1, node_2)
+    x1_a, y1_a, x2_a, y2_a, valid_a, left_a, right_a, up_a, down_a = _get_edge_attr(from_nodes, screen_width, screen_height)
+    x1_b, y1_b, x2_b, y2_b, valid_b, left_b, right_b, up_b, down_b = _get_edge_attr(to_nodes, screen_width, screen_height)
+
+    # 行是节点1 列是节点2
+    min_width = np.minimum((x2_a - x1_a)[:, None], (x2_b - x1_b)[None, :])
+    min_height = np.minimum((y2_a - y1_a)[:, None], (y2_b - y1_b)[None, :])
+
+    same_row = ((np.abs(y1_a[:, None] - y1_b[None, :]) <= min_height // 3)
+                | (np.abs(y2_a[:, None] - y2_b[None, :]) <= min_height // 3))
+    same_col = ((np.abs(x1_a[:, None] - x1_b[None, :]) <= min_width // 3)
+                | (np.abs(x2_a[:, None] - x2_b[None, :]) <= min_width // 3))
 
+    # 与逐对判断一样 按 左边、右边、上边、下边 的顺序 只使用第一个满足的方向
+    at_left = (np.abs(x2_a[:, None] - x1_b[None, :]) <= min_width // 4) & same_row  # 1在2左边
+    at_right = ~at_left & (np.abs(x1_a[:, None] - x2_b[None, :]) <= min_width // 4) & same_row  # 1在2右边
+    not_row = ~at_left & ~at_right
+    above = not_row & (np.abs(y2_a[:, None] - y1_b[None, :]) <= min_height // 4) & same_col  # 1在2上边
+    under = not_row & ~above & (np.abs(y1_a[:, None] - y2_b[None, :]) <= min_height // 4) & same_col  # 1在2下边
 
-def _is_same_row(node_1: HollowZeroMapNode, node_2: HollowZeroMapNode) -> bool:
-    min_height = min(node_1.pos.height,  node_2.pos.height) // 3
-    y1_close = abs(node_1.pos.y1 - node_2.pos.y1) <= min_height
-    y2_close = abs(node_1.pos.y2 - node_2.pos.y2) <= min_height
-    return y1_close or y2_close
+    # 轨道只能沿着自身方向离开 也不能逆着方向进入
+    at_left &= ~left_b[None, :] & ~(up_a | down_a | left_a)[:, None]
+    at_right &= ~right_b[None, :] & ~(up_a | down_a | right_a)[:, None]
+    above &= ~up_b[None, :] & ~(left_a | right_a | up_a)[:, None]
+    under &= ~down_b[None, :] & ~(left_a | right_a | down_a)[:, None]
 
+    return (at_left | at_right | above | under) & valid_a[:, None] & valid_b[None, :]
 
-def _is_same_col(node_1: HollowZeroMapNode, node_2: HollowZeroMapNode) -> bool:
-    min_width = min(node_1.pos.width,  node_2.pos.width) // 3
-    x1_close = abs(node_1.pos.x1 - node_2.pos.x1) <= min_width
-    x2_close = abs(node_1.pos.x2 - node_2.pos.x2) <= min_width
-    return x1_close or x2_close
+
+def _get_edge_attr(nodes: List[HollowZeroMapNode], screen_width: int, screen_height: int) -> Tuple[np.ndarray, ...]:
+    """
+    计算边需要的节点属性
+    :return: x1, y1, x2, y2, 是否可连边, 是否轨道-左, 轨道-右, 轨道-上, 轨道-下
+    """
+    pos_arr = get_pos_array(nodes)
+    x1, y1, x2, y2 = pos_arr[:, 0], pos_arr[:, 1], pos_arr[:, 2], pos_arr[:, 3]
+    name_list = [node.entry.entry_name for node in nodes]
+    valid = ((x1 >= 0) & (y1 >= 0) & (x2 < screen_width) & (y2 < screen_height)
+             & np.array([node.entry.can_go for node in nodes], dtype=bool))
+    return (
+        x1, y1, x2, y2, valid,
+        np.array([name == '轨道-左' for name in name_list], dtype=bool),
+        np.array([name == '轨道-右' for name in name_list], dtype=bool),
+        np.array([name == '轨道-上' for name in name_list], dtype=bool),
+        np.array([name == '轨道-下' for name in name_list], dtype=bool),
+    )
 
 
 def _add_edge(edges: dict[int, List[int]], x: int, y: int) -> None:
@@ -211,75 +207,109 @@ def _add_directed_edge(edges: dict[int, List[int]], x: int, y: int) -> None:
         edges[x].append(y)
 
 
-def is_same_map(map_1: HollowZeroMap, map_2: HollowZeroMap) -> bool:
+def merge_node(to_merge: HollowZeroMapNode, node: HollowZeroMapNode) -> None:
     """
-    判断两个地图是否同一个地图
-    通常情况下，两个地图的差异是在一步移动之后产生的，因此大部分节点都应该一致
-    当相同节点数量 >= 1/2 地图节点时，认为地图一致
-    :param map_1: 地图1
-    :param map_2: 地图2
+    同一位置的两个节点合并 结果保存在 to_merge 中
+    :param to_merge: 合并到的节点
+    :param node: 另一个节点
     :return:
     """
-    node_cnt_1 = len(map_1.nodes)
-    node_cnt_2 = len(map_2.nodes)
+    if to_merge.entry.is_base:  # 旧的是底座 那么将新的类型赋值上去
+        to_merge.entry = node.entry
+    elif node.entry.is_base:  # 旧的是格子类型 新的是底座 将底座范围赋值上去
+        to_merge.pos = node.pos
+    elif to_merge.entry.entry_name == '未知' and node.entry.entry_name != '未知':  # 新旧都是格子类型 旧的是未知 将新的类型赋值上去
+        to_merge.entry = node.entry
+    elif to_merge.entry.entry_name != '未知' and node.entry.entry_name == '未知':  # 新旧都是格子类型 新的是未知 保持不变
+        pass
+    elif to_merge.confidence > 0.95 and node.confidence > 0.95:
+        if to_merge.check_time < node.check_time:  # 两者置信度都很高 保留时间最新的结果
+            to_merge.entry = node.entry
+    elif to_merge.confidence < node.confidence:  # 新旧都是格子类型 旧的识别置信度低 将新的类型赋值上去
+        to_merge.entry = node.entry
+    elif to_merge.check_time < node.check_time:  # 新旧都是格子类型 新的识别时间更晚 将新的类型赋值上去
+        to_merge.entry = node.entry
+
+
+def _is_same_pos(pos_1: Rect, pos_2: Rect) -> bool:
+    """
+    判断两个坐标是否同一个节点的位置 中心距离小于最短边的一半
+    """
+    min_dis = min(pos_1.height, pos_1.width, pos_2.height, pos_2.width) // 2
+    return cal_utils.distance_between(pos_1.center, pos_2.center) < min_dis
 
-    if node_cnt_1 == 0 and node_cnt_2 == 0:
-        return True
-    elif node_cnt_1 == 0 or node_cnt_2 == 0:
-        return False
 
-    same_node_cnt = 0
-    for node_1 in map_1.nodes:
-        for node_2 in map_2.nodes:
-            if is_same_node(node_1, node_2):
-                same_node_cnt += 1
-                break
+def _cal_grid_cell_size(side_list: List[int]) -> int:
+    """
+    网格的边长 使用节点最短边的中位数 使大部分查找只需要检查相邻的几个网格
+    """
+    if len(side_list) == 0:
+        return 1
+    return max(1, int(np.median(side_list)))
 
-    # 极端情况下 是在3个格子的情况下移动 剩下2个格子
-    # 如果移动后有在内存将格子更新为当前 则本次识别的2个格子的应该跟之前的一样 因此至少有50%格子一致
-    # 必须要两个地图都有50%格子在另一张地图上 因为进入盲盒区域后 可能区域里只有少量格子 但跟外层的地图刚好重合
-    return same_node_cnt >= node_cnt_1 * 0.5 and same_node_cnt >= node_cnt_2 * 0.5
 
+class NodeGridIndex:
 
-def merge_map(ctx: ZContext, map_list: List[HollowZeroMap]):
-    """
-    将多个地图合并成一个
-    """
-    nodes: List[HollowZeroMapNode] = []
-    max_check_time: Optional[float] = None
-
-    # 每个地图的节点取出来后去重合并
-    for m in map_list:
-        for node in m.nodes:
-            to_merge: Optional[HollowZeroMapNode] = None
-            for existed in nodes:
-                if is_same_node_pos(node, existed):
-                    to_merge = existed
-                    break
-
-            if to_merge is not None:
-                if to_merge.entry.is_base:  # 旧的是底座 那么将新的类型赋值上去
-                    to_merge.entry = node.entry
-                elif node.entry.is_base:  # 旧的是格子类型 新的是底座 将底座范围赋值上去
-                    to_merge.pos = node.pos
-                elif to_merge.entry.entry_name == '未知' and node.entry.entry_name != '未知':  # 新旧都是格子类型 旧的是未知 将新的类型赋值上去
-                    to_merge.entry = node.entry
-                elif to_merge.entry.entry_name != '未知' and node.entry.entry_name == '未知':  # 新旧都是格子类型 新的是未知 保持不变
-                    pass
-                elif to_merge.confidence > 0.95 and node.confidence > 0.95:
-                    if to_merge.check_time < node.check_time:  # 两者置信度都很高 保留时间最新的结果
-                        to_merge.entry = node.entry
-                elif to_merge.confidence < node.confidence:  # 新旧都是格子类型 旧的识别置信度低 将新的类型赋值上去
-                    to_merge.entry = node.entry
-                elif to_merge.check_time < node.check_time:  # 新旧都是格子类型 新的识别时间更晚 将新的类型赋值上去
-                    to_merge.entry = node.entry
-            else:
-                nodes.append(node)
+    def __init__(self, cell_size: int):
+        """
+        按节点中心点划分网格的空间索引 用于查找同一位置的节点
+        同一位置要求中心距离小于最短边的一半 因此只需要检查查询节点周围 半个最短边 范围内的网格
+        :param cell_size: 网格边长
+        """
+        self.cell_size: int = max(1, cell_size)
+        self._cell_map: dict[Tuple[int, int], List[int]] = {}
 
-        if max_check_time is None or m.check_time > max_check_time:
-            max_check_time = m.check_time
+    def _get_cell(self, center: Point) -> Tuple[int, int]:
+        return center.x // self.cell_size, center.y // self.cell_size
 
-    return construct_map_from_nodes(ctx, nodes, max_check_time)
+    def add(self, idx: int, center: Point) -> None:
+        cell = self._get_cell(center)
+        if cell in self._cell_map:
+            self._cell_map[cell].append(idx)
+        else:
+            self._cell_map[cell] = [idx]
+
+    def move(self, idx: int, old_center: Point, new_center: Point) -> None:
+        """
+        节点的坐标改变后 更新所在的网格
+        """
+        old_cell = self._get_cell(old_center)
+        new_cell = self._get_cell(new_center)
+        if old_cell == new_cell:
+            return
+        self._cell_map[old_cell].remove(idx)
+        self.add(idx, new_center)
+
+    def get_candidates(self, pos: Rect) -> List[int]:
+        """
+        可能与这个坐标在同一位置的节点下标 从小到大
+        """
+        center = pos.center
+        radius = min(pos.width, pos.height) // 2
+        if radius <= 0:
+            return []
+        cell_x1, cell_y1 = self._get_cell(Point(center.x - radius, center.y - radius))
+        cell_x2, cell_y2 = self._get_cell(Point(center.x + radius, center.y + radius))
+        result: List[int] = []
+        for cell_x in range(cell_x1, cell_x2 + 1):
+            for cell_y in range(cell_y1, cell_y2 + 1):
+                idx_list = self._cell_map.get((cell_x, cell_y))
+                if idx_list is not None:
+                    result.extend(idx_list)
+        result.sort()
+        return result
+
+    def find_same_pos(self, nodes: List[HollowZeroMapNode], pos: Rect) -> Optional[int]:
+        """
+        找到与坐标在同一位置的第一个节点
+        :param nodes: 索引对应的节点列表
+        :param pos: 坐标
+        :return: 节点下标 没有时返回None
+        """
+        for idx in self.get_candidates(pos):
+            if _is_same_pos(pos, nodes[idx].pos):
+                return idx
+        return None
 
 
 def is_same_node_pos(x: HollowZeroMapNode, y: HollowZeroMapNode) -> bool:
@@ -288,8 +318,7 @@ def is_same_node_pos(x: HollowZeroMapNode, y: HollowZeroMapNode) -> bool:
     """
     if x is None or y is None:
         return False
-    min_dis = min(x.pos.height, x.pos.width, y.pos.height, y.pos.width) // 2
-    return cal_utils.distance_between(x.pos.center, y.pos.center) < min_dis
+    return _is_same_pos(x.pos, y.pos)
 
 
 def is_same_node(x: HollowZeroMapNode, y: HollowZeroMapNode) -> bool:
@@ -52,78 +52,104 @@ def _bfs_search_map(
     :param: visited_nodes: 已经去过的节点 这些在后续再经过时不需要步数
     :return:
     """
+    nodes = current_map.nodes
+    node_cnt = len(nodes)
+
+    # 搜索过程中使用数组记录寻路信息 结束后再写回节点
+    can_go: List[bool] = [node.entry.can_go for node in nodes]
+    if avoid_entry_list is not None:
+        for idx in range(node_cnt):
+            if nodes[idx].entry.entry_name in avoid_entry_list:  # 避免途经点
+                can_go[idx] = False
+    need_step_list: List[int] = [node.entry.need_step for node in nodes]
+    step_cnt: List[int] = [node.path_step_cnt for node in nodes]
+    node_cnt_list: List[int] = [node.path_node_cnt for node in nodes]
+    first_node: List[Optional[HollowZeroMapNode]] = [node.path_first_node for node in nodes]
+    first_need_step_node: List[Optional[HollowZeroMapNode]] = [node.path_first_need_step_node for node in nodes]
+    last_node: List[Optional[HollowZeroMapNode]] = [node.path_last_node for node in nodes]
+    updated: List[bool] = [False] * node_cnt
+
     bfs_queue: List[int] = []  # 当前层的节点下标
-    searched: set[int] = set()  # 已经搜索过的节点下标
+    in_bfs_queue: List[bool] = [False] * node_cnt
+    searched: List[bool] = [False] * node_cnt  # 已经搜索过的节点下标
     for idx in start_idx_list:
         bfs_queue.append(idx)
-        searched.add(idx)
+        in_bfs_queue[idx] = True
+        searched[idx] = True
 
     # 宽度搜索 每层先搜索不需要移动步数的；再搜索需要移动步数的
     while len(bfs_queue) > 0:
-        next_bfs_queue: List[int] = []  # 下一层
+        next_bfs_queue: dict[int, None] = {}  # 下一层 使用有序字典 可以O(1)判断和移出
         bfs_idx = 0  # 遍历当前层的节点
         while bfs_idx < len(bfs_queue):  # 注意当前层bfs_queue会不断加入不需要步数的节点 因此用这个while
             current_idx = bfs_queue[bfs_idx]
-            current_node = current_map.nodes[current_idx]
-            searched.add(current_idx)
+            current_node = nodes[current_idx]
+            searched[current_idx] = True
             bfs_idx += 1  # 标记这个节点已经处理 下一次循环需要处理下一个节点的
 
-            if current_idx not in current_map.edges:  # 这个节点没有边 即没有可以移动的节点
+            next_idx_list = current_map.edges.get(current_idx)
+            if next_idx_list is None:  # 这个节点没有边 即没有可以移动的节点
                 continue
 
-            for next_idx in current_map.edges[current_idx]:  # 遍历这个节点的边 找到可以移动的节点
-                if next_idx in searched:  # 这个可以移动的节点 已经被搜索过
+            current_step_cnt = step_cnt[current_idx]
+            for next_idx in next_idx_list:  # 遍历这个节点的边 找到可以移动的节点
+                if searched[next_idx]:  # 这个可以移动的节点 已经被搜索过
                     continue
-
-                next_node = current_map.nodes[next_idx]
-                next_entry = next_node.entry
-
-                if not next_entry.can_go:  # 无法移动
-                    continue
-                if avoid_entry_list is not None and next_entry.entry_name in avoid_entry_list:  # 避免途经点
+                if not can_go[next_idx]:  # 无法移动 或者是避免途经点
                     continue
 
-                need_step = next_entry.need_step  # 前往这个节点是否需要步数
+                next_node = nodes[next_idx]
+                need_step = need_step_list[next_idx]  # 前往这个节点是否需要步数
 
                 # 已经去过 且还是存在的节点 还是需要先路过
                 # 否则 依赖直接点击终点 游戏内的自动寻路有几率选择另一条更短但无法通行的路 例如是危机节点
                 # 这时候就会卡死
                 # 参考 https://github.com/OneDragon-Anything/ZenlessZoneZero-OneDragon/issues/382
                 # 已经去过的节点 在 hollow_runner 中判断，不再触发对应的事件指令
-                # if (next_entry.entry_name == '邦布商人'  # 当前只有商人不会消失
+                # if (next_node.entry.entry_name == '邦布商人'  # 当前只有商人不会消失
                 #         and visited_nodes is not None
                 #         and had_been_visited(next_node, visited_nodes)):  # 已经去过的节点 不需要步数
                 #     need_step = 0
 
                 # 根据节点类型 计算前往下一个节点的步数
-                next_step_cnt = current_node.path_step_cnt + need_step
+                next_step_cnt = current_step_cnt + need_step
                 # 判断这条路径上 第一个需要步数的节点是哪个 即需要点击的节点
-                if next_step_cnt <= 1 and next_entry.need_step > 0:
-                    first_need_step_node = next_node
-                else:
-                    first_need_step_node = current_node.path_first_need_step_node
-
                 # 设置下一个节点的寻路信息
-                next_node.path_first_node = next_node if current_node.path_first_node is None else current_node.path_first_node
-                next_node.path_first_need_step_node = first_need_step_node
-                next_node.path_last_node = current_node
-                next_node.path_step_cnt = next_step_cnt
-                next_node.path_node_cnt = current_node.path_node_cnt + 1
-                # 构建前往下一个节点的路径
-
-                if next_step_cnt == current_node.path_step_cnt:  # 相同步数 就加入当前层 继续搜索
-                    if next_idx in bfs_queue:  # 已经在当前队列
+                if next_step_cnt <= 1 and need_step > 0:
+                    first_need_step_node[next_idx] = next_node
+                else:
+                    first_need_step_node[next_idx] = first_need_step_node[current_idx]
+                first_node[next_idx] = next_node if first_node[current_idx] is None else first_node[current_idx]
+                last_node[next_idx] = current_node
+                step_cnt[next_idx] = next_step_cnt
+                node_cnt_list[next_idx] = node_cnt_list[current_idx] + 1
+                updated[next_idx] = True
+
+                if next_step_cnt == current_step_cnt:  # 相同步数 就加入当前层 继续搜索
+                    if in_bfs_queue[next_idx]:  # 已经在当前队列
                         pass
-                    elif next_idx in next_bfs_queue:  # 在下一层的队列 移动
-                        next_bfs_queue.remove(next_idx)
-                        bfs_queue.append(next_idx)
-                    else:  # 都不在 放入当前的队列
+                    else:  # 在下一层的队列时移出 放入当前的队列
+                        next_bfs_queue.pop(next_idx, None)
                         bfs_queue.append(next_idx)
+                        in_bfs_queue[next_idx] = True
                 else:  # 步数增加的 就加入下一层 等待后续搜索
                     if next_idx not in next_bfs_queue:
-                        next_bfs_queue.append(next_idx)
+                        next_bfs_queue[next_idx] = None
 
-        bfs_queue = next_bfs_queue
+        bfs_queue = list(next_bfs_queue.keys())
+        in_bfs_queue = [False] * node_cnt
+        for idx in bfs_queue:
+            in_bfs_queue[idx] = True
+
+    for idx in range(node_cnt):
+        if not updated[idx]:
+            continue
+        node = nodes[idx]
+        node.path_first_node = first_node[idx]
+        node.path_first_need_step_node = first_need_step_node[idx]
+        node.path_last_node = last_node[idx]
+        node.path_step_cnt = step_cnt[idx]
+        node.path_node_cnt = node_cnt_list[idx]
 
 
 def get_route_in_1_step(current_map: HollowZeroMap,
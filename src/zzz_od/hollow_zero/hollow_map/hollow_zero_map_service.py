@@ -6,7 +6,8 @@ from typing import List, Optional
 from one_dragon.utils.log_utils import log
 from zzz_od.context.zzz_context import ZContext
 from zzz_od.hollow_zero.hollow_map import hollow_map_utils
-from zzz_od.hollow_zero.hollow_map.hollow_zero_map import HollowZeroMap
+from zzz_od.hollow_zero.hollow_map.hollow_map_tracker import HollowMapTracker
+from zzz_od.hollow_zero.hollow_map.hollow_zero_map import HollowZeroMap, HollowZeroMapNode
 from zzz_od.hollow_zero.hollow_zero_data_service import HallowZeroDataService
 from zzz_od.yolo.hollow_event_detector import HollowEventDetector
 
@@ -18,7 +19,7 @@ class HollowZeroMapService:
 
         self.data_service: HallowZeroDataService = HallowZeroDataService()
         self.event_model: Optional[HollowEventDetector] = None
-        self.map_list: List[HollowZeroMap] = []
+        self.tracker_list: List[HollowMapTracker] = []  # 过去一段时间识别到的地图 每个地图持续更新
 
     def init_event_yolo(self) -> None:
         use_gpu = self.ctx.model_config.hollow_zero_event_gpu
@@ -39,6 +40,19 @@ class HollowZeroMapService:
         :param screenshot_time: 截图时间
         :return:
         """
+        nodes = self.cal_current_nodes_by_screen(screen, screenshot_time)
+        if nodes is None or len(nodes) == 0:  # 有识别到节点才认为是有地图
+            return None
+
+        return hollow_map_utils.construct_map_from_nodes(self.ctx, nodes, screenshot_time)
+
+    def cal_current_nodes_by_screen(self, screen: MatLike, screenshot_time: float) -> Optional[List[HollowZeroMapNode]]:
+        """
+        根据当前的游戏画面 识别地图上的节点 不计算边
+        :param screen: 游戏画面
+        :param screenshot_time: 截图时间
+        :return:
+        """
         if self.event_model is None:
             return None
         result = self.event_model.run(screen, run_time=screenshot_time)
@@ -47,7 +61,7 @@ class HollowZeroMapService:
         if result is None:
             return None
 
-        return hollow_map_utils.construct_map_from_yolo_result(self.ctx, result, self.data_service.name_2_entry)
+        return hollow_map_utils.construct_nodes_from_yolo_result(result, self.data_service.name_2_entry)
 
     def cal_map_by_screen(self, screen: MatLike, screenshot_time: float) -> Optional[HollowZeroMap]:
         """
@@ -58,45 +72,37 @@ class HollowZeroMapService:
         :return:
         """
         start_time = time.time()
-        # 当前帧的地图
-        current_map = self.cal_current_map_by_screen(screen, screenshot_time)
-        if current_map is None:
+        # 当前帧的节点
+        nodes = self.cal_current_nodes_by_screen(screen, screenshot_time)
+        if nodes is None or len(nodes) == 0:
             return None
 
-        # 尝试与过去识别的结果合并
-        merge_idx: int = -1
-        merge_map: HollowZeroMap = current_map
-        for i in range(len(self.map_list)):
-            old_map = self.map_list[i]
-            # 判断是一样的地图 才有可能进行合并
-            if not hollow_map_utils.is_same_map(current_map, old_map):
-                continue
-
-            merge_map = hollow_map_utils.merge_map(self.ctx, [current_map, old_map])
-            if merge_map.is_valid_map:
-                merge_idx = i
+        # 尝试更新过去识别的地图
+        matched: Optional[HollowMapTracker] = None
+        for tracker in self.tracker_list:
+            if tracker.update(nodes, screenshot_time):
+                matched = tracker
                 break
 
-        for old_map in self.map_list:
-            old_map.not_current_map_times += 1
+        for tracker in self.tracker_list:
+            tracker.map.not_current_map_times += 1
 
-        if merge_idx != -1:
-            merge_map.not_current_map_times = 0
-            self.map_list[merge_idx] = merge_map
-        else:
-            self.map_list.append(current_map)
+        if matched is None:
+            matched = HollowMapTracker(self.ctx, nodes, screenshot_time)
+            self.tracker_list.append(matched)
+        matched.map.not_current_map_times = 0
 
-        self.map_list = [x for x in self.map_list if x.not_current_map_times <= 10]
+        self.tracker_list = [x for x in self.tracker_list if x.map.not_current_map_times <= 10]
 
         log.debug('空洞地图识别 耗时 %.2f 秒', time.time() - start_time)
-        return merge_map
+        return matched.map
 
     def clear_map_result(self) -> None:
         """
         清除所有识别结果
         :return:
         """
-        self.map_list.clear()
+        self.tracker_list.clear()
 
 def __debug_cal_current_map_by_screen():
     ctx = ZContext()
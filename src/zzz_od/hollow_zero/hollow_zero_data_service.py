@@ -1,8 +1,8 @@
-import difflib
 import os
 import yaml
 from typing import List, Optional, Tuple
 
+from one_dragon.base.matcher import fuzzy_match_index
 from one_dragon.utils import os_utils
 from one_dragon.utils.i18_utils import gt
 from one_dragon.utils.log_utils import log
@@ -104,7 +104,7 @@ class HallowZeroDataService:
     def match_resonium_by_ocr(self, cate_ocr: str, name_ocr: str) -> Optional[Resonium]:
         log.info('当前识别 %s %s', cate_ocr, name_ocr)
         category_list = [gt(i, 'game') for i in self.resonium_cate_list]
-        results = difflib.get_close_matches(cate_ocr, category_list, n=2, cutoff=0.5)
+        results = fuzzy_match_index.get_fuzzy_match_index(category_list).get_close_matches(cate_ocr, n=2, cutoff=0.5)
 
         if results is None or len(results) == 0:
             log.info('匹配结果 无')
@@ -130,7 +130,7 @@ class HallowZeroDataService:
         resonium_list = self.cate_2_resonium[self.resonium_cate_list[category_idx]]
 
         resonium_name_list = [gt(i.name, 'game') for i in resonium_list]
-        results = difflib.get_close_matches(name_ocr, resonium_name_list, n=1)
+        results = fuzzy_match_index.get_fuzzy_match_index(resonium_name_list).get_close_matches(name_ocr, n=1)
 
         if results is None or len(results) == 0:
             log.info('匹配结果 无')